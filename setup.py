@@ -177,6 +177,7 @@ setup(
     cmdclass={"build_ext": CMakeBuild},
     zip_safe=False,
     setup_requires=["cmake", "mypy", "pybind11"],
+    install_requires=["numpy"],
     extras_require={"dev": ["pytest", "ruff", "mypy", "darglint"]},
     packages=find_packages(include=["tmesh", "tmesh.*"]),
     python_requires=">=3.7",
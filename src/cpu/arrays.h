@@ -0,0 +1,137 @@
+#pragma once
+
+#include <pybind11/numpy.h>
+#include <pybind11/pybind11.h>
+
+#include <cstdint>
+#include <stdexcept>
+#include <string>
+#include <type_traits>
+#include <utility>
+#include <vector>
+
+namespace py = pybind11;
+
+namespace trimesh {
+
+// C-contiguous NumPy array, casting the input to the given type if needed.
+template <typename T>
+using carray_t = py::array_t<T, py::array::c_style | py::array::forcecast>;
+
+// Returns a read-only (N, D) NumPy view over a vector or span of structs,
+// where each struct is laid out as D contiguous values of type T. The data is
+// not copied; instead, `base` is kept alive for as long as the view exists.
+template <typename T, size_t D, typename C>
+py::array_t<T> as_readonly_array(const C &values, py::handle base) {
+    using S = typename C::value_type;
+    static_assert(std::is_standard_layout_v<S>,
+                  "Struct must have a standard layout");
+    static_assert(sizeof(S) == D * sizeof(T),
+                  "Struct must be D contiguous values of type T");
+
+    py::array_t<T> arr({values.size(), D}, {sizeof(S), sizeof(T)},
+                       reinterpret_cast<const T *>(values.data()), base);
+    py::detail::array_proxy(arr.ptr())->flags &=
+        ~py::detail::npy_api::NPY_ARRAY_WRITEABLE_;
+    return arr;
+}
+
+// Returns an (N, D) NumPy array which takes ownership of a vector of structs,
+// where each struct is laid out as D contiguous values of type T. The data is
+// not copied; instead, the vector is freed once the array is.
+template <typename T, size_t D, typename S>
+py::array_t<T> as_owned_array(std::vector<S> &&values) {
+    static_assert(std::is_standard_layout_v<S>,
+                  "Struct must have a standard layout");
+    static_assert(sizeof(S) == D * sizeof(T),
+                  "Struct must be D contiguous values of type T");
+
+    auto *owned = new std::vector<S>(std::move(values));
+    py::capsule base(
+        owned, [](void *p) { delete reinterpret_cast<std::vector<S> *>(p); });
+    return py::array_t<T>({owned->size(), D}, {sizeof(S), sizeof(T)},
+                          reinterpret_cast<const T *>(owned->data()), base);
+}
+
+// Checks that an array has shape (N, Dims...).
+template <size_t... Dims, typename T>
+void check_array_shape(const carray_t<T> &arr, const std::string &name) {
+    constexpr size_t dims[] = {Dims...};
+    bool valid = arr.ndim() == static_cast<py::ssize_t>(sizeof...(Dims) + 1);
+    for (size_t i = 0; valid && i < sizeof...(Dims); i++)
+        valid = static_cast<size_t>(arr.shape(i + 1)) == dims[i];
+    if (!valid) {
+        std::string shape = "(N";
+        for (size_t d : dims) shape += ", " + std::to_string(d);
+        throw std::invalid_argument("Expected " + name + " to have shape " +
+                                    shape + ")");
+    }
+}
+
+// Reinterprets an (N, Dims...) array as a pointer to N structs, where each
+// struct is laid out as contiguous doubles. The data is not copied.
+template <typename S, size_t... Dims>
+const S *structs_from_array(const carray_t<double> &arr,
+                            const std::string &name) {
+    static_assert(std::is_standard_layout_v<S>,
+                  "Struct must have a standard layout");
+    static_assert(sizeof(S) == (Dims * ... * sizeof(double)),
+                  "Struct must be contiguous doubles");
+
+    check_array_shape<Dims...>(arr, name);
+    return reinterpret_cast<const S *>(arr.data());
+}
+
+// Allocates an output array with `n` rows of `C` values (a flat array if `C`
+// is 1) and fills each row with `fn(i, row)`, with the GIL released.
+template <typename R, size_t C = 1, typename F>
+py::array_t<R> map_rows(size_t n, F &&fn) {
+    py::array_t<R> out = C == 1 ? py::array_t<R>(n) : py::array_t<R>({n, C});
+    R *data = out.mutable_data();
+    {
+        py::gil_scoped_release release;
+        for (size_t i = 0; i < n; i++) fn(i, data + i * C);
+    }
+    return out;
+}
+
+// Copies an (N, D) array of coordinates into a vector of points, where each
+// point is laid out as D contiguous doubles.
+template <typename S, size_t D>
+std::vector<S> points_from_array(const carray_t<double> &arr,
+                                 const std::string &name) {
+    const S *points = structs_from_array<S, D>(arr, name);
+    return {points, points + arr.shape(0)};
+}
+
+template <typename S, size_t... I>
+S index_struct_from_row(const int64_t *row, std::index_sequence<I...>) {
+    return S(static_cast<size_t>(row[I])...);
+}
+
+// Converts an (M, D) array of vertex indices into a vector of faces or
+// volumes, using their constructors so that they are canonicalized.
+template <typename S, size_t D>
+std::vector<S> indices_from_array(const carray_t<int64_t> &arr,
+                                  const std::string &name) {
+    check_array_shape<D>(arr, name);
+    const size_t n = arr.shape(0);
+    const int64_t *data = arr.data();
+    std::vector<S> values;
+    values.reserve(n);
+    for (size_t i = 0; i < n; i++) {
+        const int64_t *row = data + i * D;
+        for (size_t j = 0; j < D; j++) {
+            if (row[j] < 0) {
+                throw std::invalid_argument("Negative index in " + name +
+                                            " at row " + std::to_string(i) +
+                                            ": " + std::to_string(row[j]));
+            }
+        }
+        values.push_back(
+            index_struct_from_row<S>(row, std::make_index_sequence<D>{}));
+    }
+    return values;
+}
+
+}  // namespace trimesh
@@ -4,6 +4,7 @@
 #include "options.h"
 #include "shapes.h"
 #include "three/main.h"
+#include "tmesh_io.h"
 #include "two/main.h"
 #include "types.h"
 
@@ -16,6 +17,7 @@ void add_cpu_modules(py::module &m) {
     add_3d_modules(m);
     add_shapes_modules(m);
     add_ops_modules(m);
+    add_tmesh_io_modules(m);
 }
 
 }  // namespace trimesh
@@ -0,0 +1,41 @@
+#include "mapped_file.h"
+
+#include <fcntl.h>
+#include <sys/mman.h>
+#include <sys/stat.h>
+#include <unistd.h>
+
+#include <stdexcept>
+
+namespace trimesh {
+
+mapped_file_t::mapped_file_t(const std::string &filename) {
+    const int fd = ::open(filename.c_str(), O_RDONLY);
+    if (fd < 0) throw std::runtime_error("Could not open file " + filename);
+    struct stat st;
+    if (::fstat(fd, &st) < 0) {
+        ::close(fd);
+        throw std::runtime_error("Could not read file " + filename);
+    }
+
+    // Empty files can't be mapped, but there is nothing to read from them.
+    this->size = st.st_size;
+    if (this->size > 0) {
+        void *data = ::mmap(nullptr, this->size, PROT_READ, MAP_PRIVATE, fd, 0);
+        if (data == MAP_FAILED) {
+            ::close(fd);
+            throw std::runtime_error("Could not map file " + filename);
+        }
+        ::madvise(data, this->size, MADV_WILLNEED);
+        this->data = static_cast<const char *>(data);
+    }
+
+    // The mapping stays valid after the file is closed.
+    ::close(fd);
+}
+
+mapped_file_t::~mapped_file_t() {
+    if (this->data) ::munmap(const_cast<char *>(this->data), this->size);
+}
+
+}  // namespace trimesh
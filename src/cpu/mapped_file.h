@@ -0,0 +1,18 @@
+#pragma once
+
+#include <string>
+
+namespace trimesh {
+
+// A file which is memory-mapped for reading, and unmapped when destroyed.
+struct mapped_file_t {
+    const char *data = nullptr;
+    size_t size = 0;
+
+    explicit mapped_file_t(const std::string &filename);
+    mapped_file_t(const mapped_file_t &) = delete;
+    mapped_file_t &operator=(const mapped_file_t &) = delete;
+    ~mapped_file_t();
+};
+
+}  // namespace trimesh
@@ -0,0 +1,49 @@
+#pragma once
+
+#include <algorithm>
+#include <exception>
+#include <thread>
+#include <vector>
+
+namespace trimesh {
+
+// Returns the number of threads to use for `n` work items, where a request
+// for 0 threads means one thread per hardware thread.
+inline size_t get_num_threads(size_t num_threads, size_t n) {
+    if (num_threads == 0)
+        num_threads = std::max<size_t>(std::thread::hardware_concurrency(), 1);
+    return std::max<size_t>(std::min(num_threads, n), 1);
+}
+
+// Splits [0, n) into `num_chunks` contiguous chunks and calls
+// `fn(chunk, lo, hi)` for each chunk on its own thread. The chunk boundaries
+// only depend on `n` and `num_chunks`, so callers can combine per-chunk
+// results deterministically. The first exception thrown by any chunk is
+// rethrown once all of the threads have finished.
+template <typename F>
+void parallel_chunks(size_t n, size_t num_chunks, F &&fn) {
+    if (num_chunks <= 1) {
+        fn(0, 0, n);
+        return;
+    }
+
+    std::vector<std::exception_ptr> errors(num_chunks);
+    std::vector<std::thread> threads;
+    threads.reserve(num_chunks);
+    for (size_t chunk = 0; chunk < num_chunks; chunk++) {
+        const size_t lo = n * chunk / num_chunks,
+                     hi = n * (chunk + 1) / num_chunks;
+        threads.emplace_back([&fn, &errors, chunk, lo, hi]() {
+            try {
+                fn(chunk, lo, hi);
+            } catch (...) {
+                errors[chunk] = std::current_exception();
+            }
+        });
+    }
+    for (auto &thread : threads) thread.join();
+    for (const auto &error : errors)
+        if (error) std::rethrow_exception(error);
+}
+
+}  // namespace trimesh
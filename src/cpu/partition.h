@@ -0,0 +1,549 @@
+#pragma once
+
+#include <algorithm>
+#include <array>
+#include <atomic>
+#include <cmath>
+#include <limits>
+#include <optional>
+#include <stdexcept>
+#include <utility>
+#include <vector>
+
+#include "parallel.h"
+#include "predicates.h"
+#include "weld.h"
+
+namespace trimesh {
+
+// Vertex indices of a simplex with D + 1 vertices.
+template <size_t D>
+using simplex_t = std::array<size_t, D + 1>;
+
+// Number of cells of halo around each block, whose points are triangulated
+// along with the block's own points. The grid has about one point per cell.
+constexpr size_t BLOCK_HALO_CELLS = 2;
+
+// Minimum number of points per block when triangulating in parallel.
+constexpr size_t MIN_POINTS_PER_BLOCK = 1024;
+
+// Relative padding of squared circumradii computed in floating point, so
+// that the balls which are searched for points always contain the exact
+// circumspheres. The points found are then checked with exact predicates.
+constexpr double CIRCUMSPHERE_TOLERANCE = 1e-9;
+
+// Returns the circumcenter and squared circumradius of a simplex, given its
+// vertex coordinates. If the simplex is degenerate, the radius is infinite.
+template <size_t D>
+std::pair<std::array<double, D>, double> circumsphere(
+    const std::array<std::array<double, D>, D + 1> &v) {
+    // Solves (v[i] - v[0]) . x = |v[i] - v[0]|^2 / 2 for the offset `x` of
+    // the center from the first vertex, using Gaussian elimination.
+    std::array<std::array<double, D + 1>, D> a;
+    for (size_t i = 0; i < D; i++) {
+        double sq = 0;
+        for (size_t d = 0; d < D; d++) {
+            a[i][d] = v[i + 1][d] - v[0][d];
+            sq += a[i][d] * a[i][d];
+        }
+        a[i][D] = sq / 2;
+    }
+    const double inf = std::numeric_limits<double>::infinity();
+    for (size_t c = 0; c < D; c++) {
+        size_t pivot = c;
+        for (size_t r = c + 1; r < D; r++)
+            if (std::abs(a[r][c]) > std::abs(a[pivot][c])) pivot = r;
+        std::swap(a[c], a[pivot]);
+        if (a[c][c] == 0) return {v[0], inf};
+        for (size_t r = c + 1; r < D; r++) {
+            const double f = a[r][c] / a[c][c];
+            for (size_t k = c; k <= D; k++) a[r][k] -= f * a[c][k];
+        }
+    }
+    std::array<double, D> x, center;
+    double r2 = 0;
+    for (size_t c = D; c-- > 0;) {
+        double s = a[c][D];
+        for (size_t k = c + 1; k < D; k++) s -= a[c][k] * x[k];
+        x[c] = s / a[c][c];
+    }
+    for (size_t d = 0; d < D; d++) {
+        center[d] = v[0][d] + x[d];
+        r2 += x[d] * x[d];
+    }
+    return {center, std::isfinite(r2) ? r2 : inf};
+}
+
+// Uniform grid over the bounding box of a point set, with about one point
+// per cell, whose cells are grouped into blocks for triangulating the points
+// in parallel. Axes along which the points are (nearly) flat get one cell.
+template <size_t D>
+struct block_grid_t {
+    // Half-open range of cells along each axis.
+    struct range_t {
+        std::array<size_t, D> lo, hi;
+    };
+
+    std::array<double, D> min, max;
+    double cell_size = 0;
+    std::array<size_t, D> num_cells, num_blocks;
+
+    // Points sorted by cell, where the points in flat cell `c` are
+    // `cell_points[cell_start[c]:cell_start[c + 1]]`.
+    std::vector<size_t> cell_start, cell_points, point_block;
+
+    template <typename P>
+    block_grid_t(const std::vector<P> &points, size_t target_blocks)
+        : coords(points.size()) {
+        this->min.fill(std::numeric_limits<double>::infinity());
+        this->max.fill(-std::numeric_limits<double>::infinity());
+        for (size_t i = 0; i < points.size(); i++) {
+            this->coords[i] = point_coordinates<D>(points[i]);
+            for (size_t d = 0; d < D; d++) {
+                this->min[d] = std::min(this->min[d], this->coords[i][d]);
+                this->max[d] = std::max(this->max[d], this->coords[i][d]);
+            }
+        }
+
+        // Picks the cell size so that the axes which are longer than it
+        // have about one point per cell between them.
+        std::array<bool, D> active;
+        for (size_t d = 0; d < D; d++) active[d] = this->max[d] > this->min[d];
+        for (size_t iter = 0; iter < D; iter++) {
+            double volume = 1;
+            size_t k = 0;
+            for (size_t d = 0; d < D; d++) {
+                if (!active[d]) continue;
+                volume *= this->max[d] - this->min[d];
+                k++;
+            }
+            if (k == 0) break;
+            this->cell_size = std::pow(volume / points.size(), 1.0 / k);
+            bool changed = false;
+            for (size_t d = 0; d < D; d++) {
+                if (active[d] &&
+                    this->max[d] - this->min[d] < this->cell_size) {
+                    active[d] = false;
+                    changed = true;
+                }
+            }
+            if (!changed) break;
+        }
+
+        size_t total_cells = 1;
+        for (size_t d = 0; d < D; d++) {
+            const double extent = this->max[d] - this->min[d];
+            this->num_cells[d] =
+                active[d] && this->cell_size > 0
+                    ? std::max<size_t>(std::ceil(extent / this->cell_size), 1)
+                    : 1;
+            total_cells *= this->num_cells[d];
+        }
+
+        // Splits the axis with the most cells per block until there are
+        // enough blocks.
+        this->num_blocks.fill(1);
+        for (size_t total = 1; total < target_blocks;) {
+            size_t best = 0;
+            for (size_t d = 1; d < D; d++) {
+                if (this->num_cells[d] * this->num_blocks[best] >
+                    this->num_cells[best] * this->num_blocks[d])
+                    best = d;
+            }
+            if (this->num_blocks[best] >= this->num_cells[best]) break;
+            total /= this->num_blocks[best]++;
+            total *= this->num_blocks[best];
+        }
+
+        // Sorts the points by cell.
+        std::vector<size_t> point_cell(points.size());
+        this->point_block.resize(points.size());
+        this->cell_start.assign(total_cells + 1, 0);
+        for (size_t i = 0; i < points.size(); i++) {
+            const auto cell = this->cell_of(this->coords[i]);
+            point_cell[i] = this->flat_cell(cell);
+            this->point_block[i] = this->block_of(cell);
+            this->cell_start[point_cell[i] + 1]++;
+        }
+        for (size_t c = 0; c < total_cells; c++)
+            this->cell_start[c + 1] += this->cell_start[c];
+        this->cell_points.resize(points.size());
+        std::vector<size_t> offsets(this->cell_start.begin(),
+                                    this->cell_start.end() - 1);
+        for (size_t i = 0; i < points.size(); i++)
+            this->cell_points[offsets[point_cell[i]]++] = i;
+    }
+
+    size_t size() const {
+        size_t n = 1;
+        for (size_t d = 0; d < D; d++) n *= this->num_blocks[d];
+        return n;
+    }
+
+    const std::array<double, D> &coordinates(size_t i) const {
+        return this->coords[i];
+    }
+
+    // Returns the range of cells in a block, padded by `halo` cells.
+    range_t block_range(size_t block, size_t halo) const {
+        range_t range;
+        for (size_t d = 0; d < D; d++) {
+            const size_t b = block % this->num_blocks[d];
+            block /= this->num_blocks[d];
+            range.lo[d] = this->block_start(b, d);
+            range.hi[d] = this->block_start(b + 1, d);
+            range.lo[d] -= std::min(range.lo[d], halo);
+            range.hi[d] = std::min(range.hi[d] + halo, this->num_cells[d]);
+        }
+        return range;
+    }
+
+    // Returns the points in a range of cells.
+    std::vector<size_t> points_in(const range_t &range) const {
+        std::vector<size_t> ids;
+        this->for_each_column(range, [&](const auto &, size_t c, size_t lo,
+                                         size_t hi) {
+            ids.insert(ids.end(),
+                       this->cell_points.begin() + this->cell_start[c + lo],
+                       this->cell_points.begin() + this->cell_start[c + hi]);
+        });
+        return ids;
+    }
+
+    // Checks if a ball can only contain points in a range of cells, because
+    // it doesn't reach any part of the bounding box outside of the range.
+    bool ball_within(const range_t &range, const std::array<double, D> &center,
+                     double r2) const {
+        // Cell boundaries are padded, since points are assigned to cells
+        // with rounding error.
+        const double eps = this->cell_size * 1e-6;
+        std::array<double, D> outside;
+        double total = 0;
+        for (size_t d = 0; d < D; d++) {
+            outside[d] = std::max(
+                {this->min[d] - center[d], center[d] - this->max[d], 0.0});
+            total += outside[d] * outside[d];
+        }
+        for (size_t d = 0; d < D; d++) {
+            const double rest = total - outside[d] * outside[d];
+            if (range.lo[d] > 0) {
+                const double bound =
+                    this->min[d] + range.lo[d] * this->cell_size + eps;
+                const double gap = std::max(center[d] - bound, outside[d]);
+                if (rest + gap * gap < r2) return false;
+            }
+            if (range.hi[d] < this->num_cells[d]) {
+                const double bound =
+                    this->min[d] + range.hi[d] * this->cell_size - eps;
+                const double gap = std::max(bound - center[d], outside[d]);
+                if (rest + gap * gap < r2) return false;
+            }
+        }
+        return true;
+    }
+
+    // Checks if any point which lies strictly inside a ball is one for which
+    // `include(i)` is true. Only the cells which the ball overlaps are
+    // visited.
+    template <typename F>
+    bool ball_contains(const std::array<double, D> &center, double r2,
+                       F &&include) const {
+        if (!std::isfinite(r2)) return true;
+        const double r = std::sqrt(r2);
+        range_t range;
+        for (size_t d = 0; d < D; d++) {
+            range.lo[d] = this->cell_index(center[d] - r, d);
+            range.hi[d] = this->cell_index(center[d] + r, d) + 1;
+        }
+
+        // Narrows each column of cells along the last axis to the part
+        // which overlaps the ball.
+        bool found = false;
+        this->for_each_column(range, [&](const std::array<size_t, D> &cell,
+                                         size_t c, size_t lo, size_t hi) {
+            if (found) return;
+            double dist2 = 0;
+            for (size_t d = 0; d + 1 < D; d++) {
+                const double cell_lo = this->min[d] + cell[d] * this->cell_size;
+                const double gap =
+                    std::max({cell_lo - center[d],
+                              center[d] - (cell_lo + this->cell_size), 0.0});
+                dist2 += gap * gap;
+            }
+            if (dist2 >= r2) return;
+            const double h = std::sqrt(r2 - dist2);
+            lo = std::max(lo, this->cell_index(center[D - 1] - h, D - 1));
+            hi = std::min(hi, this->cell_index(center[D - 1] + h, D - 1) + 1);
+            for (size_t k = this->cell_start[c + lo];
+                 k < this->cell_start[c + hi] && !found; k++) {
+                const size_t i = this->cell_points[k];
+                double d2 = 0;
+                for (size_t d = 0; d < D; d++) {
+                    const double diff = this->coords[i][d] - center[d];
+                    d2 += diff * diff;
+                }
+                found = d2 < r2 && include(i);
+            }
+        });
+        return found;
+    }
+
+   private:
+    std::vector<std::array<double, D>> coords;
+
+    size_t cell_index(double x, size_t d) const {
+        if (this->num_cells[d] == 1) return 0;
+        const double t = std::floor((x - this->min[d]) / this->cell_size);
+        if (!(t > 0)) return 0;
+        return std::min(static_cast<size_t>(std::min<double>(t, SIZE_MAX / 2)),
+                        this->num_cells[d] - 1);
+    }
+
+    std::array<size_t, D> cell_of(const std::array<double, D> &p) const {
+        std::array<size_t, D> cell;
+        for (size_t d = 0; d < D; d++) cell[d] = this->cell_index(p[d], d);
+        return cell;
+    }
+
+    // Flat index of a cell, where cells along the last axis are contiguous.
+    size_t flat_cell(const std::array<size_t, D> &cell) const {
+        size_t c = 0;
+        for (size_t d = 0; d < D; d++) c = c * this->num_cells[d] + cell[d];
+        return c;
+    }
+
+    // Returns the first cell of the `b`-th block along an axis.
+    size_t block_start(size_t b, size_t d) const {
+        return b * this->num_cells[d] / this->num_blocks[d];
+    }
+
+    size_t block_of(const std::array<size_t, D> &cell) const {
+        size_t b = 0;
+        for (size_t d = D; d-- > 0;) {
+            const size_t k = this->num_blocks[d];
+            b = b * k + ((cell[d] + 1) * k - 1) / this->num_cells[d];
+        }
+        return b;
+    }
+
+    // Calls `fn(cell, c, lo, hi)` for each column of cells along the last
+    // axis in a range, where `cell` and `c` are the coordinates and flat
+    // index of the column's first cell, and `[lo, hi)` is the range of
+    // cells along the last axis.
+    template <typename F>
+    void for_each_column(const range_t &range, F &&fn) const {
+        std::array<size_t, D> cell = range.lo;
+        while (true) {
+            cell[D - 1] = 0;
+            fn(cell, this->flat_cell(cell), range.lo[D - 1], range.hi[D - 1]);
+            size_t d = 0;
+            for (; d + 1 < D; d++) {
+                if (++cell[d] < range.hi[d]) break;
+                cell[d] = range.lo[d];
+            }
+            if (d + 1 >= D) break;
+        }
+    }
+};
+
+// Delaunay triangulation of a set of distinct points, computed in parallel
+// by splitting the points into blocks of a grid. The result is the same as
+// triangulating all of the points at once, starting from the same enclosing
+// simplex, and dropping the simplices which touch it.
+//
+// Each block is triangulated together with a halo of nearby points. A simplex
+// of a block's tree is known to be in the full triangulation if its
+// circumsphere only reaches the cells of the block and its halo, and the
+// vertices of the neighboring simplices are outside of it, and a point is
+// finished if every simplex around it is known, since its neighborhood in the
+// full triangulation must then be the same. Ties between cospherical points
+// are broken by the perturbed predicates, which don't depend on the order of
+// insertion, so every block breaks them in the same way as the full
+// triangulation. The simplices around the finished points are kept by the
+// block of their lowest finished vertex. The simplices between the remaining
+// points are found by triangulating just those points, and keeping the
+// simplices whose circumspheres don't contain any finished points.
+//
+// `make_tree()` returns a new Delaunay tree starting from the enclosing
+// simplex, `insert(tree, ids)` reorders `ids` into the order they should be
+// inserted in and inserts them, `for_each_leaf(tree, fn)` calls `fn` with the
+// index of each leaf of the tree, and `get_simplex(tree, i)` returns the
+// vertex indices of a simplex, where the first D + 1 vertices are those of
+// the enclosing simplex. Simplices are returned with the same vertex order
+// as the leaves of the trees.
+template <size_t D, typename P, typename MakeTree, typename Insert,
+          typename ForEachLeaf, typename GetSimplex>
+std::vector<simplex_t<D>> triangulate_in_blocks(
+    const std::vector<P> &points, size_t num_threads, MakeTree &&make_tree,
+    Insert &&insert, ForEachLeaf &&for_each_leaf, GetSimplex &&get_simplex) {
+    const size_t n = points.size();
+    num_threads = get_num_threads(num_threads, n);
+    const block_grid_t<D> grid(points,
+                               std::min(num_threads, n / MIN_POINTS_PER_BLOCK));
+    const size_t num_blocks = grid.size();
+
+    // Triangulates the points with the given IDs, calling `fn` with the
+    // vertices of each leaf, the vertices across each of its faces, and the
+    // IDs of its vertices if it doesn't touch the enclosing simplex.
+    auto triangulate_points = [&](std::vector<size_t> &ids, auto &&fn) {
+        auto tree = make_tree();
+        insert(tree, ids);
+        if (tree.get_vertices().size() != ids.size() + D + 1)
+            throw std::runtime_error("Points were merged while triangulating");
+        for_each_leaf(tree, [&](size_t i) {
+            const simplex_t<D> leaf = get_simplex(tree, i);
+            const auto &neighbors = tree.get_neighbors(i);
+            simplex_t<D> opposite;
+            for (size_t k = 0; k <= D; k++) {
+                opposite[k] = NO_NEIGHBOR;
+                if (neighbors[k] == NO_NEIGHBOR) continue;
+                for (size_t v : get_simplex(tree, neighbors[k]))
+                    if (std::find(leaf.begin(), leaf.end(), v) == leaf.end())
+                        opposite[k] = v;
+            }
+            std::optional<simplex_t<D>> s = simplex_t<D>{};
+            for (size_t k = 0; k <= D && s; k++) {
+                if (leaf[k] <= D)
+                    s.reset();
+                else
+                    (*s)[k] = ids[leaf[k] - D - 1];
+            }
+            fn(leaf, opposite, s);
+        });
+    };
+
+    auto vertices_of = [&](const simplex_t<D> &s) {
+        std::array<std::array<double, D>, D + 1> v;
+        for (size_t k = 0; k <= D; k++) v[k] = grid.coordinates(s[k]);
+        return v;
+    };
+
+    auto sphere_of = [&](const simplex_t<D> &s) {
+        simplex_t<D> sorted = s;
+        std::sort(sorted.begin(), sorted.end());
+        return circumsphere<D>(vertices_of(sorted));
+    };
+
+    // Checks if a simplex of a block's tree is in the full triangulation.
+    // The tree is Delaunay with respect to the points in the block and its
+    // halo, so the circumsphere has to stay within their cells, and the
+    // vertices across each face have to be outside of it.
+    auto is_known = [&](const typename block_grid_t<D>::range_t &range,
+                        const std::vector<size_t> &ids, const simplex_t<D> &s,
+                        const simplex_t<D> &opposite) {
+        const auto [center, r2] = sphere_of(s);
+        if (!std::isfinite(r2) ||
+            !grid.ball_within(range, center, r2 * (1 + CIRCUMSPHERE_TOLERANCE)))
+            return false;
+        const auto vertices = vertices_of(s);
+        for (size_t v : opposite) {
+            if (v == NO_NEIGHBOR || v <= D) continue;
+            const auto p = grid.coordinates(ids[v - D - 1]);
+            if (simplex_in_sphere<D>(vertices, p) > 0) return false;
+        }
+        return true;
+    };
+
+    // Triangulates each block with its halo, finding the finished points
+    // and the known simplices around them.
+    std::vector<char> finished(n, 0);
+    std::vector<std::vector<simplex_t<D>>> candidates(num_blocks);
+    std::atomic<size_t> next_block{0};
+    const size_t num_workers = std::min(num_threads, num_blocks);
+    parallel_chunks(num_workers, num_workers, [&](size_t, size_t, size_t) {
+        for (size_t b; (b = next_block++) < num_blocks;) {
+            const auto range = grid.block_range(b, BLOCK_HALO_CELLS);
+            std::vector<size_t> ids = grid.points_in(range);
+            std::vector<char> unknown(ids.size(), 0);
+            std::vector<simplex_t<D>> known;
+            triangulate_points(
+                ids, [&](const simplex_t<D> &leaf, const simplex_t<D> &opposite,
+                         const std::optional<simplex_t<D>> &s) {
+                    // Only simplices around the block's own points which might
+                    // still be finished need to be checked.
+                    bool needed = false;
+                    for (size_t k = 0; k <= D && !needed; k++) {
+                        if (leaf[k] <= D) continue;
+                        const size_t j = leaf[k] - D - 1;
+                        needed = !unknown[j] && grid.point_block[ids[j]] == b;
+                    }
+                    if (!needed) return;
+                    if (s && is_known(range, ids, *s, opposite)) {
+                        known.push_back(*s);
+                        return;
+                    }
+                    for (size_t k = 0; k <= D; k++)
+                        if (leaf[k] > D) unknown[leaf[k] - D - 1] = 1;
+                });
+            for (size_t j = 0; j < ids.size(); j++)
+                if (!unknown[j] && grid.point_block[ids[j]] == b)
+                    finished[ids[j]] = 1;
+            for (const auto &s : known) {
+                for (size_t v : s) {
+                    if (grid.point_block[v] == b && finished[v]) {
+                        candidates[b].push_back(s);
+                        break;
+                    }
+                }
+            }
+        }
+    });
+
+    // Keeps each simplex in the block of its lowest finished vertex.
+    auto owner_block = [&](const simplex_t<D> &s) {
+        size_t owner = SIZE_MAX;
+        for (size_t v : s)
+            if (finished[v]) owner = std::min(owner, v);
+        return grid.point_block[owner];
+    };
+    parallel_chunks(num_blocks, num_workers, [&](size_t, size_t lo, size_t hi) {
+        for (size_t b = lo; b < hi; b++) {
+            auto &blk = candidates[b];
+            blk.erase(std::remove_if(blk.begin(), blk.end(),
+                                     [&](const simplex_t<D> &s) {
+                                         return owner_block(s) != b;
+                                     }),
+                      blk.end());
+        }
+    });
+    std::vector<simplex_t<D>> simplices;
+    for (auto &blk : candidates) {
+        simplices.insert(simplices.end(), blk.begin(), blk.end());
+        std::vector<simplex_t<D>>().swap(blk);
+    }
+
+    // Triangulates the unfinished points, keeping the simplices which would
+    // still be there after adding the finished points.
+    std::vector<size_t> rest;
+    for (size_t i = 0; i < n; i++)
+        if (!finished[i]) rest.push_back(i);
+    if (rest.empty()) return simplices;
+    std::vector<simplex_t<D>> remaining;
+    triangulate_points(rest, [&](const simplex_t<D> &, const simplex_t<D> &,
+                                 const std::optional<simplex_t<D>> &s) {
+        if (s) remaining.push_back(*s);
+    });
+    std::vector<char> keep(remaining.size(), 1);
+    if (rest.size() < n) {
+        parallel_chunks(
+            remaining.size(), get_num_threads(num_threads, remaining.size()),
+            [&](size_t, size_t lo, size_t hi) {
+                for (size_t j = lo; j < hi; j++) {
+                    const auto [center, r2] = sphere_of(remaining[j]);
+                    const auto vertices = vertices_of(remaining[j]);
+                    keep[j] = !grid.ball_contains(
+                        center, r2 * (1 + CIRCUMSPHERE_TOLERANCE),
+                        [&](size_t i) {
+                            return finished[i] &&
+                                   simplex_in_sphere<D>(
+                                       vertices, grid.coordinates(i)) > 0;
+                        });
+                }
+            });
+    }
+    for (size_t j = 0; j < remaining.size(); j++)
+        if (keep[j]) simplices.push_back(remaining[j]);
+    return simplices;
+}
+
+}  // namespace trimesh
@@ -0,0 +1,72 @@
+#pragma once
+
+#include <pybind11/pybind11.h>
+
+#include <cstring>
+#include <new>
+#include <stdexcept>
+#include <string>
+#include <string_view>
+#include <type_traits>
+#include <vector>
+
+#include "arrays.h"
+
+namespace py = pybind11;
+
+namespace trimesh {
+
+// Pickles a small value type, such as a point or an affine transformation, as
+// the bytes of its in-memory representation.
+template <typename T>
+auto pickle_as_bytes() {
+    static_assert(std::is_trivially_copyable_v<T>,
+                  "Type must be trivially copyable");
+
+    return py::pickle(
+        [](const T &value) {
+            return py::bytes(reinterpret_cast<const char *>(&value), sizeof(T));
+        },
+        [](const py::bytes &state) {
+            const std::string_view data = state;
+            if (data.size() != sizeof(T))
+                throw std::runtime_error("Invalid pickled state");
+            alignas(T) char buffer[sizeof(T)];
+            std::memcpy(buffer, data.data(), sizeof(T));
+            return *std::launder(reinterpret_cast<T *>(buffer));
+        });
+}
+
+// Checks that a pickled state is a tuple with the expected number of items.
+inline void check_state_size(const py::tuple &state, size_t size) {
+    if (state.size() != size) throw std::runtime_error("Invalid pickled state");
+}
+
+// Copies an (N, D) array from a pickled state back into a vector of structs,
+// where each struct is laid out as D contiguous values of type T.
+template <typename S, typename T, size_t D>
+std::vector<S> vector_from_state(py::handle arr, const std::string &name) {
+    static_assert(std::is_trivially_copyable_v<S>,
+                  "Struct must be trivially copyable");
+    static_assert(sizeof(S) == D * sizeof(T),
+                  "Struct must be D contiguous values of type T");
+
+    const auto values = arr.cast<carray_t<T>>();
+    check_array_shape<D>(values, name);
+    const S *begin = reinterpret_cast<const S *>(values.data());
+    return {begin, begin + values.shape(0)};
+}
+
+// Checks that the faces or volumes of an unpickled mesh, which is not
+// validated in full, only refer to its vertices.
+template <typename C>
+void check_state_indices(const C &items, size_t num_vertices) {
+    for (const auto &item : items) {
+        for (const size_t i : item.get_vertices()) {
+            if (i >= num_vertices)
+                throw std::runtime_error("Invalid mesh vertex index");
+        }
+    }
+}
+
+}  // namespace trimesh
@@ -0,0 +1,476 @@
+#include "predicates.h"
+
+#include <algorithm>
+#include <array>
+#include <cmath>
+#include <limits>
+#include <vector>
+
+namespace trimesh {
+
+// An expansion is a sum of floating point numbers which don't overlap,
+// ordered by increasing magnitude and without zeros, so that the last
+// component has the sign of the sum and approximates it.
+using expansion_t = std::vector<double>;
+
+// Computes `a + b` exactly as `x + y`, where `x` is the rounded sum.
+void two_sum(double a, double b, double &x, double &y) {
+    x = a + b;
+    const double b_virtual = x - a;
+    const double a_virtual = x - b_virtual;
+    y = (a - a_virtual) + (b - b_virtual);
+}
+
+// Like `two_sum`, but requires that `|a| >= |b|`.
+void fast_two_sum(double a, double b, double &x, double &y) {
+    x = a + b;
+    y = b - (x - a);
+}
+
+// Splits `a` into two halves with 26 significant bits each, so that their
+// products with other halves are exact.
+constexpr double SPLITTER = 134217729.0;  // 2^27 + 1
+
+void split(double a, double &hi, double &lo) {
+    const double c = SPLITTER * a;
+    const double big = c - a;
+    hi = c - big;
+    lo = a - hi;
+}
+
+// Computes `a * b` exactly as `x + y`, where `x` is the rounded product.
+void two_product(double a, double b, double &x, double &y) {
+    x = a * b;
+    double ahi, alo, bhi, blo;
+    split(a, ahi, alo);
+    split(b, bhi, blo);
+    const double err1 = x - ahi * bhi;
+    const double err2 = err1 - alo * bhi;
+    const double err3 = err2 - ahi * blo;
+    y = alo * blo - err3;
+}
+
+// Merges two expansions by increasing magnitude, then sums the components
+// in that order.
+expansion_t add_expansions(const expansion_t &e, const expansion_t &f) {
+    if (e.empty()) return f;
+    if (f.empty()) return e;
+    expansion_t g(e.size() + f.size());
+    std::merge(e.begin(), e.end(), f.begin(), f.end(), g.begin(),
+               [](double x, double y) { return std::abs(x) < std::abs(y); });
+    expansion_t h;
+    h.reserve(g.size());
+    double q = g[0], x, y;
+    for (size_t i = 1; i < g.size(); i++) {
+        two_sum(q, g[i], x, y);
+        q = x;
+        if (y != 0) h.push_back(y);
+    }
+    if (q != 0) h.push_back(q);
+    return h;
+}
+
+expansion_t scale_expansion(const expansion_t &e, double b) {
+    expansion_t h;
+    if (e.empty() || b == 0) return h;
+    h.reserve(2 * e.size());
+    double q, x, y, product, sum;
+    two_product(e[0], b, q, y);
+    if (y != 0) h.push_back(y);
+    for (size_t i = 1; i < e.size(); i++) {
+        two_product(e[i], b, product, x);
+        two_sum(q, x, sum, y);
+        if (y != 0) h.push_back(y);
+        fast_two_sum(product, sum, q, y);
+        if (y != 0) h.push_back(y);
+    }
+    if (q != 0) h.push_back(q);
+    return h;
+}
+
+expansion_t multiply_expansions(const expansion_t &e, const expansion_t &f) {
+    if (e.size() < f.size()) return multiply_expansions(f, e);
+    expansion_t h;
+    for (const double c : f) h = add_expansions(h, scale_expansion(e, c));
+    return h;
+}
+
+expansion_t negate_expansion(expansion_t e) {
+    for (double &c : e) c = -c;
+    return e;
+}
+
+expansion_t subtract_expansions(const expansion_t &e, const expansion_t &f) {
+    return add_expansions(e, negate_expansion(f));
+}
+
+// The exact difference `a - b`.
+expansion_t difference(double a, double b) {
+    double x, y;
+    two_sum(a, -b, x, y);
+    expansion_t h;
+    if (y != 0) h.push_back(y);
+    if (x != 0) h.push_back(x);
+    return h;
+}
+
+double estimate(const expansion_t &e) { return e.empty() ? 0.0 : e.back(); }
+
+// The exact value of `a * d - b * c`.
+expansion_t cross_product(const expansion_t &a, const expansion_t &b,
+                          const expansion_t &c, const expansion_t &d) {
+    return subtract_expansions(multiply_expansions(a, d),
+                               multiply_expansions(b, c));
+}
+
+// The exact value of `x * x + y * y (+ z * z)`.
+expansion_t lift(const expansion_t &x, const expansion_t &y,
+                 const expansion_t &z = {}) {
+    return add_expansions(
+        add_expansions(multiply_expansions(x, x), multiply_expansions(y, y)),
+        multiply_expansions(z, z));
+}
+
+// An expansion with room for `N` components, which is kept on the stack. The
+// determinants are first evaluated exactly from the rounded differences of
+// the coordinates, which gives the exact result if none of the differences
+// were rounded, as is usually the case for nearby points. The sizes of the
+// expansions are known in advance for this, which makes it much faster than
+// evaluating the determinants from the coordinates themselves.
+template <size_t N>
+struct small_expansion_t {
+    std::array<double, N> terms;
+    size_t size = 0;
+
+    void push(double x) {
+        if (x != 0) this->terms[this->size++] = x;
+    }
+
+    double estimate() const {
+        return this->size == 0 ? 0.0 : this->terms[this->size - 1];
+    }
+};
+
+template <size_t N, size_t M>
+small_expansion_t<N + M> add_expansions(const small_expansion_t<N> &e,
+                                        const small_expansion_t<M> &f) {
+    std::array<double, N + M> g;
+    const size_t n =
+        std::merge(
+            e.terms.begin(), e.terms.begin() + e.size, f.terms.begin(),
+            f.terms.begin() + f.size, g.begin(),
+            [](double x, double y) { return std::abs(x) < std::abs(y); }) -
+        g.begin();
+    small_expansion_t<N + M> h;
+    if (n == 0) return h;
+    double q = g[0], x, y;
+    for (size_t i = 1; i < n; i++) {
+        two_sum(q, g[i], x, y);
+        q = x;
+        h.push(y);
+    }
+    h.push(q);
+    return h;
+}
+
+template <size_t N>
+small_expansion_t<2 * N> scale_expansion(const small_expansion_t<N> &e,
+                                         double b) {
+    small_expansion_t<2 * N> h;
+    if (e.size == 0 || b == 0) return h;
+    double q, x, y, product, sum;
+    two_product(e.terms[0], b, q, y);
+    h.push(y);
+    for (size_t i = 1; i < e.size; i++) {
+        two_product(e.terms[i], b, product, x);
+        two_sum(q, x, sum, y);
+        h.push(y);
+        fast_two_sum(product, sum, q, y);
+        h.push(y);
+    }
+    h.push(q);
+    return h;
+}
+
+template <size_t N>
+small_expansion_t<N> negate_expansion(small_expansion_t<N> e) {
+    for (size_t i = 0; i < e.size; i++) e.terms[i] = -e.terms[i];
+    return e;
+}
+
+// The exact value of `a * b - c * d`.
+small_expansion_t<4> product_difference(double a, double b, double c,
+                                        double d) {
+    small_expansion_t<2> ab, cd;
+    double x, y;
+    two_product(a, b, x, y);
+    ab.push(y);
+    ab.push(x);
+    two_product(c, -d, x, y);
+    cd.push(y);
+    cd.push(x);
+    return add_expansions(ab, cd);
+}
+
+// The exact value of `m * (x * x + y * y (+ z * z))`.
+template <size_t N>
+small_expansion_t<8 * N> lift_expansion(const small_expansion_t<N> &m, double x,
+                                        double y) {
+    return add_expansions(scale_expansion(scale_expansion(m, x), x),
+                          scale_expansion(scale_expansion(m, y), y));
+}
+
+template <size_t N>
+small_expansion_t<12 * N> lift_expansion(const small_expansion_t<N> &m,
+                                         double x, double y, double z) {
+    return add_expansions(lift_expansion(m, x, y),
+                          scale_expansion(scale_expansion(m, z), z));
+}
+
+// Computes `a - b` in floating point, clearing `exact` if it was rounded.
+double rounded_difference(double a, double b, bool &exact) {
+    double x, y;
+    two_sum(a, -b, x, y);
+    if (y != 0) exact = false;
+    return x;
+}
+
+// Whether `long double` has a wider significand than `double`, as with the
+// x87 extended format, so that the filters are worth running again in it.
+constexpr bool HAS_EXTENDED_PRECISION =
+    std::numeric_limits<long double>::digits >
+    std::numeric_limits<double>::digits;
+
+// Rounds a determinant to double without letting it underflow to zero.
+double narrow(long double det) {
+    const double x = static_cast<double>(det);
+    if (x != 0 || det == 0) return x;
+    return det > 0 ? std::numeric_limits<double>::denorm_min()
+                   : -std::numeric_limits<double>::denorm_min();
+}
+
+double orient_2d_exact(const coordinates_2d_t &a, const coordinates_2d_t &b,
+                       const coordinates_2d_t &c) {
+    if constexpr (HAS_EXTENDED_PRECISION) {
+        long double det;
+        if (orient_2d_filter(a, b, c, det)) return narrow(det);
+    }
+    bool exact = true;
+    std::array<std::array<double, 2>, 2> r;
+    for (size_t k = 0; k < 2; k++) {
+        r[0][k] = rounded_difference(a[k], c[k], exact);
+        r[1][k] = rounded_difference(b[k], c[k], exact);
+    }
+    if (exact) {
+        const auto &[ac, bc] = r;
+        return product_difference(ac[0], bc[1], ac[1], bc[0]).estimate();
+    }
+
+    const auto acx = difference(a[0], c[0]), acy = difference(a[1], c[1]);
+    const auto bcx = difference(b[0], c[0]), bcy = difference(b[1], c[1]);
+    return estimate(cross_product(acx, acy, bcx, bcy));
+}
+
+double orient_3d_exact(const coordinates_3d_t &a, const coordinates_3d_t &b,
+                       const coordinates_3d_t &c, const coordinates_3d_t &d) {
+    if constexpr (HAS_EXTENDED_PRECISION) {
+        long double det;
+        if (orient_3d_filter(a, b, c, d, det)) return narrow(det);
+    }
+    bool exact = true;
+    std::array<std::array<double, 3>, 3> r;
+    for (size_t k = 0; k < 3; k++) {
+        r[0][k] = rounded_difference(a[k], d[k], exact);
+        r[1][k] = rounded_difference(b[k], d[k], exact);
+        r[2][k] = rounded_difference(c[k], d[k], exact);
+    }
+    if (exact) {
+        const auto &[ad, bd, cd] = r;
+        const auto det = add_expansions(
+            add_expansions(
+                scale_expansion(product_difference(bd[0], cd[1], bd[1], cd[0]),
+                                ad[2]),
+                scale_expansion(product_difference(cd[0], ad[1], cd[1], ad[0]),
+                                bd[2])),
+            scale_expansion(product_difference(ad[0], bd[1], ad[1], bd[0]),
+                            cd[2]));
+        return -det.estimate();
+    }
+
+    const auto adx = difference(a[0], d[0]), bdx = difference(b[0], d[0]),
+               cdx = difference(c[0], d[0]);
+    const auto ady = difference(a[1], d[1]), bdy = difference(b[1], d[1]),
+               cdy = difference(c[1], d[1]);
+    const auto adz = difference(a[2], d[2]), bdz = difference(b[2], d[2]),
+               cdz = difference(c[2], d[2]);
+    const auto det = add_expansions(
+        add_expansions(
+            multiply_expansions(adz, cross_product(bdx, bdy, cdx, cdy)),
+            multiply_expansions(bdz, cross_product(cdx, cdy, adx, ady))),
+        multiply_expansions(cdz, cross_product(adx, ady, bdx, bdy)));
+    return -estimate(det);
+}
+
+double in_circle_exact(const coordinates_2d_t &a, const coordinates_2d_t &b,
+                       const coordinates_2d_t &c, const coordinates_2d_t &d) {
+    if constexpr (HAS_EXTENDED_PRECISION) {
+        long double det;
+        if (in_circle_filter(a, b, c, d, det)) return narrow(det);
+    }
+    bool exact = true;
+    std::array<std::array<double, 2>, 3> r;
+    for (size_t k = 0; k < 2; k++) {
+        r[0][k] = rounded_difference(a[k], d[k], exact);
+        r[1][k] = rounded_difference(b[k], d[k], exact);
+        r[2][k] = rounded_difference(c[k], d[k], exact);
+    }
+    if (exact) {
+        const auto &[ad, bd, cd] = r;
+        const auto det = add_expansions(
+            add_expansions(
+                lift_expansion(product_difference(bd[0], cd[1], bd[1], cd[0]),
+                               ad[0], ad[1]),
+                lift_expansion(product_difference(cd[0], ad[1], cd[1], ad[0]),
+                               bd[0], bd[1])),
+            lift_expansion(product_difference(ad[0], bd[1], ad[1], bd[0]),
+                           cd[0], cd[1]));
+        return det.estimate();
+    }
+
+    const auto adx = difference(a[0], d[0]), bdx = difference(b[0], d[0]),
+               cdx = difference(c[0], d[0]);
+    const auto ady = difference(a[1], d[1]), bdy = difference(b[1], d[1]),
+               cdy = difference(c[1], d[1]);
+    const auto det = add_expansions(
+        add_expansions(multiply_expansions(lift(adx, ady),
+                                           cross_product(bdx, bdy, cdx, cdy)),
+                       multiply_expansions(lift(bdx, bdy),
+                                           cross_product(cdx, cdy, adx, ady))),
+        multiply_expansions(lift(cdx, cdy), cross_product(adx, ady, bdx, bdy)));
+    return estimate(det);
+}
+
+double in_sphere_exact(const coordinates_3d_t &a, const coordinates_3d_t &b,
+                       const coordinates_3d_t &c, const coordinates_3d_t &d,
+                       const coordinates_3d_t &e) {
+    if constexpr (HAS_EXTENDED_PRECISION) {
+        long double det;
+        if (in_sphere_filter(a, b, c, d, e, det)) return narrow(det);
+    }
+    bool exact = true;
+    std::array<std::array<double, 3>, 4> r;
+    for (size_t k = 0; k < 3; k++) {
+        r[0][k] = rounded_difference(a[k], e[k], exact);
+        r[1][k] = rounded_difference(b[k], e[k], exact);
+        r[2][k] = rounded_difference(c[k], e[k], exact);
+        r[3][k] = rounded_difference(d[k], e[k], exact);
+    }
+    if (exact) {
+        const auto &[ae, be, ce, de] = r;
+        const auto ab = product_difference(ae[0], be[1], ae[1], be[0]),
+                   bc = product_difference(be[0], ce[1], be[1], ce[0]),
+                   cd = product_difference(ce[0], de[1], ce[1], de[0]),
+                   da = product_difference(de[0], ae[1], de[1], ae[0]),
+                   ac = product_difference(ae[0], ce[1], ae[1], ce[0]),
+                   bd = product_difference(be[0], de[1], be[1], de[0]);
+        auto triple = [](const small_expansion_t<4> &m1, double z1,
+                         const small_expansion_t<4> &m2, double z2,
+                         const small_expansion_t<4> &m3, double z3) {
+            return add_expansions(add_expansions(scale_expansion(m1, z1),
+                                                 scale_expansion(m2, z2)),
+                                  scale_expansion(m3, z3));
+        };
+        const auto abc = triple(bc, ae[2], ac, -be[2], ab, ce[2]);
+        const auto bcd = triple(cd, be[2], bd, -ce[2], bc, de[2]);
+        const auto cda = triple(da, ce[2], ac, de[2], cd, ae[2]);
+        const auto dab = triple(ab, de[2], bd, ae[2], da, be[2]);
+        const auto det = add_expansions(
+            add_expansions(
+                lift_expansion(abc, de[0], de[1], de[2]),
+                negate_expansion(lift_expansion(dab, ce[0], ce[1], ce[2]))),
+            add_expansions(
+                lift_expansion(cda, be[0], be[1], be[2]),
+                negate_expansion(lift_expansion(bcd, ae[0], ae[1], ae[2]))));
+        return -det.estimate();
+    }
+
+    const auto aex = difference(a[0], e[0]), bex = difference(b[0], e[0]),
+               cex = difference(c[0], e[0]), dex = difference(d[0], e[0]);
+    const auto aey = difference(a[1], e[1]), bey = difference(b[1], e[1]),
+               cey = difference(c[1], e[1]), dey = difference(d[1], e[1]);
+    const auto aez = difference(a[2], e[2]), bez = difference(b[2], e[2]),
+               cez = difference(c[2], e[2]), dez = difference(d[2], e[2]);
+    const auto ab = cross_product(aex, aey, bex, bey),
+               bc = cross_product(bex, bey, cex, cey),
+               cd = cross_product(cex, cey, dex, dey),
+               da = cross_product(dex, dey, aex, aey),
+               ac = cross_product(aex, aey, cex, cey),
+               bd = cross_product(bex, bey, dex, dey);
+
+    // Each of these is the determinant of the rows of three of the points.
+    auto triple = [](const expansion_t &z1, const expansion_t &m1,
+                     const expansion_t &z2, const expansion_t &m2,
+                     const expansion_t &z3, const expansion_t &m3) {
+        return add_expansions(add_expansions(multiply_expansions(z1, m1),
+                                             multiply_expansions(z2, m2)),
+                              multiply_expansions(z3, m3));
+    };
+    const auto abc = triple(aez, bc, bez, negate_expansion(ac), cez, ab);
+    const auto bcd = triple(bez, cd, cez, negate_expansion(bd), dez, bc);
+    const auto cda = triple(cez, da, dez, ac, aez, cd);
+    const auto dab = triple(dez, ab, aez, bd, bez, da);
+
+    const auto det = add_expansions(
+        subtract_expansions(multiply_expansions(lift(dex, dey, dez), abc),
+                            multiply_expansions(lift(cex, cey, cez), dab)),
+        subtract_expansions(multiply_expansions(lift(bex, bey, bez), cda),
+                            multiply_expansions(lift(aex, aey, aez), bcd)));
+    return -estimate(det);
+}
+
+// The perturbed predicates look at the points from the last in
+// lexicographic order, which has the largest perturbation, to the first. If
+// that point is the one being tested, it is lifted furthest, so it is
+// outside. Otherwise, the sign is that of the orientation of the simplex
+// with that point replaced by the one being tested, unless those are
+// collinear or coplanar, in which case the next point decides.
+double in_circle_perturbed(const coordinates_2d_t &a, const coordinates_2d_t &b,
+                           const coordinates_2d_t &c,
+                           const coordinates_2d_t &d) {
+    const double det = in_circle(a, b, c, d);
+    if (det != 0) return det;
+
+    std::array<const coordinates_2d_t *, 4> points{&a, &b, &c, &d};
+    std::sort(points.begin(), points.end(),
+              [](const auto *p, const auto *q) { return *p < *q; });
+    for (size_t i = points.size() - 1; i > 1; i--) {
+        if (points[i] == &d) break;
+        const double o = points[i] == &c   ? orient_2d(a, b, d)
+                         : points[i] == &b ? orient_2d(a, d, c)
+                                           : orient_2d(d, b, c);
+        if (o != 0) return o;
+    }
+    return -1;
+}
+
+double in_sphere_perturbed(const coordinates_3d_t &a, const coordinates_3d_t &b,
+                           const coordinates_3d_t &c, const coordinates_3d_t &d,
+                           const coordinates_3d_t &e) {
+    const double det = in_sphere(a, b, c, d, e);
+    if (det != 0) return det;
+
+    std::array<const coordinates_3d_t *, 5> points{&a, &b, &c, &d, &e};
+    std::sort(points.begin(), points.end(),
+              [](const auto *p, const auto *q) { return *p < *q; });
+    for (size_t i = points.size() - 1; i > 1; i--) {
+        if (points[i] == &e) break;
+        const double o = points[i] == &d   ? orient_3d(a, b, c, e)
+                         : points[i] == &c ? orient_3d(a, b, e, d)
+                         : points[i] == &b ? orient_3d(a, e, c, d)
+                                           : orient_3d(e, b, c, d);
+        if (o != 0) return o;
+    }
+    return -1;
+}
+
+}  // namespace trimesh
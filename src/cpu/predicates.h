@@ -0,0 +1,274 @@
+#pragma once
+
+#include <array>
+#include <cmath>
+#include <limits>
+
+namespace trimesh {
+
+// Geometric predicates which always give the correct sign, following
+// Shewchuk's "Adaptive Precision Floating-Point Arithmetic and Fast Robust
+// Geometric Predicates". Each determinant is first evaluated in floating
+// point along with a bound on its rounding error, and only if it is within
+// the bound of zero is it evaluated again more precisely, and finally
+// exactly, using expansions of floating point numbers. The values are only
+// approximate, but their signs are exact.
+//
+// - `orient_2d(a, b, c)` is positive if `a`, `b` and `c` are in
+//   counter-clockwise order, negative if they are in clockwise order, and
+//   zero if they are collinear.
+// - `orient_3d(a, b, c, d)` has the sign of the volume of the tetrahedron
+//   `(a, b, c, d)`, as in `tetrahedron_3d_t::signed_volume`, and is zero if
+//   the points are coplanar.
+// - `in_circle(a, b, c, d)` is positive if `d` is inside the circle through
+//   `a`, `b` and `c`, negative if it is outside, and zero if it is on the
+//   circle, provided that `orient_2d(a, b, c)` is positive.
+// - `in_sphere(a, b, c, d, e)` is positive if `e` is inside the sphere
+//   through `a`, `b`, `c` and `d`, negative if it is outside, and zero if it
+//   is on the sphere, provided that `orient_3d(a, b, c, d)` is positive.
+//
+// The Delaunay triangulations use `in_circle_perturbed` and
+// `in_sphere_perturbed` instead, which break ties between cocircular or
+// cospherical points by symbolic perturbation, following Devillers and
+// Teillaud's "Perturbations for Delaunay and weighted Delaunay 3D
+// triangulations". Each point is lifted by an infinitesimal amount which
+// depends on its lexicographic order, so that these are never zero. Since
+// the order only depends on the coordinates, every triangulation of the
+// same points breaks ties in the same way, whatever order the points are
+// inserted in, and the orientation of the simplices isn't perturbed, so the
+// triangulations don't contain flat simplices.
+
+using coordinates_2d_t = std::array<double, 2>;
+using coordinates_3d_t = std::array<double, 3>;
+
+double orient_2d_exact(const coordinates_2d_t &a, const coordinates_2d_t &b,
+                       const coordinates_2d_t &c);
+double orient_3d_exact(const coordinates_3d_t &a, const coordinates_3d_t &b,
+                       const coordinates_3d_t &c, const coordinates_3d_t &d);
+double in_circle_exact(const coordinates_2d_t &a, const coordinates_2d_t &b,
+                       const coordinates_2d_t &c, const coordinates_2d_t &d);
+double in_sphere_exact(const coordinates_3d_t &a, const coordinates_3d_t &b,
+                       const coordinates_3d_t &c, const coordinates_3d_t &d,
+                       const coordinates_3d_t &e);
+
+// Half of the machine epsilon of `T`, which bounds the relative rounding
+// error of a single operation, and the resulting error bounds of the filters.
+template <typename T>
+constexpr T PREDICATE_EPSILON = std::numeric_limits<T>::epsilon() / 2;
+template <typename T>
+constexpr T ORIENT_2D_ERROR_BOUND =
+    (3 + 16 * PREDICATE_EPSILON<T>)*PREDICATE_EPSILON<T>;
+template <typename T>
+constexpr T ORIENT_3D_ERROR_BOUND =
+    (7 + 56 * PREDICATE_EPSILON<T>)*PREDICATE_EPSILON<T>;
+template <typename T>
+constexpr T IN_CIRCLE_ERROR_BOUND =
+    (10 + 96 * PREDICATE_EPSILON<T>)*PREDICATE_EPSILON<T>;
+template <typename T>
+constexpr T IN_SPHERE_ERROR_BOUND =
+    (16 + 224 * PREDICATE_EPSILON<T>)*PREDICATE_EPSILON<T>;
+
+// The filters evaluate each determinant in the floating point type `T`,
+// setting `det` and returning true if its sign is certain. They are first
+// run in double precision, and the exact versions run them again in extended
+// precision where it is available in hardware, before using expansions.
+template <typename T>
+bool orient_2d_filter(const coordinates_2d_t &a, const coordinates_2d_t &b,
+                      const coordinates_2d_t &c, T &det) {
+    const T left = (T(a[0]) - T(c[0])) * (T(b[1]) - T(c[1]));
+    const T right = (T(a[1]) - T(c[1])) * (T(b[0]) - T(c[0]));
+    det = left - right;
+    const T bound =
+        ORIENT_2D_ERROR_BOUND<T> * (std::abs(left) + std::abs(right));
+    return det > bound || -det > bound;
+}
+
+template <typename T>
+bool orient_3d_filter(const coordinates_3d_t &a, const coordinates_3d_t &b,
+                      const coordinates_3d_t &c, const coordinates_3d_t &d,
+                      T &det) {
+    const T adx = T(a[0]) - T(d[0]), bdx = T(b[0]) - T(d[0]),
+            cdx = T(c[0]) - T(d[0]);
+    const T ady = T(a[1]) - T(d[1]), bdy = T(b[1]) - T(d[1]),
+            cdy = T(c[1]) - T(d[1]);
+    const T adz = T(a[2]) - T(d[2]), bdz = T(b[2]) - T(d[2]),
+            cdz = T(c[2]) - T(d[2]);
+    const T bdxcdy = bdx * cdy, cdxbdy = cdx * bdy;
+    const T cdxady = cdx * ady, adxcdy = adx * cdy;
+    const T adxbdy = adx * bdy, bdxady = bdx * ady;
+
+    // This is the determinant of the rows `a - d`, `b - d` and `c - d`,
+    // which has the opposite sign of the volume.
+    det = -(adz * (bdxcdy - cdxbdy) + bdz * (cdxady - adxcdy) +
+            cdz * (adxbdy - bdxady));
+    const T permanent = (std::abs(bdxcdy) + std::abs(cdxbdy)) * std::abs(adz) +
+                        (std::abs(cdxady) + std::abs(adxcdy)) * std::abs(bdz) +
+                        (std::abs(adxbdy) + std::abs(bdxady)) * std::abs(cdz);
+    const T bound = ORIENT_3D_ERROR_BOUND<T> * permanent;
+    return det > bound || -det > bound;
+}
+
+template <typename T>
+bool in_circle_filter(const coordinates_2d_t &a, const coordinates_2d_t &b,
+                      const coordinates_2d_t &c, const coordinates_2d_t &d,
+                      T &det) {
+    const T adx = T(a[0]) - T(d[0]), bdx = T(b[0]) - T(d[0]),
+            cdx = T(c[0]) - T(d[0]);
+    const T ady = T(a[1]) - T(d[1]), bdy = T(b[1]) - T(d[1]),
+            cdy = T(c[1]) - T(d[1]);
+    const T bdxcdy = bdx * cdy, cdxbdy = cdx * bdy;
+    const T cdxady = cdx * ady, adxcdy = adx * cdy;
+    const T adxbdy = adx * bdy, bdxady = bdx * ady;
+    const T alift = adx * adx + ady * ady;
+    const T blift = bdx * bdx + bdy * bdy;
+    const T clift = cdx * cdx + cdy * cdy;
+
+    det = alift * (bdxcdy - cdxbdy) + blift * (cdxady - adxcdy) +
+          clift * (adxbdy - bdxady);
+    const T permanent = (std::abs(bdxcdy) + std::abs(cdxbdy)) * alift +
+                        (std::abs(cdxady) + std::abs(adxcdy)) * blift +
+                        (std::abs(adxbdy) + std::abs(bdxady)) * clift;
+    const T bound = IN_CIRCLE_ERROR_BOUND<T> * permanent;
+    return det > bound || -det > bound;
+}
+
+template <typename T>
+bool in_sphere_filter(const coordinates_3d_t &a, const coordinates_3d_t &b,
+                      const coordinates_3d_t &c, const coordinates_3d_t &d,
+                      const coordinates_3d_t &e, T &det) {
+    const T aex = T(a[0]) - T(e[0]), bex = T(b[0]) - T(e[0]),
+            cex = T(c[0]) - T(e[0]), dex = T(d[0]) - T(e[0]);
+    const T aey = T(a[1]) - T(e[1]), bey = T(b[1]) - T(e[1]),
+            cey = T(c[1]) - T(e[1]), dey = T(d[1]) - T(e[1]);
+    const T aez = T(a[2]) - T(e[2]), bez = T(b[2]) - T(e[2]),
+            cez = T(c[2]) - T(e[2]), dez = T(d[2]) - T(e[2]);
+    const T aexbey = aex * bey, bexaey = bex * aey;
+    const T bexcey = bex * cey, cexbey = cex * bey;
+    const T cexdey = cex * dey, dexcey = dex * cey;
+    const T dexaey = dex * aey, aexdey = aex * dey;
+    const T aexcey = aex * cey, cexaey = cex * aey;
+    const T bexdey = bex * dey, dexbey = dex * bey;
+    const T ab = aexbey - bexaey, bc = bexcey - cexbey;
+    const T cd = cexdey - dexcey, da = dexaey - aexdey;
+    const T ac = aexcey - cexaey, bd = bexdey - dexbey;
+    const T abc = aez * bc - bez * ac + cez * ab;
+    const T bcd = bez * cd - cez * bd + dez * bc;
+    const T cda = cez * da + dez * ac + aez * cd;
+    const T dab = dez * ab + aez * bd + bez * da;
+    const T alift = aex * aex + aey * aey + aez * aez;
+    const T blift = bex * bex + bey * bey + bez * bez;
+    const T clift = cex * cex + cey * cey + cez * cez;
+    const T dlift = dex * dex + dey * dey + dez * dez;
+
+    // Like `orient_3d`, this determinant has the opposite sign.
+    det = -((dlift * abc - clift * dab) + (blift * cda - alift * bcd));
+    const T ab_plus = std::abs(aexbey) + std::abs(bexaey);
+    const T bc_plus = std::abs(bexcey) + std::abs(cexbey);
+    const T cd_plus = std::abs(cexdey) + std::abs(dexcey);
+    const T da_plus = std::abs(dexaey) + std::abs(aexdey);
+    const T ac_plus = std::abs(aexcey) + std::abs(cexaey);
+    const T bd_plus = std::abs(bexdey) + std::abs(dexbey);
+    const T permanent = (cd_plus * std::abs(bez) + bd_plus * std::abs(cez) +
+                         bc_plus * std::abs(dez)) *
+                            alift +
+                        (da_plus * std::abs(cez) + ac_plus * std::abs(dez) +
+                         cd_plus * std::abs(aez)) *
+                            blift +
+                        (ab_plus * std::abs(dez) + bd_plus * std::abs(aez) +
+                         da_plus * std::abs(bez)) *
+                            clift +
+                        (bc_plus * std::abs(aez) + ac_plus * std::abs(bez) +
+                         ab_plus * std::abs(cez)) *
+                            dlift;
+    const T bound = IN_SPHERE_ERROR_BOUND<T> * permanent;
+    return det > bound || -det > bound;
+}
+
+inline double orient_2d(const coordinates_2d_t &a, const coordinates_2d_t &b,
+                        const coordinates_2d_t &c) {
+    double det;
+    if (orient_2d_filter(a, b, c, det)) return det;
+    return orient_2d_exact(a, b, c);
+}
+
+inline double orient_3d(const coordinates_3d_t &a, const coordinates_3d_t &b,
+                        const coordinates_3d_t &c, const coordinates_3d_t &d) {
+    double det;
+    if (orient_3d_filter(a, b, c, d, det)) return det;
+    return orient_3d_exact(a, b, c, d);
+}
+
+inline double in_circle(const coordinates_2d_t &a, const coordinates_2d_t &b,
+                        const coordinates_2d_t &c, const coordinates_2d_t &d) {
+    double det;
+    if (in_circle_filter(a, b, c, d, det)) return det;
+    return in_circle_exact(a, b, c, d);
+}
+
+inline double in_sphere(const coordinates_3d_t &a, const coordinates_3d_t &b,
+                        const coordinates_3d_t &c, const coordinates_3d_t &d,
+                        const coordinates_3d_t &e) {
+    double det;
+    if (in_sphere_filter(a, b, c, d, e, det)) return det;
+    return in_sphere_exact(a, b, c, d, e);
+}
+
+// Overloads for point types with `x`, `y` and, in 3D, `z` members.
+template <typename P>
+double orient_2d(const P &a, const P &b, const P &c) {
+    return orient_2d(coordinates_2d_t{a.x, a.y}, {b.x, b.y}, {c.x, c.y});
+}
+
+template <typename P>
+double orient_3d(const P &a, const P &b, const P &c, const P &d) {
+    return orient_3d(coordinates_3d_t{a.x, a.y, a.z}, {b.x, b.y, b.z},
+                     {c.x, c.y, c.z}, {d.x, d.y, d.z});
+}
+
+template <typename P>
+double in_circle(const P &a, const P &b, const P &c, const P &d) {
+    return in_circle(coordinates_2d_t{a.x, a.y}, {b.x, b.y}, {c.x, c.y},
+                     {d.x, d.y});
+}
+
+template <typename P>
+double in_sphere(const P &a, const P &b, const P &c, const P &d, const P &e) {
+    return in_sphere(coordinates_3d_t{a.x, a.y, a.z}, {b.x, b.y, b.z},
+                     {c.x, c.y, c.z}, {d.x, d.y, d.z}, {e.x, e.y, e.z});
+}
+
+double in_circle_perturbed(const coordinates_2d_t &a, const coordinates_2d_t &b,
+                           const coordinates_2d_t &c,
+                           const coordinates_2d_t &d);
+double in_sphere_perturbed(const coordinates_3d_t &a, const coordinates_3d_t &b,
+                           const coordinates_3d_t &c, const coordinates_3d_t &d,
+                           const coordinates_3d_t &e);
+
+template <typename P>
+double in_circle_perturbed(const P &a, const P &b, const P &c, const P &d) {
+    return in_circle_perturbed(coordinates_2d_t{a.x, a.y}, {b.x, b.y},
+                               {c.x, c.y}, {d.x, d.y});
+}
+
+template <typename P>
+double in_sphere_perturbed(const P &a, const P &b, const P &c, const P &d,
+                           const P &e) {
+    return in_sphere_perturbed(coordinates_3d_t{a.x, a.y, a.z}, {b.x, b.y, b.z},
+                               {c.x, c.y, c.z}, {d.x, d.y, d.z},
+                               {e.x, e.y, e.z});
+}
+
+// The perturbed `in_circle` or `in_sphere` predicate for a simplex in D
+// dimensions, which is positive if `p` is inside the circumsphere of `s`,
+// provided that `s` is positively oriented.
+template <size_t D>
+double simplex_in_sphere(const std::array<std::array<double, D>, D + 1> &s,
+                         const std::array<double, D> &p) {
+    static_assert(D == 2 || D == 3, "Only 2D and 3D simplices are supported");
+    if constexpr (D == 2)
+        return in_circle_perturbed(s[0], s[1], s[2], p);
+    else
+        return in_sphere_perturbed(s[0], s[1], s[2], s[3], p);
+}
+
+}  // namespace trimesh
@@ -0,0 +1,33 @@
+#pragma once
+
+#include <cstddef>
+#include <vector>
+
+namespace trimesh {
+
+// Read-only view of a contiguous array of values which are owned elsewhere,
+// such as by a vector or by a memory-mapped file.
+template <typename T>
+struct span_t {
+    using value_type = T;
+
+    const T *ptr = nullptr;
+    size_t len = 0;
+
+    span_t() = default;
+    span_t(const T *ptr, size_t len) : ptr(ptr), len(len) {}
+    span_t(const std::vector<T> &values)
+        : ptr(values.data()), len(values.size()) {}
+
+    const T *data() const { return this->ptr; }
+    size_t size() const { return this->len; }
+    bool empty() const { return this->len == 0; }
+    const T *begin() const { return this->ptr; }
+    const T *end() const { return this->ptr + this->len; }
+    const T &operator[](size_t i) const { return this->ptr[i]; }
+
+    // Copies the values into a vector which owns them.
+    std::vector<T> to_vector() const { return {this->begin(), this->end()}; }
+};
+
+}  // namespace trimesh
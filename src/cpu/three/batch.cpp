@@ -0,0 +1,145 @@
+#include "batch.h"
+
+#include <string>
+
+using namespace pybind11::literals;
+
+namespace trimesh {
+
+// Calls `fn(point, shape, row)` for each point against a single shape.
+template <typename R, size_t C = 1, typename S, typename F>
+py::array_t<R> map_points(const carray_t<double> &points, const S &shape,
+                          F fn) {
+    const auto *ps = structs_from_array<point_3d_t, 3>(points, "points");
+    return map_rows<R, C>(points.shape(0),
+                          [&](size_t i, R *row) { fn(ps[i], shape, row); });
+}
+
+// Calls `fn(point, shape, row)` for each point and its paired shape, where
+// the shapes are given as an (N, K, 3) array.
+template <typename R, size_t C = 1, typename S, size_t K, typename F>
+py::array_t<R> map_points(const carray_t<double> &points,
+                          const carray_t<double> &shapes,
+                          const std::string &name, F fn) {
+    const auto *ps = structs_from_array<point_3d_t, 3>(points, "points");
+    const auto *ss = structs_from_array<S, K, 3>(shapes, name);
+    if (points.shape(0) != shapes.shape(0)) {
+        throw std::invalid_argument(
+            "Got " + std::to_string(points.shape(0)) + " points but " +
+            std::to_string(shapes.shape(0)) + " " + name);
+    }
+    return map_rows<R, C>(points.shape(0),
+                          [&](size_t i, R *row) { fn(ps[i], ss[i], row); });
+}
+
+void distance_to_triangle_row(const point_3d_t &p, const triangle_3d_t &t,
+                              double *row) {
+    row[0] = p.distance_to_triangle(t);
+}
+
+void barycentric_coordinates_row(const point_3d_t &p, const triangle_3d_t &t,
+                                 double *row) {
+    const auto b = p.barycentric_coordinates(t);
+    row[0] = b.u;
+    row[1] = b.v;
+    row[2] = b.w;
+}
+
+void distance_to_tetrahedron_row(const point_3d_t &p, const tetrahedron_3d_t &t,
+                                 double *row) {
+    row[0] = p.distance_to_tetrahedron(t);
+}
+
+void point_is_inside_row(const point_3d_t &p, const tetrahedron_3d_t &t,
+                         bool *row) {
+    row[0] = t.point_is_inside(p);
+}
+
+py::array_t<double> batch_distance_to_triangle_3d(
+    const carray_t<double> &points, const triangle_3d_t &triangle) {
+    return map_points<double>(points, triangle, distance_to_triangle_row);
+}
+
+py::array_t<double> batch_distance_to_triangle_3d(
+    const carray_t<double> &points, const carray_t<double> &triangles) {
+    return map_points<double, 1, triangle_3d_t, 3>(
+        points, triangles, "triangles", distance_to_triangle_row);
+}
+
+py::array_t<double> batch_barycentric_coordinates_3d(
+    const carray_t<double> &points, const triangle_3d_t &triangle) {
+    return map_points<double, 3>(points, triangle, barycentric_coordinates_row);
+}
+
+py::array_t<double> batch_barycentric_coordinates_3d(
+    const carray_t<double> &points, const carray_t<double> &triangles) {
+    return map_points<double, 3, triangle_3d_t, 3>(
+        points, triangles, "triangles", barycentric_coordinates_row);
+}
+
+py::array_t<double> batch_distance_to_tetrahedron_3d(
+    const carray_t<double> &points, const tetrahedron_3d_t &tetrahedron) {
+    return map_points<double>(points, tetrahedron, distance_to_tetrahedron_row);
+}
+
+py::array_t<double> batch_distance_to_tetrahedron_3d(
+    const carray_t<double> &points, const carray_t<double> &tetrahedra) {
+    return map_points<double, 1, tetrahedron_3d_t, 4>(
+        points, tetrahedra, "tetrahedra", distance_to_tetrahedron_row);
+}
+
+py::array_t<bool> batch_point_is_inside_3d(
+    const carray_t<double> &points, const tetrahedron_3d_t &tetrahedron) {
+    return map_points<bool>(points, tetrahedron, point_is_inside_row);
+}
+
+py::array_t<bool> batch_point_is_inside_3d(const carray_t<double> &points,
+                                           const carray_t<double> &tetrahedra) {
+    return map_points<bool, 1, tetrahedron_3d_t, 4>(
+        points, tetrahedra, "tetrahedra", point_is_inside_row);
+}
+
+void add_3d_batch_modules(py::module &m) {
+    m.def("batch_distance_to_triangle_3d",
+          py::overload_cast<const carray_t<double> &, const triangle_3d_t &>(
+              &batch_distance_to_triangle_3d),
+          "Distances from (N, 3) points to a triangle", "points"_a,
+          "triangle"_a);
+    m.def("batch_distance_to_triangle_3d",
+          py::overload_cast<const carray_t<double> &, const carray_t<double> &>(
+              &batch_distance_to_triangle_3d),
+          "Distances from (N, 3) points to (N, 3, 3) triangles", "points"_a,
+          "triangles"_a);
+    m.def("batch_barycentric_coordinates_3d",
+          py::overload_cast<const carray_t<double> &, const triangle_3d_t &>(
+              &batch_barycentric_coordinates_3d),
+          "Barycentric coordinates of (N, 3) points in a triangle", "points"_a,
+          "triangle"_a);
+    m.def("batch_barycentric_coordinates_3d",
+          py::overload_cast<const carray_t<double> &, const carray_t<double> &>(
+              &batch_barycentric_coordinates_3d),
+          "Barycentric coordinates of (N, 3) points in (N, 3, 3) triangles",
+          "points"_a, "triangles"_a);
+    m.def("batch_distance_to_tetrahedron_3d",
+          py::overload_cast<const carray_t<double> &, const tetrahedron_3d_t &>(
+              &batch_distance_to_tetrahedron_3d),
+          "Distances from (N, 3) points to a tetrahedron", "points"_a,
+          "tetrahedron"_a);
+    m.def("batch_distance_to_tetrahedron_3d",
+          py::overload_cast<const carray_t<double> &, const carray_t<double> &>(
+              &batch_distance_to_tetrahedron_3d),
+          "Distances from (N, 3) points to (N, 4, 3) tetrahedra", "points"_a,
+          "tetrahedra"_a);
+    m.def("batch_point_is_inside_3d",
+          py::overload_cast<const carray_t<double> &, const tetrahedron_3d_t &>(
+              &batch_point_is_inside_3d),
+          "Checks if each of (N, 3) points is inside a tetrahedron", "points"_a,
+          "tetrahedron"_a);
+    m.def("batch_point_is_inside_3d",
+          py::overload_cast<const carray_t<double> &, const carray_t<double> &>(
+              &batch_point_is_inside_3d),
+          "Checks if (N, 3) points are inside (N, 4, 3) tetrahedra", "points"_a,
+          "tetrahedra"_a);
+}
+
+}  // namespace trimesh
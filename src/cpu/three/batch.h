@@ -0,0 +1,34 @@
+#pragma once
+
+#include <pybind11/pybind11.h>
+#include <pybind11/stl.h>
+
+#include "../arrays.h"
+#include "types.h"
+
+namespace py = pybind11;
+
+namespace trimesh {
+
+// Vectorized predicates over (N, 3) arrays of points, against either a single
+// shape or an (N, 3, 3) / (N, 4, 3) array of shapes (one per point).
+py::array_t<double> batch_distance_to_triangle_3d(
+    const carray_t<double> &points, const triangle_3d_t &triangle);
+py::array_t<double> batch_distance_to_triangle_3d(
+    const carray_t<double> &points, const carray_t<double> &triangles);
+py::array_t<double> batch_barycentric_coordinates_3d(
+    const carray_t<double> &points, const triangle_3d_t &triangle);
+py::array_t<double> batch_barycentric_coordinates_3d(
+    const carray_t<double> &points, const carray_t<double> &triangles);
+py::array_t<double> batch_distance_to_tetrahedron_3d(
+    const carray_t<double> &points, const tetrahedron_3d_t &tetrahedron);
+py::array_t<double> batch_distance_to_tetrahedron_3d(
+    const carray_t<double> &points, const carray_t<double> &tetrahedra);
+py::array_t<bool> batch_point_is_inside_3d(const carray_t<double> &points,
+                                           const tetrahedron_3d_t &tetrahedron);
+py::array_t<bool> batch_point_is_inside_3d(const carray_t<double> &points,
+                                           const carray_t<double> &tetrahedra);
+
+void add_3d_batch_modules(py::module &m);
+
+}  // namespace trimesh
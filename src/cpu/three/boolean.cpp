@@ -1,7 +1,15 @@
 #include "boolean.h"
 
+#include <algorithm>
+#include <array>
+#include <cmath>
 #include <iostream>
+#include <limits>
+#include <optional>
+#include <unordered_map>
 
+#include "../options.h"
+#include "../parallel.h"
 #include "bvh.h"
 
 using namespace pybind11::literals;
@@ -10,31 +18,753 @@ namespace trimesh {
 
 enum boolean_3d_op { UNION, INTERSECTION, DIFFERENCE };
 
+// Clips a segment to a convex polygon, both lying in the plane with the given
+// normal. The polygon must be counter-clockwise around the normal. Returns
+// nothing if less than the tolerance of the segment is left.
+std::optional<line_3d_t> clip_segment(const line_3d_t &l,
+                                      const std::vector<point_3d_t> &polygon,
+                                      const point_3d_t &normal) {
+    const point_3d_t dir = l.p2 - l.p1;
+    double lo = 0.0, hi = 1.0;
+    for (size_t i = 0; i < polygon.size(); i++) {
+        const auto &a = polygon[i], &b = polygon[(i + 1) % polygon.size()];
+        const point_3d_t inward = normal.cross(b - a).normalize();
+        const double d = inward.dot(l.p1 - a), dd = inward.dot(dir);
+        if (std::abs(dd) < std::numeric_limits<double>::epsilon()) {
+            if (d < -get_tolerance()) return std::nullopt;
+        } else if (dd > 0) {
+            lo = std::max(lo, -d / dd);
+        } else {
+            hi = std::min(hi, -d / dd);
+        }
+    }
+    if ((hi - lo) * dir.length() < get_tolerance()) return std::nullopt;
+    return line_3d_t{l.p1 + lo * dir, l.p1 + hi * dir};
+}
+
+// Gets the segment where triangle `t` crosses triangle `u`, if any. Coplanar
+// triangles are skipped, since the regions where they overlap are bounded by
+// the segments from the neighbouring faces which aren't coplanar.
+std::optional<line_3d_t> crossing_segment(const triangle_3d_t &t,
+                                          const triangle_3d_t &u) {
+    const point_3d_t normal = u.normal();
+    const std::array<point_3d_t, 3> ps{t.p1, t.p2, t.p3};
+    std::array<double, 3> ds;
+    for (size_t i = 0; i < 3; i++) {
+        ds[i] = normal.dot(ps[i] - u.p1);
+        if (std::abs(ds[i]) < get_tolerance()) ds[i] = 0.0;
+    }
+
+    // Gets the points where `t` meets the plane of `u`.
+    std::vector<point_3d_t> points;
+    for (size_t i = 0; i < 3; i++) {
+        const size_t j = (i + 1) % 3;
+        if (ds[i] == 0.0) points.push_back(ps[i]);
+        if ((ds[i] < 0 && ds[j] > 0) || (ds[i] > 0 && ds[j] < 0))
+            points.push_back(ps[i] +
+                             (ds[i] / (ds[i] - ds[j])) * (ps[j] - ps[i]));
+    }
+    if (points.size() != 2) return std::nullopt;
+    return clip_segment({points[0], points[1]}, u.vertices(), normal);
+}
+
+// Cuts a convex polygon in two along the line through a segment, if the
+// segment passes through the inside of the polygon. The polygon and the
+// segment lie in the plane with the given normal.
+bool cut_polygon(const polygon_3d_t &polygon, const line_3d_t &l,
+                 const point_3d_t &normal, std::vector<polygon_3d_t> &out) {
+    if (!clip_segment(l, polygon.points, normal)) return false;
+
+    const point_3d_t side = normal.cross(l.p2 - l.p1).normalize();
+    const auto &ps = polygon.points;
+    std::vector<double> ds(ps.size());
+    bool has_left = false, has_right = false;
+    for (size_t i = 0; i < ps.size(); i++) {
+        ds[i] = side.dot(ps[i] - l.p1);
+        if (std::abs(ds[i]) < get_tolerance()) ds[i] = 0.0;
+        has_left |= ds[i] > 0;
+        has_right |= ds[i] < 0;
+    }
+    if (!has_left || !has_right) return false;
+
+    std::vector<point_3d_t> left, right;
+    for (size_t i = 0; i < ps.size(); i++) {
+        const size_t j = (i + 1) % ps.size();
+        if (ds[i] >= 0) left.push_back(ps[i]);
+        if (ds[i] <= 0) right.push_back(ps[i]);
+        if ((ds[i] < 0 && ds[j] > 0) || (ds[i] > 0 && ds[j] < 0)) {
+            const point_3d_t p =
+                ps[i] + (ds[i] / (ds[i] - ds[j])) * (ps[j] - ps[i]);
+            left.push_back(p);
+            right.push_back(p);
+        }
+    }
+    out.push_back(left);
+    out.push_back(right);
+    return true;
+}
+
+// Builds a triangle mesh from a list of triangles, welding vertices which are
+// equal.
+trimesh_3d_t from_triangles(const std::vector<triangle_3d_t> &triangles) {
+    point_welder_3d_t welder;
+    const auto &points = welder.points;
+    face_list_t welded;
+    auto get_point_id = [&](const point_3d_t &p) {
+        return welder.add_point(p);
+    };
+
+    // Faces which appear in both orientations cancel out, which happens for
+    // slivers narrower than the tolerance along the intersection.
+    face_map_t<size_t> face_ids;
+    std::vector<char> removed;
+    welded.reserve(triangles.size());
+    for (const auto &t : triangles) {
+        const size_t a = get_point_id(t.p1), b = get_point_id(t.p2),
+                     c = get_point_id(t.p3);
+        if (a == b || a == c || b == c) continue;
+        const face_t face{a, b, c};
+        const auto flipped = face_ids.find(face.flip());
+        if (flipped != face_ids.end() && !removed[flipped->second]) {
+            removed[flipped->second] = true;
+            continue;
+        }
+        const auto same = face_ids.find(face);
+        if (same != face_ids.end() && !removed[same->second]) continue;
+        face_ids[face] = welded.size();
+        welded.push_back(face);
+        removed.push_back(false);
+    }
+
+    // Only keeps the vertices which are still used by some face.
+    std::vector<point_3d_t> vertices;
+    face_list_t faces;
+    std::vector<size_t> vertex_ids(points.size(), SIZE_MAX);
+    auto get_vertex_id = [&](size_t i) {
+        if (vertex_ids[i] == SIZE_MAX) {
+            vertex_ids[i] = vertices.size();
+            vertices.push_back(points[i]);
+        }
+        return vertex_ids[i];
+    };
+    faces.reserve(welded.size());
+    for (size_t i = 0; i < welded.size(); i++) {
+        if (removed[i]) continue;
+        const auto &[a, b, c] = welded[i];
+        faces.push_back({get_vertex_id(a), get_vertex_id(b), get_vertex_id(c)});
+    }
+    return {vertices, faces};
+}
+
+// Builds a triangle mesh from a list of convex polygons which tile a
+// surface. Vertices of one polygon which lie on an edge of another polygon
+// are inserted into that edge, so that neighbouring faces share vertices,
+// and then each polygon is triangulated as a fan from one of its corners,
+// or around its center if every fan would have flat triangles.
+trimesh_3d_t from_polygons(const std::vector<polygon_3d_t> &polygons,
+                           size_t num_threads) {
+    point_welder_3d_t welder;
+    std::vector<std::vector<size_t>> rings(polygons.size());
+    for (size_t i = 0; i < polygons.size(); i++) {
+        for (const auto &p : polygons[i].points) {
+            const size_t id = welder.add_point(p);
+            if (rings[i].empty() || rings[i].back() != id)
+                rings[i].push_back(id);
+        }
+        if (rings[i].size() > 1 && rings[i].front() == rings[i].back())
+            rings[i].pop_back();
+    }
+    const auto &points = welder.points;
+    std::vector<bounding_box_3d_t> boxes;
+    boxes.reserve(points.size());
+    for (const auto &p : points) boxes.push_back({p, p});
+    const box_tree_3d_t tree(boxes);
+
+    const size_t n = polygons.size(),
+                 num_chunks = get_num_threads(num_threads, n);
+    std::vector<std::vector<triangle_3d_t>> chunk_triangles(num_chunks);
+    parallel_chunks(n, num_chunks, [&](size_t chunk, size_t lo, size_t hi) {
+        auto &out = chunk_triangles[chunk];
+        std::vector<size_t> ring, ids;
+        std::vector<char> inserted;
+        std::vector<triangle_3d_t> fan;
+        std::vector<std::tuple<double, size_t>> on_edge;
+        for (size_t i = lo; i < hi; i++) {
+            const auto &polygon = rings[i];
+            if (polygon.size() < 3) continue;
+
+            // Inserts the vertices which lie on each edge, in order.
+            ring.clear();
+            inserted.clear();
+            for (size_t j = 0; j < polygon.size(); j++) {
+                const size_t a = polygon[j],
+                             b = polygon[(j + 1) % polygon.size()];
+                const point_3d_t &pa = points[a], &pb = points[b];
+                const point_3d_t dir = pb - pa,
+                                 tol{get_tolerance(), get_tolerance(),
+                                     get_tolerance()};
+                const bounding_box_3d_t box(std::vector<point_3d_t>{pa, pb});
+                ids.clear();
+                tree.box_intersection_indices({box.min - tol, box.max + tol},
+                                              ids);
+                on_edge.clear();
+                for (const auto &k : ids) {
+                    if (k == a || k == b) continue;
+                    const double s = dir.dot(points[k] - pa) / dir.dot(dir);
+                    if (s <= 0.0 || s >= 1.0) continue;
+                    if (points[k].distance_to_point(pa + s * dir) <
+                        get_tolerance())
+                        on_edge.push_back({s, k});
+                }
+                std::sort(on_edge.begin(), on_edge.end());
+                ring.push_back(a);
+                inserted.push_back(false);
+                for (const auto &[s, k] : on_edge) {
+                    ring.push_back(k);
+                    inserted.push_back(true);
+                }
+            }
+
+            // Fanning out from a corner gives flat triangles for the
+            // vertices on the edges next to it, so it is only used if none
+            // of the triangles are thinner than the tolerance.
+            const size_t m = ring.size();
+            bool fanned = false;
+            for (size_t apex = 0; apex < m && !fanned; apex++) {
+                if (inserted[apex]) continue;
+                fan.clear();
+                for (size_t j = 1; j + 1 < m; j++) {
+                    const triangle_3d_t t{points[ring[apex]],
+                                          points[ring[(apex + j) % m]],
+                                          points[ring[(apex + j + 1) % m]]};
+                    const double longest =
+                        std::max({t.p1.distance_to_point(t.p2),
+                                  t.p2.distance_to_point(t.p3),
+                                  t.p3.distance_to_point(t.p1)});
+                    if (2 * t.area() < get_tolerance() * longest) break;
+                    fan.push_back(t);
+                }
+                if (fan.size() + 2 == m) {
+                    out.insert(out.end(), fan.begin(), fan.end());
+                    fanned = true;
+                }
+            }
+            if (fanned) continue;
+            point_3d_t center{0, 0, 0};
+            for (const auto &k : ring) center += points[k];
+            center /= ring.size();
+            for (size_t j = 0; j < ring.size(); j++) {
+                out.push_back({center, points[ring[j]],
+                               points[ring[(j + 1) % ring.size()]]});
+            }
+        }
+    });
+
+    std::vector<triangle_3d_t> triangles;
+    for (const auto &out : chunk_triangles)
+        triangles.insert(triangles.end(), out.begin(), out.end());
+    return from_triangles(triangles);
+}
+
+// Removes the vertices which aren't corners of a closed surface, which are
+// left where the faces were cut along the lines through the intersection
+// segments. A vertex is removed by collapsing it into one of its neighbors:
+// any neighbor if its faces all lie in one plane, or one of the two
+// neighbors along the crease if they lie in two planes and it is on a
+// straight crease between them. The collapse is only made if it keeps the
+// surface manifold and each of the moved faces in its plane.
+trimesh_3d_t remove_flat_vertices(const trimesh_3d_t &mesh) {
+    const auto &vertices = mesh.vertices();
+    std::vector<std::array<size_t, 3>> faces;
+    std::vector<std::vector<size_t>> vertex_faces(vertices.size());
+    for (const auto &f : mesh.get_faces()) {
+        for (size_t v : {f.a, f.b, f.c})
+            vertex_faces[v].push_back(faces.size());
+        faces.push_back({f.a, f.b, f.c});
+    }
+    std::vector<char> removed(faces.size(), false);
+    auto normal = [&](const std::array<size_t, 3> &f) {
+        return triangle_3d_t{vertices[f[0]], vertices[f[1]], vertices[f[2]]}
+            .normal();
+    };
+    auto aligned = [](const point_3d_t &n, const point_3d_t &m) {
+        return n.dot(m) > 1.0 - get_tolerance();
+    };
+    auto has = [](const std::array<size_t, 3> &f, size_t v) {
+        return f[0] == v || f[1] == v || f[2] == v;
+    };
+
+    std::vector<size_t> fs, candidates;
+    std::vector<point_3d_t> normals, planes;
+    for (size_t v = 0; v < vertices.size(); v++) {
+        fs.clear();
+        for (size_t fi : vertex_faces[v])
+            if (!removed[fi]) fs.push_back(fi);
+        if (fs.empty()) continue;
+
+        // Groups the faces by plane, giving up on corners.
+        normals.clear();
+        planes.clear();
+        for (size_t fi : fs) {
+            normals.push_back(normal(faces[fi]));
+            if (std::none_of(planes.begin(), planes.end(), [&](const auto &n) {
+                    return aligned(n, normals.back());
+                }))
+                planes.push_back(normals.back());
+        }
+        if (planes.size() > 2) continue;
+
+        // Finds the neighbors which `v` can be collapsed into, which are
+        // the ends of the edges between faces in different planes if it is
+        // on a crease.
+        candidates.clear();
+        for (size_t k = 0; k < fs.size(); k++) {
+            for (size_t u : faces[fs[k]]) {
+                if (u == v || std::find(candidates.begin(), candidates.end(),
+                                        u) != candidates.end())
+                    continue;
+                bool crease = false;
+                for (size_t l = 0; l < fs.size(); l++)
+                    if (l != k && has(faces[fs[l]], u))
+                        crease |= !aligned(normals[k], normals[l]);
+                if (planes.size() == 1 || crease) candidates.push_back(u);
+            }
+        }
+        if (planes.size() == 2) {
+            if (candidates.size() != 2) continue;
+            const point_3d_t d1 = vertices[candidates[0]] - vertices[v],
+                             d2 = vertices[candidates[1]] - vertices[v];
+            if (d1.normalize().dot(d2.normalize()) > -1.0 + get_tolerance())
+                continue;
+        }
+
+        for (size_t u : candidates) {
+            // The faces on the edge are removed, and the vertices opposite
+            // the edge must be the only neighbors which `v` and `u` share.
+            size_t num_shared = 0;
+            std::vector<size_t> opposite;
+            for (size_t fi : fs) {
+                if (!has(faces[fi], u)) continue;
+                num_shared++;
+                for (size_t w : faces[fi])
+                    if (w != u && w != v) opposite.push_back(w);
+            }
+            if (num_shared != 2) continue;
+            bool valid = true;
+            for (size_t fi : vertex_faces[u]) {
+                if (removed[fi] || has(faces[fi], v)) continue;
+                for (size_t w : faces[fi]) {
+                    if (w == u || std::find(opposite.begin(), opposite.end(),
+                                            w) != opposite.end())
+                        continue;
+                    for (size_t fj : fs) valid &= !has(faces[fj], w);
+                }
+            }
+
+            // The other faces keep their planes and orientations.
+            for (size_t k = 0; k < fs.size() && valid; k++) {
+                if (has(faces[fs[k]], u)) continue;
+                auto moved = faces[fs[k]];
+                std::replace(moved.begin(), moved.end(), v, u);
+                valid = aligned(normal(moved), normals[k]);
+            }
+            if (!valid) continue;
+
+            for (size_t fi : fs) {
+                if (has(faces[fi], u)) {
+                    removed[fi] = true;
+                } else {
+                    std::replace(faces[fi].begin(), faces[fi].end(), v, u);
+                    vertex_faces[u].push_back(fi);
+                }
+            }
+            vertex_faces[v].clear();
+            break;
+        }
+    }
+
+    // Only keeps the vertices which are still used by some face.
+    std::vector<point_3d_t> kept_vertices;
+    face_list_t kept_faces;
+    std::vector<size_t> vertex_ids(vertices.size(), SIZE_MAX);
+    auto get_vertex_id = [&](size_t i) {
+        if (vertex_ids[i] == SIZE_MAX) {
+            vertex_ids[i] = kept_vertices.size();
+            kept_vertices.push_back(vertices[i]);
+        }
+        return vertex_ids[i];
+    };
+    for (size_t i = 0; i < faces.size(); i++) {
+        if (removed[i]) continue;
+        const auto &[a, b, c] = faces[i];
+        kept_faces.push_back(
+            {get_vertex_id(a), get_vertex_id(b), get_vertex_id(c)});
+    }
+    return {kept_vertices, kept_faces};
+}
+
+// Splits each face of A along the segments where it crosses the faces of B.
+// Each face is cut into convex pieces by the lines through the segments,
+// only cutting the pieces which each segment passes through. The segments
+// are always computed from the faces of the first mesh in the operation
+// (`a_first` is false when A is the second mesh), so that both meshes are
+// split along the same segments. The faces are independent of each other,
+// so they are split in parallel.
+trimesh_3d_t split_at_all_intersections(const trimesh_3d_t &a_mesh,
+                                        const trimesh_3d_t &b_mesh,
+                                        const bvh_3d_t &b_bvh, bool a_first,
+                                        size_t num_threads) {
+    const auto a_triangles = a_mesh.get_triangles(),
+               b_triangles = b_mesh.get_triangles();
+    const size_t num_faces = a_triangles.size(),
+                 num_chunks = get_num_threads(num_threads, num_faces);
+    std::vector<std::vector<polygon_3d_t>> chunk_polygons(num_chunks);
+    parallel_chunks(
+        num_faces, num_chunks, [&](size_t chunk, size_t lo, size_t hi) {
+            auto &out = chunk_polygons[chunk];
+            std::vector<size_t> b_ids;
+            std::vector<polygon_3d_t> pieces, next_pieces;
+            for (size_t i = lo; i < hi; i++) {
+                const auto &t = a_triangles[i];
+                const point_3d_t normal = t.normal();
+                b_ids.clear();
+                b_bvh.box_intersection_indices(bounding_box_3d_t({t}), b_ids);
+                pieces = {polygon_3d_t(t.vertices())};
+                for (const auto &b_id : b_ids) {
+                    const auto segment =
+                        a_first ? crossing_segment(t, b_triangles[b_id])
+                                : crossing_segment(b_triangles[b_id], t);
+                    if (!segment) continue;
+                    next_pieces.clear();
+                    for (const auto &piece : pieces)
+                        if (!cut_polygon(piece, *segment, normal, next_pieces))
+                            next_pieces.push_back(piece);
+                    std::swap(pieces, next_pieces);
+                }
+                out.insert(out.end(), pieces.begin(), pieces.end());
+            }
+        });
+
+    std::vector<polygon_3d_t> polygons;
+    for (const auto &out : chunk_polygons)
+        polygons.insert(polygons.end(), out.begin(), out.end());
+    return from_polygons(polygons, num_threads);
+}
+
+// Computes the solid angle which a triangle covers as seen from a point,
+// which is positive if the point is behind the triangle.
+double solid_angle(const triangle_3d_t &t, const point_3d_t &p) {
+    const point_3d_t a = t.p1 - p, b = t.p2 - p, c = t.p3 - p;
+    const double la = a.length(), lb = b.length(), lc = c.length();
+    const double det = a.dot(b.cross(c));
+    const double div =
+        la * lb * lc + a.dot(b) * lc + b.dot(c) * la + c.dot(a) * lb;
+    return 2.0 * std::atan2(det, div);
+}
+
+// How many times larger than the radius of a node the distance to a point
+// has to be before the faces in the node are approximated.
+constexpr double WINDING_NUMBER_BETA = 2.0;
+
+// Computes the winding number of a closed surface around points, which is
+// one for points inside the surface and zero for points outside of it,
+// following Barill et al.'s "Fast Winding Numbers for Soups and Clouds".
+// The faces in each node of the surface's BVH are summed up as a single
+// dipole, from the area-weighted normal and center of the faces, which is
+// used instead of the faces themselves for points far from the node.
+struct winding_number_3d_t {
+    const bvh_3d_t &bvh;
+    std::vector<triangle_3d_t> triangles;
+    std::vector<point_3d_t> normals, centers;
+    std::vector<double> radii;
+
+    winding_number_3d_t(const trimesh_3d_t &mesh, const bvh_3d_t &bvh)
+        : bvh(bvh), triangles(mesh.get_triangles()) {
+        const auto nodes = bvh.get_nodes();
+        const auto indices = bvh.get_indices();
+        normals.assign(nodes.size(), {0, 0, 0});
+        centers.assign(nodes.size(), {0, 0, 0});
+        radii.assign(nodes.size(), 0.0);
+
+        // Children come after their parents, so the nodes are visited in
+        // reverse to sum up the children first.
+        std::vector<double> areas(nodes.size(), 0.0);
+        for (size_t id = nodes.size(); id-- > 0;) {
+            const auto &node = nodes[id];
+            if (node.is_leaf()) {
+                for (size_t i = node.offset; i < node.offset + node.count;
+                     i++) {
+                    const auto &t = triangles[indices[i]];
+                    const point_3d_t n = 0.5 * (t.p2 - t.p1).cross(t.p3 - t.p1);
+                    normals[id] += n;
+                    centers[id] += n.length() * t.center();
+                    areas[id] += n.length();
+                }
+            } else {
+                for (const size_t child : {id + 1, node.offset}) {
+                    normals[id] += normals[child];
+                    centers[id] += areas[child] * centers[child];
+                    areas[id] += areas[child];
+                }
+            }
+            centers[id] =
+                areas[id] > 0 ? centers[id] / areas[id] : node.box.center();
+            for (const auto &corner : node.box.corners())
+                radii[id] =
+                    std::max(radii[id], corner.distance_to_point(centers[id]));
+        }
+    }
+
+    double operator()(const point_3d_t &p) const {
+        const auto nodes = bvh.get_nodes();
+        const auto indices = bvh.get_indices();
+        double total = 0.0;
+        if (nodes.empty()) return total;
+        std::vector<size_t> stack{0};
+        while (!stack.empty()) {
+            const size_t id = stack.back();
+            stack.pop_back();
+            const auto &node = nodes[id];
+            const point_3d_t d = centers[id] - p;
+            const double length = d.length();
+            if (length > WINDING_NUMBER_BETA * radii[id]) {
+                total += normals[id].dot(d) / (length * length * length);
+            } else if (node.is_leaf()) {
+                for (size_t i = node.offset; i < node.offset + node.count; i++)
+                    total += solid_angle(triangles[indices[i]], p);
+            } else {
+                stack.push_back(node.offset);
+                stack.push_back(id + 1);
+            }
+        }
+        return total / (4.0 * M_PI);
+    }
+};
+
+// Where a face of one surface lies relative to the other surface. Faces on
+// the other surface are either facing the same way as it or the opposite
+// way.
+enum surface_side_3d { OUTSIDE, INSIDE, SAME, OPPOSITE };
+
+// Classifies each face of `split`, which has already been split where it
+// crosses `other`, by where it lies relative to `other`. This can only
+// change across `other`, so the faces are grouped by flood fill across
+// edges which don't lie on `other`, and then one representative point per
+// group is tested against `other`.
+std::vector<surface_side_3d> classify_faces(const trimesh_3d_t &split,
+                                            const trimesh_3d_t &other,
+                                            const bvh_3d_t &other_bvh,
+                                            size_t num_threads) {
+    const auto &faces = split.get_faces();
+    const auto &vertices = split.vertices();
+
+    // Marks the vertices which lie on the other surface. The flood fill
+    // doesn't cross edges between two such vertices, since they might lie
+    // on the other surface.
+    std::vector<char> on_surface(vertices.size(), false);
+    parallel_chunks(vertices.size(),
+                    get_num_threads(num_threads, vertices.size()),
+                    [&](size_t chunk, size_t lo, size_t hi) {
+                        for (size_t i = lo; i < hi; i++)
+                            on_surface[i] = other_bvh.distance(vertices[i]) <
+                                            get_tolerance();
+                    });
+
+    // Groups the faces by flood fill, keeping track of the largest face in
+    // each group to use as its representative.
+    edge_map_t<std::vector<size_t>> edge_faces;
+    for (size_t i = 0; i < faces.size(); i++)
+        for (const auto &edge : faces[i].get_edges(false))
+            edge_faces[edge].push_back(i);
+
+    std::vector<size_t> face_group(faces.size(), faces.size()), representatives;
+    std::vector<size_t> queue;
+    for (size_t i = 0; i < faces.size(); i++) {
+        if (face_group[i] != faces.size()) continue;
+        const size_t group = representatives.size();
+        representatives.push_back(i);
+        double best_area = -1.0;
+        face_group[i] = group;
+        queue = {i};
+        while (!queue.empty()) {
+            const size_t face_id = queue.back();
+            queue.pop_back();
+            const double area = split.get_triangle(faces[face_id]).area();
+            if (area > best_area) {
+                best_area = area;
+                representatives[group] = face_id;
+            }
+            for (const auto &edge : faces[face_id].get_edges(false)) {
+                if (on_surface[edge.a] && on_surface[edge.b]) continue;
+                for (const auto &other_id : edge_faces[edge]) {
+                    if (face_group[other_id] != faces.size()) continue;
+                    face_group[other_id] = group;
+                    queue.push_back(other_id);
+                }
+            }
+        }
+    }
+
+    // Tests the center of each representative face against the other
+    // surface. Faces on the other surface are compared by their normals.
+    const winding_number_3d_t winding_number(other, other_bvh);
+    std::vector<surface_side_3d> group_side(representatives.size());
+    parallel_chunks(
+        representatives.size(),
+        get_num_threads(num_threads, representatives.size()),
+        [&](size_t chunk, size_t lo, size_t hi) {
+            for (size_t i = lo; i < hi; i++) {
+                const auto t = split.get_triangle(faces[representatives[i]]);
+                const auto center = t.center();
+                const auto [other_face, closest] =
+                    other_bvh.closest_point(center);
+                const double alignment =
+                    other.get_triangle(other_face).normal().dot(t.normal());
+                if (center.distance_to_point(closest) < get_tolerance() &&
+                    std::abs(alignment) > 1.0 - get_tolerance()) {
+                    group_side[i] = alignment > 0 ? SAME : OPPOSITE;
+                } else {
+                    group_side[i] =
+                        winding_number(center) > 0.5 ? INSIDE : OUTSIDE;
+                }
+            }
+        });
+
+    std::vector<surface_side_3d> sides(faces.size());
+    for (size_t i = 0; i < faces.size(); i++)
+        sides[i] = group_side[face_group[i]];
+    return sides;
+}
+
+trimesh_3d_t mesh_op(const trimesh_3d_t &mesh_a, const trimesh_3d_t &mesh_b,
+                     boolean_3d_op op, size_t num_threads) {
+    // Splits each surface where it crosses the other one, and classifies
+    // the pieces against the other surface.
+    const bvh_3d_t a_bvh(mesh_a), b_bvh(mesh_b);
+    const auto a_split = split_at_all_intersections(mesh_a, mesh_b, b_bvh, true,
+                                                    num_threads),
+               b_split = split_at_all_intersections(mesh_b, mesh_a, a_bvh,
+                                                    false, num_threads);
+    const auto a_sides = classify_faces(a_split, mesh_b, b_bvh, num_threads),
+               b_sides = classify_faces(b_split, mesh_a, a_bvh, num_threads);
+
+    // Pieces of A and B which lie on each other are only taken from A. For
+    // unions, keeps the pieces of each surface outside of the other. For
+    // intersections, keeps the pieces of each surface inside the other. For
+    // differences, keeps the pieces of A outside of B, and the pieces of B
+    // inside of A, flipped to face inwards.
+    const auto &a_faces = a_split.get_faces(), &b_faces = b_split.get_faces();
+    std::vector<polygon_3d_t> polygons;
+    for (size_t i = 0; i < a_sides.size(); i++) {
+        const auto side = a_sides[i];
+        bool keep = false;
+        switch (op) {
+            case UNION:
+                keep = side == OUTSIDE || side == SAME;
+                break;
+            case INTERSECTION:
+                keep = side == INSIDE || side == SAME;
+                break;
+            case DIFFERENCE:
+                keep = side == OUTSIDE || side == OPPOSITE;
+                break;
+        }
+        if (keep)
+            polygons.push_back(a_split.get_triangle(a_faces[i]).vertices());
+    }
+    for (size_t i = 0; i < b_sides.size(); i++) {
+        const auto side = b_sides[i];
+        const auto t = b_split.get_triangle(b_faces[i]);
+        switch (op) {
+            case UNION:
+                if (side == OUTSIDE) polygons.push_back(t.vertices());
+                break;
+            case INTERSECTION:
+                if (side == INSIDE) polygons.push_back(t.vertices());
+                break;
+            case DIFFERENCE:
+                if (side == INSIDE) polygons.push_back({{t.p1, t.p3, t.p2}});
+                break;
+        }
+    }
+
+    // The pieces of A and B were split separately, so their vertices along
+    // the intersection are matched up again.
+    return remove_flat_vertices(from_polygons(polygons, num_threads));
+}
+
+trimesh_3d_t mesh_union(const trimesh_3d_t &a, const trimesh_3d_t &b,
+                        size_t num_threads) {
+    return mesh_op(a, b, UNION, num_threads);
+}
+
+trimesh_3d_t mesh_intersection(const trimesh_3d_t &a, const trimesh_3d_t &b,
+                               size_t num_threads) {
+    return mesh_op(a, b, INTERSECTION, num_threads);
+}
+
+trimesh_3d_t mesh_difference(const trimesh_3d_t &a, const trimesh_3d_t &b,
+                             size_t num_threads) {
+    return mesh_op(a, b, DIFFERENCE, num_threads);
+}
+
+// Combines tetrahedral meshes through their surfaces, and tetrahedralizes
+// the result again. Cutting the tetrahedra of each mesh separately would
+// leave their faces split differently where they meet, so the result
+// wouldn't be conforming.
 tetramesh_3d_t mesh_op(const tetramesh_3d_t &mesh_a,
-                       const tetramesh_3d_t &mesh_b, boolean_3d_op op) {
-    throw std::runtime_error("Not implemented yet.");
+                       const tetramesh_3d_t &mesh_b, boolean_3d_op op,
+                       size_t num_threads) {
+    return mesh_op(mesh_a.to_trimesh(), mesh_b.to_trimesh(), op, num_threads)
+        .to_tetramesh();
 }
 
-tetramesh_3d_t mesh_union(const tetramesh_3d_t &a, const tetramesh_3d_t &b) {
-    return mesh_op(a, b, UNION);
+tetramesh_3d_t mesh_union(const tetramesh_3d_t &a, const tetramesh_3d_t &b,
+                          size_t num_threads) {
+    return mesh_op(a, b, UNION, num_threads);
 }
 
 tetramesh_3d_t mesh_intersection(const tetramesh_3d_t &a,
-                                 const tetramesh_3d_t &b) {
-    return mesh_op(a, b, INTERSECTION);
+                                 const tetramesh_3d_t &b, size_t num_threads) {
+    return mesh_op(a, b, INTERSECTION, num_threads);
 }
 
-tetramesh_3d_t mesh_difference(const tetramesh_3d_t &a,
-                               const tetramesh_3d_t &b) {
-    return mesh_op(a, b, DIFFERENCE);
+tetramesh_3d_t mesh_difference(const tetramesh_3d_t &a, const tetramesh_3d_t &b,
+                               size_t num_threads) {
+    return mesh_op(a, b, DIFFERENCE, num_threads);
 }
 
 void add_3d_boolean_modules(py::module &m) {
-    m.def("union", &mesh_union, "Union of two meshes", "a"_a, "b"_a);
-    m.def("intersection", &mesh_intersection, "Intersection of two meshes",
-          "a"_a, "b"_a);
-    m.def("difference", &mesh_difference, "Difference of two meshes", "a"_a,
-          "b"_a);
+    m.def("union",
+          py::overload_cast<const tetramesh_3d_t &, const tetramesh_3d_t &,
+                            size_t>(&mesh_union),
+          "Union of two meshes", "a"_a, "b"_a, "num_threads"_a = 1,
+          py::call_guard<py::gil_scoped_release>());
+    m.def("union",
+          py::overload_cast<const trimesh_3d_t &, const trimesh_3d_t &, size_t>(
+              &mesh_union),
+          "Union of two closed surfaces", "a"_a, "b"_a, "num_threads"_a = 1,
+          py::call_guard<py::gil_scoped_release>());
+    m.def("intersection",
+          py::overload_cast<const tetramesh_3d_t &, const tetramesh_3d_t &,
+                            size_t>(&mesh_intersection),
+          "Intersection of two meshes", "a"_a, "b"_a, "num_threads"_a = 1,
+          py::call_guard<py::gil_scoped_release>());
+    m.def("intersection",
+          py::overload_cast<const trimesh_3d_t &, const trimesh_3d_t &, size_t>(
+              &mesh_intersection),
+          "Intersection of two closed surfaces", "a"_a, "b"_a,
+          "num_threads"_a = 1, py::call_guard<py::gil_scoped_release>());
+    m.def("difference",
+          py::overload_cast<const tetramesh_3d_t &, const tetramesh_3d_t &,
+                            size_t>(&mesh_difference),
+          "Difference of two meshes", "a"_a, "b"_a, "num_threads"_a = 1,
+          py::call_guard<py::gil_scoped_release>());
+    m.def("difference",
+          py::overload_cast<const trimesh_3d_t &, const trimesh_3d_t &, size_t>(
+              &mesh_difference),
+          "Difference of two closed surfaces", "a"_a, "b"_a,
+          "num_threads"_a = 1, py::call_guard<py::gil_scoped_release>());
 }
 
 }  // namespace trimesh
@@ -10,11 +10,28 @@ namespace py = pybind11;
 
 namespace trimesh {
 
-tetramesh_3d_t mesh_union(const tetramesh_3d_t &a, const tetramesh_3d_t &b);
+// Booleans on tetrahedral meshes, which combine their surfaces and
+// tetrahedralize the result, so that it is conforming. The `num_threads`
+// argument sets how many threads to use when combining the surfaces, where 0
+// means one per hardware thread. The output is the same regardless of the
+// number of threads.
+tetramesh_3d_t mesh_union(const tetramesh_3d_t &a, const tetramesh_3d_t &b,
+                          size_t num_threads = 1);
 tetramesh_3d_t mesh_intersection(const tetramesh_3d_t &a,
-                                 const tetramesh_3d_t &b);
+                                 const tetramesh_3d_t &b,
+                                 size_t num_threads = 1);
 tetramesh_3d_t mesh_difference(const tetramesh_3d_t &a,
-                               const tetramesh_3d_t &b);
+                               const tetramesh_3d_t &b,
+                               size_t num_threads = 1);
+
+// Booleans on closed triangle meshes, which only operate on the surfaces and
+// never build a volumetric mesh.
+trimesh_3d_t mesh_union(const trimesh_3d_t &a, const trimesh_3d_t &b,
+                        size_t num_threads = 1);
+trimesh_3d_t mesh_intersection(const trimesh_3d_t &a, const trimesh_3d_t &b,
+                               size_t num_threads = 1);
+trimesh_3d_t mesh_difference(const trimesh_3d_t &a, const trimesh_3d_t &b,
+                             size_t num_threads = 1);
 
 void add_3d_boolean_modules(py::module &m);
 
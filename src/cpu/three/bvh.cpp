@@ -1,11 +1,17 @@
 #include "bvh.h"
 
+#include <algorithm>
+#include <cmath>
 #include <iostream>
+#include <limits>
 #include <numeric>
+#include <optional>
 #include <queue>
 #include <sstream>
 
 #include "../options.h"
+#include "../pickle.h"
+#include "../predicates.h"
 
 using namespace pybind11::literals;
 
@@ -15,121 +21,158 @@ namespace trimesh {
  * point_3d_set_t *
  * -------------- */
 
-point_3d_set_t::point_3d_set_t(const std::initializer_list<point_3d_t> &points)
-    : points(points) {
-    for (size_t i = 0; i < this->points.size(); ++i)
-        this->indices[this->points[i]] = i;
+point_3d_set_t::point_3d_set_t(
+    const std::initializer_list<point_3d_t> &points) {
+    for (const auto &p : points) this->welder.insert(p);
 }
 
-point_3d_t point_3d_set_t::operator[](size_t i) const { return points[i]; }
+point_3d_t point_3d_set_t::operator[](size_t i) const {
+    return welder.points[i];
+}
 
 size_t point_3d_set_t::add_point(const point_3d_t &p) {
-    if (auto it = point_id(p); it) return *it;
-    points.push_back(p);
-    indices[p] = points.size() - 1;
-    return points.size() - 1;
+    return welder.add_point(p);
 }
 
-size_t point_3d_set_t::size() const { return points.size(); }
+size_t point_3d_set_t::size() const { return welder.size(); }
 
 size_t point_3d_set_t::get_point(const point_3d_t &p) const {
-    return indices.at(p);
+    if (auto i = welder.find(p); i) return *i;
+    throw std::out_of_range("Point " + p.to_string() + " is not in the set");
 }
 
-point_3d_t point_3d_set_t::get_point(size_t i) const { return points[i]; }
+point_3d_t point_3d_set_t::get_point(size_t i) const {
+    return welder.points[i];
+}
 
 std::optional<size_t> point_3d_set_t::point_id(const point_3d_t &p) const {
-    if (auto it = indices.find(p); it != indices.end()) return it->second;
-    return std::nullopt;
+    return welder.find(p);
 }
 
 const std::vector<point_3d_t> &point_3d_set_t::get_points() const {
-    return points;
+    return welder.points;
 }
 
 /* ------------------------ *
  * delaunay_split_tree_3d_t *
  * ------------------------ */
 
-size_t delaunay_split_tree_3d_t::add_volume(
-    const volume_t &v, const std::vector<size_t> &parents) {
-    tetrahedron_3d_t t{this->vertices[v.a], this->vertices[v.b],
-                       this->vertices[v.c], this->vertices[v.d]};
-    if (t.signed_volume() < 0) {
-        throw std::runtime_error(
-            "Tetrahedron is not oriented correctly (signed volume is "
-            "negative).");
-    }
-
-    const size_t i = this->volumes.size();
-    for (const auto &parent : parents) {
-        this->children[parent].push_back(i);
-    }
-    this->volumes.push_back(v);
-    for (const auto &face : v.get_faces()) {
-        this->face_to_volume[face] = i;
-        for (const auto &edge : face.get_edges(false)) {
-            this->edge_to_faces[edge].insert(face);
-        }
-    }
-    this->children.push_back({});
-    return i;
-}
-
 std::vector<size_t> delaunay_split_tree_3d_t::add_volumes(
     const std::vector<volume_t> &volumes, const std::vector<size_t> &parents) {
-    std::vector<size_t> indices;
-
-    // Checks that the total volume of the new volumes matches parents.
+    // Checks that the new volumes are oriented correctly, and that their
+    // total volume matches the parents. `orient_3d` is exact in sign, and
+    // otherwise six times the signed volume.
+    auto orientation = [&](const volume_t &v) {
+        return orient_3d(this->vertices[v.a], this->vertices[v.b],
+                         this->vertices[v.c], this->vertices[v.d]);
+    };
+    std::vector<double> orientations(volumes.size());
     double child_volume = 0, parent_volume = 0;
     for (size_t i = 0; i < volumes.size(); i++) {
-        const auto sv =
-            this->get_tetrahedron_from_volume(volumes[i]).signed_volume();
-        if (sv < 0) {
+        orientations[i] = orientation(volumes[i]);
+        if (orientations[i] < 0) {
             throw std::runtime_error(
                 "Tetrahedron is not oriented correctly (volume is negative).");
         }
-        child_volume += sv;
+        child_volume += orientations[i] / 6;
     }
     for (size_t i = 0; i < parents.size(); i++) {
-        const auto &pv = this->volumes[parents[i]];
-        tetrahedron_3d_t t{this->vertices[pv.a], this->vertices[pv.b],
-                           this->vertices[pv.c], this->vertices[pv.d]};
-        const auto sv = t.signed_volume();
-        if (sv < 0) {
+        const double o = orientation(this->volumes[parents[i]]);
+        if (o < 0) {
             throw std::runtime_error("Parent tetrahedron " + std::to_string(i) +
                                      " volume is negative.");
         }
-        parent_volume += sv;
+        parent_volume += o / 6;
     }
-    if (std::abs(child_volume - parent_volume) > get_tolerance()) {
+    if (std::abs(child_volume - parent_volume) >
+        get_tolerance() * parent_volume) {
         throw std::runtime_error("The total volume of the new volumes " +
                                  std::to_string(child_volume) +
                                  " does not match the parent volume " +
                                  std::to_string(parent_volume));
     }
 
-    for (size_t i = 0; i < volumes.size(); ++i) {
-        if (this->get_tetrahedron_from_volume(volumes[i]).signed_volume() <
-            get_tolerance())
-            continue;
-        indices.push_back(this->add_volume(volumes[i], parents));
+    // Only flat volumes are dropped, since dropping small ones would leave
+    // holes in the tetrahedralization.
+    const child_range_t range{this->volumes.size(),
+                              this->volumes.size() + volumes.size()};
+    std::vector<size_t> indices;
+    for (size_t i = 0; i < volumes.size(); i++) {
+        if (orientations[i] <= 0) continue;
+        const auto &v = volumes[i];
+        indices.push_back(this->volumes.size());
+        this->volumes.push_back(v);
+        this->children.push_back({});
+        this->neighbors.push_back(
+            {NO_NEIGHBOR, NO_NEIGHBOR, NO_NEIGHBOR, NO_NEIGHBOR});
+    }
+    const child_range_t added{range.begin, this->volumes.size()};
+    for (const auto &parent : parents) this->children[parent] = added;
+
+    // Links the new volumes to each other, then to the volumes on the other
+    // side of the faces which they share with their parents.
+    face_map_t<std::pair<size_t, size_t>> open_faces;
+    for (size_t i = added.begin; i < added.end; i++) {
+        const auto faces = this->volumes[i].get_faces();
+        for (size_t k = 0; k < faces.size(); k++) {
+            auto it = open_faces.find(faces[k].flip());
+            if (it == open_faces.end()) {
+                open_faces.emplace(faces[k], std::make_pair(i, k));
+                continue;
+            }
+            const auto [j, l] = it->second;
+            this->neighbors[i][k] = j;
+            this->neighbors[j][l] = i;
+            open_faces.erase(it);
+        }
     }
+    for (const auto &parent : parents) {
+        const auto faces = this->volumes[parent].get_faces();
+        for (size_t k = 0; k < faces.size(); k++) {
+            const size_t n = this->neighbors[parent][k];
+            if (n == NO_NEIGHBOR || !this->is_leaf(n)) continue;
+            auto it = open_faces.find(faces[k]);
+            const size_t j =
+                it == open_faces.end() ? NO_NEIGHBOR : it->second.first;
+            if (j != NO_NEIGHBOR) this->neighbors[j][it->second.second] = n;
+            for (auto &m : this->neighbors[n])
+                if (m == parent) m = j;
+        }
+    }
+
+    this->num_leaves += indices.size();
+    this->num_leaves -= parents.size();
+    if (!indices.empty()) this->last_leaf = indices.back();
     return indices;
 }
 
-delaunay_split_tree_3d_t::delaunay_split_tree_3d_t(const tetrahedron_3d_t &root)
-    : root(root) {
-    this->volumes = {{0, 1, 2, 3}};
-    this->face_to_volume = {};
-    this->edge_to_faces = {};
-    for (const auto &f : this->volumes[0].get_faces()) {
-        this->face_to_volume[f] = 0;
-        for (const auto &e : f.get_edges(false)) {
-            this->edge_to_faces[e].insert(f);
-        }
+void delaunay_split_tree_3d_t::compact() {
+    // Drops the volumes which have been replaced, keeping the leaves in the
+    // same order and remapping the neighbors to their new indices.
+    std::vector<size_t> ids(this->volumes.size(), NO_NEIGHBOR);
+    size_t n = 0;
+    for (size_t i = 0; i < this->volumes.size(); i++) {
+        if (!this->is_leaf(i)) continue;
+        ids[i] = n;
+        this->volumes[n] = this->volumes[i];
+        this->neighbors[n] = this->neighbors[i];
+        n++;
     }
+    this->volumes.erase(this->volumes.begin() + n, this->volumes.end());
+    this->neighbors.erase(this->neighbors.begin() + n, this->neighbors.end());
+    this->children.assign(n, {});
+    for (auto &ns : this->neighbors)
+        for (auto &j : ns)
+            if (j != NO_NEIGHBOR) j = ids[j];
+    this->last_leaf = ids[this->last_leaf];
+}
+
+delaunay_split_tree_3d_t::delaunay_split_tree_3d_t(const tetrahedron_3d_t &root,
+                                                   bool keep_history)
+    : root(root), keep_history(keep_history) {
+    this->volumes = {{0, 1, 2, 3}};
     this->children = {{}};
+    this->neighbors = {{NO_NEIGHBOR, NO_NEIGHBOR, NO_NEIGHBOR, NO_NEIGHBOR}};
     this->vertices = {root.p1, root.p2, root.p3, root.p4};
 }
 
@@ -137,18 +180,49 @@ bool delaunay_split_tree_3d_t::is_leaf(size_t i) const {
     return this->children[i].empty();
 }
 
+double delaunay_split_tree_3d_t::outside_distance(const point_3d_t &p,
+                                                  size_t i) const {
+    // Unlike `distance_to_tetrahedron`, this doesn't pad each face by the
+    // tolerance, which would make slivers contain points far outside them.
+    double dist = std::numeric_limits<double>::lowest();
+    for (const auto &f : this->volumes[i].get_faces()) {
+        const point_3d_t a = this->vertices[f.a];
+        const point_3d_t n =
+            (this->vertices[f.b] - a).cross(this->vertices[f.c] - a);
+        const double length = n.length();
+        if (length > 0) dist = std::max(dist, n.dot(p - a) / length);
+    }
+    return dist;
+}
+
 size_t delaunay_split_tree_3d_t::find_leaf_index(const point_3d_t &p) const {
+    // Without the split history, every leaf has to be checked.
+    if (!this->keep_history) {
+        double min_dist = std::numeric_limits<double>::max();
+        size_t min_index = 0;
+        for (size_t i = 0; i < this->volumes.size(); i++) {
+            if (!is_leaf(i)) continue;
+            double t_dist = outside_distance(p, i);
+            if (t_dist < min_dist) {
+                min_dist = t_dist;
+                min_index = i;
+            }
+        }
+        if (min_dist > get_tolerance()) {
+            throw std::runtime_error(
+                "Could not find leaf tetrahedron for point " + p.to_string());
+        }
+        return min_index;
+    }
+
     size_t i = 0;
     while (!is_leaf(i)) {
-        // Gets the closest triangle to the point.
+        // Gets the child which the point is furthest inside of.
+        const auto &range = this->children[i];
         double min_dist = std::numeric_limits<double>::max();
         size_t min_index = 0;
-        for (const auto &child_id : this->children[i]) {
-            const auto &child = this->volumes[child_id];
-            const tetrahedron_3d_t t{
-                this->vertices[child.a], this->vertices[child.b],
-                this->vertices[child.c], this->vertices[child.d]};
-            double t_dist = p.distance_to_tetrahedron(t);
+        for (size_t child_id = range.begin; child_id < range.end; child_id++) {
+            double t_dist = outside_distance(p, child_id);
             if (t_dist < min_dist) {
                 min_dist = t_dist;
                 min_index = child_id;
@@ -159,9 +233,10 @@ size_t delaunay_split_tree_3d_t::find_leaf_index(const point_3d_t &p) const {
             std::ostringstream ss;
             ss << "Could not find leaf triangle for point " << p.to_string()
                << " in tetrahedron " << this->get_tetrahedron(i).to_string()
-               << " with " << this->children[i].size()
+               << " with " << range.end - range.begin
                << " children:" << std::endl;
-            for (const auto &child_id : this->children[i]) {
+            for (size_t child_id = range.begin; child_id < range.end;
+                 child_id++) {
                 ss << " - " << this->get_tetrahedron(child_id).to_string()
                    << " (dist: "
                    << p.distance_to_tetrahedron(this->get_tetrahedron(child_id))
@@ -175,10 +250,46 @@ size_t delaunay_split_tree_3d_t::find_leaf_index(const point_3d_t &p) const {
     return i;
 }
 
+size_t delaunay_split_tree_3d_t::walk_to_leaf(const point_3d_t &p) const {
+    // Walks over the current leaves, starting from the most recently added
+    // one, by crossing a face which the point is in front of until there are
+    // none left. The walk never goes straight back across the face it came
+    // through, and starts checking from a random face at each step, so that
+    // it can't get stuck in a cycle on near-degenerate inputs. If it takes
+    // too long, this falls back to `find_leaf_index`.
+    size_t i = this->last_leaf, previous = NO_NEIGHBOR;
+    uint32_t state = 2463534242u;
+    for (size_t step = 0; step < this->num_leaves; step++) {
+        const auto faces = this->volumes[i].get_faces();
+        std::optional<size_t> next;
+        state ^= state << 13;
+        state ^= state >> 17;
+        state ^= state << 5;
+        for (size_t k = 0; k < faces.size() && !next; k++) {
+            const size_t j = (k + state) % faces.size();
+            const size_t n = this->neighbors[i][j];
+            if (n == NO_NEIGHBOR || n == previous) continue;
+            const auto &f = faces[j];
+            if (orient_3d(this->vertices[f.a], this->vertices[f.b],
+                          this->vertices[f.c], p) > 0)
+                next = n;
+        }
+        if (!next) return i;
+        previous = i;
+        i = *next;
+    }
+    return find_leaf_index(p);
+}
+
 const volume_t &delaunay_split_tree_3d_t::get_volume(size_t i) const {
     return this->volumes[i];
 }
 
+const std::array<size_t, 4> &delaunay_split_tree_3d_t::get_neighbors(
+    size_t i) const {
+    return this->neighbors[i];
+}
+
 tetrahedron_3d_t delaunay_split_tree_3d_t::get_tetrahedron_from_volume(
     const volume_t &f) const {
     return {this->vertices[f.a], this->vertices[f.b], this->vertices[f.c],
@@ -208,21 +319,20 @@ void delaunay_split_tree_3d_t::make_delaunay(const size_t &pi,
     std::queue<size_t> volumes{{ti}};
     std::unordered_set<size_t> volumes_to_remove{ti};
 
+    // Ties between cospherical points (such as the vertices of a sphere
+    // mesh) are broken by symbolic perturbation, so that the result doesn't
+    // depend on the insertion order.
     auto not_delaunay = [&](const volume_t &v) -> bool {
-        return this->get_tetrahedron_from_volume(v).circumsphere_contains(
-            p, get_tolerance());
+        return in_sphere_perturbed(this->vertices[v.a], this->vertices[v.b],
+                                   this->vertices[v.c], this->vertices[v.d],
+                                   p) > 0;
     };
 
     while (!volumes.empty()) {
         size_t volume_id = volumes.front();
         volumes.pop();
-        const auto &volume = this->get_volume(volume_id);
-        for (const auto &face : volume.get_faces()) {
-            const auto &rev_face = face.flip();
-            if (this->face_to_volume.find(rev_face) ==
-                this->face_to_volume.end())
-                continue;
-            const auto &neighbor_id = this->face_to_volume[rev_face];
+        for (const auto &neighbor_id : this->neighbors[volume_id]) {
+            if (neighbor_id == NO_NEIGHBOR) continue;
             if (volumes_to_remove.find(neighbor_id) != volumes_to_remove.end())
                 continue;
             const auto &neighbor = this->get_volume(neighbor_id);
@@ -233,31 +343,38 @@ void delaunay_split_tree_3d_t::make_delaunay(const size_t &pi,
         }
     }
 
-    // Finds boundary faces.
-    face_set_t boundary_faces;
-    for (const auto &volume_id : volumes_to_remove) {
-        const auto &volume = this->get_volume(volume_id);
-        for (const auto &face : volume.get_faces()) {
-            const auto &rev_face = face.flip();
-            if (this->face_to_volume.find(rev_face) ==
-                this->face_to_volume.end()) {
-                boundary_faces.insert(face);
-                continue;
-            }
-            const auto &neighbor_id = this->face_to_volume[rev_face];
-            if (volumes_to_remove.find(neighbor_id) ==
-                volumes_to_remove.end()) {
-                boundary_faces.insert(face);
+    // Finds boundary faces, and creates a new tetrahedron from each of them
+    // with the point. With the perturbation, the point can strictly see
+    // every boundary face of the cavity found above. The cavity is still
+    // grown across any face which it can't, since that would leave a flat
+    // volume.
+    std::vector<volume_t> new_volumes;
+    bool grown = true;
+    while (grown) {
+        grown = false;
+        new_volumes.clear();
+        for (const auto &volume_id : volumes_to_remove) {
+            const auto faces = this->get_volume(volume_id).get_faces();
+            for (size_t k = 0; k < faces.size(); k++) {
+                const size_t neighbor_id = this->neighbors[volume_id][k];
+                if (neighbor_id != NO_NEIGHBOR &&
+                    volumes_to_remove.count(neighbor_id))
+                    continue;
+                const auto &face = faces[k];
+                const double orientation =
+                    orient_3d(p, this->vertices[face.a], this->vertices[face.b],
+                              this->vertices[face.c]);
+                if (neighbor_id != NO_NEIGHBOR && orientation <= 0) {
+                    volumes_to_remove.insert(neighbor_id);
+                    grown = true;
+                    break;
+                }
+                new_volumes.push_back({pi, face.a, face.b, face.c});
             }
+            if (grown) break;
         }
     }
 
-    // For each boundary face, create a new tetrahedron with the point.
-    std::vector<volume_t> new_volumes;
-    for (const auto &face : boundary_faces) {
-        new_volumes.push_back({pi, face.a, face.b, face.c});
-    }
-
     const std::vector<size_t> parents{volumes_to_remove.begin(),
                                       volumes_to_remove.end()};
     this->add_volumes(new_volumes, parents);
@@ -272,19 +389,544 @@ void delaunay_split_tree_3d_t::split_tetrahedron(const point_3d_t &p,
     //     throw std::runtime_error(ss.str());
     // }
 
+    // Points which are already in the tree don't change the triangulation.
+    if (this->vertices.point_id(p)) return;
     make_delaunay(this->vertices.add_point(p), i);
+
+    // Without the history, the replaced volumes are dropped once they
+    // outnumber the leaves, so compaction is amortized over the insertions.
+    if (!this->keep_history && this->volumes.size() > 2 * this->num_leaves)
+        this->compact();
+}
+
+void delaunay_split_tree_3d_t::discard_history() {
+    this->keep_history = false;
+    this->compact();
 }
 
 const point_3d_set_t &delaunay_split_tree_3d_t::get_vertices() const {
     return this->vertices;
 }
 
+/* -------- *
+ * bvh_3d_t *
+ * -------- */
+
+// Number of bins used to evaluate the surface area heuristic.
+constexpr size_t BVH_3D_NUM_BINS = 16;
+
+// Below this depth, nodes are always split at the median, which bounds the
+// depth of the tree and therefore the size of the traversal stack.
+constexpr size_t BVH_3D_MAX_SAH_DEPTH = 32;
+constexpr size_t BVH_3D_STACK_SIZE = BVH_3D_MAX_SAH_DEPTH + 64;
+
+// Stack of the nodes which are left to visit in a traversal. It lives on the
+// call stack, so queries don't allocate.
+struct bvh_3d_stack_t {
+    std::array<size_t, BVH_3D_STACK_SIZE> ids;
+    size_t size = 0;
+
+    bvh_3d_stack_t() { this->push(0); }
+    bool empty() const { return this->size == 0; }
+    void push(size_t id) { this->ids[this->size++] = id; }
+    size_t pop() { return this->ids[--this->size]; }
+};
+
+bounding_box_3d_t merge_bounding_boxes(const bounding_box_3d_t &a,
+                                       const bounding_box_3d_t &b) {
+    return {{std::min(a.min.x, b.min.x), std::min(a.min.y, b.min.y),
+             std::min(a.min.z, b.min.z)},
+            {std::max(a.max.x, b.max.x), std::max(a.max.y, b.max.y),
+             std::max(a.max.z, b.max.z)}};
+}
+
+double get_axis(const point_3d_t &p, size_t axis) {
+    return axis == 0 ? p.x : axis == 1 ? p.y : p.z;
+}
+
+size_t box_tree_3d_t::build(std::vector<bvh_3d_node_t> &tree_nodes,
+                            std::vector<size_t> &tree_indices,
+                            const std::vector<bounding_box_3d_t> &boxes,
+                            const std::vector<point_3d_t> &centroids,
+                            size_t lo, size_t hi, size_t leaf_size,
+                            size_t depth) {
+    // Gets the bounds of the faces and of their centroids.
+    bounding_box_3d_t box = boxes[tree_indices[lo]],
+                      centroid_box{centroids[tree_indices[lo]],
+                                   centroids[tree_indices[lo]]};
+    for (size_t i = lo + 1; i < hi; i++) {
+        box = merge_bounding_boxes(box, boxes[tree_indices[i]]);
+        const auto &c = centroids[tree_indices[i]];
+        centroid_box = merge_bounding_boxes(centroid_box, {c, c});
+    }
+
+    const size_t node_id = tree_nodes.size();
+    tree_nodes.push_back({box, lo, hi - lo});
+    if (hi - lo <= leaf_size) return node_id;
+
+    // Splits along the axis where the centroids are most spread out.
+    const point_3d_t extent = centroid_box.max - centroid_box.min;
+    size_t axis = 0;
+    if (extent.y > extent.x) axis = 1;
+    if (extent.z > get_axis(extent, axis)) axis = 2;
+    const double axis_min = get_axis(centroid_box.min, axis),
+                 axis_extent = get_axis(extent, axis);
+
+    size_t mid = hi;
+    if (depth < BVH_3D_MAX_SAH_DEPTH && axis_extent > 0) {
+        // Bins the faces by centroid and picks the split between bins which
+        // minimizes the surface area heuristic.
+        auto get_bin = [&](size_t i) {
+            const double t =
+                (get_axis(centroids[i], axis) - axis_min) / axis_extent;
+            return std::min(static_cast<size_t>(t * BVH_3D_NUM_BINS),
+                            BVH_3D_NUM_BINS - 1);
+        };
+
+        std::vector<std::optional<bounding_box_3d_t>> bin_boxes(
+            BVH_3D_NUM_BINS);
+        std::vector<size_t> bin_counts(BVH_3D_NUM_BINS, 0);
+        for (size_t i = lo; i < hi; i++) {
+            const size_t b = get_bin(tree_indices[i]);
+            const auto &face_box = boxes[tree_indices[i]];
+            bin_boxes[b] = bin_boxes[b]
+                               ? merge_bounding_boxes(*bin_boxes[b], face_box)
+                               : face_box;
+            bin_counts[b]++;
+        }
+
+        // Sweeps from the right to get the cost of each right partition.
+        std::vector<double> right_costs(BVH_3D_NUM_BINS, 0.0);
+        std::optional<bounding_box_3d_t> acc;
+        size_t acc_count = 0;
+        for (size_t b = BVH_3D_NUM_BINS - 1; b > 0; b--) {
+            if (bin_boxes[b])
+                acc = acc ? merge_bounding_boxes(*acc, *bin_boxes[b])
+                          : *bin_boxes[b];
+            acc_count += bin_counts[b];
+            right_costs[b] = acc ? acc->surface_area() * acc_count : 0.0;
+        }
+
+        // Sweeps from the left to find the best split.
+        double best_cost = std::numeric_limits<double>::max();
+        size_t best_bin = 0;
+        acc = std::nullopt;
+        acc_count = 0;
+        for (size_t b = 0; b + 1 < BVH_3D_NUM_BINS; b++) {
+            if (bin_boxes[b])
+                acc = acc ? merge_bounding_boxes(*acc, *bin_boxes[b])
+                          : *bin_boxes[b];
+            acc_count += bin_counts[b];
+            const double cost =
+                (acc ? acc->surface_area() * acc_count : 0.0) +
+                right_costs[b + 1];
+            if (cost < best_cost) {
+                best_cost = cost;
+                best_bin = b;
+            }
+        }
+
+        const auto begin = tree_indices.begin();
+        mid = std::partition(begin + lo, begin + hi,
+                             [&](size_t i) { return get_bin(i) <= best_bin; }) -
+              begin;
+    }
+
+    // Falls back to splitting at the median centroid, which is also used when
+    // all of the centroids coincide or the tree is too deep.
+    if (mid == lo || mid == hi) {
+        const auto begin = tree_indices.begin();
+        mid = lo + (hi - lo) / 2;
+        std::nth_element(begin + lo, begin + mid, begin + hi,
+                         [&](size_t a, size_t b) {
+                             return get_axis(centroids[a], axis) <
+                                    get_axis(centroids[b], axis);
+                         });
+    }
+
+    this->build(tree_nodes, tree_indices, boxes, centroids, lo, mid,
+                leaf_size, depth + 1);
+    const size_t rhs = this->build(tree_nodes, tree_indices, boxes, centroids,
+                                   mid, hi, leaf_size, depth + 1);
+    tree_nodes[node_id].offset = rhs;
+    tree_nodes[node_id].count = 0;
+    return node_id;
+}
+
+void box_tree_3d_t::init(const std::vector<bounding_box_3d_t> &boxes,
+                         const std::vector<point_3d_t> &centroids,
+                         size_t leaf_size) {
+    if (leaf_size == 0) throw std::invalid_argument("Leaf size must be >= 1");
+    if (boxes.empty()) return;
+
+    std::vector<bvh_3d_node_t> tree_nodes;
+    std::vector<size_t> tree_indices(boxes.size());
+    std::iota(tree_indices.begin(), tree_indices.end(), 0);
+    tree_nodes.reserve(2 * boxes.size() / leaf_size + 1);
+    this->build(tree_nodes, tree_indices, boxes, centroids, 0, boxes.size(),
+                leaf_size, 0);
+    this->set_tree(std::move(tree_nodes), std::move(tree_indices));
+}
+
+// Takes ownership of the vectors which a tree was built or loaded into.
+void box_tree_3d_t::set_tree(std::vector<bvh_3d_node_t> &&tree_nodes,
+                             std::vector<size_t> &&tree_indices) {
+    auto tree = std::make_shared<
+        std::pair<std::vector<bvh_3d_node_t>, std::vector<size_t>>>(
+        std::move(tree_nodes), std::move(tree_indices));
+    this->nodes = tree->first;
+    this->indices = tree->second;
+    this->owner = std::move(tree);
+}
+
+// Checks that a tree which was not built here, such as one which was loaded
+// from a file, refers to each of `num_boxes` boxes once, that its nodes only
+// refer to other nodes and indices within range, that every node but the
+// root has exactly one parent, and that it is no deeper than a built tree,
+// so that it is safe to traverse.
+void box_tree_3d_t::check_tree(size_t num_boxes) const {
+    if (this->indices.size() != num_boxes)
+        throw std::invalid_argument("Expected one BVH index per face");
+    for (const size_t i : this->indices) {
+        if (i >= num_boxes)
+            throw std::invalid_argument("Invalid BVH face index");
+    }
+    // Children come after their parents, so the depth of each node is known
+    // by the time it is checked. A node with two parents could be reached
+    // through a deeper path than the one its depth was taken from, so those
+    // are rejected.
+    std::vector<size_t> depths(this->nodes.size(), 0);
+    std::vector<char> has_parent(this->nodes.size(), false);
+    for (size_t i = 0; i < this->nodes.size(); i++) {
+        const auto &node = this->nodes[i];
+        bool valid =
+            node.is_leaf()
+                ? node.offset <= this->indices.size() &&
+                      node.count <= this->indices.size() - node.offset
+                : node.offset > i + 1 && node.offset < this->nodes.size();
+        valid = valid && (i == 0 || has_parent[i]) &&
+                depths[i] + 1 < BVH_3D_STACK_SIZE;
+        if (valid && !node.is_leaf()) {
+            valid = !has_parent[i + 1] && !has_parent[node.offset];
+            has_parent[i + 1] = has_parent[node.offset] = true;
+            depths[i + 1] = depths[node.offset] = depths[i] + 1;
+        }
+        if (!valid)
+            throw std::invalid_argument("Invalid BVH node " +
+                                        std::to_string(i));
+    }
+}
+
+box_tree_3d_t::box_tree_3d_t(const std::vector<bounding_box_3d_t> &boxes,
+                             size_t leaf_size) {
+    std::vector<point_3d_t> centroids;
+    centroids.reserve(boxes.size());
+    for (const auto &box : boxes) centroids.push_back((box.min + box.max) / 2);
+    this->init(boxes, centroids, leaf_size);
+}
+
+size_t box_tree_3d_t::box_intersection_indices(
+    const bounding_box_3d_t &bb, std::vector<size_t> &out) const {
+    const size_t start = out.size();
+    if (nodes.empty()) return 0;
+
+    bvh_3d_stack_t stack;
+    while (!stack.empty()) {
+        const size_t id = stack.pop();
+        const auto &node = nodes[id];
+        if (!node.box.intersects_bounding_box(bb)) continue;
+        if (!node.is_leaf()) {
+            stack.push(node.offset);
+            stack.push(id + 1);
+            continue;
+        }
+        out.insert(out.end(), indices.begin() + node.offset,
+                   indices.begin() + node.offset + node.count);
+    }
+    return out.size() - start;
+}
+
+bvh_3d_t::bvh_3d_t(const trimesh_3d_t &t, size_t leaf_size)
+    : bvh_3d_t(t.get_faces(), t.vertices(), leaf_size) {}
+
+// Views a hierarchy and the faces and vertices which it refers to in memory
+// which is owned elsewhere, such as a memory-mapped file, without copying
+// them. Since the faces were not checked when a mesh was built from them,
+// this also checks that they refer to the vertices.
+bvh_3d_t::bvh_3d_t(span_t<face_t> faces, span_t<point_3d_t> vertices,
+                   span_t<bvh_3d_node_t> nodes, span_t<size_t> indices,
+                   std::shared_ptr<const void> owner)
+    : faces(faces), vertices(vertices) {
+    for (const auto &[a, b, c] : faces) {
+        if (a >= vertices.size() || b >= vertices.size() ||
+            c >= vertices.size())
+            throw std::invalid_argument("Invalid face vertex index");
+    }
+    this->nodes = nodes;
+    this->indices = indices;
+    this->owner = std::move(owner);
+    this->check_tree(faces.size());
+}
+
+bvh_3d_t::bvh_3d_t(span_t<face_t> faces, span_t<point_3d_t> vertices,
+                   size_t leaf_size)
+    : faces(faces), vertices(vertices) {
+    std::vector<bounding_box_3d_t> boxes;
+    std::vector<point_3d_t> centroids;
+    boxes.reserve(faces.size());
+    centroids.reserve(faces.size());
+    for (size_t i = 0; i < faces.size(); i++) {
+        const auto t = this->get_triangle(i);
+        boxes.push_back(bounding_box_3d_t({t}));
+        centroids.push_back(t.center());
+    }
+    this->init(boxes, centroids, leaf_size);
+}
+
+triangle_3d_t bvh_3d_t::get_triangle(size_t i) const {
+    const auto &f = this->faces[i];
+    return {this->vertices[f.a], this->vertices[f.b], this->vertices[f.c]};
+}
+
+// Returns the parameter along the segment `origin + t * dir`, for t in
+// [0, t_max], where it enters the box, if it intersects the box at all.
+std::optional<double> segment_box_entry(const point_3d_t &origin,
+                                        const point_3d_t &inv_dir,
+                                        const bounding_box_3d_t &box,
+                                        double t_max) {
+    const double eps = get_tolerance();
+    double t_min = 0.0;
+    for (size_t axis = 0; axis < 3; axis++) {
+        const double o = get_axis(origin, axis), inv = get_axis(inv_dir, axis);
+        const double lo = get_axis(box.min, axis) - eps,
+                     hi = get_axis(box.max, axis) + eps;
+        if (std::isinf(inv)) {
+            if (o < lo || o > hi) return std::nullopt;
+            continue;
+        }
+        double t0 = (lo - o) * inv, t1 = (hi - o) * inv;
+        if (t0 > t1) std::swap(t0, t1);
+        t_min = std::max(t_min, t0);
+        t_max = std::min(t_max, t1);
+        if (t_min > t_max) return std::nullopt;
+    }
+    return t_min;
+}
+
+std::vector<face_t> bvh_3d_t::line_intersections(
+    const line_3d_t &l, const std::optional<size_t> max_intersections) const {
+    std::vector<face_t> intrs;
+    if (nodes.empty()) return intrs;
+
+    const point_3d_t dir = l.p2 - l.p1,
+                     inv_dir{1.0 / dir.x, 1.0 / dir.y, 1.0 / dir.z};
+    bvh_3d_stack_t stack;
+    while (!stack.empty()) {
+        const size_t id = stack.pop();
+        const auto &node = nodes[id];
+        if (!segment_box_entry(l.p1, inv_dir, node.box, 1.0)) continue;
+        if (!node.is_leaf()) {
+            stack.push(node.offset);
+            stack.push(id + 1);
+            continue;
+        }
+        for (size_t i = node.offset; i < node.offset + node.count; i++) {
+            if (l.intersects_triangle(this->get_triangle(indices[i]))) {
+                intrs.push_back(faces[indices[i]]);
+                if (max_intersections && intrs.size() >= *max_intersections)
+                    return intrs;
+            }
+        }
+    }
+    return intrs;
+}
+
+std::optional<std::tuple<face_t, point_3d_t>> bvh_3d_t::raycast(
+    const line_3d_t &l) const {
+    if (nodes.empty()) return std::nullopt;
+
+    const point_3d_t dir = l.p2 - l.p1,
+                     inv_dir{1.0 / dir.x, 1.0 / dir.y, 1.0 / dir.z};
+    const double dir_length_sq = dir.dot(dir);
+    double best_t = 1.0;
+    std::optional<std::tuple<size_t, point_3d_t>> best;
+
+    // Visits the nearer child first, so that later boxes can be pruned
+    // against the closest hit found so far.
+    bvh_3d_stack_t stack;
+    while (!stack.empty()) {
+        const size_t id = stack.pop();
+        const auto &node = nodes[id];
+        if (!segment_box_entry(l.p1, inv_dir, node.box, best_t)) continue;
+        if (!node.is_leaf()) {
+            const auto lhs = segment_box_entry(l.p1, inv_dir, nodes[id + 1].box,
+                                               best_t),
+                       rhs = segment_box_entry(
+                           l.p1, inv_dir, nodes[node.offset].box, best_t);
+            if (lhs && rhs && *rhs < *lhs) {
+                stack.push(id + 1);
+                stack.push(node.offset);
+            } else {
+                if (rhs) stack.push(node.offset);
+                if (lhs) stack.push(id + 1);
+            }
+            continue;
+        }
+        for (size_t i = node.offset; i < node.offset + node.count; i++) {
+            const auto hit =
+                l.triangle_intersection(this->get_triangle(indices[i]));
+            if (!hit) continue;
+            const double t = (*hit - l.p1).dot(dir) / dir_length_sq;
+            if (!best || t < best_t) {
+                best_t = t;
+                best = {indices[i], *hit};
+            }
+        }
+    }
+
+    if (!best) return std::nullopt;
+    return std::make_tuple(faces[std::get<0>(*best)], std::get<1>(*best));
+}
+
+std::tuple<size_t, point_3d_t> bvh_3d_t::get_closest_face(
+    const point_3d_t &p) const {
+    if (nodes.empty()) throw std::runtime_error("BVH is empty");
+
+    // When several faces are (nearly) equally close, such as when the closest
+    // point is on an edge or a vertex, prefers the face whose normal is most
+    // aligned with the query direction, so that the sign of the distance
+    // is consistent with the surface orientation.
+    const double eps = get_tolerance();
+    double best_dist = std::numeric_limits<double>::max(), best_align = -1.0;
+    size_t best_face = 0;
+    point_3d_t best_point = p;
+
+    bvh_3d_stack_t stack;
+    while (!stack.empty()) {
+        const size_t id = stack.pop();
+        const auto &node = nodes[id];
+        if (node.box.distance_to_point(p) > best_dist + eps) continue;
+        if (!node.is_leaf()) {
+            const double lhs = nodes[id + 1].box.distance_to_point(p),
+                         rhs = nodes[node.offset].box.distance_to_point(p);
+            if (lhs <= rhs) {
+                stack.push(node.offset);
+                stack.push(id + 1);
+            } else {
+                stack.push(id + 1);
+                stack.push(node.offset);
+            }
+            continue;
+        }
+        for (size_t i = node.offset; i < node.offset + node.count; i++) {
+            const auto t = this->get_triangle(indices[i]);
+            const auto q = t.closest_point(p);
+            const double dist = p.distance_to_point(q);
+            if (dist > best_dist + eps) continue;
+            const double align =
+                dist > 0 ? std::abs(t.normal().dot(p - q)) / dist : 0.0;
+            if (dist < best_dist - eps || align > best_align) {
+                best_dist = std::min(best_dist, dist);
+                best_align = align;
+                best_face = indices[i];
+                best_point = q;
+            }
+        }
+    }
+    return {best_face, best_point};
+}
+
+std::tuple<face_t, point_3d_t> bvh_3d_t::closest_point(
+    const point_3d_t &p) const {
+    const auto [face_id, q] = this->get_closest_face(p);
+    return {faces[face_id], q};
+}
+
+double bvh_3d_t::distance(const point_3d_t &p) const {
+    const auto [face_id, q] = this->get_closest_face(p);
+    return p.distance_to_point(q);
+}
+
+double bvh_3d_t::signed_distance(const point_3d_t &p) const {
+    const auto [face_id, q] = this->get_closest_face(p);
+    const double dist = p.distance_to_point(q);
+    return this->get_triangle(face_id).normal().dot(p - q) < 0 ? -dist : dist;
+}
+
+std::vector<face_t> bvh_3d_t::bounding_box_intersections(
+    const bounding_box_3d_t &bb,
+    const std::optional<size_t> max_intersections) const {
+    std::vector<face_t> intrs;
+    if (nodes.empty()) return intrs;
+
+    bvh_3d_stack_t stack;
+    while (!stack.empty()) {
+        const size_t id = stack.pop();
+        const auto &node = nodes[id];
+        if (!node.box.intersects_bounding_box(bb)) continue;
+        if (!node.is_leaf()) {
+            stack.push(node.offset);
+            stack.push(id + 1);
+            continue;
+        }
+        for (size_t i = node.offset; i < node.offset + node.count; i++) {
+            if (this->get_triangle(indices[i]).intersects_bounding_box(bb)) {
+                intrs.push_back(faces[indices[i]]);
+                if (max_intersections && intrs.size() >= *max_intersections)
+                    return intrs;
+            }
+        }
+    }
+    return intrs;
+}
+
+std::vector<face_t> bvh_3d_t::triangle_intersections(
+    const triangle_3d_t &t,
+    const std::optional<size_t> max_intersections) const {
+    std::vector<face_t> intrs;
+    if (nodes.empty()) return intrs;
+
+    const bounding_box_3d_t bb{std::vector<triangle_3d_t>{t}};
+    bvh_3d_stack_t stack;
+    while (!stack.empty()) {
+        const size_t id = stack.pop();
+        const auto &node = nodes[id];
+        if (!node.box.intersects_bounding_box(bb) ||
+            !t.intersects_bounding_box(node.box))
+            continue;
+        if (!node.is_leaf()) {
+            stack.push(node.offset);
+            stack.push(id + 1);
+            continue;
+        }
+        for (size_t i = node.offset; i < node.offset + node.count; i++) {
+            if (t.intersects_triangle(this->get_triangle(indices[i]))) {
+                intrs.push_back(faces[indices[i]]);
+                if (max_intersections && intrs.size() >= *max_intersections)
+                    return intrs;
+            }
+        }
+    }
+    return intrs;
+}
+
+std::string bvh_3d_t::to_string() const {
+    std::stringstream ss;
+    ss << "BVH3D(";
+    ss << "faces = " << faces.size() << ", ";
+    ss << "vertices = " << vertices.size() << ", ";
+    ss << "nodes = " << nodes.size() << ")";
+    return ss.str();
+}
+
 void add_3d_bvh_modules(py::module &m) {
     auto dtree_3d =
         py::class_<delaunay_split_tree_3d_t>(m, "DelaunaySplitTree3D");
+    auto bvh_3d = py::class_<bvh_3d_t>(m, "BVH3D");
 
     dtree_3d
-        .def(py::init<const tetrahedron_3d_t &>(), "root"_a,
+        .def(py::init<const tetrahedron_3d_t &, bool>(), "root"_a,
+             "keep_history"_a = true,
              "Constructs a 3D Delaunay split tree from a "
              "tetrahedron")
         .def("is_leaf", &delaunay_split_tree_3d_t::is_leaf, "i"_a,
@@ -293,8 +935,26 @@ void add_3d_bvh_modules(py::module &m) {
              "p"_a,
              "Returns the index of the leaf containing the "
              "point")
+        .def("walk_to_leaf", &delaunay_split_tree_3d_t::walk_to_leaf, "p"_a,
+             "Returns the index of the leaf containing the point, by walking "
+             "from the most recently added leaf")
         .def("get_volume", &delaunay_split_tree_3d_t::get_volume, "i"_a,
              "Returns the volume at the given index")
+        .def(
+            "get_neighbors",
+            [](const delaunay_split_tree_3d_t &tree, size_t i) {
+                std::vector<std::optional<size_t>> neighbors;
+                for (const size_t n : tree.get_neighbors(i)) {
+                    if (n == NO_NEIGHBOR)
+                        neighbors.push_back(std::nullopt);
+                    else
+                        neighbors.push_back(n);
+                }
+                return neighbors;
+            },
+            "i"_a,
+            "Returns the volume across each face of the volume at the given "
+            "index, or None where there is none")
         .def("get_tetrahedron",
              &delaunay_split_tree_3d_t::get_tetrahedron_from_volume, "v"_a,
              "Returns the tetrahedron corresponding to the "
@@ -306,7 +966,87 @@ void add_3d_bvh_modules(py::module &m) {
         .def("split_tetrahedron",
              py::overload_cast<const point_3d_t &, size_t>(
                  &delaunay_split_tree_3d_t::split_tetrahedron),
-             "p"_a, "i"_a, "Splits the tetrahedron at the given index");
+             "p"_a, "i"_a, "Splits the tetrahedron at the given index")
+        .def("discard_history", &delaunay_split_tree_3d_t::discard_history,
+             "Drops the replaced tetrahedra, renumbering the leaves");
+
+    bvh_3d
+        .def(py::init<const trimesh_3d_t &, size_t>(),
+             "Boundary volume hierarchy", "trimesh"_a, "leaf_size"_a = 4,
+             py::keep_alive<1, 2>())
+        // The pickled state includes the vertices and faces which the BVH
+        // refers to, so that it can be unpickled on its own into a BVH over
+        // a new mesh. The nodes are pickled as raw bytes, since they are only
+        // read back by this module.
+        .def(py::pickle(
+            [](py::object self) {
+                const auto &bvh = self.cast<const bvh_3d_t &>();
+                return py::make_tuple(
+                    as_readonly_array<double, 3>(bvh.get_vertices(), self),
+                    as_readonly_array<int64_t, 3>(bvh.get_faces(), self),
+                    as_readonly_array<uint8_t, sizeof(bvh_3d_node_t)>(
+                        bvh.get_nodes(), self),
+                    as_readonly_array<int64_t, 1>(bvh.get_indices(), self));
+            },
+            [](const py::tuple &state) {
+                check_state_size(state, 4);
+                struct unpickled_t {
+                    trimesh_3d_t mesh;
+                    std::vector<bvh_3d_node_t> nodes;
+                    std::vector<size_t> indices;
+                };
+                auto data = std::make_shared<unpickled_t>(unpickled_t{
+                    trimesh_3d_t::from_arrays(
+                        state[0].cast<carray_t<double>>(),
+                        state[1].cast<carray_t<int64_t>>(), false),
+                    vector_from_state<bvh_3d_node_t, uint8_t,
+                                      sizeof(bvh_3d_node_t)>(state[2], "nodes"),
+                    vector_from_state<size_t, int64_t, 1>(state[3],
+                                                          "indices")});
+                check_state_indices(data->mesh.get_faces(),
+                                    data->mesh.vertices().size());
+                return bvh_3d_t(data->mesh.get_faces(), data->mesh.vertices(),
+                                data->nodes, data->indices, data);
+            }))
+        .def("__str__", &bvh_3d_t::to_string, py::is_operator())
+        .def("__repr__", &bvh_3d_t::to_string, py::is_operator())
+        .def("line_intersections", &bvh_3d_t::line_intersections,
+             "Faces which intersect a line segment", "line"_a,
+             "max_intersections"_a = std::nullopt)
+        .def("raycast", &bvh_3d_t::raycast,
+             "Closest face and point where a line segment hits the mesh",
+             "line"_a)
+        .def("closest_point", &bvh_3d_t::closest_point,
+             "Closest face and point on the mesh to a point", "point"_a)
+        .def("distance", &bvh_3d_t::distance,
+             "Distance from a point to the mesh", "point"_a)
+        .def("signed_distance", &bvh_3d_t::signed_distance,
+             "Signed distance from a point to the mesh, negative inside",
+             "point"_a)
+        .def("bounding_box_intersections",
+             &bvh_3d_t::bounding_box_intersections,
+             "Faces which intersect a bounding box", "box"_a,
+             "max_intersections"_a = std::nullopt)
+        .def("triangle_intersections", &bvh_3d_t::triangle_intersections,
+             "Faces which intersect a triangle", "triangle"_a,
+             "max_intersections"_a = std::nullopt)
+        .def("__len__", &bvh_3d_t::num_nodes, "Number of nodes",
+             py::is_operator())
+        .def_property_readonly(
+            "faces",
+            [](const bvh_3d_t &bvh) {
+                const auto faces = bvh.get_faces();
+                return std::vector<face_t>(faces.begin(), faces.end());
+            },
+            "Faces")
+        .def_property_readonly(
+            "vertices",
+            [](const bvh_3d_t &bvh) {
+                const auto vertices = bvh.get_vertices();
+                return std::vector<point_3d_t>(vertices.begin(),
+                                               vertices.end());
+            },
+            "Vertices");
 }
 
 }  // namespace trimesh
@@ -3,17 +3,25 @@
 #include <pybind11/pybind11.h>
 #include <pybind11/stl.h>
 
+#include <array>
+#include <memory>
+#include <unordered_map>
+#include <vector>
+
+#include "../span.h"
 #include "../types.h"
+#include "../weld.h"
 #include "types.h"
 
 namespace py = pybind11;
 
 namespace trimesh {
 
+// Set of points, where points within the tolerance of each other are
+// treated as the same point.
 struct point_3d_set_t {
    private:
-    std::vector<point_3d_t> points;
-    std::map<point_3d_t, size_t> indices;
+    point_welder_t<point_3d_t, 3> welder;
 
    public:
     point_3d_set_t() = default;
@@ -30,34 +38,135 @@ struct point_3d_set_t {
     const std::vector<point_3d_t> &get_points() const;
 };
 
+using point_welder_3d_t = point_welder_t<point_3d_t, 3>;
+
+// Incremental Delaunay tetrahedralization which keeps every tetrahedron it
+// has ever created, so that points can be located by descending the split
+// history. The current tetrahedra are linked through flat neighbor arrays,
+// where `neighbors[i][k]` is the volume across the k-th face (in the order
+// of `volume_t::get_faces`) of volume `i`. If `keep_history` is false, the
+// replaced volumes are periodically compacted away, which renumbers the
+// leaves, so that memory only grows with the size of the triangulation.
 struct delaunay_split_tree_3d_t {
    private:
     const tetrahedron_3d_t root;
+    bool keep_history;
     std::vector<volume_t> volumes;
-    std::vector<std::vector<size_t>> children;
-    face_map_t<size_t> face_to_volume;
-    edge_map_t<face_set_t> edge_to_faces;
+    std::vector<child_range_t> children;
+    std::vector<std::array<size_t, 4>> neighbors;
     point_3d_set_t vertices;
+    size_t last_leaf = 0, num_leaves = 1;
 
-    size_t add_volume(const volume_t &v, const std::vector<size_t> &parents);
     std::vector<size_t> add_volumes(const std::vector<volume_t> &volumes,
                                     const std::vector<size_t> &parents);
     void make_delaunay(const size_t &pi, const size_t &ti);
+    double outside_distance(const point_3d_t &p, size_t i) const;
+    void compact();
 
    public:
-    delaunay_split_tree_3d_t(const tetrahedron_3d_t &root);
+    delaunay_split_tree_3d_t(const tetrahedron_3d_t &root,
+                             bool keep_history = true);
     ~delaunay_split_tree_3d_t() = default;
 
     bool is_leaf(size_t i) const;
     size_t find_leaf_index(const point_3d_t &p) const;
+    size_t walk_to_leaf(const point_3d_t &p) const;
     const volume_t &get_volume(size_t i) const;
+    const std::array<size_t, 4> &get_neighbors(size_t i) const;
     tetrahedron_3d_t get_tetrahedron_from_volume(const volume_t &f) const;
     tetrahedron_3d_t get_tetrahedron(size_t i) const;
     std::vector<size_t> get_leaf_indices() const;
     void split_tetrahedron(const point_3d_t &p, size_t i);
+    void discard_history();
     const point_3d_set_t &get_vertices() const;
 };
 
+// Node in a flattened bounding volume hierarchy. Nodes are stored in
+// depth-first order, so the left child of an internal node immediately follows
+// it and `offset` is the index of its right child. For leaf nodes, `offset` is
+// the start of the node's range in the face index array and `count` is the
+// number of faces in the range.
+struct bvh_3d_node_t {
+    bounding_box_3d_t box;
+    size_t offset, count;
+
+    bool is_leaf() const { return count > 0; }
+};
+
+// Bounding volume hierarchy over a list of boxes, built using a binned
+// surface area heuristic.
+struct box_tree_3d_t {
+   protected:
+    // The nodes and the box indices which the leaves refer to. These point
+    // into memory which `owner` keeps alive, which is either the vectors the
+    // tree was built into or memory shared with other processes, such as a
+    // memory-mapped file.
+    span_t<bvh_3d_node_t> nodes;
+    span_t<size_t> indices;
+    std::shared_ptr<const void> owner;
+
+    box_tree_3d_t() = default;
+    void init(const std::vector<bounding_box_3d_t> &boxes,
+              const std::vector<point_3d_t> &centroids, size_t leaf_size);
+    size_t build(std::vector<bvh_3d_node_t> &tree_nodes,
+                 std::vector<size_t> &tree_indices,
+                 const std::vector<bounding_box_3d_t> &boxes,
+                 const std::vector<point_3d_t> &centroids, size_t lo,
+                 size_t hi, size_t leaf_size, size_t depth);
+    void set_tree(std::vector<bvh_3d_node_t> &&tree_nodes,
+                  std::vector<size_t> &&tree_indices);
+    void check_tree(size_t num_boxes) const;
+
+   public:
+    box_tree_3d_t(const std::vector<bounding_box_3d_t> &boxes,
+                  size_t leaf_size = 4);
+    ~box_tree_3d_t() = default;
+    size_t num_nodes() const { return this->nodes.size(); }
+    span_t<bvh_3d_node_t> get_nodes() const { return this->nodes; }
+    span_t<size_t> get_indices() const { return this->indices; }
+
+    // Appends the indices of the boxes which overlap `bb` to `out`, and
+    // returns the number of indices which were added.
+    size_t box_intersection_indices(const bounding_box_3d_t &bb,
+                                    std::vector<size_t> &out) const;
+};
+
+struct bvh_3d_t : public box_tree_3d_t {
+   private:
+    span_t<face_t> faces;
+    span_t<point_3d_t> vertices;
+
+    triangle_3d_t get_triangle(size_t i) const;
+    std::tuple<size_t, point_3d_t> get_closest_face(const point_3d_t &p) const;
+
+   public:
+    bvh_3d_t(const trimesh_3d_t &t, size_t leaf_size = 4);
+    bvh_3d_t(span_t<face_t> faces, span_t<point_3d_t> vertices,
+             size_t leaf_size = 4);
+    bvh_3d_t(span_t<face_t> faces, span_t<point_3d_t> vertices,
+             span_t<bvh_3d_node_t> nodes, span_t<size_t> indices,
+             std::shared_ptr<const void> owner);
+    ~bvh_3d_t() = default;
+    span_t<face_t> get_faces() const { return this->faces; }
+    span_t<point_3d_t> get_vertices() const { return this->vertices; }
+
+    std::vector<face_t> line_intersections(
+        const line_3d_t &l,
+        const std::optional<size_t> max_intersections = std::nullopt) const;
+    std::optional<std::tuple<face_t, point_3d_t>> raycast(
+        const line_3d_t &l) const;
+    std::tuple<face_t, point_3d_t> closest_point(const point_3d_t &p) const;
+    double distance(const point_3d_t &p) const;
+    double signed_distance(const point_3d_t &p) const;
+    std::vector<face_t> bounding_box_intersections(
+        const bounding_box_3d_t &bb,
+        const std::optional<size_t> max_intersections = std::nullopt) const;
+    std::vector<face_t> triangle_intersections(
+        const triangle_3d_t &t,
+        const std::optional<size_t> max_intersections = std::nullopt) const;
+    std::string to_string() const;
+};
+
 void add_3d_bvh_modules(py::module &m);
 
 }  // namespace trimesh
@@ -1,19 +1,119 @@
 #include "io.h"
 
+#include <cctype>
+#include <charconv>
+#include <cstring>
 #include <fstream>
 #include <iostream>
 #include <sstream>
 
+#include "../mapped_file.h"
+#include "../parallel.h"
+#include "../weld.h"
+
 using namespace pybind11::literals;
 
 namespace trimesh {
 
-face_list_t get_sorted_faces(const face_list_t &faces) {
+face_list_t get_sorted_faces(span_t<face_t> faces) {
     face_list_t sorted_faces(faces.begin(), faces.end());
     std::sort(sorted_faces.begin(), sorted_faces.end());
     return sorted_faces;
 }
 
+// Welds a list of triangle corners into vertices, returning them along with
+// the faces between them in the order of the triangles. Faces whose corners
+// are welded together, and repeated faces, are dropped.
+std::tuple<std::vector<point_3d_t>, face_list_t> weld_corners(
+    const std::vector<point_3d_t> &corners, size_t num_threads = 1) {
+    auto [vertices, ids] =
+        weld_points<point_3d_t, 3>(corners, get_tolerance(), num_threads);
+    face_list_t faces;
+    faces.reserve(ids.size() / 3);
+    for (size_t i = 0; i + 2 < ids.size(); i += 3) {
+        if (ids[i] == ids[i + 1] || ids[i] == ids[i + 2] ||
+            ids[i + 1] == ids[i + 2])
+            continue;
+        faces.push_back({ids[i], ids[i + 1], ids[i + 2]});
+    }
+
+    // Drops repeated faces, keeping the first of each, using an
+    // open-addressing hash table of face indices which is at most half full.
+    constexpr size_t EMPTY = SIZE_MAX;
+    size_t num_slots = 16;
+    while (num_slots < 2 * faces.size()) num_slots *= 2;
+    std::vector<size_t> slots(num_slots, EMPTY);
+    size_t num_faces = 0;
+    for (size_t i = 0; i < faces.size(); i++) {
+        size_t s = face_hash_fn(faces[i]) & (num_slots - 1);
+        while (slots[s] != EMPTY && faces[slots[s]] != faces[i])
+            s = (s + 1) & (num_slots - 1);
+        if (slots[s] != EMPTY) continue;
+        slots[s] = num_faces;
+        faces[num_faces++] = faces[i];
+    }
+    faces.erase(faces.begin() + num_faces, faces.end());
+
+    return {std::move(vertices), std::move(faces)};
+}
+
+// Builds a mesh from a list of triangle corners, welding the corners which
+// are shared between triangles into single vertices.
+trimesh_3d_t trimesh_from_corners(const std::vector<point_3d_t> &corners,
+                                  size_t num_threads = 1) {
+    auto [vertices, faces] = weld_corners(corners, num_threads);
+    return {std::move(vertices), std::move(faces)};
+}
+
+// Smallest number of bytes of an OBJ file to parse on each thread.
+constexpr size_t MIN_BYTES_PER_OBJ_CHUNK = 1 << 20;
+
+// Sizes of the header of a binary STL file, which is 80 bytes followed by
+// the number of triangles, and of each triangle record, which is a normal,
+// three corners and an attribute byte count.
+constexpr size_t STL_HEADER_SIZE = 80 + sizeof(uint32_t);
+constexpr size_t STL_RECORD_SIZE = 12 * sizeof(float) + sizeof(uint16_t);
+
+// Reads the triangle corners from a binary STL file. The file is
+// memory-mapped, and the records are parsed in chunks on `num_threads`
+// threads.
+std::vector<point_3d_t> read_stl_corners(const std::string &filename,
+                                         size_t num_threads) {
+    const mapped_file_t file(filename);
+    if (file.size < STL_HEADER_SIZE) {
+        throw std::runtime_error("File " + filename +
+                                 " is too small to be a binary STL file");
+    }
+
+    uint32_t num_triangles;
+    std::memcpy(&num_triangles, file.data + 80, sizeof(uint32_t));
+    const size_t n = num_triangles;
+    if (file.size < STL_HEADER_SIZE + n * STL_RECORD_SIZE) {
+        throw std::runtime_error("File " + filename + " has " +
+                                 std::to_string(file.size) +
+                                 " bytes, which is too small for " +
+                                 std::to_string(n) + " triangles");
+    }
+
+    std::vector<point_3d_t> corners(3 * n);
+    parallel_chunks(n, get_num_threads(num_threads, n),
+                    [&](size_t chunk, size_t lo, size_t hi) {
+                        for (size_t i = lo; i < hi; i++) {
+                            // Skips the normal, since faces are oriented by the
+                            // order of their corners.
+                            const char *record = file.data + STL_HEADER_SIZE +
+                                                 i * STL_RECORD_SIZE +
+                                                 3 * sizeof(float);
+                            float vs[9];
+                            std::memcpy(vs, record, sizeof(vs));
+                            for (size_t j = 0; j < 3; j++)
+                                corners[3 * i + j] = {vs[3 * j], vs[3 * j + 1],
+                                                      vs[3 * j + 2]};
+                        }
+                    });
+    return corners;
+}
+
 void save_stl(const std::string &filename, const trimesh_3d_t &mesh) {
     check_file_ext(filename, "stl");
 
@@ -57,63 +157,23 @@ void save_stl(const std::string &filename, const tetramesh_3d_t &mesh) {
     save_stl(filename, mesh.to_trimesh());
 }
 
-trimesh_3d_t load_stl(const std::string &filename) {
-    std::ifstream f;
-    f.open(filename, std::ios::in | std::ios::binary);
-
-    // 80 byte header.
-    char header[80];
-    f.read(header, 80);
-
-    // Number of triangles.
-    uint32_t num_triangles;
-    f.read(reinterpret_cast<char *>(&num_triangles), sizeof(uint32_t));
+trimesh_3d_t load_stl(const std::string &filename, size_t num_threads) {
+    return trimesh_from_corners(read_stl_corners(filename, num_threads),
+                                num_threads);
+}
 
+py::dict load_stl_arrays(const std::string &filename, size_t num_threads) {
     std::vector<point_3d_t> vertices;
-    face_set_t faces;
-
-    // Keeps track of the unique vertices.
-    std::map<point_3d_t, size_t> vertex_map;
-
-    // Lambda function to get the index of a vertex.
-    auto get_vertex_index = [&vertex_map, &vertices](const point_3d_t &vertex) {
-        if (vertex_map.find(vertex) == vertex_map.end()) {
-            size_t index = vertices.size();
-            vertices.push_back(vertex);
-            vertex_map[vertex] = index;
-        }
-        return vertex_map[vertex];
-    };
-
-    // Read each triangle.
-    for (size_t i = 0; i < num_triangles; i++) {
-        // Normal.
-        float ns[3];
-        f.read(reinterpret_cast<char *>(ns), sizeof(ns));
-        point_3d_t normal{ns[0], ns[1], ns[2]};
-
-        // Vertices.
-        float vs[9];
-        f.read(reinterpret_cast<char *>(vs), sizeof(vs));
-        point_3d_t v1{vs[0], vs[1], vs[2]}, v2{vs[3], vs[4], vs[5]},
-            v3{vs[6], vs[7], vs[8]};
-
-        // Add the vertices.
-        size_t v1_index = get_vertex_index(v1), v2_index = get_vertex_index(v2),
-               v3_index = get_vertex_index(v3);
-
-        // Add the triangle face.
-        faces.insert({v1_index, v2_index, v3_index});
-
-        // Attribute byte count.
-        uint16_t attribute_byte_count;
-        f.read(reinterpret_cast<char *>(&attribute_byte_count),
-               sizeof(uint16_t));
+    face_list_t faces;
+    {
+        py::gil_scoped_release release;
+        std::tie(vertices, faces) =
+            weld_corners(read_stl_corners(filename, num_threads), num_threads);
     }
-
-    f.close();
-
-    return {vertices, faces};
+    py::dict arrays;
+    arrays["vertices"] = as_owned_array<double, 3>(std::move(vertices));
+    arrays["faces"] = as_owned_array<int64_t, 3>(std::move(faces));
+    return arrays;
 }
 
 void save_stl_text(const std::string &filename, const trimesh_3d_t &mesh) {
@@ -164,21 +224,8 @@ trimesh_3d_t load_stl_text(const std::string &filename) {
     std::string line;
     std::getline(f, line);
 
-    std::vector<point_3d_t> vertices;
-    face_set_t faces;
-
-    // Keeps track of the unique vertices.
-    std::map<point_3d_t, size_t> vertex_map;
-
-    // Lambda function to get the index of a vertex.
-    auto get_vertex_index = [&vertex_map, &vertices](const point_3d_t &vertex) {
-        if (vertex_map.find(vertex) == vertex_map.end()) {
-            size_t index = vertices.size();
-            vertices.push_back(vertex);
-            vertex_map[vertex] = index;
-        }
-        return vertex_map[vertex];
-    };
+    // The corners of each triangle, which are welded once they're all read.
+    std::vector<point_3d_t> corners;
 
     auto read_point = [](const std::string &line) {
         std::istringstream ss(line);
@@ -208,12 +255,7 @@ trimesh_3d_t load_stl_text(const std::string &filename) {
         std::getline(f, line);
         point_3d_t v3 = read_point(line);
 
-        // Add the vertices.
-        size_t v1_index = get_vertex_index(v1), v2_index = get_vertex_index(v2),
-               v3_index = get_vertex_index(v3);
-
-        // Add the triangle face.
-        faces.insert({v1_index, v2_index, v3_index});
+        corners.insert(corners.end(), {v1, v2, v3});
 
         // Skip "endloop" and "endfacet".
         std::getline(f, line);
@@ -222,140 +264,656 @@ trimesh_3d_t load_stl_text(const std::string &filename) {
 
     f.close();
 
-    return {vertices, faces};
+    return trimesh_from_corners(corners);
 }
 
+// Writes text to a file through a large buffer, formatting numbers with
+// `std::to_chars`, so that nothing is flushed until the buffer fills up.
+struct buffered_writer_t {
+    static constexpr size_t CAPACITY = 1 << 20;
+
+    explicit buffered_writer_t(const std::string &filename)
+        : f(filename, std::ios::out | std::ios::binary) {
+        if (!this->f.is_open())
+            throw std::runtime_error("Could not open file " + filename);
+        this->buffer.reserve(CAPACITY + 64);
+    }
+
+    ~buffered_writer_t() { this->flush(); }
+
+    buffered_writer_t &operator<<(const char *s) {
+        this->buffer.append(s);
+        return this->maybe_flush();
+    }
+
+    buffered_writer_t &operator<<(char c) {
+        this->buffer.push_back(c);
+        return this->maybe_flush();
+    }
+
+    template <typename T>
+    buffered_writer_t &operator<<(T value) {
+        char chars[32];
+        const auto [end, ec] =
+            std::to_chars(chars, chars + sizeof(chars), value);
+        this->buffer.append(chars, end);
+        return this->maybe_flush();
+    }
+
+    void flush() {
+        this->f.write(this->buffer.data(), this->buffer.size());
+        this->buffer.clear();
+    }
+
+   private:
+    std::ofstream f;
+    std::string buffer;
+
+    buffered_writer_t &maybe_flush() {
+        if (this->buffer.size() >= CAPACITY) this->flush();
+        return *this;
+    }
+};
+
 void save_obj(const std::string &filename, const trimesh_3d_t &mesh) {
     check_file_ext(filename, "obj");
 
-    std::ofstream f;
-    f.open(filename, std::ios::out);
+    buffered_writer_t f(filename);
 
     // Write the vertices.
     for (auto &vertex : mesh.vertices()) {
-        f << "v " << vertex.x << " " << vertex.y << " " << vertex.z
-          << std::endl;
+        f << "v " << vertex.x << ' ' << vertex.y << ' ' << vertex.z << '\n';
     }
 
     // Write the faces.
     for (auto &face : get_sorted_faces(mesh.get_faces())) {
-        f << "f " << face.a + 1 << " " << face.b + 1 << " " << face.c + 1
-          << std::endl;
+        f << "f " << face.a + 1 << ' ' << face.b + 1 << ' ' << face.c + 1
+          << '\n';
     }
-
-    f.close();
 }
 
 void save_obj(const std::string &filename, const tetramesh_3d_t &mesh) {
     save_obj(filename, mesh.to_trimesh());
 }
 
-trimesh_3d_t load_obj(const std::string &filename) {
-    std::ifstream f;
-    f.open(filename, std::ios::in);
-
+// The vertices and faces parsed from a chunk of lines of an OBJ file. Face
+// indices are zero-based, and negative indices, which count back from the
+// latest vertex, are stored relative to the start of the chunk, since the
+// number of vertices before it isn't known until every chunk is parsed.
+struct obj_chunk_t {
     std::vector<point_3d_t> vertices;
-    face_set_t faces;
+    std::vector<std::array<int64_t, 3>> faces;
+    std::vector<bool> relative;
+};
+
+// Returns the start of the line containing `p`, or `p` if it's the start of
+// the file.
+const char *line_start(const char *begin, const char *p) {
+    while (p > begin && p[-1] != '\n') p--;
+    return p;
+}
 
-    // Keeps track of the unique vertices.
-    std::map<point_3d_t, size_t> vertex_map;
+obj_chunk_t parse_obj_chunk(const char *p, const char *end) {
+    obj_chunk_t chunk;
+    auto skip_spaces = [&]() {
+        while (p < end && (*p == ' ' || *p == '\t')) p++;
+    };
+    auto skip_line = [&]() {
+        while (p < end && *p != '\n') p++;
+        if (p < end) p++;
+    };
+    auto is_keyword = [&](char c) {
+        return end - p > 1 && p[0] == c && (p[1] == ' ' || p[1] == '\t');
+    };
+    // Skips one leading plus sign, which `std::from_chars` doesn't accept.
+    auto skip_plus = [&]() {
+        if (end - p > 1 && p[0] == '+' && p[1] != '-') p++;
+    };
 
-    std::string line;
-    while (std::getline(f, line)) {
-        std::istringstream ss(line);
-        std::string type;
-        ss >> type;
-
-        if (type == "v") {
-            // Vertex.
-            double x, y, z;
-            ss >> x >> y >> z;
-            vertices.push_back({x, y, z});
-        } else if (type == "f") {
-            // Face.
-            size_t v1, v2, v3;
-            ss >> v1 >> v2 >> v3;
-            faces.insert({v1 - 1, v2 - 1, v3 - 1});
+    std::vector<int64_t> ids;
+    std::vector<bool> relative;
+    while (p < end) {
+        skip_spaces();
+        if (is_keyword('v')) {
+            p += 2;
+            double xyz[3];
+            for (double &c : xyz) {
+                skip_spaces();
+                skip_plus();
+                const auto [next, ec] = std::from_chars(p, end, c);
+                if (ec != std::errc())
+                    throw std::runtime_error("Invalid OBJ vertex");
+                p = next;
+            }
+            chunk.vertices.push_back({xyz[0], xyz[1], xyz[2]});
+        } else if (is_keyword('f')) {
+            // Reads the vertex index of each corner, ignoring texture and
+            // normal indices, then splits the polygon into a fan.
+            p += 2;
+            ids.clear();
+            relative.clear();
+            while (true) {
+                skip_spaces();
+                skip_plus();
+                int64_t id;
+                const auto [next, ec] = std::from_chars(p, end, id);
+                if (ec != std::errc()) break;
+                p = next;
+                while (p < end && !std::isspace(static_cast<unsigned char>(*p)))
+                    p++;
+                if (id == 0) throw std::runtime_error("Invalid OBJ index 0");
+                const bool is_relative = id < 0;
+                ids.push_back(is_relative ? chunk.vertices.size() + id
+                                          : id - 1);
+                relative.push_back(is_relative);
+            }
+            for (size_t k = 2; k < ids.size(); k++) {
+                chunk.faces.push_back({ids[0], ids[k - 1], ids[k]});
+                chunk.relative.insert(
+                    chunk.relative.end(),
+                    {relative[0], relative[k - 1], relative[k]});
+            }
         }
+        skip_line();
     }
+    return chunk;
+}
 
-    f.close();
+trimesh_3d_t load_obj(const std::string &filename, size_t num_threads) {
+    const mapped_file_t file(filename);
+    const char *begin = file.data, *end = file.data + file.size;
+
+    // Splits the file into chunks of whole lines, which are parsed on their
+    // own threads.
+    const size_t num_chunks =
+        get_num_threads(num_threads, file.size / MIN_BYTES_PER_OBJ_CHUNK);
+    std::vector<obj_chunk_t> chunks(num_chunks);
+    parallel_chunks(
+        file.size, num_chunks, [&](size_t chunk, size_t lo, size_t hi) {
+            chunks[chunk] = parse_obj_chunk(
+                line_start(begin, begin + lo),
+                hi == file.size ? end : line_start(begin, begin + hi));
+        });
+
+    size_t num_vertices = 0, num_faces = 0;
+    for (const auto &chunk : chunks) {
+        num_vertices += chunk.vertices.size();
+        num_faces += chunk.faces.size();
+    }
+    std::vector<point_3d_t> vertices;
+    face_list_t faces;
+    vertices.reserve(num_vertices);
+    faces.reserve(num_faces);
+    for (const auto &chunk : chunks) {
+        const int64_t offset = vertices.size();
+        vertices.insert(vertices.end(), chunk.vertices.begin(),
+                        chunk.vertices.end());
+        for (size_t i = 0; i < chunk.faces.size(); i++) {
+            std::array<size_t, 3> ids;
+            for (size_t j = 0; j < 3; j++) {
+                const int64_t id = chunk.faces[i][j] +
+                                   (chunk.relative[3 * i + j] ? offset : 0);
+                if (id < 0 || id >= static_cast<int64_t>(num_vertices))
+                    throw std::runtime_error("Invalid OBJ index in face " +
+                                             std::to_string(faces.size()));
+                ids[j] = id;
+            }
+            faces.push_back({ids[0], ids[1], ids[2]});
+        }
+    }
+    return {std::move(vertices), std::move(faces)};
+}
 
-    return {vertices, faces};
+// The scalar types which PLY properties can have.
+enum ply_type_t {
+    PLY_INT8,
+    PLY_UINT8,
+    PLY_INT16,
+    PLY_UINT16,
+    PLY_INT32,
+    PLY_UINT32,
+    PLY_FLOAT32,
+    PLY_FLOAT64
+};
+
+ply_type_t parse_ply_type(const std::string &name) {
+    if (name == "char" || name == "int8") return PLY_INT8;
+    if (name == "uchar" || name == "uint8") return PLY_UINT8;
+    if (name == "short" || name == "int16") return PLY_INT16;
+    if (name == "ushort" || name == "uint16") return PLY_UINT16;
+    if (name == "int" || name == "int32") return PLY_INT32;
+    if (name == "uint" || name == "uint32") return PLY_UINT32;
+    if (name == "float" || name == "float32") return PLY_FLOAT32;
+    if (name == "double" || name == "float64") return PLY_FLOAT64;
+    throw std::runtime_error("Unknown PLY property type: " + name);
 }
 
-void save_ply(const std::string &filename, const trimesh_3d_t &mesh) {
-    check_file_ext(filename, "ply");
+size_t ply_type_size(ply_type_t type) {
+    switch (type) {
+        case PLY_INT8:
+        case PLY_UINT8:
+            return 1;
+        case PLY_INT16:
+        case PLY_UINT16:
+            return 2;
+        case PLY_INT32:
+        case PLY_UINT32:
+        case PLY_FLOAT32:
+            return 4;
+        default:
+            return 8;
+    }
+}
 
-    std::ofstream f;
-    f.open(filename, std::ios::out);
+struct ply_property_t {
+    std::string name;
+    ply_type_t type;
+    bool is_list = false;
+    ply_type_t count_type = PLY_UINT8;
+};
+
+struct ply_element_t {
+    std::string name;
+    size_t count = 0;
+    std::vector<ply_property_t> properties;
+};
+
+// Reads the values of a PLY file after its header, which are either ASCII
+// text separated by whitespace, or packed little-endian binary.
+struct ply_reader_t {
+    const char *p, *end;
+    bool binary;
+
+    template <typename T>
+    double read_binary() {
+        if (this->end - this->p < static_cast<ptrdiff_t>(sizeof(T)))
+            throw std::runtime_error("Unexpected end of PLY file");
+        T value;
+        std::memcpy(&value, this->p, sizeof(T));
+        this->p += sizeof(T);
+        return value;
+    }
 
-    // Write the header.
-    f << "ply" << std::endl;
-    f << "format ascii 1.0" << std::endl;
-    f << "element vertex " << mesh.vertices().size() << std::endl;
-    f << "property double x" << std::endl;
-    f << "property double y" << std::endl;
-    f << "property double z" << std::endl;
-    f << "element face " << mesh.vertices().size() << std::endl;
-    f << "property list uchar int vertex_index" << std::endl;
-    f << "end_header" << std::endl;
+    double read_ascii() {
+        while (this->p < this->end &&
+               std::isspace(static_cast<unsigned char>(*this->p)))
+            this->p++;
+        double value;
+        const auto [next, ec] = std::from_chars(this->p, this->end, value);
+        if (ec != std::errc()) throw std::runtime_error("Invalid PLY value");
+        this->p = next;
+        return value;
+    }
 
-    // Write the vertices.
-    for (auto &vertex : mesh.vertices()) {
-        f << vertex.x << " " << vertex.y << " " << vertex.z << std::endl;
+    // Reads a value of the given type. Single precision values in ASCII
+    // files are rounded to floats, as they would be in binary files.
+    double read(ply_type_t type) {
+        if (!this->binary) {
+            const double value = this->read_ascii();
+            return type == PLY_FLOAT32 ? static_cast<float>(value) : value;
+        }
+        switch (type) {
+            case PLY_INT8:
+                return this->read_binary<int8_t>();
+            case PLY_UINT8:
+                return this->read_binary<uint8_t>();
+            case PLY_INT16:
+                return this->read_binary<int16_t>();
+            case PLY_UINT16:
+                return this->read_binary<uint16_t>();
+            case PLY_INT32:
+                return this->read_binary<int32_t>();
+            case PLY_UINT32:
+                return this->read_binary<uint32_t>();
+            case PLY_FLOAT32:
+                return this->read_binary<float>();
+            default:
+                return this->read_binary<double>();
+        }
     }
 
-    // Write the faces.
-    for (auto &face : get_sorted_faces(mesh.get_faces())) {
-        f << "3 " << face.a << " " << face.b << " " << face.c << std::endl;
+    // Skips the rest of the current line of an ASCII file.
+    void skip_line() {
+        if (this->binary) return;
+        while (this->p < this->end && *this->p != '\n') this->p++;
     }
+};
 
-    f.close();
+// The contents of a PLY file. The normals and colors are empty if the
+// vertices don't have them.
+struct ply_data_t {
+    std::vector<point_3d_t> vertices;
+    face_list_t faces;
+    std::vector<point_3d_t> normals;
+    std::vector<std::array<uint8_t, 3>> colors;
+};
+
+ply_data_t read_ply(const std::string &filename) {
+    const mapped_file_t file(filename);
+    const char *p = file.data, *end = file.data + file.size;
+
+    // Parses the header, line by line.
+    auto next_line = [&]() {
+        const char *start = p;
+        while (p < end && *p != '\n') p++;
+        std::string line(start, p);
+        if (p < end) p++;
+        if (!line.empty() && line.back() == '\r') line.pop_back();
+        return line;
+    };
+    if (next_line() != "ply")
+        throw std::runtime_error("File " + filename + " is not a PLY file");
+    bool binary = false;
+    std::vector<ply_element_t> elements;
+    while (true) {
+        if (p >= end) throw std::runtime_error("PLY header is not terminated");
+        std::istringstream ss(next_line());
+        std::string keyword;
+        ss >> keyword;
+        if (keyword == "end_header") {
+            break;
+        } else if (keyword == "format") {
+            std::string format;
+            ss >> format;
+            if (format == "binary_little_endian") {
+                binary = true;
+            } else if (format != "ascii") {
+                throw std::runtime_error("Unsupported PLY format: " + format);
+            }
+        } else if (keyword == "element") {
+            ply_element_t element;
+            ss >> element.name >> element.count;
+            elements.push_back(element);
+        } else if (keyword == "property") {
+            if (elements.empty())
+                throw std::runtime_error("PLY property before any element");
+            ply_property_t property;
+            std::string type;
+            ss >> type;
+            if (type == "list") {
+                std::string count_type;
+                ss >> count_type >> type;
+                property.is_list = true;
+                property.count_type = parse_ply_type(count_type);
+            }
+            property.type = parse_ply_type(type);
+            ss >> property.name;
+            elements.back().properties.push_back(property);
+        }
+    }
+
+    // Checks that the file is large enough for the elements declared in its
+    // header before space is reserved for them, so that a corrupt count
+    // fails with a clear error rather than a failed allocation. Each value
+    // takes at least its size in a binary file, or a digit and a separator
+    // in an ASCII file, where the last separator may be missing. Lists may
+    // be empty, so only their counts are included, and every element is
+    // taken to need at least one byte.
+    size_t available = (end - p) + (binary ? 0 : 1);
+    for (const auto &element : elements) {
+        size_t element_size = 0;
+        for (const auto &property : element.properties) {
+            element_size += binary ? ply_type_size(property.is_list
+                                                       ? property.count_type
+                                                       : property.type)
+                                   : 2;
+        }
+        element_size = std::max<size_t>(element_size, 1);
+        if (element.count > available / element_size) {
+            throw std::runtime_error(
+                "File " + filename + " is too small for " +
+                std::to_string(element.count) + " " + element.name +
+                " elements");
+        }
+        available -= element.count * element_size;
+    }
+
+    ply_data_t data;
+    ply_reader_t reader{p, end, binary};
+    size_t num_vertices = 0;
+    for (const auto &element : elements) {
+        const auto &properties = element.properties;
+        if (element.name == "vertex") {
+            // Maps each property to the value it holds, if any.
+            enum { X, Y, Z, NX, NY, NZ, RED, GREEN, BLUE, OTHER };
+            const std::vector<std::string> names = {
+                "x", "y", "z", "nx", "ny", "nz", "red", "green", "blue"};
+            std::vector<size_t> slots;
+            bool has_normals = false, has_colors = false;
+            for (const auto &property : properties) {
+                const size_t slot =
+                    std::find(names.begin(), names.end(), property.name) -
+                    names.begin();
+                has_normals |= slot == NX;
+                has_colors |= slot == RED;
+                slots.push_back(slot);
+            }
+
+            num_vertices = element.count;
+            data.vertices.resize(element.count);
+            if (has_normals) data.normals.resize(element.count);
+            if (has_colors) data.colors.resize(element.count);
+            double values[OTHER + 1] = {};
+            for (size_t i = 0; i < element.count; i++) {
+                for (size_t j = 0; j < properties.size(); j++) {
+                    const auto &property = properties[j];
+                    if (property.is_list) {
+                        const size_t n = reader.read(property.count_type);
+                        for (size_t k = 0; k < n; k++)
+                            reader.read(property.type);
+                    } else {
+                        values[slots[j]] = reader.read(property.type);
+                    }
+                }
+                reader.skip_line();
+                data.vertices[i] = {values[X], values[Y], values[Z]};
+                if (has_normals)
+                    data.normals[i] = {values[NX], values[NY], values[NZ]};
+                if (has_colors)
+                    data.colors[i] = {static_cast<uint8_t>(values[RED]),
+                                      static_cast<uint8_t>(values[GREEN]),
+                                      static_cast<uint8_t>(values[BLUE])};
+            }
+        } else if (element.name == "face") {
+            // Polygons are split into fans of triangles.
+            data.faces.reserve(element.count);
+            std::vector<size_t> ids;
+            for (size_t i = 0; i < element.count; i++) {
+                for (const auto &property : properties) {
+                    const bool is_indices = property.name == "vertex_indices" ||
+                                            property.name == "vertex_index";
+                    const size_t n =
+                        property.is_list ? reader.read(property.count_type) : 1;
+                    ids.clear();
+                    for (size_t k = 0; k < n; k++) {
+                        const double id = reader.read(property.type);
+                        if (!is_indices) continue;
+                        if (id < 0 || id >= num_vertices) {
+                            throw std::runtime_error(
+                                "Invalid PLY vertex index " +
+                                std::to_string(static_cast<int64_t>(id)) +
+                                " in face " + std::to_string(i));
+                        }
+                        ids.push_back(static_cast<size_t>(id));
+                    }
+                    for (size_t k = 2; k < ids.size(); k++)
+                        data.faces.push_back({ids[0], ids[k - 1], ids[k]});
+                }
+                reader.skip_line();
+            }
+        } else {
+            // Skips other elements.
+            for (size_t i = 0; i < element.count; i++) {
+                for (const auto &property : properties) {
+                    const size_t n =
+                        property.is_list ? reader.read(property.count_type) : 1;
+                    for (size_t k = 0; k < n; k++) reader.read(property.type);
+                }
+                reader.skip_line();
+            }
+        }
+    }
+    return data;
 }
 
-void save_ply(const std::string &filename, const tetramesh_3d_t &mesh) {
-    save_ply(filename, mesh.to_trimesh());
+// Appends the bytes of a value to a buffer.
+template <typename T>
+void append_bytes(std::vector<char> &buffer, T value) {
+    const char *bytes = reinterpret_cast<const char *>(&value);
+    buffer.insert(buffer.end(), bytes, bytes + sizeof(T));
 }
 
-trimesh_3d_t load_ply(const std::string &filename) {
-    std::ifstream f;
-    f.open(filename, std::ios::in);
+void save_ply(const std::string &filename, const trimesh_3d_t &mesh,
+              bool binary, bool single_precision,
+              const std::optional<carray_t<double>> &normals,
+              const std::optional<py::array> &colors) {
+    check_file_ext(filename, "ply");
 
-    // Skip the header.
-    std::string line;
-    while (std::getline(f, line)) {
-        if (line == "end_header") {
-            break;
-        }
+    const auto &vertices = mesh.vertices();
+    const auto faces = get_sorted_faces(mesh.get_faces());
+    if (vertices.size() > UINT32_MAX)
+        throw std::invalid_argument("Too many vertices for a PLY file");
+    const double *ns = nullptr;
+    const uint8_t *cs = nullptr;
+    std::optional<carray_t<uint8_t>> color_array;
+    if (normals) {
+        check_array_shape<3>(*normals, "normals");
+        if (static_cast<size_t>(normals->shape(0)) != vertices.size())
+            throw std::invalid_argument("Expected one normal per vertex");
+        ns = normals->data();
+    }
+    if (colors) {
+        // Colors of other types aren't cast, since that would silently
+        // truncate values such as 0.5 to zero.
+        if (!py::isinstance<py::array_t<uint8_t>>(*colors))
+            throw std::invalid_argument("Expected colors to be uint8");
+        color_array = carray_t<uint8_t>::ensure(*colors);
+        check_array_shape<3>(*color_array, "colors");
+        if (static_cast<size_t>(color_array->shape(0)) != vertices.size())
+            throw std::invalid_argument("Expected one color per vertex");
+        cs = color_array->data();
     }
 
-    std::vector<point_3d_t> vertices;
-    face_set_t faces;
-
-    while (std::getline(f, line)) {
-        std::istringstream ss(line);
+    // Write the header.
+    const std::string type = single_precision ? "float" : "double";
+    std::stringstream header;
+    header << "ply" << std::endl;
+    header << "format " << (binary ? "binary_little_endian" : "ascii") << " 1.0"
+           << std::endl;
+    header << "element vertex " << vertices.size() << std::endl;
+    for (const char *axis : {"x", "y", "z"})
+        header << "property " << type << " " << axis << std::endl;
+    if (ns) {
+        for (const char *axis : {"nx", "ny", "nz"})
+            header << "property " << type << " " << axis << std::endl;
+    }
+    if (cs) {
+        for (const char *channel : {"red", "green", "blue"})
+            header << "property uchar " << channel << std::endl;
+    }
+    header << "element face " << faces.size() << std::endl;
+    header << "property list uchar uint vertex_indices" << std::endl;
+    header << "end_header" << std::endl;
+
+    if (!binary) {
+        // Numbers are written with the fewest digits which read back as the
+        // same value of the declared type.
+        buffered_writer_t f(filename);
+        f << header.str().c_str();
+        auto write_coordinates = [&](double x, double y, double z) {
+            const char *separator = "";
+            for (const double v : {x, y, z}) {
+                f << separator;
+                if (single_precision)
+                    f << static_cast<float>(v);
+                else
+                    f << v;
+                separator = " ";
+            }
+        };
+
+        // Write the vertices.
+        for (size_t i = 0; i < vertices.size(); i++) {
+            const auto &vertex = vertices[i];
+            write_coordinates(vertex.x, vertex.y, vertex.z);
+            if (ns) {
+                f << ' ';
+                write_coordinates(ns[3 * i], ns[3 * i + 1], ns[3 * i + 2]);
+            }
+            if (cs) {
+                for (size_t k = 0; k < 3; k++) f << ' ' << +cs[3 * i + k];
+            }
+            f << '\n';
+        }
 
-        // If there are 2 spaces in the line, it's a vertex. Otherwise if
-        // there are 3 spaces in the line and it starts with "3 " then it's a
-        // face. Otherwise ignore.
-        int num_spaces = std::count(line.begin(), line.end(), ' ');
-        if (num_spaces == 2) {
-            // Vertex.
-            double x, y, z;
-            ss >> x >> y >> z;
-            vertices.push_back({x, y, z});
-        } else if (num_spaces == 3 && line.substr(0, 2) == "3 ") {
-            // Face.
-            size_t start, v1, v2, v3;
-            ss >> start >> v1 >> v2 >> v3;
-            faces.insert({v1, v2, v3});
+        // Write the faces.
+        for (auto &face : faces) {
+            f << "3 " << face.a << ' ' << face.b << ' ' << face.c << '\n';
         }
+    } else {
+        std::ofstream f;
+        f.open(filename, std::ios::out | std::ios::binary);
+        f << header.str();
+
+        // Writes the vertices and then the faces as single blocks.
+        std::vector<char> buffer;
+        const size_t float_size =
+            single_precision ? sizeof(float) : sizeof(double);
+        buffer.reserve(vertices.size() * (6 * float_size + 3));
+        auto append_coordinates = [&](double x, double y, double z) {
+            for (const double v : {x, y, z}) {
+                if (single_precision)
+                    append_bytes(buffer, static_cast<float>(v));
+                else
+                    append_bytes(buffer, v);
+            }
+        };
+        for (size_t i = 0; i < vertices.size(); i++) {
+            append_coordinates(vertices[i].x, vertices[i].y, vertices[i].z);
+            if (ns) append_coordinates(ns[3 * i], ns[3 * i + 1], ns[3 * i + 2]);
+            if (cs) buffer.insert(buffer.end(), cs + 3 * i, cs + 3 * i + 3);
+        }
+        f.write(buffer.data(), buffer.size());
+
+        buffer.clear();
+        buffer.reserve(faces.size() * (1 + 3 * sizeof(uint32_t)));
+        for (const auto &face : faces) {
+            append_bytes<uint8_t>(buffer, 3);
+            for (const size_t id : {face.a, face.b, face.c})
+                append_bytes(buffer, static_cast<uint32_t>(id));
+        }
+        f.write(buffer.data(), buffer.size());
+        f.close();
     }
+}
 
-    f.close();
+void save_ply(const std::string &filename, const tetramesh_3d_t &mesh,
+              bool binary, bool single_precision,
+              const std::optional<carray_t<double>> &normals,
+              const std::optional<py::array> &colors) {
+    save_ply(filename, mesh.to_trimesh(), binary, single_precision, normals,
+             colors);
+}
+
+trimesh_3d_t load_ply(const std::string &filename) {
+    auto data = read_ply(filename);
+    return {std::move(data.vertices), std::move(data.faces)};
+}
 
-    return {vertices, faces};
+py::dict load_ply_arrays(const std::string &filename) {
+    ply_data_t data;
+    {
+        py::gil_scoped_release release;
+        data = read_ply(filename);
+    }
+    py::dict arrays;
+    arrays["vertices"] = as_owned_array<double, 3>(std::move(data.vertices));
+    arrays["faces"] = as_owned_array<int64_t, 3>(std::move(data.faces));
+    if (!data.normals.empty())
+        arrays["normals"] = as_owned_array<double, 3>(std::move(data.normals));
+    if (!data.colors.empty())
+        arrays["colors"] = as_owned_array<uint8_t, 3>(std::move(data.colors));
+    return arrays;
 }
 
 void add_3d_io_modules(py::module &m) {
@@ -367,7 +925,12 @@ void add_3d_io_modules(py::module &m) {
           py::overload_cast<const std::string &, const tetramesh_3d_t &>(
               &save_stl),
           "Saves a mesh to an STL file", "filename"_a, "mesh"_a);
-    m.def("load_stl", &load_stl, "Loads a mesh from an STL file", "filename"_a);
+    m.def("load_stl", &load_stl, "Loads a mesh from an STL file", "filename"_a,
+          "num_threads"_a = 1, py::call_guard<py::gil_scoped_release>());
+    m.def("load_stl_arrays", &load_stl_arrays,
+          "Loads a dictionary of the (N, 3) vertex and (M, 3) face arrays of "
+          "a mesh from an STL file",
+          "filename"_a, "num_threads"_a = 1);
 
     m.def("save_stl_text",
           py::overload_cast<const std::string &, const trimesh_3d_t &>(
@@ -388,17 +951,36 @@ void add_3d_io_modules(py::module &m) {
           py::overload_cast<const std::string &, const tetramesh_3d_t &>(
               &save_obj),
           "Saves a mesh to an OBJ file", "filename"_a, "mesh"_a);
-    m.def("load_obj", &load_obj, "Loads a mesh from an OBJ file", "filename"_a);
+    m.def("load_obj", &load_obj, "Loads a mesh from an OBJ file", "filename"_a,
+          "num_threads"_a = 1, py::call_guard<py::gil_scoped_release>());
 
     m.def(
         "save_ply",
-        py::overload_cast<const std::string &, const trimesh_3d_t &>(&save_ply),
-        "Saves a mesh to a PLY file", "filename"_a, "mesh"_a);
-    m.def("save_ply",
-          py::overload_cast<const std::string &, const tetramesh_3d_t &>(
-              &save_ply),
-          "Saves a mesh to a PLY file", "filename"_a, "mesh"_a);
-    m.def("load_ply", &load_ply, "Loads a mesh from a PLY file", "filename"_a);
+        py::overload_cast<const std::string &, const trimesh_3d_t &, bool, bool,
+                          const std::optional<carray_t<double>> &,
+                          const std::optional<py::array> &>(&save_ply),
+        "Saves a mesh to a PLY file, in binary if `binary` is set, with "
+        "optional (N, 3) per-vertex normals and colors",
+        "filename"_a, "mesh"_a, "binary"_a = false,
+        "single_precision"_a = false, "normals"_a = py::none(),
+        "colors"_a = py::none());
+    m.def(
+        "save_ply",
+        py::overload_cast<const std::string &, const tetramesh_3d_t &, bool,
+                          bool, const std::optional<carray_t<double>> &,
+                          const std::optional<py::array> &>(&save_ply),
+        "Saves a mesh to a PLY file, in binary if `binary` is set, with "
+        "optional (N, 3) per-vertex normals and colors",
+        "filename"_a, "mesh"_a, "binary"_a = false,
+        "single_precision"_a = false, "normals"_a = py::none(),
+        "colors"_a = py::none());
+    m.def("load_ply", &load_ply,
+          "Loads a mesh from an ASCII or binary PLY file", "filename"_a,
+          py::call_guard<py::gil_scoped_release>());
+    m.def("load_ply_arrays", &load_ply_arrays,
+          "Loads a dictionary of the vertex and face arrays of a mesh from a "
+          "PLY file, along with its normals and colors if it has them",
+          "filename"_a);
 }
 
 }  // namespace trimesh
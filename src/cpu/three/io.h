@@ -1,9 +1,12 @@
 #pragma once
 
+#include <pybind11/numpy.h>
 #include <pybind11/pybind11.h>
 #include <pybind11/stl.h>
 
+#include <optional>
 #include <string>
+#include <tuple>
 
 #include "../types.h"
 #include "types.h"
@@ -15,7 +18,8 @@ namespace trimesh {
 // Functions for saving and loading STLs.
 void save_stl(const std::string &filename, const trimesh_3d_t &mesh);
 void save_stl(const std::string &filename, const tetramesh_3d_t &mesh);
-trimesh_3d_t load_stl(const std::string &filename);
+trimesh_3d_t load_stl(const std::string &filename, size_t num_threads = 1);
+py::dict load_stl_arrays(const std::string &filename, size_t num_threads = 1);
 
 // Functions for saving and loading STLs as text.
 void save_stl_text(const std::string &filename, const trimesh_3d_t &mesh);
@@ -25,12 +29,19 @@ trimesh_3d_t load_stl_text(const std::string &filename);
 // Functions for saving and loading OBJs.
 void save_obj(const std::string &filename, const trimesh_3d_t &mesh);
 void save_obj(const std::string &filename, const tetramesh_3d_t &mesh);
-trimesh_3d_t load_obj(const std::string &filename);
+trimesh_3d_t load_obj(const std::string &filename, size_t num_threads = 1);
 
 // Functions for saving and loading PLYs.
-void save_ply(const std::string &filename, const trimesh_3d_t &mesh);
-void save_ply(const std::string &filename, const tetramesh_3d_t &mesh);
+void save_ply(const std::string &filename, const trimesh_3d_t &mesh,
+              bool binary = false, bool single_precision = false,
+              const std::optional<carray_t<double>> &normals = std::nullopt,
+              const std::optional<py::array> &colors = std::nullopt);
+void save_ply(const std::string &filename, const tetramesh_3d_t &mesh,
+              bool binary = false, bool single_precision = false,
+              const std::optional<carray_t<double>> &normals = std::nullopt,
+              const std::optional<py::array> &colors = std::nullopt);
 trimesh_3d_t load_ply(const std::string &filename);
+py::dict load_ply_arrays(const std::string &filename);
 
 void add_3d_io_modules(py::module &m);
 
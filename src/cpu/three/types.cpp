@@ -1,12 +1,18 @@
 #include "types.h"
 
 #include <algorithm>
+#include <array>
+#include <limits>
 #include <numeric>
 #include <queue>
 #include <random>
+#include <optional>
 #include <sstream>
+#include <unordered_map>
 
 #include "../options.h"
+#include "../partition.h"
+#include "../pickle.h"
 #include "boolean.h"
 #include "bvh.h"
 
@@ -455,6 +461,35 @@ double triangle_3d_t::distance_to_point(const point_3d_t &p) const {
                      p.distance_to_line({p3, p1})});
 }
 
+point_3d_t triangle_3d_t::closest_point(const point_3d_t &p) const {
+    // Checks the Voronoi regions of the vertices and edges, falling back to
+    // the projection onto the face (Ericson, Real-Time Collision Detection).
+    const point_3d_t ab = p2 - p1, ac = p3 - p1, ap = p - p1;
+    const double d1 = ab.dot(ap), d2 = ac.dot(ap);
+    if (d1 <= 0 && d2 <= 0) return p1;
+
+    const point_3d_t bp = p - p2;
+    const double d3 = ab.dot(bp), d4 = ac.dot(bp);
+    if (d3 >= 0 && d4 <= d3) return p2;
+
+    const double vc = d1 * d4 - d3 * d2;
+    if (vc <= 0 && d1 >= 0 && d3 <= 0) return p1 + ab * (d1 / (d1 - d3));
+
+    const point_3d_t cp = p - p3;
+    const double d5 = ab.dot(cp), d6 = ac.dot(cp);
+    if (d6 >= 0 && d5 <= d6) return p3;
+
+    const double vb = d5 * d2 - d1 * d6;
+    if (vb <= 0 && d2 >= 0 && d6 <= 0) return p1 + ac * (d2 / (d2 - d6));
+
+    const double va = d3 * d6 - d5 * d4;
+    if (va <= 0 && (d4 - d3) >= 0 && (d5 - d6) >= 0)
+        return p2 + (p3 - p2) * ((d4 - d3) / ((d4 - d3) + (d5 - d6)));
+
+    const double denom = 1.0 / (va + vb + vc);
+    return p1 + ab * (vb * denom) + ac * (vc * denom);
+}
+
 bool triangle_3d_t::contains_point(const point_3d_t &p) const {
     std::optional<point_3d_t> tp = p.project_to_triangle(*this);
     if (!tp) return false;
@@ -468,6 +503,50 @@ bool triangle_3d_t::is_coplanar(const triangle_3d_t &t) const {
            std::abs(n.dot(t.p3 - p1)) < get_tolerance();
 }
 
+bool triangle_3d_t::intersects_triangle(const triangle_3d_t &t) const {
+    // Two triangles intersect if an edge of one crosses the other. Coplanar
+    // triangles which overlap without crossing edges contain each other's
+    // vertices.
+    for (const auto &e : edges())
+        if (e.intersects_triangle(t)) return true;
+    for (const auto &e : t.edges())
+        if (e.intersects_triangle(*this)) return true;
+    if (is_coplanar(t)) {
+        for (const auto &e : edges())
+            for (const auto &f : t.edges())
+                if (e.line_intersection(f)) return true;
+        return contains_point(t.p1) || t.contains_point(p1);
+    }
+    return false;
+}
+
+bool triangle_3d_t::intersects_bounding_box(
+    const bounding_box_3d_t &bb) const {
+    // Separating axis test (Akenine-Moller) using the box axes, the triangle
+    // normal and the cross products of the box axes with the triangle edges.
+    const point_3d_t c = bb.center(), h = (bb.max - bb.min) / 2.0;
+    const double eps = get_tolerance();
+    const point_3d_t v0 = p1 - c, v1 = p2 - c, v2 = p3 - c;
+    const point_3d_t edges[3] = {v1 - v0, v2 - v1, v0 - v2};
+    const point_3d_t axes[3] = {{1, 0, 0}, {0, 1, 0}, {0, 0, 1}};
+
+    auto separated = [&](const point_3d_t &axis) {
+        const double q0 = v0.dot(axis), q1 = v1.dot(axis), q2 = v2.dot(axis);
+        const double r = h.x * std::abs(axis.x) + h.y * std::abs(axis.y) +
+                         h.z * std::abs(axis.z);
+        return std::min({q0, q1, q2}) > r + eps ||
+               std::max({q0, q1, q2}) < -r - eps;
+    };
+
+    for (const auto &axis : axes)
+        if (separated(axis)) return false;
+    if (separated(edges[0].cross(edges[1]))) return false;
+    for (const auto &axis : axes)
+        for (const auto &edge : edges)
+            if (separated(axis.cross(edge))) return false;
+    return true;
+}
+
 point_3d_t triangle_3d_t::point_from_barycentric_coords(
     const barycentric_coordinates_t &b) const {
     return p1 * b.u + p2 * b.v + p3 * b.w;
@@ -648,7 +727,7 @@ bounding_box_3d_t::bounding_box_3d_t(const point_3d_t &min,
                                      const point_3d_t &max)
     : min(min), max(max) {}
 
-bounding_box_3d_t::bounding_box_3d_t(const std::vector<point_3d_t> &points) {
+bounding_box_3d_t::bounding_box_3d_t(span_t<point_3d_t> points) {
     if (points.empty()) throw std::runtime_error("Empty point list");
 
     double min_x = points[0].x, min_y = points[0].y, min_z = points[0].z;
@@ -821,6 +900,26 @@ double bounding_box_3d_t::volume() const {
     return (max.x - min.x) * (max.y - min.y) * (max.z - min.z);
 }
 
+double bounding_box_3d_t::surface_area() const {
+    const point_3d_t d = max - min;
+    return 2.0 * (d.x * d.y + d.y * d.z + d.z * d.x);
+}
+
+bool bounding_box_3d_t::intersects_bounding_box(
+    const bounding_box_3d_t &bb) const {
+    const double eps = get_tolerance();
+    return min.x <= bb.max.x + eps && bb.min.x <= max.x + eps &&
+           min.y <= bb.max.y + eps && bb.min.y <= max.y + eps &&
+           min.z <= bb.max.z + eps && bb.min.z <= max.z + eps;
+}
+
+double bounding_box_3d_t::distance_to_point(const point_3d_t &p) const {
+    const double dx = std::max({min.x - p.x, 0.0, p.x - max.x}),
+                 dy = std::max({min.y - p.y, 0.0, p.y - max.y}),
+                 dz = std::max({min.z - p.z, 0.0, p.z - max.z});
+    return std::sqrt(dx * dx + dy * dy + dz * dz);
+}
+
 std::string bounding_box_3d_t::to_string() const {
     return "BoundingBox3D(" + min.to_string() + ", " + max.to_string() + ")";
 }
@@ -1110,7 +1209,7 @@ trimesh_3d_t operator>>(const affine_3d_t &a, const trimesh_3d_t &t) {
     for (const auto &v : t.vertices()) {
         points.push_back(a >> v);
     }
-    return {points, t.get_faces()};
+    return {std::move(points), t.get_faces().to_vector()};
 }
 
 trimesh_3d_t operator<<(const trimesh_3d_t &p, const affine_3d_t &a) {
@@ -1130,7 +1229,7 @@ tetramesh_3d_t operator>>(const affine_3d_t &a, const tetramesh_3d_t &p) {
     for (const auto &v : p.vertices()) {
         points.push_back(a >> v);
     }
-    return {points, p.volumes()};
+    return {std::move(points), p.volumes().to_vector()};
 }
 
 tetramesh_3d_t operator<<(const tetramesh_3d_t &p, const affine_3d_t &a) {
@@ -1143,15 +1242,31 @@ tetramesh_3d_t operator<<(const tetramesh_3d_t &p, const affine_3d_t &a) {
 
 trimesh_3d_t::trimesh_3d_t(const std::vector<point_3d_t> &vertices,
                            const face_set_t &faces, bool validate)
-    : _vertices(vertices), _faces(faces.begin(), faces.end()) {
+    : trimesh_3d_t(std::vector<point_3d_t>(vertices),
+                   face_list_t(faces.begin(), faces.end()), validate) {}
+
+trimesh_3d_t::trimesh_3d_t(const std::vector<point_3d_t> &vertices,
+                           const face_list_t &faces, bool validate)
+    : trimesh_3d_t(std::vector<point_3d_t>(vertices), face_list_t(faces),
+                   validate) {}
+
+// Takes ownership of the vectors, which are shared by every copy of the mesh.
+trimesh_3d_t::trimesh_3d_t(std::vector<point_3d_t> &&vertices,
+                           face_list_t &&faces, bool validate) {
+    auto data =
+        std::make_shared<std::pair<std::vector<point_3d_t>, face_list_t>>(
+            std::move(vertices), std::move(faces));
+    this->_vertices = data->first;
+    this->_faces = data->second;
+    this->owner = std::move(data);
     if (validate) {
         this->validate();
     }
 }
 
-trimesh_3d_t::trimesh_3d_t(const std::vector<point_3d_t> &vertices,
-                           const face_list_t &faces, bool validate)
-    : _vertices(vertices), _faces(faces) {
+trimesh_3d_t::trimesh_3d_t(span_t<point_3d_t> vertices, span_t<face_t> faces,
+                           std::shared_ptr<const void> owner, bool validate)
+    : _vertices(vertices), _faces(faces), owner(std::move(owner)) {
     if (validate) {
         this->validate();
     }
@@ -1164,6 +1279,14 @@ trimesh_3d_t::trimesh_3d_t(const std::vector<point_3d_t> &vertices,
     throw std::runtime_error("Not implemented");
 }
 
+trimesh_3d_t trimesh_3d_t::from_arrays(const carray_t<double> &vertices,
+                                       const carray_t<int64_t> &faces,
+                                       bool validate) {
+    py::gil_scoped_release release;
+    return {points_from_array<point_3d_t, 3>(vertices, "vertices"),
+            indices_from_array<face_t, 3>(faces, "faces"), validate};
+}
+
 void trimesh_3d_t::validate() const {
     // Checks that there is at least one face.
     if (_faces.empty()) {
@@ -1205,11 +1328,9 @@ void trimesh_3d_t::validate() const {
     }
 }
 
-const std::vector<point_3d_t> &trimesh_3d_t::vertices() const {
-    return _vertices;
-}
+span_t<point_3d_t> trimesh_3d_t::vertices() const { return _vertices; }
 
-const face_list_t &trimesh_3d_t::get_faces() const { return _faces; }
+span_t<face_t> trimesh_3d_t::get_faces() const { return _faces; }
 
 triangle_3d_t trimesh_3d_t::get_triangle(const face_t &face) const {
     auto &[vi, vj, vk] = face;
@@ -1235,7 +1356,7 @@ double trimesh_3d_t::signed_volume() const {
 }
 
 trimesh_3d_t trimesh_3d_t::subdivide(bool at_edges) const {
-    std::vector<point_3d_t> vertices = _vertices;
+    std::vector<point_3d_t> vertices = _vertices.to_vector();
     face_list_t faces;
 
     if (at_edges) {
@@ -1290,11 +1411,431 @@ trimesh_3d_t trimesh_3d_t::subdivide(bool at_edges) const {
     return {vertices, faces};
 }
 
+// Returns a tetrahedron which comfortably contains all of the given points,
+// which incremental Delaunay triangulation starts from.
+tetrahedron_3d_t super_tetrahedron(span_t<point_3d_t> points) {
+    bounding_box_3d_t bb{points};
+    double d = std::max(std::max(bb.max.x - bb.min.x, bb.max.y - bb.min.y),
+                        bb.max.z - bb.min.z);
+    point_3d_t p1{bb.min.x - 10 * d, bb.min.y - d, bb.min.z - d};
+    point_3d_t p2{bb.max.x + 10 * d, bb.min.y - d, bb.min.z - d};
+    point_3d_t p3{bb.min.x, bb.max.y + 10 * d, bb.min.z - d};
+    point_3d_t p4{bb.min.x, bb.min.y - d, bb.max.z + 10 * d};
+    return {p1, p2, p3, p4};
+}
+
+// Returns the Morton (Z-order) code of each point within the bounding box,
+// using 21 bits per coordinate.
+std::vector<uint64_t> morton_codes(const std::vector<point_3d_t> &points,
+                                   const bounding_box_3d_t &bb) {
+    auto spread = [](uint64_t v) {
+        v = (v | (v << 32)) & 0x001F00000000FFFFull;
+        v = (v | (v << 16)) & 0x001F0000FF0000FFull;
+        v = (v | (v << 8)) & 0x100F00F00F00F00Full;
+        v = (v | (v << 4)) & 0x10C30C30C30C30C3ull;
+        v = (v | (v << 2)) & 0x1249249249249249ull;
+        return v;
+    };
+    auto quantize = [](double v, double min, double max) -> uint64_t {
+        if (max <= min) return 0;
+        return static_cast<uint64_t>((v - min) / (max - min) * 0x1FFFFFu);
+    };
+    std::vector<uint64_t> codes(points.size());
+    for (size_t i = 0; i < points.size(); i++) {
+        const auto &p = points[i];
+        codes[i] = spread(quantize(p.x, bb.min.x, bb.max.x)) |
+                   spread(quantize(p.y, bb.min.y, bb.max.y)) << 1 |
+                   spread(quantize(p.z, bb.min.z, bb.max.z)) << 2;
+    }
+    return codes;
+}
+
+// Maximum number of rounds of Steiner point insertion used to recover the
+// surface in `to_tetramesh`.
+constexpr size_t MAX_SURFACE_RECOVERY_ROUNDS = 16;
+
+// Tetrahedra in `to_tetramesh` whose volume is below this fraction of the
+// cube of their longest edge are treated as flat. The volume of a flat
+// sliver only comes from rounding, so its sign can flip when the tetramesh
+// is transformed.
+constexpr double MIN_RELATIVE_TETRAHEDRON_VOLUME = 1e-9;
+
 tetramesh_3d_t trimesh_3d_t::to_tetramesh() const {
-    // Converts a trimesh to a tetramesh.
-    // Description of algorithm is here:
-    // https://www.youtube.com/watch?v=sNxz_Ht6Y1Y
-    throw std::runtime_error("not implemented");
+    // Converts a closed trimesh to a tetramesh, using a conforming Delaunay
+    // tetrahedralization. The vertices are tetrahedralized first, then the
+    // surface is recovered by inserting Steiner points on it: each missing
+    // edge is split at its midpoint, and once every edge is present, each
+    // face which isn't covered by faces of the tetrahedralization gets the
+    // point where a tetrahedron edge crosses it. Flat slivers which don't
+    // lie against the surface get a point at their centroid, since dropping
+    // them would leave a cavity in the tetramesh. Finally, the tetrahedra are
+    // grouped by flood fill across faces which don't lie on the surface, and
+    // the groups which are behind the surface are kept. Points are located
+    // by walking, so the split history doesn't need to be kept.
+    delaunay_split_tree_3d_t tree{super_tetrahedron(_vertices), false};
+    const auto &points = tree.get_vertices();
+    auto insert = [&](const point_3d_t &p) -> size_t {
+        tree.split_tetrahedron(p, tree.walk_to_leaf(p));
+        return points.get_point(p);
+    };
+
+    // Welds coincident vertices, then inserts them in biased randomized
+    // order, with a fixed seed so that the output is deterministic.
+    point_welder_3d_t welder;
+    std::vector<size_t> ids(_vertices.size());
+    for (size_t i = 0; i < _vertices.size(); i++)
+        ids[i] = welder.add_point(_vertices[i]);
+    std::vector<size_t> tree_ids(welder.points.size());
+    const auto codes =
+        morton_codes(welder.points, bounding_box_3d_t{welder.points});
+    for (size_t i : insertion_order(codes, true, true, 0))
+        tree_ids[i] = insert(welder.points[i]);
+    for (auto &id : ids) id = tree_ids[id];
+
+    // Keeps track of the surface faces which each tree vertex lies on, and
+    // the surface faces along each (possibly split) surface edge. Faces
+    // which became degenerate when welding are dropped.
+    std::vector<triangle_3d_t> triangles;
+    std::unordered_map<size_t, std::vector<size_t>> vertex_faces;
+    edge_map_t<std::vector<size_t>> segments;
+    auto add_vertex_face = [&](size_t v, size_t fi) {
+        auto &fs = vertex_faces[v];
+        if (std::find(fs.begin(), fs.end(), fi) == fs.end()) fs.push_back(fi);
+    };
+    for (const auto &f : _faces) {
+        const size_t a = ids[f.a], b = ids[f.b], c = ids[f.c];
+        if (a == b || b == c || c == a) continue;
+        const size_t fi = triangles.size();
+        triangles.push_back(get_triangle(f));
+        for (size_t v : {a, b, c}) add_vertex_face(v, fi);
+        for (const auto &e : face_t{a, b, c}.get_edges(false))
+            segments[e].push_back(fi);
+    }
+    for (const auto &[e, fs] : segments) {
+        if (fs.size() != 2)
+            throw std::invalid_argument("Expected a closed mesh");
+    }
+
+    // Gets the surface face which a face of the tetrahedralization lies on,
+    // if any.
+    auto surface_face = [&](const face_t &f) -> std::optional<size_t> {
+        auto ia = vertex_faces.find(f.a), ib = vertex_faces.find(f.b),
+             ic = vertex_faces.find(f.c);
+        if (ia == vertex_faces.end() || ib == vertex_faces.end() ||
+            ic == vertex_faces.end())
+            return std::nullopt;
+        auto has = [](const std::vector<size_t> &fs, size_t fi) {
+            return std::find(fs.begin(), fs.end(), fi) != fs.end();
+        };
+        for (size_t fi : ia->second)
+            if (has(ib->second, fi) && has(ic->second, fi)) return fi;
+        return std::nullopt;
+    };
+    auto tree_triangle = [&](const face_t &f) -> triangle_3d_t {
+        return {points[f.a], points[f.b], points[f.c]};
+    };
+    auto tree_edges = [&](size_t i) {
+        const auto &v = tree.get_volume(i);
+        auto edges = v.get_edges(false);
+        edges.push_back({v.a, v.c, false});
+        edges.push_back({v.b, v.d, false});
+        return edges;
+    };
+
+    // Checks if a tetrahedron is flat, relative to its longest edge.
+    auto is_flat = [](const tetrahedron_3d_t &t) {
+        const std::array<point_3d_t, 4> corners{t.p1, t.p2, t.p3, t.p4};
+        double longest = 0.0;
+        for (size_t j = 0; j < 4; j++)
+            for (size_t k = j + 1; k < 4; k++)
+                longest = std::max(longest,
+                                   corners[j].distance_to_point(corners[k]));
+        return std::abs(t.signed_volume()) <=
+               MIN_RELATIVE_TETRAHEDRON_VOLUME * longest * longest * longest;
+    };
+
+    std::vector<size_t> leaves;
+    for (size_t round = 0;; round++) {
+        leaves = tree.get_leaf_indices();
+        edge_set_t leaf_edges;
+        for (size_t i : leaves)
+            for (const auto &e : tree_edges(i)) leaf_edges.insert(e);
+
+        std::vector<edge_t> missing_edges;
+        for (const auto &[e, fs] : segments) {
+            const double length = points[e.a].distance_to_point(points[e.b]);
+            if (!leaf_edges.count(e) && length > 2 * get_tolerance())
+                missing_edges.push_back(e);
+        }
+
+        // Once every edge is present, checks which faces are covered.
+        std::vector<size_t> missing_faces;
+        if (missing_edges.empty()) {
+            std::vector<double> covered(triangles.size(), 0.0);
+            for (size_t i : leaves) {
+                for (const auto &f : tree.get_volume(i).get_faces()) {
+                    auto fi = surface_face(f);
+                    if (!fi) continue;
+                    const auto t = tree_triangle(f);
+                    if (t.normal().dot(triangles[*fi].normal()) > 0)
+                        covered[*fi] += t.area();
+                }
+            }
+            for (size_t fi = 0; fi < triangles.size(); fi++) {
+                if (covered[fi] < (1 - get_tolerance()) * triangles[fi].area())
+                    missing_faces.push_back(fi);
+            }
+        }
+
+        // Once the surface is recovered, finds the flat slivers which have
+        // fewer than two faces on it.
+        std::vector<point_3d_t> sliver_centroids;
+        if (missing_edges.empty() && missing_faces.empty()) {
+            for (size_t i : leaves) {
+                const auto t = tree.get_tetrahedron(i);
+                if (!is_flat(t)) continue;
+                size_t num_surface_faces = 0;
+                for (const auto &f : tree.get_volume(i).get_faces())
+                    num_surface_faces += surface_face(f).has_value();
+                if (num_surface_faces < 2)
+                    sliver_centroids.push_back(t.centroid());
+            }
+            if (sliver_centroids.empty()) break;
+        }
+
+        // Features near the tolerance can stop the surface from being fully
+        // recovered, in which case the tetrahedra around them are
+        // classified individually below.
+        if (round == MAX_SURFACE_RECOVERY_ROUNDS) break;
+
+        if (!sliver_centroids.empty()) {
+            for (const auto &p : sliver_centroids) insert(p);
+            continue;
+        }
+        if (!missing_edges.empty()) {
+            for (const auto &e : missing_edges) {
+                const size_t m = insert((points[e.a] + points[e.b]) / 2.0);
+                const auto fs = segments.extract(e).mapped();
+                for (size_t fi : fs) add_vertex_face(m, fi);
+                segments[{e.a, m, false}] = fs;
+                segments[{m, e.b, false}] = fs;
+            }
+            continue;
+        }
+
+        // Finds the point where a tetrahedron edge crosses each missing face
+        // closest to its center, falling back to the center itself.
+        std::vector<bounding_box_3d_t> boxes;
+        std::vector<point_3d_t> crossings;
+        for (size_t fi : missing_faces) {
+            const auto &t = triangles[fi];
+            boxes.push_back(bounding_box_3d_t{t.vertices()});
+            crossings.push_back(t.center());
+        }
+        std::vector<bool> crossed(missing_faces.size(), false);
+        const box_tree_3d_t missing_tree{boxes};
+        std::vector<size_t> candidates;
+        for (const auto &e : leaf_edges) {
+            const point_3d_t p = points[e.a], q = points[e.b];
+            candidates.clear();
+            missing_tree.box_intersection_indices(
+                bounding_box_3d_t{std::vector<point_3d_t>{p, q}}, candidates);
+            for (size_t j : candidates) {
+                const auto &t = triangles[missing_faces[j]];
+                const point_3d_t n = t.normal();
+                const double dp = n.dot(p - t.p1), dq = n.dot(q - t.p1);
+                if ((dp > -get_tolerance() && dq > -get_tolerance()) ||
+                    (dp < get_tolerance() && dq < get_tolerance()))
+                    continue;
+                const point_3d_t x = p + (q - p) * (dp / (dp - dq));
+                if (!t.contains_point(x)) continue;
+                const point_3d_t c = t.center();
+                if (!crossed[j] || x.distance_to_point(c) <
+                                       crossings[j].distance_to_point(c)) {
+                    crossings[j] = x;
+                    crossed[j] = true;
+                }
+            }
+        }
+        for (size_t j = 0; j < missing_faces.size(); j++)
+            add_vertex_face(insert(crossings[j]), missing_faces[j]);
+    }
+
+    // Groups the tetrahedra by flood fill across faces which aren't on the
+    // surface, moving between them through the neighbor links of the tree.
+    // A group is behind the surface if one of its tetrahedra has a face on
+    // it which points the same way, and in front of it otherwise.
+    constexpr int BEHIND = 1, IN_FRONT = 2;
+    constexpr size_t NO_GROUP = SIZE_MAX;
+    std::vector<size_t> group(
+        leaves.empty() ? 0
+                       : *std::max_element(leaves.begin(), leaves.end()) + 1,
+        NO_GROUP);
+    std::vector<int> group_side;
+    std::vector<size_t> stack;
+    for (size_t start : leaves) {
+        if (group[start] != NO_GROUP) continue;
+        const size_t g = group_side.size();
+        group_side.push_back(0);
+        group[start] = g;
+        stack.push_back(start);
+        while (!stack.empty()) {
+            const size_t i = stack.back();
+            stack.pop_back();
+            const auto faces = tree.get_volume(i).get_faces();
+            const auto &neighbors = tree.get_neighbors(i);
+            for (size_t k = 0; k < 4; k++) {
+                const auto &f = faces[k];
+                if (auto fi = surface_face(f); fi) {
+                    const double alignment =
+                        tree_triangle(f).normal().dot(triangles[*fi].normal());
+                    group_side[g] |= alignment > 0 ? BEHIND : IN_FRONT;
+                    continue;
+                }
+                const size_t n = neighbors[k];
+                if (n == NO_NEIGHBOR || group[n] != NO_GROUP) continue;
+                group[n] = g;
+                stack.push_back(n);
+            }
+        }
+    }
+
+    // Where the surface wasn't fully recovered, a group can leak from behind
+    // the surface to in front of it, so its tetrahedra are classified by the
+    // signed distance from their centroids to the surface instead.
+    std::optional<bvh_3d_t> bvh;
+    auto is_behind = [&](size_t i) {
+        const int side = group_side[group[i]];
+        if (side != (BEHIND | IN_FRONT)) return side == BEHIND;
+        if (!bvh) bvh.emplace(*this);
+        return bvh->signed_distance(tree.get_tetrahedron(i).centroid()) < 0;
+    };
+
+    // Keeps the tetrahedra behind the surface. Slivers between four coplanar
+    // surface vertices are flat, so they are dropped too. The faces they
+    // leave exposed lie in the same plane as the surface, so the shape of
+    // the tetramesh doesn't change.
+    std::vector<char> kept(group.size(), false);
+    for (size_t i : leaves) {
+        const auto t = tree.get_tetrahedron(i);
+        kept[i] = t.signed_volume() > 0 && !is_flat(t) && is_behind(i);
+    }
+
+    // Gets the tetrahedra around an edge of tetrahedron `i` in order, by
+    // walking across the faces which contain the edge.
+    auto edge_ring = [&](const edge_t &e, size_t i) {
+        std::vector<size_t> ring;
+        size_t previous = NO_NEIGHBOR;
+        while (ring.empty() || i != ring[0]) {
+            ring.push_back(i);
+            const auto faces = tree.get_volume(i).get_faces();
+            const auto &neighbors = tree.get_neighbors(i);
+            size_t next = NO_NEIGHBOR;
+            for (size_t k = 0; k < 4 && next == NO_NEIGHBOR; k++) {
+                const auto &f = faces[k];
+                auto has = [&](size_t v) {
+                    return f.a == v || f.b == v || f.c == v;
+                };
+                if (has(e.a) && has(e.b) && neighbors[k] != previous)
+                    next = neighbors[k];
+            }
+            if (next == NO_NEIGHBOR || ring.size() > leaves.size())
+                return std::vector<size_t>{};
+            previous = i;
+            i = next;
+        }
+        return ring;
+    };
+
+    // Tetrahedra which cross the surface where it wasn't recovered can be
+    // classified differently from their neighbors, so that the kept ones
+    // meet along an edge without sharing a face there. Around such an edge,
+    // the kept and dropped tetrahedra form alternating runs, and the run
+    // with the least volume is switched, which joins the runs on either
+    // side of it, until the boundary is manifold. Tetrahedra are only
+    // switched once, so that neighboring edges can't undo each other.
+    std::vector<char> switched(kept.size(), false);
+    for (size_t round = 0; round < MAX_SURFACE_RECOVERY_ROUNDS; round++) {
+        edge_map_t<std::pair<size_t, size_t>> boundary_edges;
+        for (size_t i : leaves) {
+            if (!kept[i]) continue;
+            const auto faces = tree.get_volume(i).get_faces();
+            const auto &neighbors = tree.get_neighbors(i);
+            for (size_t k = 0; k < 4; k++) {
+                if (neighbors[k] != NO_NEIGHBOR && kept[neighbors[k]]) continue;
+                for (const auto &e : faces[k].get_edges(false)) {
+                    auto &[count, tetrahedron] = boundary_edges[e];
+                    count++;
+                    tetrahedron = i;
+                }
+            }
+        }
+
+        bool changed = false;
+        for (const auto &[e, entry] : boundary_edges) {
+            if (entry.first <= 2) continue;
+            auto ring = edge_ring(e, entry.second);
+
+            // Splits the ring into runs, starting where it changes.
+            const auto start = std::find_if(
+                ring.begin(), ring.end(),
+                [&](size_t i) { return kept[i] != kept[ring.back()]; });
+            if (start == ring.end()) continue;
+            std::rotate(ring.begin(), start, ring.end());
+            std::vector<std::pair<size_t, size_t>> runs;
+            for (size_t j = 0; j < ring.size(); j++) {
+                if (j == 0 || kept[ring[j]] != kept[ring[j - 1]])
+                    runs.push_back({j, j});
+                runs.back().second = j + 1;
+            }
+            if (runs.size() <= 2) continue;
+
+            // Dropped runs can only be kept if none of their tetrahedra are
+            // flat.
+            double least_volume = std::numeric_limits<double>::infinity();
+            std::optional<std::pair<size_t, size_t>> least;
+            for (const auto &[lo, hi] : runs) {
+                double volume = 0.0;
+                bool can_switch = true;
+                for (size_t j = lo; j < hi; j++) {
+                    const auto t = tree.get_tetrahedron(ring[j]);
+                    volume += std::abs(t.signed_volume());
+                    if (switched[ring[j]] ||
+                        (!kept[ring[j]] &&
+                         (t.signed_volume() <= 0 || is_flat(t))))
+                        can_switch = false;
+                }
+                if (can_switch && volume < least_volume) {
+                    least_volume = volume;
+                    least = {lo, hi};
+                }
+            }
+            if (!least) continue;
+            for (size_t j = least->first; j < least->second; j++) {
+                kept[ring[j]] = !kept[ring[j]];
+                switched[ring[j]] = true;
+            }
+            changed = true;
+        }
+        if (!changed) break;
+    }
+
+    // Drops unused vertices.
+    std::vector<point_3d_t> vertices;
+    volume_list_t volumes;
+    std::unordered_map<size_t, size_t> vertex_ids;
+    auto vertex_id = [&](size_t i) -> size_t {
+        auto [it, inserted] = vertex_ids.try_emplace(i, vertices.size());
+        if (inserted) vertices.push_back(points[i]);
+        return it->second;
+    };
+    for (size_t i : leaves) {
+        if (!kept[i]) continue;
+        const auto &v = tree.get_volume(i);
+        volumes.push_back({vertex_id(v.a), vertex_id(v.b), vertex_id(v.c),
+                           vertex_id(v.d)});
+    }
+    return {std::move(vertices), std::move(volumes)};
 }
 
 std::string trimesh_3d_t::to_string() const {
@@ -1326,33 +1867,71 @@ std::string trimesh_3d_t::to_string() const {
 
 trimesh_3d_t trimesh_3d_t::operator<<(const affine_3d_t &tf) const {
     std::vector<point_3d_t> vertices;
-    face_list_t faces = this->_faces;
+    face_list_t faces = this->_faces.to_vector();
     std::transform(this->_vertices.begin(), this->_vertices.end(),
                    std::back_inserter(vertices),
                    [&tf](const point_3d_t &vertex) { return vertex << tf; });
     return {vertices, faces};
 }
 
+trimesh_3d_t trimesh_3d_t::operator|(const trimesh_3d_t &other) const {
+    return mesh_union(*this, other);
+}
+
+trimesh_3d_t trimesh_3d_t::operator&(const trimesh_3d_t &other) const {
+    return mesh_intersection(*this, other);
+}
+
+trimesh_3d_t trimesh_3d_t::operator-(const trimesh_3d_t &other) const {
+    return mesh_difference(*this, other);
+}
+
 /* ------------ *
  * trimesh_3d_t *
  * ------------ */
 
 tetramesh_3d_t::tetramesh_3d_t(const std::vector<point_3d_t> &vertices,
                                const volume_set_t &volumes, bool validate)
-    : _vertices(vertices), _volumes(volumes.begin(), volumes.end()) {
+    : tetramesh_3d_t(std::vector<point_3d_t>(vertices),
+                     volume_list_t(volumes.begin(), volumes.end()), validate) {
+}
+
+tetramesh_3d_t::tetramesh_3d_t(const std::vector<point_3d_t> &vertices,
+                               const volume_list_t &volumes, bool validate)
+    : tetramesh_3d_t(std::vector<point_3d_t>(vertices), volume_list_t(volumes),
+                     validate) {}
+
+// Takes ownership of the vectors, which are shared by every copy of the mesh.
+tetramesh_3d_t::tetramesh_3d_t(std::vector<point_3d_t> &&vertices,
+                               volume_list_t &&volumes, bool validate) {
+    auto data =
+        std::make_shared<std::pair<std::vector<point_3d_t>, volume_list_t>>(
+            std::move(vertices), std::move(volumes));
+    this->_vertices = data->first;
+    this->_volumes = data->second;
+    this->owner = std::move(data);
     if (validate) {
         this->validate();
     }
 }
 
-tetramesh_3d_t::tetramesh_3d_t(const std::vector<point_3d_t> &vertices,
-                               const volume_list_t &volumes, bool validate)
-    : _vertices(vertices), _volumes(volumes) {
+tetramesh_3d_t::tetramesh_3d_t(span_t<point_3d_t> vertices,
+                               span_t<volume_t> volumes,
+                               std::shared_ptr<const void> owner, bool validate)
+    : _vertices(vertices), _volumes(volumes), owner(std::move(owner)) {
     if (validate) {
         this->validate();
     }
 }
 
+tetramesh_3d_t tetramesh_3d_t::from_arrays(const carray_t<double> &vertices,
+                                           const carray_t<int64_t> &volumes,
+                                           bool validate) {
+    py::gil_scoped_release release;
+    return {points_from_array<point_3d_t, 3>(vertices, "vertices"),
+            indices_from_array<volume_t, 4>(volumes, "volumes"), validate};
+}
+
 void tetramesh_3d_t::validate() const {
     // Checks that there is at least one face.
     if (_volumes.empty()) {
@@ -1395,26 +1974,21 @@ void tetramesh_3d_t::validate() const {
         }
     }
 
-    // Checks that all faces point outwards.
+    // Checks that all faces point outwards. The sign of the volume is found
+    // exactly, since it can be rounded the wrong way for slivers.
     for (auto &volume : _volumes) {
         auto &[vi, vj, vk, vl] = volume;
-        auto &a = _vertices[vi];
-        auto &b = _vertices[vj];
-        auto &c = _vertices[vk];
-        auto &d = _vertices[vl];
-        auto n = (b - a).cross(c - a);
-        if (n.dot(d - a) < 0) {
+        if (orient_3d(_vertices[vi], _vertices[vj], _vertices[vk],
+                      _vertices[vl]) < 0) {
             throw std::runtime_error("Volume " + volume.to_string() +
                                      " is not oriented correctly");
         }
     }
 }
 
-const std::vector<point_3d_t> &tetramesh_3d_t::vertices() const {
-    return _vertices;
-}
+span_t<point_3d_t> tetramesh_3d_t::vertices() const { return _vertices; }
 
-const volume_list_t &tetramesh_3d_t::volumes() const { return _volumes; }
+span_t<volume_t> tetramesh_3d_t::volumes() const { return _volumes; }
 
 tetrahedron_3d_t tetramesh_3d_t::get_tetrahedron(const volume_t &volume) const {
     auto &[vi, vj, vk, vl] = volume;
@@ -1448,7 +2022,22 @@ trimesh_3d_t tetramesh_3d_t::to_trimesh() const {
         }
     }
 
-    return {_vertices, faces};
+    // Drops the vertices which are inside the mesh, keeping the order of
+    // the ones on the surface.
+    std::vector<bool> used(_vertices.size(), false);
+    for (const auto &[a, b, c] : faces) used[a] = used[b] = used[c] = true;
+    std::vector<point_3d_t> vertices;
+    std::vector<size_t> vertex_ids(_vertices.size());
+    for (size_t i = 0; i < _vertices.size(); i++) {
+        if (!used[i]) continue;
+        vertex_ids[i] = vertices.size();
+        vertices.push_back(_vertices[i]);
+    }
+    face_list_t surface_faces;
+    surface_faces.reserve(faces.size());
+    for (const auto &[a, b, c] : faces)
+        surface_faces.push_back({vertex_ids[a], vertex_ids[b], vertex_ids[c]});
+    return {std::move(vertices), std::move(surface_faces)};
 }
 
 std::string tetramesh_3d_t::to_string() const {
@@ -1483,7 +2072,7 @@ tetramesh_3d_t tetramesh_3d_t::operator<<(const affine_3d_t &tf) const {
     std::transform(this->_vertices.begin(), this->_vertices.end(),
                    std::back_inserter(vertices),
                    [&tf](const point_3d_t &vertex) { return vertex << tf; });
-    return {vertices, this->_volumes};
+    return {std::move(vertices), this->_volumes.to_vector()};
 }
 
 tetramesh_3d_t tetramesh_3d_t::operator|(const tetramesh_3d_t &other) const {
@@ -1502,36 +2091,64 @@ tetramesh_3d_t tetramesh_3d_t::operator-(const tetramesh_3d_t &other) const {
  * Additional constructors *
  * ----------------------- */
 
-tetramesh_3d_t triangulate(const std::vector<point_3d_t> &points,
-                           bool shuffle) {
+tetramesh_3d_t triangulate(const std::vector<point_3d_t> &points, bool shuffle,
+                           bool brio, std::optional<unsigned int> seed,
+                           size_t num_threads) {
     if (points.size() < 3) {
         throw std::invalid_argument("Not enough points");
     }
 
     // Super tetrahedron.
-    bounding_box_3d_t bb{points};
-    double d = std::max(std::max(bb.max.x - bb.min.x, bb.max.y - bb.min.y),
-                        bb.max.z - bb.min.z);
-    point_3d_t p1{bb.min.x - 10 * d, bb.min.y - d, bb.min.z - d};
-    point_3d_t p2{bb.max.x + 10 * d, bb.min.y - d, bb.min.z - d};
-    point_3d_t p3{bb.min.x, bb.max.y + 10 * d, bb.min.z - d};
-    point_3d_t p4{bb.min.x, bb.min.y - d, bb.max.z + 10 * d};
-    tetrahedron_3d_t super_tetra{p1, p2, p3, p4};
-
-    // Generates a random permutation of the point indices.
-    std::vector<size_t> indices(points.size());
-    std::iota(indices.begin(), indices.end(), 0);
-    if (shuffle) {
-        std::random_device rd;
-        std::mt19937 gen(rd());
-        std::shuffle(indices.begin(), indices.end(), gen);
+    const tetrahedron_3d_t super_tetra = super_tetrahedron(points);
+    const bounding_box_3d_t bb{points};
+
+    // Triangulates blocks of the points in parallel. The points are welded
+    // first, so that the trees don't merge any of them.
+    if (get_num_threads(num_threads, points.size()) > 1) {
+        point_welder_3d_t welder;
+        for (const auto &p : points) welder.add_point(p);
+        const auto &unique = welder.points;
+        const auto simplices = triangulate_in_blocks<3>(
+            unique, num_threads,
+            [&]() { return delaunay_split_tree_3d_t{super_tetra, false}; },
+            [&](delaunay_split_tree_3d_t &tree, std::vector<size_t> &ids) {
+                std::vector<point_3d_t> batch;
+                batch.reserve(ids.size());
+                for (size_t i : ids) batch.push_back(unique[i]);
+                std::vector<size_t> sorted;
+                sorted.reserve(ids.size());
+                for (size_t j : insertion_order(morton_codes(batch, bb),
+                                                shuffle, brio, seed)) {
+                    tree.split_tetrahedron(batch[j],
+                                           tree.walk_to_leaf(batch[j]));
+                    sorted.push_back(ids[j]);
+                }
+                ids.swap(sorted);
+            },
+            [](const delaunay_split_tree_3d_t &tree, auto &&fn) {
+                for (const auto i : tree.get_leaf_indices()) fn(i);
+            },
+            [](const delaunay_split_tree_3d_t &tree, size_t i) {
+                const auto &volume = tree.get_volume(i);
+                return simplex_t<3>{volume.a, volume.b, volume.c, volume.d};
+            });
+        volume_list_t volumes;
+        volumes.reserve(simplices.size());
+        for (const auto &s : simplices)
+            volumes.push_back({s[0], s[1], s[2], s[3]});
+        return {unique, volumes, false};
     }
 
-    // Triangulation.
-    delaunay_split_tree_3d_t tree{super_tetra};
+    // Gets the order in which to insert the points.
+    const std::vector<size_t> indices =
+        insertion_order(morton_codes(points, bb), shuffle, brio, seed);
+
+    // Triangulation. Points are located by walking, so the split history
+    // doesn't need to be kept.
+    delaunay_split_tree_3d_t tree{super_tetra, false};
     for (size_t pi : indices) {
         const auto &p = points[pi];
-        const size_t i = tree.find_leaf_index(p);
+        const size_t i = tree.walk_to_leaf(p);
         tree.split_tetrahedron(p, i);
     }
 
@@ -1573,6 +2190,57 @@ void add_3d_types_modules(py::module &m) {
     auto trimesh_3d = py::class_<trimesh_3d_t>(m, "Trimesh3D");
     auto tetramesh_3d = py::class_<tetramesh_3d_t>(m, "Tetramesh3D");
 
+    // Defines pickling, so that these can be sent to other processes. The
+    // arrays in the pickled state of a mesh view its vertices and faces or
+    // volumes, so with protocol 5 they are sent as out-of-band buffers
+    // without copying.
+    point_3d.def(pickle_as_bytes<point_3d_t>());
+    line_3d.def(pickle_as_bytes<line_3d_t>());
+    sphere_3d.def(pickle_as_bytes<sphere_3d_t>());
+    triangle_3d.def(pickle_as_bytes<triangle_3d_t>());
+    tetrahedron_3d.def(pickle_as_bytes<tetrahedron_3d_t>());
+    bbox_3d.def(pickle_as_bytes<bounding_box_3d_t>());
+    affine_3d.def(pickle_as_bytes<affine_3d_t>());
+    polygon_3d.def(py::pickle(
+        [](py::object self) {
+            const auto &poly = self.cast<const polygon_3d_t &>();
+            return as_readonly_array<double, 3>(poly.points, self);
+        },
+        [](const py::array &state) {
+            return polygon_3d_t(points_from_array<point_3d_t, 3>(
+                state.cast<carray_t<double>>(), "points"));
+        }));
+    trimesh_3d.def(py::pickle(
+        [](py::object self) {
+            const auto &mesh = self.cast<const trimesh_3d_t &>();
+            return py::make_tuple(
+                as_readonly_array<double, 3>(mesh.vertices(), self),
+                as_readonly_array<int64_t, 3>(mesh.get_faces(), self));
+        },
+        [](const py::tuple &state) {
+            check_state_size(state, 2);
+            auto mesh = trimesh_3d_t::from_arrays(
+                state[0].cast<carray_t<double>>(),
+                state[1].cast<carray_t<int64_t>>(), false);
+            check_state_indices(mesh.get_faces(), mesh.vertices().size());
+            return mesh;
+        }));
+    tetramesh_3d.def(py::pickle(
+        [](py::object self) {
+            const auto &mesh = self.cast<const tetramesh_3d_t &>();
+            return py::make_tuple(
+                as_readonly_array<double, 3>(mesh.vertices(), self),
+                as_readonly_array<int64_t, 4>(mesh.volumes(), self));
+        },
+        [](const py::tuple &state) {
+            check_state_size(state, 2);
+            auto mesh = tetramesh_3d_t::from_arrays(
+                state[0].cast<carray_t<double>>(),
+                state[1].cast<carray_t<int64_t>>(), false);
+            check_state_indices(mesh.volumes(), mesh.vertices().size());
+            return mesh;
+        }));
+
     // Defines Point3D methods.
     point_3d
         .def(py::init<double, double, double>(), "A point in 3D space", "x"_a,
@@ -1771,6 +2439,13 @@ void add_3d_types_modules(py::module &m) {
         .def("is_coplanar", &triangle_3d_t::is_coplanar,
              "Checks if the triangle is coplanar with another triangle",
              "other"_a)
+        .def("closest_point", &triangle_3d_t::closest_point,
+             "The closest point on the triangle to another point", "other"_a)
+        .def("intersects_triangle", &triangle_3d_t::intersects_triangle,
+             "Checks if the triangle intersects another triangle", "other"_a)
+        .def("intersects_bounding_box",
+             &triangle_3d_t::intersects_bounding_box,
+             "Checks if the triangle intersects a bounding box", "other"_a)
         .def("point_from_barycentric_coords",
              &triangle_3d_t::point_from_barycentric_coords,
              "The point from barycentric coordinates", "b"_a);
@@ -1829,7 +2504,9 @@ void add_3d_types_modules(py::module &m) {
     bbox_3d
         .def(py::init<const point_3d_t &, const point_3d_t &>(),
              "Creates a bounding box from two points", "min"_a, "max"_a)
-        .def(py::init<const std::vector<point_3d_t> &>(),
+        .def(py::init([](const std::vector<point_3d_t> &points) {
+                 return bounding_box_3d_t(points);
+             }),
              "Creates a bounding box from a set of points", "points"_a)
         .def(py::init<const std::vector<line_3d_t> &>(),
              "Creates a bounding box from a set of lines", "lines"_a)
@@ -1868,7 +2545,15 @@ void add_3d_types_modules(py::module &m) {
         .def("tetrahedrons", &bounding_box_3d_t::tetrahedrons,
              "The bounding box's tetrahedrons")
         .def("center", &bounding_box_3d_t::center, "The bounding box's center")
-        .def("volume", &bounding_box_3d_t::volume, "The bounding box's volume");
+        .def("volume", &bounding_box_3d_t::volume, "The bounding box's volume")
+        .def("surface_area", &bounding_box_3d_t::surface_area,
+             "The bounding box's surface area")
+        .def("intersects_bounding_box",
+             &bounding_box_3d_t::intersects_bounding_box,
+             "Checks if the bounding box intersects another bounding box",
+             "other"_a)
+        .def("distance_to_point", &bounding_box_3d_t::distance_to_point,
+             "The distance from the bounding box to a point", "other"_a);
 
     // Defines Polygon3D methods.
     polygon_3d
@@ -1977,10 +2662,36 @@ void add_3d_types_modules(py::module &m) {
 
     // Defines Trimesh3D methods.
     trimesh_3d
-        .def_property_readonly("vertices", &trimesh_3d_t::vertices,
-                               "The mesh vertices")
-        .def_property_readonly("faces", &trimesh_3d_t::get_faces,
-                               "The mesh faces")
+        .def_static("from_arrays", &trimesh_3d_t::from_arrays,
+                    "Creates a trimesh from (N, 3) vertex and (M, 3) face "
+                    "arrays",
+                    "vertices"_a, "faces"_a, "validate"_a = true)
+        .def_property_readonly(
+            "vertices",
+            [](const trimesh_3d_t &mesh) {
+                return mesh.vertices().to_vector();
+            },
+            "The mesh vertices")
+        .def_property_readonly(
+            "faces",
+            [](const trimesh_3d_t &mesh) {
+                return mesh.get_faces().to_vector();
+            },
+            "The mesh faces")
+        .def_property_readonly(
+            "vertices_array",
+            [](py::object self) {
+                const auto &mesh = self.cast<const trimesh_3d_t &>();
+                return as_readonly_array<double, 3>(mesh.vertices(), self);
+            },
+            "Read-only (N, 3) array view of the mesh vertices")
+        .def_property_readonly(
+            "faces_array",
+            [](py::object self) {
+                const auto &mesh = self.cast<const trimesh_3d_t &>();
+                return as_readonly_array<int64_t, 3>(mesh.get_faces(), self);
+            },
+            "Read-only (M, 3) array view of the mesh faces")
         .def("get_triangle", &trimesh_3d_t::get_triangle,
              "Gets a mesh triangle from a face", "face"_a)
         .def("get_triangles", &trimesh_3d_t::get_triangles,
@@ -1989,36 +2700,98 @@ void add_3d_types_modules(py::module &m) {
              "Computes the signed volume of the mesh")
         .def("subdivide", &trimesh_3d_t::subdivide,
              "Subdivides the mesh into smaller triangles", "at_edges"_a = true)
+        .def("to_tetramesh", &trimesh_3d_t::to_tetramesh,
+             "Converts the closed surface to a tetrahedral mesh",
+             py::call_guard<py::gil_scoped_release>())
         .def("__str__", &trimesh_3d_t::to_string, py::is_operator())
         .def("__repr__", &trimesh_3d_t::to_string, py::is_operator())
         .def("__lshift__", &trimesh_3d_t::operator<<,
              "Applies affine transformation to 3D mesh", "affine"_a,
+             py::is_operator())
+        .def("union",
+             py::overload_cast<const trimesh_3d_t &, const trimesh_3d_t &,
+                               size_t>(&mesh_union),
+             "Computes the union of two closed 3D surfaces", "other"_a,
+             "num_threads"_a = 1, py::call_guard<py::gil_scoped_release>())
+        .def("__or__", &trimesh_3d_t::operator|,
+             "Computes the union of two closed 3D surfaces", "other"_a,
+             py::is_operator())
+        .def("intersection",
+             py::overload_cast<const trimesh_3d_t &, const trimesh_3d_t &,
+                               size_t>(&mesh_intersection),
+             "Computes the intersection of two closed 3D surfaces", "other"_a,
+             "num_threads"_a = 1, py::call_guard<py::gil_scoped_release>())
+        .def("__and__", &trimesh_3d_t::operator&,
+             "Computes the intersection of two closed 3D surfaces", "other"_a,
+             py::is_operator())
+        .def("difference",
+             py::overload_cast<const trimesh_3d_t &, const trimesh_3d_t &,
+                               size_t>(&mesh_difference),
+             "Computes the difference of two closed 3D surfaces", "other"_a,
+             "num_threads"_a = 1, py::call_guard<py::gil_scoped_release>())
+        .def("__sub__", &trimesh_3d_t::operator-,
+             "Computes the difference of two closed 3D surfaces", "other"_a,
              py::is_operator());
 
     // Defines Tetramesh3D methods.
     tetramesh_3d
-        .def_property_readonly("vertices", &tetramesh_3d_t::vertices,
-                               "The mesh vertices")
-        .def_property_readonly("volumes", &tetramesh_3d_t::volumes,
-                               "The mesh volumes")
+        .def_static("from_arrays", &tetramesh_3d_t::from_arrays,
+                    "Creates a tetramesh from (N, 3) vertex and (M, 4) volume "
+                    "arrays",
+                    "vertices"_a, "volumes"_a, "validate"_a = true)
+        .def_property_readonly(
+            "vertices",
+            [](const tetramesh_3d_t &mesh) {
+                return mesh.vertices().to_vector();
+            },
+            "The mesh vertices")
+        .def_property_readonly(
+            "volumes",
+            [](const tetramesh_3d_t &mesh) {
+                return mesh.volumes().to_vector();
+            },
+            "The mesh volumes")
+        .def_property_readonly(
+            "vertices_array",
+            [](py::object self) {
+                const auto &mesh = self.cast<const tetramesh_3d_t &>();
+                return as_readonly_array<double, 3>(mesh.vertices(), self);
+            },
+            "Read-only (N, 3) array view of the mesh vertices")
+        .def_property_readonly(
+            "volumes_array",
+            [](py::object self) {
+                const auto &mesh = self.cast<const tetramesh_3d_t &>();
+                return as_readonly_array<int64_t, 4>(mesh.volumes(), self);
+            },
+            "Read-only (M, 4) array view of the mesh volumes")
         .def("get_tetrahedron", &tetramesh_3d_t::get_tetrahedron,
              "Gets a mesh tetrahedron from a volume", "volume"_a)
         .def("get_tetrahedra", &tetramesh_3d_t::get_tetrahedra,
              "Gets all mesh tetrahedrons")
         .def("to_trimesh", &tetramesh_3d_t::to_trimesh,
              "Converts the tetrahedral mesh to a triangular mesh")
-        .def("union", &tetramesh_3d_t::operator|,
-             "Computes the union of two 3D meshes", "other"_a)
+        .def("union",
+             py::overload_cast<const tetramesh_3d_t &, const tetramesh_3d_t &,
+                               size_t>(&mesh_union),
+             "Computes the union of two 3D meshes", "other"_a,
+             "num_threads"_a = 1, py::call_guard<py::gil_scoped_release>())
         .def("__or__", &tetramesh_3d_t::operator|,
              "Computes the union of two 3D meshes", "other"_a,
              py::is_operator())
-        .def("intersection", &tetramesh_3d_t::operator&,
-             "Computes the intersection of two 3D meshes", "other"_a)
+        .def("intersection",
+             py::overload_cast<const tetramesh_3d_t &, const tetramesh_3d_t &,
+                               size_t>(&mesh_intersection),
+             "Computes the intersection of two 3D meshes", "other"_a,
+             "num_threads"_a = 1, py::call_guard<py::gil_scoped_release>())
         .def("__and__", &tetramesh_3d_t::operator&,
              "Computes the intersection of two 3D meshes", "other"_a,
              py::is_operator())
-        .def("difference", &tetramesh_3d_t::operator-,
-             "Computes the difference of two 3D meshes", "other"_a)
+        .def("difference",
+             py::overload_cast<const tetramesh_3d_t &, const tetramesh_3d_t &,
+                               size_t>(&mesh_difference),
+             "Computes the difference of two 3D meshes", "other"_a,
+             "num_threads"_a = 1, py::call_guard<py::gil_scoped_release>())
         .def("__sub__", &tetramesh_3d_t::operator-,
              "Computes the difference of two 3D meshes", "other"_a,
              py::is_operator())
@@ -2030,7 +2803,9 @@ void add_3d_types_modules(py::module &m) {
 
     // Defines additional constructors.
     m.def("triangulate_3d", &triangulate, "Triangulates a set of points",
-          "polygon"_a, "shuffle"_a = true);
+          "polygon"_a, "shuffle"_a = true, "brio"_a = false,
+          "seed"_a = std::nullopt, "num_threads"_a = 1,
+          py::call_guard<py::gil_scoped_release>());
 }
 
 }  // namespace trimesh
@@ -3,9 +3,13 @@
 #include <pybind11/pybind11.h>
 #include <pybind11/stl.h>
 
+#include <memory>
+#include <optional>
 #include <string>
 #include <unordered_set>
 
+#include "../arrays.h"
+#include "../span.h"
 #include "../types.h"
 
 namespace py = pybind11;
@@ -129,8 +133,11 @@ struct triangle_3d_t {
     std::vector<line_3d_t> edges() const;
 
     double distance_to_point(const point_3d_t &p) const;
+    point_3d_t closest_point(const point_3d_t &p) const;
     bool contains_point(const point_3d_t &p) const;
     bool is_coplanar(const triangle_3d_t &t) const;
+    bool intersects_triangle(const triangle_3d_t &t) const;
+    bool intersects_bounding_box(const bounding_box_3d_t &bb) const;
     point_3d_t point_from_barycentric_coords(
         const barycentric_coordinates_t &b) const;
     std::vector<point_3d_t> triangle_intersection(const triangle_3d_t &t) const;
@@ -167,7 +174,7 @@ struct bounding_box_3d_t {
 
     bounding_box_3d_t();
     bounding_box_3d_t(const point_3d_t &min, const point_3d_t &max);
-    bounding_box_3d_t(const std::vector<point_3d_t> &ps);
+    bounding_box_3d_t(span_t<point_3d_t> ps);
     bounding_box_3d_t(const std::vector<line_3d_t> &lines);
     bounding_box_3d_t(const std::vector<triangle_3d_t> &triangles);
     bounding_box_3d_t(const std::vector<bounding_box_3d_t> &bboxes);
@@ -185,6 +192,9 @@ struct bounding_box_3d_t {
 
     point_3d_t center() const;
     double volume() const;
+    double surface_area() const;
+    bool intersects_bounding_box(const bounding_box_3d_t &bb) const;
+    double distance_to_point(const point_3d_t &p) const;
 
     std::string to_string() const;
 };
@@ -259,8 +269,12 @@ tetramesh_3d_t operator<<(const tetramesh_3d_t &p, const affine_3d_t &a);
 
 struct trimesh_3d_t {
    private:
-    const std::vector<point_3d_t> _vertices;
-    const face_list_t _faces;
+    // The vertices and faces are views into memory which `owner` keeps
+    // alive, which is either the vectors the mesh was built from, or a
+    // mapped `.tmesh` file or buffer which the mesh is used in place from.
+    span_t<point_3d_t> _vertices;
+    span_t<face_t> _faces;
+    std::shared_ptr<const void> owner;
     void validate() const;
 
    public:
@@ -268,10 +282,18 @@ struct trimesh_3d_t {
                  const face_set_t &faces, bool validate = true);
     trimesh_3d_t(const std::vector<point_3d_t> &vertices,
                  const face_list_t &faces, bool validate = true);
+    trimesh_3d_t(std::vector<point_3d_t> &&vertices, face_list_t &&faces,
+                 bool validate = true);
     trimesh_3d_t(const std::vector<point_3d_t> &vertices, bool validate = true);
+    trimesh_3d_t(span_t<point_3d_t> vertices, span_t<face_t> faces,
+                 std::shared_ptr<const void> owner, bool validate = true);
+
+    static trimesh_3d_t from_arrays(const carray_t<double> &vertices,
+                                    const carray_t<int64_t> &faces,
+                                    bool validate = true);
 
-    const std::vector<point_3d_t> &vertices() const;
-    const face_list_t &get_faces() const;
+    span_t<point_3d_t> vertices() const;
+    span_t<face_t> get_faces() const;
     triangle_3d_t get_triangle(const face_t &face) const;
     std::vector<triangle_3d_t> get_triangles() const;
     double signed_volume() const;
@@ -280,12 +302,18 @@ struct trimesh_3d_t {
     std::string to_string() const;
 
     trimesh_3d_t operator<<(const affine_3d_t &tf) const;
+    trimesh_3d_t operator|(const trimesh_3d_t &other) const;
+    trimesh_3d_t operator&(const trimesh_3d_t &other) const;
+    trimesh_3d_t operator-(const trimesh_3d_t &other) const;
 };
 
 struct tetramesh_3d_t {
    private:
-    const std::vector<point_3d_t> _vertices;
-    const volume_list_t _volumes;
+    // The vertices and volumes are views into memory which `owner` keeps
+    // alive, like those of `trimesh_3d_t`.
+    span_t<point_3d_t> _vertices;
+    span_t<volume_t> _volumes;
+    std::shared_ptr<const void> owner;
     void validate() const;
 
    public:
@@ -293,9 +321,17 @@ struct tetramesh_3d_t {
                    const volume_set_t &volumes, bool validate = true);
     tetramesh_3d_t(const std::vector<point_3d_t> &vertices,
                    const volume_list_t &volumes, bool validate = true);
+    tetramesh_3d_t(std::vector<point_3d_t> &&vertices,
+                   volume_list_t &&volumes, bool validate = true);
+    tetramesh_3d_t(span_t<point_3d_t> vertices, span_t<volume_t> volumes,
+                   std::shared_ptr<const void> owner, bool validate = true);
+
+    static tetramesh_3d_t from_arrays(const carray_t<double> &vertices,
+                                      const carray_t<int64_t> &volumes,
+                                      bool validate = true);
 
-    const std::vector<point_3d_t> &vertices() const;
-    const volume_list_t &volumes() const;
+    span_t<point_3d_t> vertices() const;
+    span_t<volume_t> volumes() const;
     tetrahedron_3d_t get_tetrahedron(const volume_t &volume) const;
     std::vector<tetrahedron_3d_t> get_tetrahedra() const;
     trimesh_3d_t to_trimesh() const;
@@ -307,8 +343,12 @@ struct tetramesh_3d_t {
     tetramesh_3d_t operator-(const tetramesh_3d_t &other) const;
 };
 
+// Delaunay tetrahedralization of a set of points. If `num_threads` isn't 1,
+// the points are split into blocks which are tetrahedralized in parallel.
 tetramesh_3d_t triangulate(const std::vector<point_3d_t> &points,
-                           bool shuffle = true);
+                           bool shuffle = true, bool brio = false,
+                           std::optional<unsigned int> seed = std::nullopt,
+                           size_t num_threads = 1);
 
 void add_3d_types_modules(py::module &m);
 
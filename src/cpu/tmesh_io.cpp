@@ -0,0 +1,646 @@
+#include "tmesh_io.h"
+
+#include <pybind11/numpy.h>
+
+#include <algorithm>
+#include <array>
+#include <cstring>
+#include <fstream>
+#include <memory>
+
+#include "mapped_file.h"
+
+using namespace pybind11::literals;
+
+namespace trimesh {
+
+// A `.tmesh` file starts with a header, followed by a table of sections.
+// Each section is a C-contiguous (rows, cols) array of little-endian 64-bit
+// values, which starts at a multiple of `TMESH_ALIGNMENT` bytes so that it
+// can be viewed in place once the file is memory-mapped. Indices which are
+// missing, such as neighbors across boundary faces, are -1.
+enum tmesh_kind_t : uint32_t {
+    TMESH_TRIMESH_2D = 1,
+    TMESH_TRIMESH_3D = 2,
+    TMESH_TETRAMESH_3D = 3,
+};
+
+enum tmesh_tag_t : uint32_t {
+    // The (N, D) vertex coordinates.
+    TMESH_VERTICES = 1,
+    // The (M, 3) faces or (M, 4) volumes.
+    TMESH_INDICES = 2,
+    // The neighbor of each face across each of its edges, where edge `j`
+    // starts at vertex `j`, or of each volume across the face opposite each
+    // of its vertices.
+    TMESH_ADJACENCY = 3,
+    // The (K, 8) nodes of a BVH over the faces, laid out as `bvh_3d_node_t`,
+    // and the (M, 1) face indices which the leaves refer to.
+    TMESH_BVH_NODES = 4,
+    TMESH_BVH_INDICES = 5,
+};
+
+enum tmesh_dtype_t : uint32_t {
+    TMESH_FLOAT64 = 1,
+    TMESH_INT64 = 2,
+    // A record of six float64 box coordinates, followed by the int64 offset
+    // and count of a BVH node.
+    TMESH_BVH_3D_NODE = 3,
+};
+
+constexpr char TMESH_MAGIC[8] = {'T', 'M', 'E', 'S', 'H', '\0', '\0', '\0'};
+constexpr uint32_t TMESH_VERSION = 1;
+constexpr size_t TMESH_ALIGNMENT = 64;
+
+struct tmesh_header_t {
+    char magic[8];
+    uint32_t version;
+    uint32_t kind;
+    uint64_t num_sections;
+    uint64_t reserved;
+};
+
+struct tmesh_section_t {
+    uint32_t tag;
+    uint32_t dtype;
+    uint64_t offset, rows, cols;
+};
+
+// A section which is about to be written, pointing to its values.
+struct tmesh_block_t {
+    tmesh_tag_t tag;
+    tmesh_dtype_t dtype;
+    const void *data;
+    size_t rows, cols;
+};
+
+// The sections of a mesh which is about to be written, along with the
+// arrays which were computed for it, such as its BVH.
+struct tmesh_contents_t {
+    tmesh_kind_t kind;
+    std::vector<tmesh_block_t> blocks;
+    std::vector<std::shared_ptr<const void>> storage;
+
+    template <typename T>
+    const T &keep(T &&value) {
+        auto ptr = std::make_shared<const T>(std::move(value));
+        this->storage.push_back(ptr);
+        return *ptr;
+    }
+};
+
+static_assert(sizeof(point_2d_t) == 2 * sizeof(double) &&
+                  sizeof(point_3d_t) == 3 * sizeof(double) &&
+                  sizeof(face_t) == 3 * sizeof(int64_t) &&
+                  sizeof(volume_t) == 4 * sizeof(int64_t) &&
+                  sizeof(bvh_3d_node_t) == 8 * sizeof(int64_t),
+              "Mesh arrays must be laid out as 64-bit values");
+
+size_t align_tmesh_offset(size_t offset) {
+    return (offset + TMESH_ALIGNMENT - 1) / TMESH_ALIGNMENT * TMESH_ALIGNMENT;
+}
+
+// The header and section table of a `.tmesh` file, and its size in bytes.
+struct tmesh_layout_t {
+    tmesh_header_t header;
+    std::vector<tmesh_section_t> sections;
+    size_t size;
+};
+
+tmesh_layout_t layout_tmesh(const tmesh_contents_t &contents) {
+    tmesh_layout_t layout{};
+    std::memcpy(layout.header.magic, TMESH_MAGIC, sizeof(TMESH_MAGIC));
+    layout.header.version = TMESH_VERSION;
+    layout.header.kind = contents.kind;
+    layout.header.num_sections = contents.blocks.size();
+
+    size_t offset =
+        align_tmesh_offset(sizeof(tmesh_header_t) +
+                           contents.blocks.size() * sizeof(tmesh_section_t));
+    for (const auto &block : contents.blocks) {
+        layout.sections.push_back(
+            {block.tag, block.dtype, offset, block.rows, block.cols});
+        offset += block.rows * block.cols * sizeof(double);
+        layout.size = offset;
+        offset = align_tmesh_offset(offset);
+    }
+    return layout;
+}
+
+void write_tmesh(const std::string &filename,
+                 const tmesh_contents_t &contents) {
+    check_file_ext(filename, "tmesh");
+
+    std::ofstream f(filename, std::ios::out | std::ios::binary);
+    if (!f.is_open())
+        throw std::runtime_error("Could not open file " + filename);
+
+    const auto layout = layout_tmesh(contents);
+    f.write(reinterpret_cast<const char *>(&layout.header),
+            sizeof(layout.header));
+    f.write(reinterpret_cast<const char *>(layout.sections.data()),
+            layout.sections.size() * sizeof(tmesh_section_t));
+    size_t position = sizeof(layout.header) +
+                      layout.sections.size() * sizeof(tmesh_section_t);
+    const char padding[TMESH_ALIGNMENT] = {};
+    for (size_t i = 0; i < contents.blocks.size(); i++) {
+        const auto &block = contents.blocks[i];
+        const size_t size = block.rows * block.cols * sizeof(double);
+        f.write(padding, layout.sections[i].offset - position);
+        f.write(static_cast<const char *>(block.data), size);
+        position = layout.sections[i].offset + size;
+    }
+
+    if (!f) throw std::runtime_error("Could not write file " + filename);
+}
+
+// Writes the contents into a buffer of at least `layout.size` bytes.
+void write_tmesh(char *out, const tmesh_layout_t &layout,
+                 const tmesh_contents_t &contents) {
+    std::memset(out, 0, layout.size);
+    std::memcpy(out, &layout.header, sizeof(layout.header));
+    std::memcpy(out + sizeof(layout.header), layout.sections.data(),
+                layout.sections.size() * sizeof(tmesh_section_t));
+    for (size_t i = 0; i < contents.blocks.size(); i++) {
+        const auto &block = contents.blocks[i];
+        std::memcpy(out + layout.sections[i].offset, block.data,
+                    block.rows * block.cols * sizeof(double));
+    }
+}
+
+// Finds the neighbor of each face across each of its edges, which is the
+// face with the same edge in the other direction.
+std::vector<std::array<size_t, 3>> get_face_adjacency(span_t<face_t> faces) {
+    edge_map_t<size_t> edge_faces;
+    edge_faces.reserve(3 * faces.size());
+    for (size_t i = 0; i < faces.size(); i++)
+        for (const auto &edge : faces[i].get_edges()) edge_faces[edge] = i;
+
+    std::vector<std::array<size_t, 3>> adjacency(faces.size());
+    for (size_t i = 0; i < faces.size(); i++) {
+        const auto edges = faces[i].get_edges();
+        for (size_t j = 0; j < 3; j++) {
+            const auto it = edge_faces.find(edges[j].flip());
+            adjacency[i][j] = it == edge_faces.end() ? NO_NEIGHBOR : it->second;
+        }
+    }
+    return adjacency;
+}
+
+// Finds the neighbor of each volume across the face opposite each of its
+// vertices, which is the other volume with the same face.
+std::vector<std::array<size_t, 4>> get_volume_adjacency(
+    span_t<volume_t> volumes) {
+    auto get_face = [&](size_t i, size_t j) {
+        std::array<size_t, 4> v = {volumes[i].a, volumes[i].b, volumes[i].c,
+                                   volumes[i].d};
+        std::array<size_t, 3> f;
+        std::copy_if(v.begin(), v.end(), f.begin(),
+                     [&](size_t k) { return k != v[j]; });
+        std::sort(f.begin(), f.end());
+        return face_t{f[0], f[1], f[2]};
+    };
+
+    face_map_t<std::pair<size_t, size_t>> face_volumes;
+    face_volumes.reserve(4 * volumes.size());
+    std::vector<std::array<size_t, 4>> adjacency(volumes.size());
+    for (size_t i = 0; i < volumes.size(); i++) {
+        for (size_t j = 0; j < 4; j++) {
+            adjacency[i][j] = NO_NEIGHBOR;
+            const auto [it, inserted] =
+                face_volumes.emplace(get_face(i, j), std::make_pair(i, j));
+            if (inserted) continue;
+            const auto [other, k] = it->second;
+            adjacency[i][j] = other;
+            adjacency[other][k] = i;
+        }
+    }
+    return adjacency;
+}
+
+tmesh_contents_t get_tmesh_contents(const trimesh_2d_t &mesh, bool adjacency) {
+    tmesh_contents_t contents{TMESH_TRIMESH_2D};
+    contents.blocks = {{TMESH_VERTICES, TMESH_FLOAT64, mesh.vertices().data(),
+                        mesh.vertices().size(), 2},
+                       {TMESH_INDICES, TMESH_INT64, mesh.faces().data(),
+                        mesh.faces().size(), 3}};
+    if (adjacency) {
+        const auto &neighbors = contents.keep(get_face_adjacency(mesh.faces()));
+        contents.blocks.push_back({TMESH_ADJACENCY, TMESH_INT64,
+                                   neighbors.data(), neighbors.size(), 3});
+    }
+    return contents;
+}
+
+tmesh_contents_t get_tmesh_contents(const trimesh_3d_t &mesh, bool bvh,
+                                    bool adjacency) {
+    tmesh_contents_t contents{TMESH_TRIMESH_3D};
+    contents.blocks = {{TMESH_VERTICES, TMESH_FLOAT64, mesh.vertices().data(),
+                        mesh.vertices().size(), 3},
+                       {TMESH_INDICES, TMESH_INT64, mesh.get_faces().data(),
+                        mesh.get_faces().size(), 3}};
+    if (adjacency) {
+        const auto &neighbors =
+            contents.keep(get_face_adjacency(mesh.get_faces()));
+        contents.blocks.push_back({TMESH_ADJACENCY, TMESH_INT64,
+                                   neighbors.data(), neighbors.size(), 3});
+    }
+    if (bvh) {
+        const auto &tree = contents.keep(bvh_3d_t(mesh));
+        contents.blocks.push_back({TMESH_BVH_NODES, TMESH_BVH_3D_NODE,
+                                   tree.get_nodes().data(),
+                                   tree.get_nodes().size(), 8});
+        contents.blocks.push_back({TMESH_BVH_INDICES, TMESH_INT64,
+                                   tree.get_indices().data(),
+                                   tree.get_indices().size(), 1});
+    }
+    return contents;
+}
+
+tmesh_contents_t get_tmesh_contents(const tetramesh_3d_t &mesh,
+                                    bool adjacency) {
+    tmesh_contents_t contents{TMESH_TETRAMESH_3D};
+    contents.blocks = {{TMESH_VERTICES, TMESH_FLOAT64, mesh.vertices().data(),
+                        mesh.vertices().size(), 3},
+                       {TMESH_INDICES, TMESH_INT64, mesh.volumes().data(),
+                        mesh.volumes().size(), 4}};
+    if (adjacency) {
+        const auto &neighbors =
+            contents.keep(get_volume_adjacency(mesh.volumes()));
+        contents.blocks.push_back({TMESH_ADJACENCY, TMESH_INT64,
+                                   neighbors.data(), neighbors.size(), 4});
+    }
+    return contents;
+}
+
+void save_tmesh(const std::string &filename, const trimesh_2d_t &mesh,
+                bool adjacency) {
+    write_tmesh(filename, get_tmesh_contents(mesh, adjacency));
+}
+
+void save_tmesh(const std::string &filename, const trimesh_3d_t &mesh, bool bvh,
+                bool adjacency) {
+    write_tmesh(filename, get_tmesh_contents(mesh, bvh, adjacency));
+}
+
+void save_tmesh(const std::string &filename, const tetramesh_3d_t &mesh,
+                bool adjacency) {
+    write_tmesh(filename, get_tmesh_contents(mesh, adjacency));
+}
+
+// Creates a shared memory segment which is just large enough for the
+// contents, and writes them into it. The segment is removed again if the
+// contents can't be written.
+py::object share_tmesh(const tmesh_contents_t &contents,
+                       const std::optional<std::string> &name) {
+    const auto layout = layout_tmesh(contents);
+    py::object shm =
+        py::module_::import("multiprocessing.shared_memory")
+            .attr("SharedMemory")("name"_a = name, "create"_a = true,
+                                  "size"_a = layout.size);
+    try {
+        const auto buffer =
+            shm.attr("buf").cast<py::buffer>().request(/*writable=*/true);
+        if (static_cast<size_t>(buffer.size) < layout.size)
+            throw std::runtime_error("Shared memory segment is too small");
+        py::gil_scoped_release release;
+        write_tmesh(static_cast<char *>(buffer.ptr), layout, contents);
+    } catch (...) {
+        shm.attr("close")();
+        shm.attr("unlink")();
+        throw;
+    }
+    return shm;
+}
+
+py::object share_tmesh(const trimesh_2d_t &mesh, bool adjacency,
+                       const std::optional<std::string> &name) {
+    return share_tmesh(get_tmesh_contents(mesh, adjacency), name);
+}
+
+py::object share_tmesh(const trimesh_3d_t &mesh, bool bvh, bool adjacency,
+                       const std::optional<std::string> &name) {
+    return share_tmesh(get_tmesh_contents(mesh, bvh, adjacency), name);
+}
+
+py::object share_tmesh(const tetramesh_3d_t &mesh, bool adjacency,
+                       const std::optional<std::string> &name) {
+    return share_tmesh(get_tmesh_contents(mesh, adjacency), name);
+}
+
+// The contents of a `.tmesh` file, whose header and sections have been
+// checked, so that every section lies within it. The contents stay valid for
+// as long as `owner` exists, which is either the mapped file or the buffer
+// which holds them.
+struct tmesh_file_t {
+    const char *contents;
+    std::shared_ptr<const void> owner;
+    tmesh_kind_t kind;
+    std::vector<tmesh_section_t> sections;
+
+    const tmesh_section_t *find(tmesh_tag_t tag) const {
+        for (const auto &section : this->sections)
+            if (section.tag == tag) return &section;
+        return nullptr;
+    }
+
+    template <typename T>
+    const T *data(const tmesh_section_t &section) const {
+        return reinterpret_cast<const T *>(this->contents + section.offset);
+    }
+};
+
+tmesh_file_t read_tmesh(const char *data, size_t size,
+                        std::shared_ptr<const void> owner,
+                        const std::string &source) {
+    tmesh_file_t tmesh{data, std::move(owner)};
+    auto invalid = [&](const std::string &reason) {
+        return std::runtime_error("Invalid .tmesh " + source + ": " + reason);
+    };
+
+    tmesh_header_t header;
+    if (size < sizeof(header)) throw invalid("too small");
+    if (reinterpret_cast<uintptr_t>(data) % alignof(double) != 0)
+        throw invalid("not aligned to 8 bytes");
+    std::memcpy(&header, data, sizeof(header));
+    if (std::memcmp(header.magic, TMESH_MAGIC, sizeof(TMESH_MAGIC)) != 0)
+        throw invalid("bad magic number");
+    if (header.version != TMESH_VERSION)
+        throw invalid("unsupported version " + std::to_string(header.version));
+    if (header.kind < TMESH_TRIMESH_2D || header.kind > TMESH_TETRAMESH_3D)
+        throw invalid("unknown mesh kind " + std::to_string(header.kind));
+    tmesh.kind = static_cast<tmesh_kind_t>(header.kind);
+    if (header.num_sections > (size - sizeof(header)) / sizeof(tmesh_section_t))
+        throw invalid("truncated section table");
+    tmesh.sections.resize(header.num_sections);
+    std::memcpy(tmesh.sections.data(), data + sizeof(header),
+                header.num_sections * sizeof(tmesh_section_t));
+
+    // Checks that each section fits in the file, and has the shape and type
+    // which its tag calls for.
+    const size_t dims = tmesh.kind == TMESH_TRIMESH_2D ? 2 : 3;
+    const size_t corners = tmesh.kind == TMESH_TETRAMESH_3D ? 4 : 3;
+    for (const auto &section : tmesh.sections) {
+        const size_t max_values = size / sizeof(double);
+        if (section.offset % TMESH_ALIGNMENT != 0 || section.offset > size ||
+            (section.cols != 0 && section.rows > max_values / section.cols) ||
+            section.rows * section.cols * sizeof(double) >
+                size - section.offset)
+            throw invalid("section " + std::to_string(section.tag) +
+                          " is out of bounds");
+
+        size_t cols = 0;
+        tmesh_dtype_t dtype = TMESH_INT64;
+        switch (section.tag) {
+            case TMESH_VERTICES:
+                cols = dims;
+                dtype = TMESH_FLOAT64;
+                break;
+            case TMESH_INDICES:
+            case TMESH_ADJACENCY:
+                cols = corners;
+                break;
+            case TMESH_BVH_NODES:
+                cols = 8;
+                dtype = TMESH_BVH_3D_NODE;
+                break;
+            case TMESH_BVH_INDICES:
+                cols = 1;
+                break;
+            default:
+                // Skips sections from newer writers.
+                continue;
+        }
+        if (section.cols != cols || section.dtype != dtype)
+            throw invalid("section " + std::to_string(section.tag) +
+                          " has the wrong shape or type");
+    }
+    if (!tmesh.find(TMESH_VERTICES) || !tmesh.find(TMESH_INDICES))
+        throw invalid("missing vertices or indices");
+    return tmesh;
+}
+
+// Memory-maps a `.tmesh` file, or views a buffer which holds one. A buffer
+// can't be released, such as by closing the shared memory segment it views,
+// for as long as the contents are in use.
+tmesh_file_t read_tmesh(const py::object &source) {
+    if (py::isinstance<py::str>(source)) {
+        const auto filename = source.cast<std::string>();
+        auto file = std::make_shared<const mapped_file_t>(filename);
+        return read_tmesh(file->data, file->size, file, "file " + filename);
+    }
+    if (!py::isinstance<py::buffer>(source))
+        throw py::type_error("Expected a filename or a buffer");
+
+    std::shared_ptr<const py::buffer_info> buffer(
+        new py::buffer_info(source.cast<py::buffer>().request()),
+        [](const py::buffer_info *info) {
+            py::gil_scoped_acquire acquire;
+            delete info;
+        });
+    if (!PyBuffer_IsContiguous(buffer->view(), 'C'))
+        throw std::invalid_argument("Expected a contiguous buffer");
+    return read_tmesh(static_cast<const char *>(buffer->ptr),
+                      buffer->size * buffer->itemsize, buffer, "buffer");
+}
+
+// Views the rows of a `.tmesh` section in place, as long as `tmesh.owner`
+// keeps the file or buffer alive.
+template <typename T>
+span_t<T> view_tmesh_section(const tmesh_file_t &tmesh, tmesh_tag_t tag) {
+    const auto &section = *tmesh.find(tag);
+    return {tmesh.data<T>(section), section.rows};
+}
+
+// Checks that each index of the faces or volumes of a `.tmesh` file refers
+// to a vertex. Indices are read as signed values, so negative ones are
+// caught before they are used as unsigned offsets.
+template <size_t K>
+void check_tmesh_indices(const tmesh_file_t &tmesh) {
+    const auto &section = *tmesh.find(TMESH_INDICES);
+    const size_t num_vertices = tmesh.find(TMESH_VERTICES)->rows;
+    const int64_t *data = tmesh.data<int64_t>(section);
+    for (size_t i = 0; i < section.rows; i++) {
+        for (size_t j = 0; j < K; j++) {
+            const int64_t id = data[i * K + j];
+            if (id < 0 || static_cast<size_t>(id) >= num_vertices)
+                throw std::runtime_error("Invalid vertex index " +
+                                         std::to_string(id) + " in row " +
+                                         std::to_string(i));
+        }
+    }
+}
+
+py::object load_tmesh(const py::object &source, bool validate) {
+    const auto tmesh = read_tmesh(source);
+
+    // The mesh is built without the GIL, and handed to Python without being
+    // copied again. 3D meshes use the vertices and indices in place, and keep
+    // the mapped file or buffer alive, while 2D meshes copy them.
+    trimesh_2d_t *trimesh_2d = nullptr;
+    trimesh_3d_t *trimesh_3d = nullptr;
+    tetramesh_3d_t *tetramesh_3d = nullptr;
+    {
+        py::gil_scoped_release release;
+        switch (tmesh.kind) {
+            case TMESH_TRIMESH_2D:
+                check_tmesh_indices<3>(tmesh);
+                trimesh_2d = new trimesh_2d_t(
+                    view_tmesh_section<point_2d_t>(tmesh, TMESH_VERTICES)
+                        .to_vector(),
+                    view_tmesh_section<face_t>(tmesh, TMESH_INDICES)
+                        .to_vector(),
+                    validate);
+                break;
+            case TMESH_TRIMESH_3D:
+                check_tmesh_indices<3>(tmesh);
+                trimesh_3d = new trimesh_3d_t(
+                    view_tmesh_section<point_3d_t>(tmesh, TMESH_VERTICES),
+                    view_tmesh_section<face_t>(tmesh, TMESH_INDICES),
+                    tmesh.owner, validate);
+                break;
+            case TMESH_TETRAMESH_3D:
+                check_tmesh_indices<4>(tmesh);
+                tetramesh_3d = new tetramesh_3d_t(
+                    view_tmesh_section<point_3d_t>(tmesh, TMESH_VERTICES),
+                    view_tmesh_section<volume_t>(tmesh, TMESH_INDICES),
+                    tmesh.owner, validate);
+                break;
+        }
+    }
+    const auto policy = py::return_value_policy::take_ownership;
+    if (trimesh_2d) return py::cast(trimesh_2d, policy);
+    if (trimesh_3d) return py::cast(trimesh_3d, policy);
+    return py::cast(tetramesh_3d, policy);
+}
+
+py::dict load_tmesh_arrays(const py::object &source) {
+    const auto tmesh = read_tmesh(source);
+
+    // The arrays are read-only views into the mapped file or buffer, which
+    // is kept for as long as any of them exists.
+    py::capsule base(new std::shared_ptr<const void>(tmesh.owner), [](void *p) {
+        delete reinterpret_cast<std::shared_ptr<const void> *>(p);
+    });
+    const auto node_dtype = py::dtype::from_args(
+        py::make_tuple(py::make_tuple("min", "<f8", py::make_tuple(3)),
+                       py::make_tuple("max", "<f8", py::make_tuple(3)),
+                       py::make_tuple("offset", "<u8"),
+                       py::make_tuple("count", "<u8"))
+            .cast<py::list>());
+    auto view = [&](const tmesh_section_t &section) {
+        const char *data = tmesh.data<char>(section);
+        py::array arr;
+        if (section.dtype == TMESH_BVH_3D_NODE)
+            arr = py::array(node_dtype, {section.rows}, data, base);
+        else if (section.cols == 1)
+            arr =
+                py::array(py::dtype::of<int64_t>(), {section.rows}, data, base);
+        else
+            arr = py::array(section.dtype == TMESH_FLOAT64
+                                ? py::dtype::of<double>()
+                                : py::dtype::of<int64_t>(),
+                            {section.rows, section.cols}, data, base);
+        py::detail::array_proxy(arr.ptr())->flags &=
+            ~py::detail::npy_api::NPY_ARRAY_WRITEABLE_;
+        return arr;
+    };
+
+    const std::vector<std::pair<tmesh_tag_t, std::string>> names = {
+        {TMESH_VERTICES, "vertices"},
+        {TMESH_INDICES, tmesh.kind == TMESH_TETRAMESH_3D ? "volumes" : "faces"},
+        {TMESH_ADJACENCY, "adjacency"},
+        {TMESH_BVH_NODES, "bvh_nodes"},
+        {TMESH_BVH_INDICES, "bvh_indices"}};
+    py::dict arrays;
+    for (const auto &[tag, name] : names)
+        if (const auto *section = tmesh.find(tag))
+            arrays[name.c_str()] = view(*section);
+    return arrays;
+}
+
+bvh_3d_t load_tmesh_bvh(const py::object &source, const trimesh_3d_t *mesh) {
+    const auto tmesh = read_tmesh(source);
+    const auto *nodes = tmesh.find(TMESH_BVH_NODES);
+    const auto *indices = tmesh.find(TMESH_BVH_INDICES);
+    if (tmesh.kind != TMESH_TRIMESH_3D || !nodes || !indices)
+        throw std::runtime_error(".tmesh source has no BVH");
+
+    // The tree is used in place, so the BVH keeps the mapped file or buffer
+    // for as long as it exists. Without a mesh, its faces and vertices are
+    // also used in place.
+    const span_t<bvh_3d_node_t> tree_nodes(tmesh.data<bvh_3d_node_t>(*nodes),
+                                           nodes->rows);
+    const span_t<size_t> tree_indices(tmesh.data<size_t>(*indices),
+                                      indices->rows);
+    if (mesh)
+        return {mesh->get_faces(), mesh->vertices(), tree_nodes, tree_indices,
+                tmesh.owner};
+    const auto *faces = tmesh.find(TMESH_INDICES);
+    const auto *vertices = tmesh.find(TMESH_VERTICES);
+    return {{tmesh.data<face_t>(*faces), faces->rows},
+            {tmesh.data<point_3d_t>(*vertices), vertices->rows},
+            tree_nodes,
+            tree_indices,
+            tmesh.owner};
+}
+
+void add_tmesh_io_modules(py::module &m) {
+    m.def("save_tmesh",
+          py::overload_cast<const std::string &, const trimesh_2d_t &, bool>(
+              &save_tmesh),
+          "Saves a mesh to a .tmesh file, optionally with the neighbors of "
+          "each face",
+          "filename"_a, "mesh"_a, "adjacency"_a = false);
+    m.def("save_tmesh",
+          py::overload_cast<const std::string &, const trimesh_3d_t &, bool,
+                            bool>(&save_tmesh),
+          "Saves a mesh to a .tmesh file, optionally with a BVH over its "
+          "faces and the neighbors of each face",
+          "filename"_a, "mesh"_a, "bvh"_a = false, "adjacency"_a = false);
+    m.def("save_tmesh",
+          py::overload_cast<const std::string &, const tetramesh_3d_t &, bool>(
+              &save_tmesh),
+          "Saves a mesh to a .tmesh file, optionally with the neighbors of "
+          "each volume",
+          "filename"_a, "mesh"_a, "adjacency"_a = false);
+    m.def("share_tmesh",
+          py::overload_cast<const trimesh_2d_t &, bool,
+                            const std::optional<std::string> &>(&share_tmesh),
+          "Writes a mesh into a new shared memory segment in the .tmesh "
+          "layout, returning the SharedMemory which holds it",
+          "mesh"_a, "adjacency"_a = false, "name"_a = py::none());
+    m.def("share_tmesh",
+          py::overload_cast<const trimesh_3d_t &, bool, bool,
+                            const std::optional<std::string> &>(&share_tmesh),
+          "Writes a mesh into a new shared memory segment in the .tmesh "
+          "layout, optionally with a BVH over its faces, returning the "
+          "SharedMemory which holds it",
+          "mesh"_a, "bvh"_a = false, "adjacency"_a = false,
+          "name"_a = py::none());
+    m.def("share_tmesh",
+          py::overload_cast<const tetramesh_3d_t &, bool,
+                            const std::optional<std::string> &>(&share_tmesh),
+          "Writes a mesh into a new shared memory segment in the .tmesh "
+          "layout, returning the SharedMemory which holds it",
+          "mesh"_a, "adjacency"_a = false, "name"_a = py::none());
+    m.def("load_tmesh", &load_tmesh,
+          "Loads a mesh from a .tmesh file, or from a buffer which holds one. "
+          "3D meshes use the vertices and indices in place, keeping the file "
+          "or buffer in use while they exist, and 2D meshes copy them. Use "
+          "load_tmesh_arrays for read-only arrays and load_tmesh_bvh for a "
+          "saved BVH, which are never copied",
+          "source"_a, "validate"_a = true);
+    m.def("load_tmesh_arrays", &load_tmesh_arrays,
+          "Memory-maps a .tmesh file, or views a buffer which holds one, "
+          "returning a dictionary of read-only arrays which view its sections "
+          "without copying them",
+          "source"_a);
+    m.def("load_tmesh_bvh", &load_tmesh_bvh,
+          "Loads the BVH which was saved with a mesh in a .tmesh file or "
+          "buffer, using its tree in place. Without a mesh, the faces and "
+          "vertices are also used in place",
+          "source"_a, "trimesh"_a = nullptr, py::keep_alive<0, 2>());
+}
+
+}  // namespace trimesh
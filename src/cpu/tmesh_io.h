@@ -0,0 +1,48 @@
+#pragma once
+
+#include <pybind11/pybind11.h>
+#include <pybind11/stl.h>
+
+#include <optional>
+#include <string>
+
+#include "three/bvh.h"
+#include "three/types.h"
+#include "two/types.h"
+
+namespace py = pybind11;
+
+namespace trimesh {
+
+// Functions for saving and loading meshes in the native `.tmesh` format,
+// which stores the vertex and index arrays as they are laid out in memory,
+// along with optional precomputed sections, so that they can be loaded by
+// memory-mapping the file.
+void save_tmesh(const std::string &filename, const trimesh_2d_t &mesh,
+                bool adjacency = false);
+void save_tmesh(const std::string &filename, const trimesh_3d_t &mesh,
+                bool bvh = false, bool adjacency = false);
+void save_tmesh(const std::string &filename, const tetramesh_3d_t &mesh,
+                bool adjacency = false);
+
+// These write the same layout into a new shared memory segment, returning
+// the `multiprocessing.shared_memory.SharedMemory` which holds it, so that
+// other processes can attach to it by name.
+py::object share_tmesh(const trimesh_2d_t &mesh, bool adjacency = false,
+                       const std::optional<std::string> &name = std::nullopt);
+py::object share_tmesh(const trimesh_3d_t &mesh, bool bvh = false,
+                       bool adjacency = false,
+                       const std::optional<std::string> &name = std::nullopt);
+py::object share_tmesh(const tetramesh_3d_t &mesh, bool adjacency = false,
+                       const std::optional<std::string> &name = std::nullopt);
+
+// The loading functions take either a filename or a buffer holding the
+// contents of a `.tmesh` file, such as the `buf` of a shared memory segment.
+py::object load_tmesh(const py::object &source, bool validate = true);
+py::dict load_tmesh_arrays(const py::object &source);
+bvh_3d_t load_tmesh_bvh(const py::object &source,
+                        const trimesh_3d_t *mesh = nullptr);
+
+void add_tmesh_io_modules(py::module &m);
+
+}  // namespace trimesh
@@ -0,0 +1,116 @@
+#include "batch.h"
+
+#include <string>
+
+using namespace pybind11::literals;
+
+namespace trimesh {
+
+// Calls `fn(point, triangle, row)` for each point against a single triangle.
+template <typename R, size_t C = 1, typename F>
+py::array_t<R> map_points(const carray_t<double> &points,
+                          const triangle_2d_t &triangle, F fn) {
+    const auto *ps = structs_from_array<point_2d_t, 2>(points, "points");
+    return map_rows<R, C>(points.shape(0),
+                          [&](size_t i, R *row) { fn(ps[i], triangle, row); });
+}
+
+// Calls `fn(point, triangle, row)` for each point and its paired triangle.
+template <typename R, size_t C = 1, typename F>
+py::array_t<R> map_points(const carray_t<double> &points,
+                          const carray_t<double> &triangles, F fn) {
+    const auto *ps = structs_from_array<point_2d_t, 2>(points, "points");
+    const auto *ts =
+        structs_from_array<triangle_2d_t, 3, 2>(triangles, "triangles");
+    if (points.shape(0) != triangles.shape(0)) {
+        throw std::invalid_argument(
+            "Got " + std::to_string(points.shape(0)) + " points but " +
+            std::to_string(triangles.shape(0)) + " triangles");
+    }
+    return map_rows<R, C>(points.shape(0),
+                          [&](size_t i, R *row) { fn(ps[i], ts[i], row); });
+}
+
+void distance_to_triangle_row(const point_2d_t &p, const triangle_2d_t &t,
+                              double *row) {
+    row[0] = p.distance_to_triangle(t);
+}
+
+void contains_point_row(const point_2d_t &p, const triangle_2d_t &t,
+                        bool *row) {
+    row[0] = t.contains_point(p);
+}
+
+void barycentric_coordinates_row(const point_2d_t &p, const triangle_2d_t &t,
+                                 double *row) {
+    const auto b = p.barycentric_coordinates(t);
+    row[0] = b.u;
+    row[1] = b.v;
+    row[2] = b.w;
+}
+
+py::array_t<double> batch_distance_to_triangle_2d(
+    const carray_t<double> &points, const triangle_2d_t &triangle) {
+    return map_points<double>(points, triangle, distance_to_triangle_row);
+}
+
+py::array_t<double> batch_distance_to_triangle_2d(
+    const carray_t<double> &points, const carray_t<double> &triangles) {
+    return map_points<double>(points, triangles, distance_to_triangle_row);
+}
+
+py::array_t<bool> batch_contains_point_2d(const carray_t<double> &points,
+                                          const triangle_2d_t &triangle) {
+    return map_points<bool>(points, triangle, contains_point_row);
+}
+
+py::array_t<bool> batch_contains_point_2d(const carray_t<double> &points,
+                                          const carray_t<double> &triangles) {
+    return map_points<bool>(points, triangles, contains_point_row);
+}
+
+py::array_t<double> batch_barycentric_coordinates_2d(
+    const carray_t<double> &points, const triangle_2d_t &triangle) {
+    return map_points<double, 3>(points, triangle, barycentric_coordinates_row);
+}
+
+py::array_t<double> batch_barycentric_coordinates_2d(
+    const carray_t<double> &points, const carray_t<double> &triangles) {
+    return map_points<double, 3>(points, triangles,
+                                 barycentric_coordinates_row);
+}
+
+void add_2d_batch_modules(py::module &m) {
+    m.def("batch_distance_to_triangle_2d",
+          py::overload_cast<const carray_t<double> &, const triangle_2d_t &>(
+              &batch_distance_to_triangle_2d),
+          "Distances from (N, 2) points to a triangle", "points"_a,
+          "triangle"_a);
+    m.def("batch_distance_to_triangle_2d",
+          py::overload_cast<const carray_t<double> &, const carray_t<double> &>(
+              &batch_distance_to_triangle_2d),
+          "Distances from (N, 2) points to (N, 3, 2) triangles", "points"_a,
+          "triangles"_a);
+    m.def("batch_contains_point_2d",
+          py::overload_cast<const carray_t<double> &, const triangle_2d_t &>(
+              &batch_contains_point_2d),
+          "Checks if a triangle contains each of (N, 2) points", "points"_a,
+          "triangle"_a);
+    m.def("batch_contains_point_2d",
+          py::overload_cast<const carray_t<double> &, const carray_t<double> &>(
+              &batch_contains_point_2d),
+          "Checks if (N, 3, 2) triangles contain (N, 2) points", "points"_a,
+          "triangles"_a);
+    m.def("batch_barycentric_coordinates_2d",
+          py::overload_cast<const carray_t<double> &, const triangle_2d_t &>(
+              &batch_barycentric_coordinates_2d),
+          "Barycentric coordinates of (N, 2) points in a triangle", "points"_a,
+          "triangle"_a);
+    m.def("batch_barycentric_coordinates_2d",
+          py::overload_cast<const carray_t<double> &, const carray_t<double> &>(
+              &batch_barycentric_coordinates_2d),
+          "Barycentric coordinates of (N, 2) points in (N, 3, 2) triangles",
+          "points"_a, "triangles"_a);
+}
+
+}  // namespace trimesh
@@ -0,0 +1,30 @@
+#pragma once
+
+#include <pybind11/pybind11.h>
+#include <pybind11/stl.h>
+
+#include "../arrays.h"
+#include "types.h"
+
+namespace py = pybind11;
+
+namespace trimesh {
+
+// Vectorized predicates over (N, 2) arrays of points, against either a single
+// triangle or an (N, 3, 2) array of triangles (one per point).
+py::array_t<double> batch_distance_to_triangle_2d(
+    const carray_t<double> &points, const triangle_2d_t &triangle);
+py::array_t<double> batch_distance_to_triangle_2d(
+    const carray_t<double> &points, const carray_t<double> &triangles);
+py::array_t<bool> batch_contains_point_2d(const carray_t<double> &points,
+                                          const triangle_2d_t &triangle);
+py::array_t<bool> batch_contains_point_2d(const carray_t<double> &points,
+                                          const carray_t<double> &triangles);
+py::array_t<double> batch_barycentric_coordinates_2d(
+    const carray_t<double> &points, const triangle_2d_t &triangle);
+py::array_t<double> batch_barycentric_coordinates_2d(
+    const carray_t<double> &points, const carray_t<double> &triangles);
+
+void add_2d_batch_modules(py::module &m);
+
+}  // namespace trimesh
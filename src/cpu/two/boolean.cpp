@@ -1,7 +1,10 @@
 #include "boolean.h"
 
 #include <algorithm>
+#include <cmath>
 
+#include "../options.h"
+#include "../parallel.h"
 #include "bvh.h"
 
 using namespace pybind11::literals;
@@ -11,39 +14,64 @@ namespace trimesh {
 enum boolean_2d_op { INTERSECTION, COMPLEMENT };
 
 trimesh_2d_t split_at_all_intersections(const trimesh_2d_t &a_mesh,
-                                        const trimesh_2d_t &b_mesh) {
+                                        const trimesh_2d_t &b_mesh,
+                                        size_t num_threads) {
     std::vector<point_2d_t> vertices = a_mesh.vertices();
 
-    // Keeps track of the faces that have been split.
-    std::vector<triangle_split_tree_2d_t> a_trees;
-    for (auto &a_face : a_mesh.faces()) {
-        a_trees.push_back({a_face, vertices});
-    }
-
-    // Checks each triangle in B against each triangle in A.
-    // This could be made more efficient by indexing the vertices of B to
-    // efficiently find the vertices which intersect a triangle in A.
-    for (size_t b_face_id = 0; b_face_id < b_mesh.faces().size(); b_face_id++) {
-        auto &b_face = b_mesh.faces()[b_face_id];
-        auto &[b_a, b_b, b_c] = b_face;
-        auto &b_tri = b_mesh.get_triangle(b_face);
+    // Only the boundary of B decides whether a face of A is inside it, so A
+    // is only split at the boundary edges of B. Splitting at the interior
+    // edges as well would just add slivers wherever they meet at a point.
+    edge_map_t<size_t> b_edge_counts;
+    for (const auto &b_face : b_mesh.faces())
+        for (const auto &edge : b_face.get_edges(false))
+            b_edge_counts[edge]++;
 
-        // Splits triangles at edges.
+    // Finds the edges of B which intersect each triangle in A, using a BVH
+    // over the faces of A so that only the faces whose bounding boxes the
+    // edge overlaps are checked. The edges are kept in the order they appear
+    // in B, since the result of splitting a face depends on that order.
+    bvh_2d_t a_bvh(a_mesh);
+    std::vector<line_2d_t> b_edges;
+    std::vector<std::vector<size_t>> a_face_edges(a_mesh.faces().size());
+    std::vector<size_t> a_face_ids;
+    for (auto &b_face : b_mesh.faces()) {
         for (auto &edge : b_face.get_edges()) {
+            if (b_edge_counts.at({edge.a, edge.b, false}) != 1) continue;
             line_2d_t b_edge{b_mesh.vertices()[edge.a],
                              b_mesh.vertices()[edge.b]};
 
-            for (size_t a_face_id = 0; a_face_id < a_mesh.faces().size();
-                 a_face_id++) {
+            a_face_ids.clear();
+            a_bvh.line_intersection_indices(b_edge, a_face_ids);
+            for (auto &a_face_id : a_face_ids)
+                a_face_edges[a_face_id].push_back(b_edges.size());
+            b_edges.push_back(b_edge);
+        }
+    }
+
+    // Splits each face of A at the edges which intersect it. The faces are
+    // independent of each other, so they can be split in parallel.
+    std::vector<triangle_split_tree_2d_t> a_trees;
+    a_trees.reserve(a_mesh.faces().size());
+    for (auto &a_face : a_mesh.faces()) {
+        a_trees.push_back({a_face, vertices});
+    }
+    const size_t num_faces = a_trees.size();
+    parallel_chunks(
+        num_faces, get_num_threads(num_threads, num_faces),
+        [&](size_t chunk, size_t lo, size_t hi) {
+            for (size_t a_face_id = lo; a_face_id < hi; a_face_id++) {
                 auto &a_tree = a_trees[a_face_id];
-                auto t_ids = a_tree.get_leaf_triangles_which_intersect(b_edge);
+                for (auto &edge_id : a_face_edges[a_face_id]) {
+                    auto &b_edge = b_edges[edge_id];
+                    auto t_ids =
+                        a_tree.get_leaf_triangles_which_intersect(b_edge);
 
-                for (auto &t_id : t_ids) {
-                    a_tree.split_triangle(b_edge, t_id);
+                    for (auto &t_id : t_ids) {
+                        a_tree.split_triangle(b_edge, t_id);
+                    }
                 }
             }
-        }
-    }
+        });
 
     // Adds all faces from the split trees to the new mesh.
     face_set_t faces;
@@ -63,29 +91,122 @@ trimesh_2d_t split_at_all_intersections(const trimesh_2d_t &a_mesh,
     return {new_vertices, new_faces};
 }
 
-trimesh_2d_t mesh_op(const trimesh_2d_t &mesh_a, const trimesh_2d_t &mesh_b,
-                     boolean_2d_op op, bool validate, bool cleanup) {
-    const trimesh_2d_t a_split = split_at_all_intersections(mesh_a, mesh_b),
-                       b_split = split_at_all_intersections(mesh_b, mesh_a);
-
-    // Classifies each face in A as inside or outside B, and each face in B
-    // as inside or outside A.
-    bvh_2d_t a_bvh(mesh_a), b_bvh(mesh_b);
-    std::vector<bool> a_face_inside(a_split.faces().size()),
-        b_face_inside(b_split.faces().size());
-    for (size_t a_face_id = 0; a_face_id < a_split.faces().size();
-         a_face_id++) {
-        auto &a_face = a_split.faces()[a_face_id];
-        auto &a_tri = a_split.get_triangle(a_face);
-        a_face_inside[a_face_id] = (bool)b_bvh.get_containing_face(a_tri);
-    }
-    for (size_t b_face_id = 0; b_face_id < b_split.faces().size();
-         b_face_id++) {
-        auto &b_face = b_split.faces()[b_face_id];
-        auto &b_tri = b_split.get_triangle(b_face);
-        b_face_inside[b_face_id] = (bool)a_bvh.get_containing_face(b_tri);
+// Classifies each face of `split`, which has already been split at the edges
+// of `other`, as inside or outside of `other`. Whether a face is inside can
+// only change across the boundary of `other`, so the faces are grouped by
+// flood fill across edges which don't lie on that boundary, and then one
+// representative point per group is tested against `other`.
+std::vector<bool> classify_faces(const trimesh_2d_t &split,
+                                 const trimesh_2d_t &other,
+                                 const bvh_2d_t &other_bvh,
+                                 size_t num_threads) {
+    const auto &faces = split.faces();
+    const auto &vertices = split.vertices();
+
+    // Counts the faces adjacent to each edge of the other mesh, so that
+    // boundary edges are the ones with a single face.
+    edge_map_t<size_t> other_edge_counts;
+    for (const auto &face : other.faces())
+        for (const auto &edge : face.get_edges(false))
+            other_edge_counts[edge]++;
+
+    // Marks the vertices which lie on the boundary of the other mesh. The
+    // flood fill doesn't cross edges between two such vertices, since they
+    // might lie on the boundary.
+    std::vector<char> on_boundary(vertices.size(), false);
+    parallel_chunks(
+        vertices.size(), get_num_threads(num_threads, vertices.size()),
+        [&](size_t chunk, size_t lo, size_t hi) {
+            std::vector<size_t> other_face_ids;
+            for (size_t i = lo; i < hi; i++) {
+                other_face_ids.clear();
+                other_bvh.point_intersection_indices(vertices[i],
+                                                     other_face_ids);
+                for (const auto &other_face_id : other_face_ids) {
+                    const auto &other_face = other.faces()[other_face_id];
+                    for (const auto &edge : other_face.get_edges(false)) {
+                        if (other_edge_counts.at(edge) != 1) continue;
+                        line_2d_t line{other.vertices()[edge.a],
+                                       other.vertices()[edge.b]};
+                        if (line.distance_to_point(vertices[i]) <
+                            get_tolerance())
+                            on_boundary[i] = true;
+                    }
+                }
+            }
+        });
+
+    // Groups the faces by flood fill, keeping track of the largest face in
+    // each group to use as its representative.
+    edge_map_t<std::vector<size_t>> edge_faces;
+    for (size_t i = 0; i < faces.size(); i++)
+        for (const auto &edge : faces[i].get_edges(false))
+            edge_faces[edge].push_back(i);
+
+    std::vector<size_t> face_group(faces.size(), faces.size()),
+        representatives;
+    std::vector<size_t> queue;
+    for (size_t i = 0; i < faces.size(); i++) {
+        if (face_group[i] != faces.size()) continue;
+        const size_t group = representatives.size();
+        representatives.push_back(i);
+        double best_area = -1.0;
+        face_group[i] = group;
+        queue = {i};
+        while (!queue.empty()) {
+            const size_t face_id = queue.back();
+            queue.pop_back();
+            const double area =
+                std::abs(split.get_triangle(faces[face_id]).area());
+            if (area > best_area) {
+                best_area = area;
+                representatives[group] = face_id;
+            }
+            for (const auto &edge : faces[face_id].get_edges(false)) {
+                if (on_boundary[edge.a] && on_boundary[edge.b]) continue;
+                for (const auto &other_id : edge_faces[edge]) {
+                    if (face_group[other_id] != faces.size()) continue;
+                    face_group[other_id] = group;
+                    queue.push_back(other_id);
+                }
+            }
+        }
     }
 
+    // Tests the center of each representative face against the other mesh.
+    std::vector<char> group_inside(representatives.size(), false);
+    parallel_chunks(
+        representatives.size(),
+        get_num_threads(num_threads, representatives.size()),
+        [&](size_t chunk, size_t lo, size_t hi) {
+            std::vector<size_t> other_face_ids;
+            for (size_t i = lo; i < hi; i++) {
+                const auto center =
+                    split.get_triangle(faces[representatives[i]]).center();
+                other_face_ids.clear();
+                group_inside[i] = other_bvh.point_intersection_indices(
+                                      center, other_face_ids, 1) > 0;
+            }
+        });
+
+    std::vector<bool> inside(faces.size());
+    for (size_t i = 0; i < faces.size(); i++)
+        inside[i] = group_inside[face_group[i]];
+    return inside;
+}
+
+trimesh_2d_t mesh_op(const trimesh_2d_t &mesh_a, const trimesh_2d_t &mesh_b,
+                     boolean_2d_op op, bool validate, bool cleanup,
+                     size_t num_threads) {
+    // Splits A at the edges of B, and classifies each face of the split mesh
+    // as inside or outside B. Only the faces of A are kept, so B doesn't
+    // need to be split.
+    const trimesh_2d_t a_split =
+        split_at_all_intersections(mesh_a, mesh_b, num_threads);
+    const bvh_2d_t b_bvh(mesh_b);
+    const std::vector<bool> a_face_inside =
+        classify_faces(a_split, mesh_b, b_bvh, num_threads);
+
     // Adds all vertices from A to the new mesh. We will clean up unused
     // vertices later.
     std::vector<point_2d_t> vertices;
@@ -151,29 +272,35 @@ trimesh_2d_t combine(const trimesh_2d_t &a, const trimesh_2d_t &b,
     }
 }
 
-trimesh_2d_t mesh_union(const trimesh_2d_t &a, const trimesh_2d_t &b) {
-    auto c = mesh_op(b, a, COMPLEMENT, false, false);
-    auto d = mesh_op(a, b, COMPLEMENT, false, false);
-    auto e = mesh_op(a, b, INTERSECTION, false, false);
+trimesh_2d_t mesh_union(const trimesh_2d_t &a, const trimesh_2d_t &b,
+                        size_t num_threads) {
+    auto c = mesh_op(b, a, COMPLEMENT, false, false, num_threads);
+    auto d = mesh_op(a, b, COMPLEMENT, false, false, num_threads);
+    auto e = mesh_op(a, b, INTERSECTION, false, false, num_threads);
     auto f = combine(c, d, false, false);
     return combine(f, e, true, true);
     return c;
 }
 
-trimesh_2d_t mesh_intersection(const trimesh_2d_t &a, const trimesh_2d_t &b) {
-    return mesh_op(a, b, INTERSECTION, true, true);
+trimesh_2d_t mesh_intersection(const trimesh_2d_t &a, const trimesh_2d_t &b,
+                               size_t num_threads) {
+    return mesh_op(a, b, INTERSECTION, true, true, num_threads);
 }
 
-trimesh_2d_t mesh_difference(const trimesh_2d_t &a, const trimesh_2d_t &b) {
-    return mesh_op(a, b, COMPLEMENT, true, true);
+trimesh_2d_t mesh_difference(const trimesh_2d_t &a, const trimesh_2d_t &b,
+                             size_t num_threads) {
+    return mesh_op(a, b, COMPLEMENT, true, true, num_threads);
 }
 
 void add_2d_boolean_modules(py::module &m) {
-    m.def("union", &mesh_union, "Union of two meshes", "a"_a, "b"_a);
+    m.def("union", &mesh_union, "Union of two meshes", "a"_a, "b"_a,
+          "num_threads"_a = 1, py::call_guard<py::gil_scoped_release>());
     m.def("intersection", &mesh_intersection, "Intersection of two meshes",
-          "a"_a, "b"_a);
+          "a"_a, "b"_a, "num_threads"_a = 1,
+          py::call_guard<py::gil_scoped_release>());
     m.def("difference", &mesh_difference, "Difference of two meshes", "a"_a,
-          "b"_a);
+          "b"_a, "num_threads"_a = 1,
+          py::call_guard<py::gil_scoped_release>());
 }
 
 }  // namespace trimesh
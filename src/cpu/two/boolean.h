@@ -10,9 +10,15 @@ namespace py = pybind11;
 
 namespace trimesh {
 
-trimesh_2d_t mesh_union(const trimesh_2d_t &a, const trimesh_2d_t &b);
-trimesh_2d_t mesh_intersection(const trimesh_2d_t &a, const trimesh_2d_t &b);
-trimesh_2d_t mesh_difference(const trimesh_2d_t &a, const trimesh_2d_t &b);
+// The `num_threads` argument sets how many threads to use when splitting the
+// faces of the two meshes, where 0 means one per hardware thread. The output
+// is the same regardless of the number of threads.
+trimesh_2d_t mesh_union(const trimesh_2d_t &a, const trimesh_2d_t &b,
+                        size_t num_threads = 1);
+trimesh_2d_t mesh_intersection(const trimesh_2d_t &a, const trimesh_2d_t &b,
+                               size_t num_threads = 1);
+trimesh_2d_t mesh_difference(const trimesh_2d_t &a, const trimesh_2d_t &b,
+                             size_t num_threads = 1);
 
 void add_2d_boolean_modules(py::module &m);
 
@@ -1,12 +1,19 @@
 #include "bvh.h"
 
+#include <algorithm>
+#include <array>
 #include <iostream>
+#include <limits>
 #include <numeric>
+#include <optional>
 #include <queue>
 #include <sstream>
 #include <unordered_set>
 
 #include "../options.h"
+#include "../parallel.h"
+#include "../pickle.h"
+#include "../predicates.h"
 
 using namespace pybind11::literals;
 
@@ -16,62 +23,61 @@ namespace trimesh {
  * point_2d_set_t *
  * -------------- */
 
-point_2d_set_t::point_2d_set_t(const std::initializer_list<point_2d_t> &points)
-    : points(points) {
-    for (size_t i = 0; i < this->points.size(); ++i)
-        this->indices[this->points[i]] = i;
+point_2d_set_t::point_2d_set_t(
+    const std::initializer_list<point_2d_t> &points) {
+    for (const auto &p : points) this->welder.insert(p);
 }
 
-point_2d_t point_2d_set_t::operator[](size_t i) const { return points[i]; }
+point_2d_set_t::point_2d_set_t(double tolerance) : welder(tolerance) {}
+
+point_2d_t point_2d_set_t::operator[](size_t i) const {
+    return welder.points[i];
+}
 
 size_t point_2d_set_t::add_point(const point_2d_t &p) {
-    if (auto it = point_id(p); it.has_value()) return it.value();
-    points.push_back(p);
-    indices[p] = points.size() - 1;
-    return points.size() - 1;
+    return welder.add_point(p);
 }
 
-size_t point_2d_set_t::size() const { return points.size(); }
+size_t point_2d_set_t::size() const { return welder.size(); }
 
 size_t point_2d_set_t::get_point(const point_2d_t &p) const {
-    return indices.at(p);
+    if (auto i = welder.find(p); i) return *i;
+    throw std::out_of_range("Point " + p.to_string() + " is not in the set");
 }
 
-point_2d_t point_2d_set_t::get_point(size_t i) const { return points[i]; }
+point_2d_t point_2d_set_t::get_point(size_t i) const {
+    return welder.points[i];
+}
 
 std::optional<size_t> point_2d_set_t::point_id(const point_2d_t &p) const {
-    if (auto it = indices.find(p); it != indices.end()) return it->second;
-    return std::nullopt;
+    return welder.find(p);
 }
 
 const std::vector<point_2d_t> &point_2d_set_t::get_points() const {
-    return points;
+    return welder.points;
 }
 
 /* ------------------------ *
  * triangle_split_tree_2d_t *
  * ------------------------ */
 
+// Where the end of a cut lies relative to the triangle being split.
+enum split_location_t { ON_CORNER, ON_EDGE, ON_INTERIOR };
+
 triangle_split_tree_2d_t::triangle_split_tree_2d_t(
     const face_t &root, const std::vector<point_2d_t> &vertices)
-    : root(root) {
+    : root(root), vertices(0.0) {
+    // Only identical points are merged within the tree, since welding nearby
+    // points could fold children over each other. Nearby points from
+    // different trees are welded when the split mesh is put together.
     this->faces = {{0, 1, 2}};
     this->children = {{}};
     auto &[a, b, c] = root;
-    this->vertices = {vertices[a], vertices[b], vertices[c]};
+    for (const auto &v : {a, b, c}) this->vertices.add_point(vertices[v]);
 }
 
 void triangle_split_tree_2d_t::add_triangle(const face_t &f,
                                             const size_t parent) {
-    triangle_2d_t t{vertices[f.a], vertices[f.b], vertices[f.c]},
-        pt{vertices[faces[parent].a], vertices[faces[parent].b],
-           vertices[faces[parent].c]};
-    if (t.area() < std::sqrt(get_tolerance())) return;
-    if (t.is_clockwise() != pt.is_clockwise()) {
-        throw std::runtime_error(
-            "Child faces are not oriented the same as the parent face.");
-    }
-
     this->faces.push_back({f.a, f.b, f.c});
     this->children.push_back(std::vector<size_t>{});
     this->children[parent].push_back(this->children.size() - 1);
@@ -89,12 +95,30 @@ void triangle_split_tree_2d_t::add_triangles(const std::vector<face_t> &fs,
 
     const auto &parent_face = this->faces[parent];
     const auto parent_triangle = get_triangle(parent);
+    const double parent_orientation =
+        orient_2d(parent_triangle.p1, parent_triangle.p2, parent_triangle.p3);
+
+    // Children with a repeated corner, or which are exactly flat, are empty,
+    // so they are dropped without losing any area. If any other child is
+    // flipped, a new point was rounded across an edge of the parent, so the
+    // cut is skipped rather than dropping part of the parent.
+    std::vector<face_t> kept;
+    for (const auto &f : fs) {
+        if (f.a == f.b || f.b == f.c || f.c == f.a) continue;
+        const auto t = get_triangle_from_face(f);
+        const double orientation =
+            orient_2d(t.p1, t.p2, t.p3) * parent_orientation;
+        if (orientation < 0.0) return;
+        if (orientation > 0.0) kept.push_back(f);
+    }
+    if (kept.size() < 2) return;
+
     const auto parent_area = parent_triangle.area();
     const auto &parent_vertices = parent_triangle.vertices();
 
     // Checks that all non-shared vertices of the parent face are contained in
     // the child faces.
-    for (const auto &f : fs) {
+    for (const auto &f : kept) {
         const auto &child_vertices = get_triangle_from_face(f).vertices();
         for (const auto &v : parent_vertices) {
             if (std::find(child_vertices.begin(), child_vertices.end(), v) ==
@@ -113,21 +137,21 @@ void triangle_split_tree_2d_t::add_triangles(const std::vector<face_t> &fs,
     // Checks that the signed area of each child equals the signed area of the
     // parent.
     const auto child_area = std::accumulate(
-        fs.begin(), fs.end(), 0.0, [&](double area, const face_t &f) {
+        kept.begin(), kept.end(), 0.0, [&](double area, const face_t &f) {
             return area + get_triangle_from_face(f).area();
         });
     if (std::abs(parent_area - child_area) > std::sqrt(get_tolerance())) {
         std::stringstream ss;
         ss << "Child faces do not have the same area as the parent face. "
            << "Parent area: " << parent_area << ". Child areas:";
-        for (const auto &f : fs) {
+        for (const auto &f : kept) {
             ss << " " << get_triangle_from_face(f).area();
         }
         ss << " (sum: " << child_area << ").";
         throw std::runtime_error(ss.str());
     }
 
-    for (auto &f : fs) add_triangle(f, parent);
+    for (auto &f : kept) add_triangle(f, parent);
 }
 
 size_t triangle_split_tree_2d_t::add_point(const point_2d_t &p) {
@@ -231,95 +255,106 @@ void triangle_split_tree_2d_t::split_triangle(const point_2d_t &p, size_t i) {
 void triangle_split_tree_2d_t::split_triangle(const line_2d_t &l, size_t i) {
     const auto f = faces[i];
     const auto t = get_triangle(i);
+    const std::array<size_t, 3> ids{f.a, f.b, f.c};
+    const std::array<point_2d_t, 3> ps{t.p1, t.p2, t.p3};
+    const double tol = get_tolerance(),
+                 sign = orient_2d(t.p1, t.p2, t.p3) < 0.0 ? -1.0 : 1.0;
+
+    // Signed distance from a point to edge `k`, which runs from corner `k`
+    // to corner `k + 1`. The distance is positive inside the triangle.
+    auto edge_distance = [&](size_t k, const point_2d_t &p) {
+        const auto edge = ps[(k + 1) % 3] - ps[k];
+        return sign * edge.cross(p - ps[k]) / edge.length();
+    };
 
-    // Gets the intersection points the line and each edge of the triangle.
-    line_2d_t l1{t.p1, t.p2}, l2{t.p2, t.p3}, l3{t.p3, t.p1};
-    auto i1 = l1.line_intersection(l), i2 = l2.line_intersection(l),
-         i3 = l3.line_intersection(l);
-
-    // Invariant views of the triangle to check.
-    std::vector<std::tuple<std::optional<point_2d_t>, std::optional<point_2d_t>,
-                           size_t, size_t, size_t>>
-        invariants{{i1, i2, f.a, f.b, f.c},
-                   {i2, i3, f.b, f.c, f.a},
-                   {i3, i1, f.c, f.a, f.b}};
-
-    // Cuts the triangle when it passes through two intersections.
-    bool intersects_corner = false;
-    for (auto &[ia, ib, fa, fb, fc] : invariants) {
-        if (ia.has_value() && ib.has_value()) {
-            if (ia.value() == ib.value()) {
-                intersects_corner = true;
-                continue;
+    // Clips the line to the triangle. Endpoints within the tolerance of an
+    // edge are snapped onto it, so that lines which end on an edge or run
+    // along it are not clipped away.
+    double t_lo = 0.0, t_hi = 1.0;
+    for (size_t k = 0; k < 3; k++) {
+        double d1 = edge_distance(k, l.p1), d2 = edge_distance(k, l.p2);
+        if (d1 > -tol) d1 = std::max(d1, 0.0);
+        if (d2 > -tol) d2 = std::max(d2, 0.0);
+        if (d1 < 0.0 && d2 < 0.0) return;
+        if (d1 < 0.0) t_lo = std::max(t_lo, d1 / (d1 - d2));
+        if (d2 < 0.0) t_hi = std::min(t_hi, d1 / (d1 - d2));
+    }
+    if (t_lo > t_hi) return;
+    const point_2d_t q1 = l.p1 + t_lo * (l.p2 - l.p1),
+                     q2 = l.p1 + t_hi * (l.p2 - l.p1);
+
+    // Locates each end of the clipped line on a corner, on an edge or in the
+    // interior of the triangle. Ends within the tolerance of a corner or an
+    // edge are snapped onto it, so that no cut is made right next to an
+    // existing corner or edge.
+    auto locate =
+        [&](const point_2d_t &q) -> std::pair<split_location_t, size_t> {
+        for (size_t k = 0; k < 3; k++)
+            if (q.distance_to_point(ps[k]) < tol) return {ON_CORNER, k};
+        size_t nearest = 0;
+        double nearest_distance = std::numeric_limits<double>::infinity();
+        for (size_t k = 0; k < 3; k++) {
+            const double d = std::abs(edge_distance(k, q));
+            if (d < nearest_distance) {
+                nearest = k;
+                nearest_distance = d;
             }
-
-            auto new_point_1 = add_point(ia.value()),
-                 new_point_2 = add_point(ib.value());
-            add_triangles({{fa, new_point_1, new_point_2},
-                           {new_point_1, fb, new_point_2},
-                           {new_point_2, fc, fa}},
-                          i);
-            return;
         }
-    }
-
-    // Lines which just intersect at a corner are ignored.
-    if (intersects_corner) return;
-
-    bool p1_in_t = t.contains_point(l.p1), p2_in_t = t.contains_point(l.p2);
+        if (nearest_distance < tol) return {ON_EDGE, nearest};
+        return {ON_INTERIOR, 0};
+    };
+    const auto [loc1, k1] = locate(q1);
+    const auto [loc2, k2] = locate(q2);
 
-    // Cuts the triangle when it passes through a single intersection.
-    for (auto &[ia, ib, fa, fb, fc] : invariants) {
-        if (ia.has_value()) {
-            // Checks that at least one of the points is inside or on an edge.
-            if (!p1_in_t && !p2_in_t)
-                throw std::runtime_error("Unexpected intersection");
+    // Projects a point onto edge `k`.
+    auto on_edge = [&](size_t k, const point_2d_t &q) {
+        return line_2d_t{ps[k], ps[(k + 1) % 3]}.closest_point(q);
+    };
 
-            // Chooses an inside and outside point (although the outside point
-            // may actually be the intersection point).
-            std::optional<point_2d_t> p_in = std::nullopt;
-            if (p1_in_t && l.p1 != ia.value())
-                p_in = l.p1;
-            else if (p2_in_t && l.p2 != ia.value())
-                p_in = l.p2;
+    // Splits edge `k` at `q`, connecting it to the opposite corner.
+    auto split_edge = [&](size_t k, const point_2d_t &q) {
+        const size_t fa = ids[k], fb = ids[(k + 1) % 3], fc = ids[(k + 2) % 3];
+        const size_t fq = add_point(on_edge(k, q));
+        add_triangles({{fa, fq, fc}, {fb, fc, fq}}, i);
+    };
 
-            if (!p_in.has_value()) {
-                auto fi = add_point(ia.value());
-                add_triangles({{fa, fi, fc}, {fb, fc, fi}}, i);
-            } else {
-                auto fi = add_point(ia.value());
-                auto fp = add_point(p_in.value());
-                add_triangles(
-                    {{fa, fi, fp}, {fa, fp, fc}, {fb, fp, fi}, {fb, fc, fp}},
-                    i);
-            }
+    // Lines which just touch the triangle split the edge they touch, so that
+    // the split matches the neighboring triangle, and are otherwise ignored.
+    if (q1.distance_to_point(q2) < tol) {
+        if (loc1 == ON_EDGE) split_edge(k1, q1);
+        return;
+    }
 
-            return;
-        }
+    // Splits the triangle at an interior end of the line, and then splits
+    // the new children which the rest of the line passes through.
+    if (loc1 == ON_INTERIOR || loc2 == ON_INTERIOR) {
+        const size_t fq = add_point(loc1 == ON_INTERIOR ? q1 : q2);
+        add_triangles({{f.a, f.b, fq}, {f.b, f.c, fq}, {f.c, f.a, fq}}, i);
+        const auto children = this->children[i];
+        for (const auto &child : children) split_triangle(l, child);
+        return;
     }
 
-    // Cuts the triangle when both points are entirely inside.
-    if (p1_in_t && p2_in_t) {
-        auto new_point_1 = add_point(l.p1), new_point_2 = add_point(l.p2);
-        line_2d_t l_p1_b{l.p1, this->vertices[f.b]},
-            l_p2_c{l.p2, this->vertices[f.c]};
-        if (l_p1_b.line_intersection(l_p2_c).has_value()) {
-            add_triangles({{f.a, new_point_1, new_point_2},
-                           {f.a, new_point_1, f.c},
-                           {f.a, new_point_2, f.b}},
-                          i);
-        } else {
-            add_triangles({{f.a, new_point_1, new_point_2},
-                           {f.a, new_point_1, f.b},
-                           {f.a, new_point_2, f.c}},
-                          i);
-        }
+    // Cuts from a corner to the opposite edge split that edge. Lines between
+    // two corners, or from a corner along one of its edges, are already
+    // edges of the triangle.
+    if (loc1 == ON_CORNER || loc2 == ON_CORNER) {
+        const auto [corner, other_loc, other_k, other_q] =
+            loc1 == ON_CORNER ? std::make_tuple(k1, loc2, k2, q2)
+                              : std::make_tuple(k2, loc1, k1, q1);
+        if (other_loc == ON_EDGE && other_k == (corner + 1) % 3)
+            split_edge(other_k, other_q);
         return;
     }
 
-    // Throw an error because we should only be considering splitting
-    // for lines which intersect a triangle.
-    throw std::runtime_error("Triangle split failed.");
+    // Cuts between two different edges split off the corner they share.
+    if (k1 == k2) return;
+    const bool forward = (k1 + 1) % 3 == k2;
+    const size_t k = forward ? k1 : k2;
+    const size_t fa = ids[k], fb = ids[(k + 1) % 3], fc = ids[(k + 2) % 3];
+    const size_t n1 = add_point(on_edge(k, forward ? q1 : q2)),
+                 n2 = add_point(on_edge((k + 1) % 3, forward ? q2 : q1));
+    add_triangles({{fa, n1, n2}, {n1, fb, n2}, {n2, fc, fa}}, i);
 }
 
 const face_t &triangle_split_tree_2d_t::get_face(size_t i) const {
@@ -390,46 +425,109 @@ const size_t triangle_split_tree_2d_t::count_leaf_triangles() const {
 
 void delaunay_split_tree_2d_t::make_delaunay(const size_t &pi, const edge_t &e,
                                              const size_t &ti) {
-    const auto e_rev = e.flip();
-
-    if (this->edge_to_face.find(e_rev) == this->edge_to_face.end()) {
+    const auto edges = this->faces[ti].get_edges(true);
+    const size_t k = std::find(edges.begin(), edges.end(), e) - edges.begin();
+    if (k == edges.size() || this->neighbors[ti][k] == NO_NEIGHBOR) {
         return;
     }
 
-    size_t tj = this->edge_to_face[e_rev];
+    const auto e_rev = e.flip();
+    size_t tj = this->neighbors[ti][k];
     const auto &tj_face = this->faces[tj];
     const auto &tj_tri = this->get_triangle(tj_face);
 
-    if (tj_tri.circumcircle_contains(this->vertices[pi], -get_tolerance())) {
-        const auto &pj = tj_face.get_other_vertex(e_rev);
-        const auto tk = this->add_triangle({pi, pj, e.b}, {ti, tj}),
-                   tl = this->add_triangle({pj, pi, e.a}, {ti, tj});
+    // Ties between cocircular points are broken by symbolic perturbation, so
+    // that the result doesn't depend on the insertion order.
+    if (in_circle_perturbed(tj_tri.p1, tj_tri.p2, tj_tri.p3,
+                            this->vertices[pi]) > 0) {
+        const auto pj = tj_face.get_other_vertex(e_rev);
+        const auto ts =
+            this->add_triangles({{pi, pj, e.b}, {pj, pi, e.a}}, {ti, tj});
 
-        this->make_delaunay(pi, {e.a, pj, true}, tl);
-        this->make_delaunay(pi, {pj, e.b, true}, tk);
+        this->make_delaunay(pi, {e.a, pj, true}, ts[1]);
+        this->make_delaunay(pi, {pj, e.b, true}, ts[0]);
     }
 }
 
-size_t delaunay_split_tree_2d_t::add_triangle(
-    const face_t &f, const std::vector<size_t> &parents) {
-    const size_t i = this->faces.size();
+std::vector<size_t> delaunay_split_tree_2d_t::add_triangles(
+    const std::vector<face_t> &fs, const std::vector<size_t> &parents) {
+    // The new triangles are added as one contiguous range, which becomes
+    // the children of every parent.
+    const child_range_t range{this->faces.size(),
+                              this->faces.size() + fs.size()};
+    std::vector<size_t> indices;
+    for (const auto &f : fs) {
+        indices.push_back(this->faces.size());
+        this->faces.push_back(f);
+        this->children.push_back({});
+        this->neighbors.push_back({NO_NEIGHBOR, NO_NEIGHBOR, NO_NEIGHBOR});
+    }
+    for (const auto &parent : parents) this->children[parent] = range;
+
+    // Links the new triangles to each other, then to the triangles on the
+    // other side of the edges which they share with their parents.
+    edge_map_t<std::pair<size_t, size_t>> open_edges;
+    for (size_t i = range.begin; i < range.end; i++) {
+        const auto edges = this->faces[i].get_edges(true);
+        for (size_t k = 0; k < edges.size(); k++) {
+            auto it = open_edges.find(edges[k].flip());
+            if (it == open_edges.end()) {
+                open_edges.emplace(edges[k], std::make_pair(i, k));
+                continue;
+            }
+            const auto [j, l] = it->second;
+            this->neighbors[i][k] = j;
+            this->neighbors[j][l] = i;
+            open_edges.erase(it);
+        }
+    }
     for (const auto &parent : parents) {
-        this->children[parent].push_back(i);
+        const auto edges = this->faces[parent].get_edges(true);
+        for (size_t k = 0; k < edges.size(); k++) {
+            const size_t n = this->neighbors[parent][k];
+            if (n == NO_NEIGHBOR || !this->is_leaf(n)) continue;
+            auto it = open_edges.find(edges[k]);
+            const size_t j =
+                it == open_edges.end() ? NO_NEIGHBOR : it->second.first;
+            if (j != NO_NEIGHBOR) this->neighbors[j][it->second.second] = n;
+            for (auto &m : this->neighbors[n])
+                if (m == parent) m = j;
+        }
     }
-    this->faces.push_back(f);
-    for (const auto &edge : f.get_edges(true)) {
-        this->edge_to_face[edge] = i;
+
+    this->num_leaves += indices.size();
+    this->num_leaves -= parents.size();
+    this->last_leaf = indices.back();
+    return indices;
+}
+
+void delaunay_split_tree_2d_t::compact() {
+    // Drops the triangles which have been replaced, keeping the leaves in
+    // the same order and remapping the neighbors to their new indices.
+    std::vector<size_t> ids(this->faces.size(), NO_NEIGHBOR);
+    size_t n = 0;
+    for (size_t i = 0; i < this->faces.size(); i++) {
+        if (!this->is_leaf(i)) continue;
+        ids[i] = n;
+        this->faces[n] = this->faces[i];
+        this->neighbors[n] = this->neighbors[i];
+        n++;
     }
-    this->children.push_back({});
-    return i;
+    this->faces.erase(this->faces.begin() + n, this->faces.end());
+    this->neighbors.erase(this->neighbors.begin() + n, this->neighbors.end());
+    this->children.assign(n, {});
+    for (auto &ns : this->neighbors)
+        for (auto &j : ns)
+            if (j != NO_NEIGHBOR) j = ids[j];
+    this->last_leaf = ids[this->last_leaf];
 }
 
-delaunay_split_tree_2d_t::delaunay_split_tree_2d_t(const triangle_2d_t &root)
-    : root(root) {
+delaunay_split_tree_2d_t::delaunay_split_tree_2d_t(const triangle_2d_t &root,
+                                                   bool keep_history)
+    : root(root), keep_history(keep_history) {
     this->faces = {{0, 1, 2}};
-    for (const auto &edge : this->faces[0].get_edges(true))
-        this->edge_to_face[edge] = 0;
     this->children = {{}};
+    this->neighbors = {{NO_NEIGHBOR, NO_NEIGHBOR, NO_NEIGHBOR}};
     this->vertices = {root.p1, root.p2, root.p3};
 }
 
@@ -438,12 +536,32 @@ bool delaunay_split_tree_2d_t::is_leaf(size_t i) const {
 }
 
 size_t delaunay_split_tree_2d_t::find_leaf_index(const point_2d_t &p) const {
+    // Without the split history, every leaf has to be checked.
+    if (!this->keep_history) {
+        double min_dist = std::numeric_limits<double>::max();
+        size_t min_index = 0;
+        for (size_t i = 0; i < this->faces.size(); i++) {
+            if (!is_leaf(i)) continue;
+            double t_dist = p.distance_to_triangle(this->get_triangle(i));
+            if (t_dist < min_dist) {
+                min_dist = t_dist;
+                min_index = i;
+            }
+        }
+        if (min_dist > get_tolerance()) {
+            throw std::runtime_error("Could not find leaf triangle for point " +
+                                     p.to_string());
+        }
+        return min_index;
+    }
+
     size_t i = 0;
     while (!is_leaf(i)) {
         // Gets the closest triangle to the point.
+        const auto &range = this->children[i];
         double min_dist = std::numeric_limits<double>::max();
         size_t min_index = 0;
-        for (const auto &child_id : this->children[i]) {
+        for (size_t child_id = range.begin; child_id < range.end; child_id++) {
             const auto &child = this->faces[child_id];
             const triangle_2d_t t{this->vertices[child.a],
                                   this->vertices[child.b],
@@ -459,9 +577,10 @@ size_t delaunay_split_tree_2d_t::find_leaf_index(const point_2d_t &p) const {
             std::ostringstream ss;
             ss << "Could not find leaf triangle for point " << p.to_string()
                << " in triangle " << this->get_triangle(i).to_string()
-               << " with " << this->children[i].size()
+               << " with " << range.end - range.begin
                << " children:" << std::endl;
-            for (const auto &child_id : this->children[i]) {
+            for (size_t child_id = range.begin; child_id < range.end;
+                 child_id++) {
                 ss << " - " << this->get_triangle(child_id).to_string()
                    << " (dist: "
                    << p.distance_to_triangle(this->get_triangle(child_id))
@@ -475,10 +594,49 @@ size_t delaunay_split_tree_2d_t::find_leaf_index(const point_2d_t &p) const {
     return i;
 }
 
+size_t delaunay_split_tree_2d_t::walk_to_leaf(const point_2d_t &p) const {
+    // Walks over the current leaves, starting from the most recently added
+    // one, by crossing an edge which separates the point from the rest of the
+    // triangle until there are none left. The walk never goes straight back
+    // across the edge it came through, and starts checking from a random
+    // edge at each step, so that it can't get stuck in a cycle on
+    // near-degenerate inputs. If it takes too long, this falls back to
+    // `find_leaf_index`.
+    size_t i = this->last_leaf, previous = NO_NEIGHBOR;
+    uint32_t state = 2463534242u;
+    for (size_t step = 0; step < this->num_leaves; step++) {
+        const auto &face = this->faces[i];
+        const auto edges = face.get_edges(true);
+        std::optional<size_t> next;
+        state ^= state << 13;
+        state ^= state >> 17;
+        state ^= state << 5;
+        for (size_t k = 0; k < edges.size() && !next; k++) {
+            const size_t j = (k + state) % edges.size();
+            const size_t n = this->neighbors[i][j];
+            if (n == NO_NEIGHBOR || n == previous) continue;
+            const auto &e = edges[j];
+            const point_2d_t a = this->vertices[e.a], b = this->vertices[e.b],
+                             c = this->vertices[face.get_other_vertex(e)];
+            const double side = orient_2d(a, b, p), inside = orient_2d(a, b, c);
+            if ((side < 0 && inside > 0) || (side > 0 && inside < 0)) next = n;
+        }
+        if (!next) return i;
+        previous = i;
+        i = *next;
+    }
+    return find_leaf_index(p);
+}
+
 const face_t &delaunay_split_tree_2d_t::get_face(size_t i) const {
     return this->faces[i];
 }
 
+const std::array<size_t, 3> &delaunay_split_tree_2d_t::get_neighbors(
+    size_t i) const {
+    return this->neighbors[i];
+}
+
 triangle_2d_t delaunay_split_tree_2d_t::get_triangle(const face_t &f) const {
     return triangle_2d_t{this->vertices[f.a], this->vertices[f.b],
                          this->vertices[f.c]};
@@ -508,51 +666,68 @@ void delaunay_split_tree_2d_t::split_triangle(const point_2d_t &p, size_t i,
     //     throw std::runtime_error(ss.str());
     // }
 
+    // Points which are already in the tree don't change the triangulation.
     const auto [fa, fb, fc] = this->faces[i];
-    const auto &va = this->vertices[fa], &vb = this->vertices[fb],
-               &vc = this->vertices[fc];
-    if (p == va || p == vb || p == vc) return;
+    if (this->vertices.point_id(p)) return;
     const auto pi = this->vertices.add_point(p);
 
     // Checks if the point intersects an edge.
-    for (const auto [ea, eb, directed] : this->faces[i].get_edges(true)) {
-        const auto &v1 = this->vertices[ea], &v2 = this->vertices[eb];
-        const line_2d_t l{v1, v2};
-        if (l.closest_point(p) == p) {
-            const edge_t e{ea, eb, directed}, e_rev{eb, ea, directed};
-            const size_t j = this->edge_to_face[e_rev];
-            const size_t pc = this->faces[i].get_other_vertex(e),
-                         pn = this->faces[j].get_other_vertex(e_rev);
-
-            // Splits each triangle.
-            const auto t1 = this->add_triangle({pi, pc, ea}, {i}),
-                       t2 = this->add_triangle({pi, eb, pc}, {i}),
-                       t3 = this->add_triangle({pi, ea, pn}, {j}),
-                       t4 = this->add_triangle({pi, pn, eb}, {j});
-
-            // Makes the new triangles Delaunay.
+    const auto edges = this->faces[i].get_edges(true);
+    bool on_edge = false;
+    for (size_t k = 0; k < edges.size() && !on_edge; k++) {
+        const auto [ea, eb, directed] = edges[k];
+        if (orient_2d(this->vertices[ea], this->vertices[eb], p) != 0) continue;
+        on_edge = true;
+
+        const edge_t e{ea, eb, directed}, e_rev{eb, ea, directed};
+        const size_t j = this->neighbors[i][k];
+        const size_t pc = this->faces[i].get_other_vertex(e);
+
+        // Splits each triangle. An edge on the boundary only has one.
+        if (j == NO_NEIGHBOR) {
+            const auto ts =
+                this->add_triangles({{pi, pc, ea}, {pi, eb, pc}}, {i});
             if (make_delaunay) {
-                this->make_delaunay(pi, {pc, ea, true}, t1);
-                this->make_delaunay(pi, {eb, pc, true}, t2);
-                this->make_delaunay(pi, {ea, pn, true}, t3);
-                this->make_delaunay(pi, {pn, eb, true}, t4);
+                this->make_delaunay(pi, {pc, ea, true}, ts[0]);
+                this->make_delaunay(pi, {eb, pc, true}, ts[1]);
             }
-
-            return;
+            continue;
+        }
+        const size_t pn = this->faces[j].get_other_vertex(e_rev);
+        const auto ts = this->add_triangles(
+            {{pi, pc, ea}, {pi, eb, pc}, {pi, ea, pn}, {pi, pn, eb}}, {i, j});
+
+        // Makes the new triangles Delaunay.
+        if (make_delaunay) {
+            this->make_delaunay(pi, {pc, ea, true}, ts[0]);
+            this->make_delaunay(pi, {eb, pc, true}, ts[1]);
+            this->make_delaunay(pi, {ea, pn, true}, ts[2]);
+            this->make_delaunay(pi, {pn, eb, true}, ts[3]);
         }
     }
 
-    // Splits the current triangle.
-    const auto t1 = this->add_triangle({fa, fb, pi}, {i});
-    const auto t2 = this->add_triangle({fb, fc, pi}, {i});
-    const auto t3 = this->add_triangle({fc, fa, pi}, {i});
+    if (!on_edge) {
+        // Splits the current triangle.
+        const auto ts = this->add_triangles(
+            {{fa, fb, pi}, {fb, fc, pi}, {fc, fa, pi}}, {i});
 
-    // Makes the new triangles Delaunay.
-    if (make_delaunay) {
-        this->make_delaunay(pi, {fa, fb, true}, t1);
-        this->make_delaunay(pi, {fb, fc, true}, t2);
-        this->make_delaunay(pi, {fc, fa, true}, t3);
+        // Makes the new triangles Delaunay.
+        if (make_delaunay) {
+            this->make_delaunay(pi, {fa, fb, true}, ts[0]);
+            this->make_delaunay(pi, {fb, fc, true}, ts[1]);
+            this->make_delaunay(pi, {fc, fa, true}, ts[2]);
+        }
     }
+
+    // Without the history, the replaced triangles are dropped once they
+    // outnumber the leaves, so compaction is amortized over the insertions.
+    if (!this->keep_history && this->faces.size() > 2 * this->num_leaves)
+        this->compact();
+}
+
+void delaunay_split_tree_2d_t::discard_history() {
+    this->keep_history = false;
+    this->compact();
 }
 
 const point_2d_set_t &delaunay_split_tree_2d_t::get_vertices() const {
@@ -563,194 +738,404 @@ const point_2d_set_t &delaunay_split_tree_2d_t::get_vertices() const {
  * bvh_2d_t *
  * -------- */
 
-void sort_bounding_boxes_for_bvh(const std::vector<bounding_box_2d_t> &boxes,
-                                 std::vector<size_t> &indices, bvh_tree_t &tree,
-                                 size_t lo, size_t hi) {
-    if (hi - lo < 2) {
-        tree[lo] = {indices[lo], -1, -1, boxes[indices[lo]]};
-        return;
-    }
+// Number of bins used to evaluate the surface area heuristic.
+constexpr size_t BVH_2D_NUM_BINS = 16;
 
-    double min_x = std::numeric_limits<double>::max(),
-           min_y = std::numeric_limits<double>::max(),
-           max_x = std::numeric_limits<double>::lowest(),
-           max_y = std::numeric_limits<double>::lowest();
-    for (size_t i = lo; i < hi; i++) {
-        const auto &box = boxes[indices[i]];
-        min_x = std::min(min_x, box.min.x);
-        min_y = std::min(min_y, box.min.y);
-        max_x = std::max(max_x, box.max.x);
-        max_y = std::max(max_y, box.max.y);
+// Below this depth, nodes are always split at the median, which bounds the
+// depth of the tree and therefore the size of the traversal stack.
+constexpr size_t BVH_2D_MAX_SAH_DEPTH = 32;
+constexpr size_t BVH_2D_STACK_SIZE = BVH_2D_MAX_SAH_DEPTH + 64;
+
+bounding_box_2d_t merge_bounding_boxes(const bounding_box_2d_t &a,
+                                       const bounding_box_2d_t &b) {
+    return {{std::min(a.min.x, b.min.x), std::min(a.min.y, b.min.y)},
+            {std::max(a.max.x, b.max.x), std::max(a.max.y, b.max.y)}};
+}
+
+// In 2D, the analogue of the surface area of a box is its perimeter.
+double half_perimeter(const bounding_box_2d_t &box) {
+    return (box.max.x - box.min.x) + (box.max.y - box.min.y);
+}
+
+size_t bvh_2d_t::build(const std::vector<bounding_box_2d_t> &face_boxes,
+                       const std::vector<point_2d_t> &centroids, size_t lo,
+                       size_t hi, size_t leaf_size, bool use_sah,
+                       size_t depth) {
+    // Gets the bounds of the faces and of their centroids.
+    bounding_box_2d_t box = face_boxes[indices[lo]],
+                      centroid_box{centroids[indices[lo]],
+                                   centroids[indices[lo]]};
+    for (size_t i = lo + 1; i < hi; i++) {
+        box = merge_bounding_boxes(box, face_boxes[indices[i]]);
+        centroid_box = merge_bounding_boxes(
+            centroid_box, {centroids[indices[i]], centroids[indices[i]]});
     }
 
-    double dx = max_x - min_x, dy = max_y - min_y;
-    size_t axis = 0;
-    if (dx < dy) axis = 1;
+    const size_t node = this->boxes.size();
+    this->boxes.push_back(box);
+    this->offsets.push_back(lo);
+    this->counts.push_back(hi - lo);
+    if (hi - lo <= leaf_size) return node;
+
+    // Splits along the axis where the centroids are most spread out.
+    const size_t axis = centroid_box.max.x - centroid_box.min.x <
+                                centroid_box.max.y - centroid_box.min.y
+                            ? 1
+                            : 0;
+    auto get_axis = [&axis](const point_2d_t &p) {
+        return axis == 0 ? p.x : p.y;
+    };
+    const double axis_min = get_axis(centroid_box.min),
+                 axis_extent = get_axis(centroid_box.max) - axis_min;
+
+    size_t mid = hi;
+    if (use_sah && depth < BVH_2D_MAX_SAH_DEPTH && axis_extent > 0) {
+        // Bins the faces by centroid and picks the split between bins which
+        // minimizes the surface area heuristic.
+        auto get_bin = [&](size_t i) {
+            const double t = (get_axis(centroids[i]) - axis_min) / axis_extent;
+            return std::min(static_cast<size_t>(t * BVH_2D_NUM_BINS),
+                            BVH_2D_NUM_BINS - 1);
+        };
+
+        std::vector<std::optional<bounding_box_2d_t>> bin_boxes(
+            BVH_2D_NUM_BINS);
+        std::vector<size_t> bin_counts(BVH_2D_NUM_BINS, 0);
+        for (size_t i = lo; i < hi; i++) {
+            const size_t b = get_bin(indices[i]);
+            const auto &face_box = face_boxes[indices[i]];
+            bin_boxes[b] = bin_boxes[b]
+                               ? merge_bounding_boxes(*bin_boxes[b], face_box)
+                               : face_box;
+            bin_counts[b]++;
+        }
 
-    auto get_axis_vals = [&axis](const bounding_box_2d_t &box) {
-        auto min = box.min, max = box.max;
-        switch (axis) {
-            case 0:
-                return std::make_pair(min.x, max.x);
-            case 1:
-                return std::make_pair(min.y, max.y);
-            default:
-                throw std::runtime_error("Invalid axis.");
+        // Sweeps from the right to get the cost of each right partition.
+        std::vector<double> right_costs(BVH_2D_NUM_BINS, 0.0);
+        std::optional<bounding_box_2d_t> acc;
+        size_t acc_count = 0;
+        for (size_t b = BVH_2D_NUM_BINS - 1; b > 0; b--) {
+            if (bin_boxes[b])
+                acc = acc ? merge_bounding_boxes(*acc, *bin_boxes[b])
+                          : *bin_boxes[b];
+            acc_count += bin_counts[b];
+            right_costs[b] = acc ? half_perimeter(*acc) * acc_count : 0.0;
         }
-    };
 
-    auto get_sort_val = [&boxes, &get_axis_vals](size_t i) {
-        auto [min, max] = get_axis_vals(boxes[i]);
-        return (min + max) / 2;
-    };
+        // Sweeps from the left to find the best split.
+        double best_cost = std::numeric_limits<double>::max();
+        size_t best_bin = 0;
+        acc = std::nullopt;
+        acc_count = 0;
+        for (size_t b = 0; b + 1 < BVH_2D_NUM_BINS; b++) {
+            if (bin_boxes[b])
+                acc = acc ? merge_bounding_boxes(*acc, *bin_boxes[b])
+                          : *bin_boxes[b];
+            acc_count += bin_counts[b];
+            const double cost =
+                (acc ? half_perimeter(*acc) * acc_count : 0.0) +
+                right_costs[b + 1];
+            if (cost < best_cost) {
+                best_cost = cost;
+                best_bin = b;
+            }
+        }
 
-    std::sort(indices.begin() + lo, indices.begin() + hi,
-              [&get_sort_val](const size_t &a, const size_t &b) {
-                  return get_sort_val(a) < get_sort_val(b);
-              });
+        mid = std::partition(indices.begin() + lo, indices.begin() + hi,
+                             [&](size_t i) { return get_bin(i) <= best_bin; }) -
+              indices.begin();
+    }
 
-    size_t mid = (hi - lo + 1) / 2;
-    std::swap(indices[lo], indices[lo + mid]);
-    tree[lo] = {indices[lo],
-                mid == 1 ? -1 : (int)(lo + 1),
-                mid == (hi - lo) ? -1 : (int)(lo + mid),
-                {{min_x, min_y}, {max_x, max_y}}};
+    // Falls back to splitting at the median centroid, which is also used when
+    // the surface area heuristic is disabled or the tree is too deep.
+    if (mid == lo || mid == hi) {
+        mid = lo + (hi - lo) / 2;
+        std::nth_element(indices.begin() + lo, indices.begin() + mid,
+                         indices.begin() + hi,
+                         [&](const size_t &a, const size_t &b) {
+                             return get_axis(centroids[a]) <
+                                    get_axis(centroids[b]);
+                         });
+    }
 
-    sort_bounding_boxes_for_bvh(boxes, indices, tree, lo + 1, lo + mid);
-    sort_bounding_boxes_for_bvh(boxes, indices, tree, lo + mid, hi);
+    this->build(face_boxes, centroids, lo, mid, leaf_size, use_sah,
+                depth + 1);
+    const size_t rhs = this->build(face_boxes, centroids, mid, hi, leaf_size,
+                                   use_sah, depth + 1);
+    this->offsets[node] = rhs;
+    this->counts[node] = 0;
+    return node;
 }
 
-bvh_2d_t::bvh_2d_t(const trimesh_2d_t &t) : bvh_2d_t(t.faces(), t.vertices()) {}
+bvh_2d_t::bvh_2d_t(const trimesh_2d_t &t, size_t leaf_size, bool use_sah)
+    : bvh_2d_t(t.faces(), t.vertices(), leaf_size, use_sah) {}
 
 bvh_2d_t::bvh_2d_t(const face_list_t &faces,
-                   const std::vector<point_2d_t> &vertices)
+                   const std::vector<point_2d_t> &vertices, size_t leaf_size,
+                   bool use_sah)
     : faces(faces), vertices(vertices) {
-    std::vector<bounding_box_2d_t> boxes;
-    for (const auto &face : faces)
-        boxes.push_back(bounding_box_2d_t({triangle_2d_t(
-            {vertices[face.a], vertices[face.b], vertices[face.c]})}));
+    if (leaf_size == 0) throw std::invalid_argument("Leaf size must be >= 1");
+    if (faces.empty()) return;
 
-    std::vector<size_t> indices(boxes.size());
+    std::vector<bounding_box_2d_t> face_boxes;
+    std::vector<point_2d_t> centroids;
+    face_boxes.reserve(faces.size());
+    centroids.reserve(faces.size());
+    for (size_t i = 0; i < faces.size(); i++) {
+        const auto t = this->get_triangle(i);
+        face_boxes.push_back(bounding_box_2d_t({t}));
+        centroids.push_back(face_boxes.back().center());
+    }
+
+    indices.resize(faces.size());
     std::iota(indices.begin(), indices.end(), 0);
-    tree.resize(boxes.size());
-    sort_bounding_boxes_for_bvh(boxes, indices, tree, 0, boxes.size());
+    const size_t max_nodes = 2 * (faces.size() / leaf_size + 1);
+    boxes.reserve(max_nodes);
+    offsets.reserve(max_nodes);
+    counts.reserve(max_nodes);
+    this->build(face_boxes, centroids, 0, faces.size(), leaf_size, use_sah, 0);
 }
 
-void line_intersections_helper(const bvh_tree_t tree, const face_list_t &faces,
-                               const std::vector<point_2d_t> &vertices, int id,
-                               const line_2d_t &l, std::vector<face_t> &intrs,
-                               const std::optional<size_t> max_intersections) {
-    if (id < 0 || id >= tree.size()) throw std::runtime_error("Invalid ID");
-
-    auto &[face_id, lhs, rhs, box] = tree[id];
-
-    // If the triangle doesn't intersect the current bounding box, then
-    // there's no need to check child triangles.
-    if (!l.intersects_bounding_box(box)) {
-        return;
+bvh_2d_t::bvh_2d_t(std::shared_ptr<const trimesh_2d_t> t,
+                   std::vector<bounding_box_2d_t> &&boxes,
+                   std::vector<size_t> &&offsets, std::vector<size_t> &&counts,
+                   std::vector<size_t> &&indices)
+    : faces(t->faces()), vertices(t->vertices()), mesh(std::move(t)) {
+    if (offsets.size() != boxes.size() || counts.size() != boxes.size())
+        throw std::invalid_argument("Mismatched BVH node arrays");
+    if (indices.size() != this->faces.size())
+        throw std::invalid_argument("Expected one BVH index per face");
+    for (const size_t i : indices) {
+        if (i >= this->faces.size())
+            throw std::invalid_argument("Invalid BVH face index");
+    }
+    // Children come after their parents, so the depth of each node is known
+    // by the time it is checked. Every node but the root must have exactly
+    // one parent, since a node shared by two parents could be reached
+    // through a deeper path than the one its depth was taken from. Trees
+    // deeper than a built tree would overflow the traversal stack.
+    std::vector<size_t> depths(boxes.size(), 0);
+    std::vector<char> has_parent(boxes.size(), false);
+    for (size_t i = 0; i < boxes.size(); i++) {
+        bool valid =
+            counts[i] > 0 ? offsets[i] <= indices.size() &&
+                                counts[i] <= indices.size() - offsets[i]
+                          : offsets[i] > i + 1 && offsets[i] < boxes.size();
+        valid = valid && (i == 0 || has_parent[i]) &&
+                depths[i] + 1 < BVH_2D_STACK_SIZE;
+        if (valid && counts[i] == 0) {
+            valid = !has_parent[i + 1] && !has_parent[offsets[i]];
+            has_parent[i + 1] = has_parent[offsets[i]] = true;
+            depths[i + 1] = depths[offsets[i]] = depths[i] + 1;
+        }
+        if (!valid)
+            throw std::invalid_argument("Invalid BVH node " +
+                                        std::to_string(i));
     }
+    this->boxes = std::move(boxes);
+    this->offsets = std::move(offsets);
+    this->counts = std::move(counts);
+    this->indices = std::move(indices);
+}
 
-    // Checks if the line intersects the current triangle.
-    auto &face_indices = faces[face_id];
-    triangle_2d_t face = {vertices[face_indices.a], vertices[face_indices.b],
-                          vertices[face_indices.c]};
-    if (l.intersects_triangle(face)) {
-        intrs.push_back(face_indices);
+bvh_tree_t bvh_2d_t::get_tree() const {
+    bvh_tree_t tree;
+    tree.reserve(this->boxes.size());
+    for (size_t node = 0; node < this->boxes.size(); node++) {
+        if (this->is_leaf(node)) {
+            const auto begin = this->indices.begin() + this->offsets[node];
+            tree.push_back({{begin, begin + this->counts[node]},
+                            -1,
+                            -1,
+                            this->boxes[node]});
+        } else {
+            tree.push_back({{},
+                            static_cast<int64_t>(node + 1),
+                            static_cast<int64_t>(this->offsets[node]),
+                            this->boxes[node]});
+        }
     }
-    if (max_intersections && intrs.size() >= *max_intersections) return;
+    return tree;
+}
 
-    // Recursively checks the left and right subtrees.
-    if (lhs != -1)
-        line_intersections_helper(tree, faces, vertices, lhs, l, intrs,
-                                  max_intersections);
-    if (max_intersections && intrs.size() >= *max_intersections) return;
-    if (rhs != -1)
-        line_intersections_helper(tree, faces, vertices, rhs, l, intrs,
-                                  max_intersections);
+triangle_2d_t bvh_2d_t::get_triangle(size_t i) const {
+    const auto &f = this->faces[i];
+    return {this->vertices[f.a], this->vertices[f.b], this->vertices[f.c]};
 }
 
-std::vector<face_t> bvh_2d_t::line_intersections(
-    const line_2d_t &l, const std::optional<size_t> max_intersections) const {
-    std::vector<face_t> intrs;
-    line_intersections_helper(tree, faces, vertices, 0, l, intrs,
-                              max_intersections);
-    return intrs;
+// Visits the faces in every leaf whose box passes `visit_box`, in depth-first
+// order, until `visit_face` returns true. The traversal stack lives on the
+// call stack, so queries don't allocate.
+template <typename B, typename F>
+void bvh_2d_t::traverse(B &&visit_box, F &&visit_face) const {
+    if (boxes.empty()) return;
+
+    std::array<size_t, BVH_2D_STACK_SIZE> stack;
+    size_t stack_size = 0;
+    stack[stack_size++] = 0;
+    while (stack_size > 0) {
+        const size_t node = stack[--stack_size];
+        if (!visit_box(boxes[node])) continue;
+        if (is_leaf(node)) {
+            for (size_t i = offsets[node]; i < offsets[node] + counts[node];
+                 i++)
+                if (visit_face(indices[i])) return;
+            continue;
+        }
+        stack[stack_size++] = offsets[node];
+        stack[stack_size++] = node + 1;
+    }
 }
 
-void triangle_intersections_helper(
-    const bvh_tree_t tree, const face_list_t &faces,
-    const std::vector<point_2d_t> &vertices, int id, const triangle_2d_t &t,
-    std::vector<face_t> &intrs, const std::optional<size_t> max_intersections) {
-    if (id < 0 || id >= tree.size()) throw std::runtime_error("Invalid ID");
+size_t bvh_2d_t::line_intersection_indices(
+    const line_2d_t &l, std::vector<size_t> &out,
+    const std::optional<size_t> max_intersections) const {
+    const size_t start = out.size();
+    if (max_intersections && *max_intersections == 0) return 0;
+    traverse([&l](const bounding_box_2d_t &box) {
+                 return l.intersects_bounding_box(box);
+             },
+             [&](size_t i) {
+                 if (!l.intersects_triangle(this->get_triangle(i)))
+                     return false;
+                 out.push_back(i);
+                 return max_intersections &&
+                        out.size() - start >= *max_intersections;
+             });
+    return out.size() - start;
+}
 
-    auto &[face_id, lhs, rhs, box] = tree[id];
+size_t bvh_2d_t::triangle_intersection_indices(
+    const triangle_2d_t &t, std::vector<size_t> &out,
+    const std::optional<size_t> max_intersections) const {
+    const size_t start = out.size();
+    if (max_intersections && *max_intersections == 0) return 0;
+    traverse([&t](const bounding_box_2d_t &box) {
+                 return t.intersects_bounding_box(box);
+             },
+             [&](size_t i) {
+                 if (!t.intersects_triangle(this->get_triangle(i)))
+                     return false;
+                 out.push_back(i);
+                 return max_intersections &&
+                        out.size() - start >= *max_intersections;
+             });
+    return out.size() - start;
+}
 
-    // If the triangle doesn't intersect the current bounding box, then
-    // there's no need to check child triangles.
-    if (!t.intersects_bounding_box(box)) {
-        return;
-    }
+size_t bvh_2d_t::point_intersection_indices(
+    const point_2d_t &p, std::vector<size_t> &out,
+    const std::optional<size_t> max_intersections) const {
+    const size_t start = out.size();
+    if (max_intersections && *max_intersections == 0) return 0;
+    traverse([&p](const bounding_box_2d_t &box) {
+                 return box.contains_point(p);
+             },
+             [&](size_t i) {
+                 if (!this->get_triangle(i).contains_point(p)) return false;
+                 out.push_back(i);
+                 return max_intersections &&
+                        out.size() - start >= *max_intersections;
+             });
+    return out.size() - start;
+}
 
-    // Checks if the line intersects the current triangle.
-    auto &face_indices = faces[face_id];
-    triangle_2d_t face = {vertices[face_indices.a], vertices[face_indices.b],
-                          vertices[face_indices.c]};
-    if (t.intersects_triangle(face)) {
-        intrs.push_back(face_indices);
-    }
-    if (max_intersections && intrs.size() >= *max_intersections) return;
+std::optional<size_t> bvh_2d_t::get_containing_face_index(
+    const triangle_2d_t &t) const {
+    // If some part of the triangle is outside a bounding box, then the
+    // triangle is not inside any of the faces below it.
+    std::optional<size_t> face;
+    traverse([&t](const bounding_box_2d_t &box) {
+                 return box.contains_triangle(t);
+             },
+             [&](size_t i) {
+                 if (!this->get_triangle(i).contains_triangle(t)) return false;
+                 face = i;
+                 return true;
+             });
+    return face;
+}
 
-    // Recursively checks the left and right subtrees.
-    if (lhs != -1)
-        triangle_intersections_helper(tree, faces, vertices, lhs, t, intrs,
-                                      max_intersections);
-    if (max_intersections && intrs.size() >= *max_intersections) return;
-    if (rhs != -1)
-        triangle_intersections_helper(tree, faces, vertices, rhs, t, intrs,
-                                      max_intersections);
+std::vector<face_t> bvh_2d_t::line_intersections(
+    const line_2d_t &l, const std::optional<size_t> max_intersections) const {
+    std::vector<size_t> indices;
+    line_intersection_indices(l, indices, max_intersections);
+    std::vector<face_t> intrs;
+    intrs.reserve(indices.size());
+    for (const auto &i : indices) intrs.push_back(faces[i]);
+    return intrs;
 }
 
 std::vector<face_t> bvh_2d_t::triangle_intersections(
     const triangle_2d_t &l,
     const std::optional<size_t> max_intersections) const {
+    std::vector<size_t> indices;
+    triangle_intersection_indices(l, indices, max_intersections);
     std::vector<face_t> intrs;
-    triangle_intersections_helper(tree, faces, vertices, 0, l, intrs,
-                                  max_intersections);
+    intrs.reserve(indices.size());
+    for (const auto &i : indices) intrs.push_back(faces[i]);
     return intrs;
 }
 
-std::optional<face_t> get_containing_face_helper(
-    const bvh_tree_t tree, const face_list_t &faces,
-    const std::vector<point_2d_t> &vertices, int id, const triangle_2d_t &t) {
-    if (id < 0 || id >= tree.size()) return std::nullopt;
-
-    auto &[face_id, lhs, rhs, box] = tree[id];
+std::optional<face_t> bvh_2d_t::get_containing_face(
+    const triangle_2d_t &t) const {
+    if (auto i = get_containing_face_index(t)) return faces[*i];
+    return std::nullopt;
+}
 
-    // If some part of the triangle is outside the current bounding box,
-    // then the triangle is not inside the mesh.
-    if (!box.contains_triangle(t)) {
-        return std::nullopt;
+// Runs `query(q, out)` for each query, which appends the matching face
+// indices to `out` and returns how many it added, and packs the results into
+// CSR form. Each thread handles a contiguous range of queries, so the output
+// is the same regardless of the number of threads.
+template <typename Q, typename F>
+std::tuple<py::array_t<int64_t>, py::array_t<int64_t>> batch_query_csr(
+    const Q *queries, size_t n, size_t num_threads, F &&query) {
+    py::array_t<int64_t> offsets(n + 1);
+    int64_t *offsets_data = offsets.mutable_data();
+    const size_t num_chunks = get_num_threads(num_threads, n);
+    std::vector<std::vector<size_t>> chunk_indices(num_chunks);
+    {
+        py::gil_scoped_release release;
+        parallel_chunks(n, num_chunks,
+                        [&](size_t chunk, size_t lo, size_t hi) {
+                            auto &out = chunk_indices[chunk];
+                            for (size_t i = lo; i < hi; i++)
+                                offsets_data[i + 1] = query(queries[i], out);
+                        });
+        offsets_data[0] = 0;
+        for (size_t i = 0; i < n; i++) offsets_data[i + 1] += offsets_data[i];
     }
 
-    // Checks if the triangle is inside the current triangle.
-    auto &face_indices = faces[face_id];
-    triangle_2d_t face = {vertices[face_indices.a], vertices[face_indices.b],
-                          vertices[face_indices.c]};
-    if (face.contains_triangle(t)) {
-        return face_indices;
-    }
+    py::array_t<int64_t> indices(offsets_data[n]);
+    int64_t *indices_data = indices.mutable_data();
+    for (const auto &out : chunk_indices)
+        indices_data = std::copy(out.begin(), out.end(), indices_data);
+    return {offsets, indices};
+}
 
-    // Recursively checks the left and right subtrees.
-    if (auto face = get_containing_face_helper(tree, faces, vertices, lhs, t))
-        return face;
-    if (auto face = get_containing_face_helper(tree, faces, vertices, rhs, t))
-        return face;
-    return std::nullopt;
+std::tuple<py::array_t<int64_t>, py::array_t<int64_t>>
+bvh_2d_t::line_intersections_batch(
+    const carray_t<double> &lines,
+    const std::optional<size_t> max_intersections, size_t num_threads) const {
+    const auto *ls = structs_from_array<line_2d_t, 2, 2>(lines, "lines");
+    return batch_query_csr(
+        ls, lines.shape(0), num_threads,
+        [&](const line_2d_t &l, std::vector<size_t> &out) {
+            return line_intersection_indices(l, out, max_intersections);
+        });
 }
 
-std::optional<face_t> bvh_2d_t::get_containing_face(
-    const triangle_2d_t &t) const {
-    return get_containing_face_helper(tree, faces, vertices, 0, t);
+std::tuple<py::array_t<int64_t>, py::array_t<int64_t>>
+bvh_2d_t::triangle_intersections_batch(
+    const carray_t<double> &triangles,
+    const std::optional<size_t> max_intersections, size_t num_threads) const {
+    const auto *ts =
+        structs_from_array<triangle_2d_t, 3, 2>(triangles, "triangles");
+    return batch_query_csr(
+        ts, triangles.shape(0), num_threads,
+        [&](const triangle_2d_t &t, std::vector<size_t> &out) {
+            return triangle_intersection_indices(t, out, max_intersections);
+        });
 }
 
 std::string bvh_2d_t::to_string() const {
@@ -758,7 +1143,7 @@ std::string bvh_2d_t::to_string() const {
     ss << "BVH(";
     ss << "faces = " << faces.size() << ", ";
     ss << "vertices = " << vertices.size() << ", ";
-    ss << "tree = " << tree.size() << ")";
+    ss << "nodes = " << boxes.size() << ")";
     return ss.str();
 }
 
@@ -799,22 +1184,79 @@ void add_2d_bvh_modules(py::module &m) {
              "Get a node", py::is_operator());
 
     dtree_2d
-        .def(py::init<const triangle_2d_t &>(), "root"_a,
+        .def(py::init<const triangle_2d_t &, bool>(), "root"_a,
+             "keep_history"_a = true,
              "Constructs a 2D Delaunay split tree from a triangle.")
         .def("is_leaf", &delaunay_split_tree_2d_t::is_leaf, "i"_a,
              "Returns true if the node is a leaf.")
+        .def("walk_to_leaf", &delaunay_split_tree_2d_t::walk_to_leaf, "p"_a,
+             "Returns the index of the leaf containing the point, by walking "
+             "from the most recently added leaf.")
+        .def(
+            "get_neighbors",
+            [](const delaunay_split_tree_2d_t &tree, size_t i) {
+                std::vector<std::optional<size_t>> neighbors;
+                for (const size_t n : tree.get_neighbors(i)) {
+                    if (n == NO_NEIGHBOR)
+                        neighbors.push_back(std::nullopt);
+                    else
+                        neighbors.push_back(n);
+                }
+                return neighbors;
+            },
+            "i"_a,
+            "Returns the triangle across each edge of the triangle at the "
+            "given index, or None where there is none.")
+        .def("get_triangle",
+             py::overload_cast<size_t>(&delaunay_split_tree_2d_t::get_triangle,
+                                       py::const_),
+             "i"_a, "Returns the triangle at the given index.")
         .def("get_leaf_triangles",
              &delaunay_split_tree_2d_t::get_leaf_triangles,
              "Returns the triangles associated with a leaf.")
         .def("split_triangle", &delaunay_split_tree_2d_t::split_triangle,
              "point"_a, "i"_a, "make_delaunay"_a = false,
-             "Splits a triangle at a point.");
+             "Splits a triangle at a point.")
+        .def("discard_history", &delaunay_split_tree_2d_t::discard_history,
+             "Drops the replaced triangles, renumbering the leaves.");
 
     bvh_2d
-        .def(py::init<const trimesh_2d_t &>(), "Boundary volume hierarchy",
-             "trimesh"_a)
-        .def(py::init<const face_list_t &, const std::vector<point_2d_t> &>(),
-             "Boundary volume hierarchy", "faces"_a, "vertices"_a)
+        .def(py::init<const trimesh_2d_t &, size_t, bool>(),
+             "Boundary volume hierarchy", "trimesh"_a, "leaf_size"_a = 4,
+             "use_sah"_a = true, py::keep_alive<1, 2>())
+        .def(py::init<const face_list_t &, const std::vector<point_2d_t> &,
+                      size_t, bool>(),
+             "Boundary volume hierarchy", "faces"_a, "vertices"_a,
+             "leaf_size"_a = 4, "use_sah"_a = true)
+        // The pickled state includes the vertices and faces which the BVH
+        // refers to, so that it can be unpickled on its own into a BVH over
+        // a new mesh.
+        .def(py::pickle(
+            [](py::object self) {
+                const auto &bvh = self.cast<const bvh_2d_t &>();
+                return py::make_tuple(
+                    as_readonly_array<double, 2>(bvh.get_vertices(), self),
+                    as_readonly_array<int64_t, 3>(bvh.get_faces(), self),
+                    as_readonly_array<double, 4>(bvh.get_boxes(), self),
+                    as_readonly_array<int64_t, 1>(bvh.get_offsets(), self),
+                    as_readonly_array<int64_t, 1>(bvh.get_counts(), self),
+                    as_readonly_array<int64_t, 1>(bvh.get_indices(), self));
+            },
+            [](const py::tuple &state) {
+                check_state_size(state, 6);
+                auto mesh = std::make_shared<const trimesh_2d_t>(
+                    trimesh_2d_t::from_arrays(
+                        state[0].cast<carray_t<double>>(),
+                        state[1].cast<carray_t<int64_t>>(), false));
+                check_state_indices(mesh->faces(), mesh->vertices().size());
+                return bvh_2d_t(
+                    std::move(mesh),
+                    vector_from_state<bounding_box_2d_t, double, 4>(state[2],
+                                                                    "boxes"),
+                    vector_from_state<size_t, int64_t, 1>(state[3], "offsets"),
+                    vector_from_state<size_t, int64_t, 1>(state[4], "counts"),
+                    vector_from_state<size_t, int64_t, 1>(state[5], "indices"));
+            }))
         .def("__str__", &bvh_2d_t::to_string, py::is_operator())
         .def("__repr__", &bvh_2d_t::to_string, py::is_operator())
         .def("line_intersections", &bvh_2d_t::line_intersections,
@@ -823,6 +1265,51 @@ void add_2d_bvh_modules(py::module &m) {
         .def("triangle_intersections", &bvh_2d_t::triangle_intersections,
              "Intersections", "triangle"_a,
              "max_intersections"_a = std::nullopt)
+        .def(
+            "line_intersection_indices",
+            [](const bvh_2d_t &bvh, const line_2d_t &l,
+               const std::optional<size_t> max_intersections) {
+                std::vector<size_t> out;
+                bvh.line_intersection_indices(l, out, max_intersections);
+                return out;
+            },
+            "Indices of the faces which intersect a line", "line"_a,
+            "max_intersections"_a = std::nullopt)
+        .def(
+            "triangle_intersection_indices",
+            [](const bvh_2d_t &bvh, const triangle_2d_t &t,
+               const std::optional<size_t> max_intersections) {
+                std::vector<size_t> out;
+                bvh.triangle_intersection_indices(t, out, max_intersections);
+                return out;
+            },
+            "Indices of the faces which intersect a triangle", "triangle"_a,
+            "max_intersections"_a = std::nullopt)
+        .def("line_intersections_batch", &bvh_2d_t::line_intersections_batch,
+             "Intersections for an (N, 2, 2) array of lines, as CSR offsets "
+             "and face indices",
+             "lines"_a, "max_intersections"_a = std::nullopt,
+             "num_threads"_a = 0)
+        .def("triangle_intersections_batch",
+             &bvh_2d_t::triangle_intersections_batch,
+             "Intersections for an (N, 3, 2) array of triangles, as CSR "
+             "offsets and face indices",
+             "triangles"_a, "max_intersections"_a = std::nullopt,
+             "num_threads"_a = 0)
+        .def(
+            "point_intersection_indices",
+            [](const bvh_2d_t &bvh, const point_2d_t &p,
+               const std::optional<size_t> max_intersections) {
+                std::vector<size_t> out;
+                bvh.point_intersection_indices(p, out, max_intersections);
+                return out;
+            },
+            "Indices of the faces which contain a point", "point"_a,
+            "max_intersections"_a = std::nullopt)
+        .def("get_containing_face", &bvh_2d_t::get_containing_face,
+             "Face which contains a triangle, if any", "triangle"_a)
+        .def("__len__", &bvh_2d_t::num_nodes, "Number of nodes",
+             py::is_operator())
         .def_property_readonly("faces", &bvh_2d_t::get_faces, "Faces")
         .def_property_readonly("vertices", &bvh_2d_t::get_vertices, "Vertices")
         .def_property_readonly("tree", &bvh_2d_t::get_tree, "Tree");
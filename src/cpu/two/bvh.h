@@ -3,20 +3,28 @@
 #include <pybind11/pybind11.h>
 #include <pybind11/stl.h>
 
+#include <array>
+#include <memory>
+#include <tuple>
+#include <vector>
+
 #include "../types.h"
+#include "../weld.h"
 #include "types.h"
 
 namespace py = pybind11;
 
 namespace trimesh {
 
+// Set of points, where points within the tolerance of each other are
+// treated as the same point.
 struct point_2d_set_t {
    private:
-    std::vector<point_2d_t> points;
-    std::map<point_2d_t, size_t> indices;
+    point_welder_t<point_2d_t, 2> welder;
 
    public:
     point_2d_set_t() = default;
+    explicit point_2d_set_t(double tolerance);
     point_2d_set_t(const std::initializer_list<point_2d_t> &points);
     ~point_2d_set_t() = default;
 
@@ -63,55 +71,116 @@ struct triangle_split_tree_2d_t {
     const size_t count_leaf_triangles() const;
 };
 
+// Incremental Delaunay triangulation which keeps every triangle it has ever
+// created, so that points can be located by descending the split history.
+// The current triangles are linked through flat neighbor arrays, where
+// `neighbors[i][k]` is the triangle across the k-th edge (in the order of
+// `face_t::get_edges`) of triangle `i`. If `keep_history` is false, the
+// replaced triangles are periodically compacted away, which renumbers the
+// leaves, so that memory only grows with the size of the triangulation.
 struct delaunay_split_tree_2d_t {
    private:
     const triangle_2d_t root;
+    bool keep_history;
     std::vector<face_t> faces;
-    std::vector<std::vector<size_t>> children;
-    edge_map_t<size_t> edge_to_face;
+    std::vector<child_range_t> children;
+    std::vector<std::array<size_t, 3>> neighbors;
     point_2d_set_t vertices;
+    size_t last_leaf = 0, num_leaves = 1;
 
     void make_delaunay(const size_t &pi, const edge_t &e, const size_t &ti);
-    size_t add_triangle(const face_t &f, const std::vector<size_t> &parents);
+    std::vector<size_t> add_triangles(const std::vector<face_t> &fs,
+                                      const std::vector<size_t> &parents);
+    void compact();
 
    public:
-    delaunay_split_tree_2d_t(const triangle_2d_t &root);
+    delaunay_split_tree_2d_t(const triangle_2d_t &root,
+                             bool keep_history = true);
     ~delaunay_split_tree_2d_t() = default;
 
     bool is_leaf(size_t i) const;
     size_t find_leaf_index(const point_2d_t &p) const;
+    size_t walk_to_leaf(const point_2d_t &p) const;
     const face_t &get_face(size_t i) const;
+    const std::array<size_t, 3> &get_neighbors(size_t i) const;
     triangle_2d_t get_triangle(const face_t &f) const;
     triangle_2d_t get_triangle(size_t i) const;
     std::vector<size_t> get_leaf_triangles() const;
     void split_triangle(const point_2d_t &p, size_t i,
                         bool make_delaunay = true);
+    void discard_history();
     const point_2d_set_t &get_vertices() const;
 };
 
-// Defines the hierarchical box tree structure to support 2D queries.
-// Each element in the vector is (triangle_id, left_child, right_child, box)
-// where triangle_id is the index of the triangle in the trimesh, left_child
-// and right_child are the indices of the left and right children in the tree
-// (-1 if there is no child), and box is the bounding box for the current
-// node.
-typedef std::vector<std::tuple<size_t, int, int, bounding_box_2d_t>> bvh_tree_t;
-
+// A view of the nodes of a 2D BVH, where each element is (face_ids,
+// left_child, right_child, box). For leaves, face_ids are the indices of the
+// faces in the node and the children are -1; for internal nodes, face_ids is
+// empty.
+typedef std::vector<
+    std::tuple<std::vector<size_t>, int64_t, int64_t, bounding_box_2d_t>>
+    bvh_tree_t;
+
+// Bounding volume hierarchy over the faces of a 2D mesh. The nodes are
+// stored in depth-first order as parallel arrays, so that traversal only
+// touches the node boxes until it reaches a leaf. The left child of an
+// internal node immediately follows it, and `offsets` holds the index of its
+// right child. For leaf nodes, `offsets` is the start of the node's range in
+// `indices` and `counts` is the number of faces in the range; internal nodes
+// have a count of zero.
 struct bvh_2d_t {
    private:
     const face_list_t &faces;
     const std::vector<point_2d_t> &vertices;
-    bvh_tree_t tree;
+    // The mesh which `faces` and `vertices` refer to, if the BVH owns it,
+    // such as when it was unpickled along with the mesh.
+    std::shared_ptr<const trimesh_2d_t> mesh;
+    std::vector<bounding_box_2d_t> boxes;
+    std::vector<size_t> offsets, counts, indices;
+
+    size_t build(const std::vector<bounding_box_2d_t> &face_boxes,
+                 const std::vector<point_2d_t> &centroids, size_t lo,
+                 size_t hi, size_t leaf_size, bool use_sah, size_t depth);
+    bool is_leaf(size_t node) const { return this->counts[node] > 0; }
+    triangle_2d_t get_triangle(size_t i) const;
+    template <typename B, typename F>
+    void traverse(B &&visit_box, F &&visit_face) const;
 
    public:
-    bvh_2d_t(const trimesh_2d_t &t);
-    bvh_2d_t(const face_list_t &faces, const std::vector<point_2d_t> &vertices);
+    bvh_2d_t(const trimesh_2d_t &t, size_t leaf_size = 4, bool use_sah = true);
+    bvh_2d_t(const face_list_t &faces, const std::vector<point_2d_t> &vertices,
+             size_t leaf_size = 4, bool use_sah = true);
+    bvh_2d_t(std::shared_ptr<const trimesh_2d_t> t,
+             std::vector<bounding_box_2d_t> &&boxes,
+             std::vector<size_t> &&offsets, std::vector<size_t> &&counts,
+             std::vector<size_t> &&indices);
     ~bvh_2d_t() = default;
     const face_list_t &get_faces() const { return this->faces; }
     const std::vector<point_2d_t> &get_vertices() const {
         return this->vertices;
     }
-    const bvh_tree_t get_tree() const { return this->tree; }
+    const std::vector<bounding_box_2d_t> &get_boxes() const {
+        return this->boxes;
+    }
+    const std::vector<size_t> &get_offsets() const { return this->offsets; }
+    const std::vector<size_t> &get_counts() const { return this->counts; }
+    const std::vector<size_t> &get_indices() const { return this->indices; }
+    size_t num_nodes() const { return this->boxes.size(); }
+    bvh_tree_t get_tree() const;
+
+    // These append the indices of the matching faces to `out` and return
+    // the number of indices which were added, so that callers can reuse the
+    // same buffer across many queries.
+    size_t line_intersection_indices(
+        const line_2d_t &l, std::vector<size_t> &out,
+        const std::optional<size_t> max_intersections = std::nullopt) const;
+    size_t triangle_intersection_indices(
+        const triangle_2d_t &t, std::vector<size_t> &out,
+        const std::optional<size_t> max_intersections = std::nullopt) const;
+    size_t point_intersection_indices(
+        const point_2d_t &p, std::vector<size_t> &out,
+        const std::optional<size_t> max_intersections = std::nullopt) const;
+    std::optional<size_t> get_containing_face_index(
+        const triangle_2d_t &t) const;
 
     std::vector<face_t> line_intersections(
         const line_2d_t &l,
@@ -120,6 +189,21 @@ struct bvh_2d_t {
         const triangle_2d_t &l,
         const std::optional<size_t> max_intersections = std::nullopt) const;
     std::optional<face_t> get_containing_face(const triangle_2d_t &t) const;
+
+    // Runs one query per row of an (N, 2, 2) array of line segments or an
+    // (N, 3, 2) array of triangles, split across threads with the GIL
+    // released. Returns (offsets, indices) in CSR form, where the faces hit
+    // by query `i` are `indices[offsets[i]:offsets[i + 1]]`.
+    std::tuple<py::array_t<int64_t>, py::array_t<int64_t>>
+    line_intersections_batch(
+        const carray_t<double> &lines,
+        const std::optional<size_t> max_intersections = std::nullopt,
+        size_t num_threads = 0) const;
+    std::tuple<py::array_t<int64_t>, py::array_t<int64_t>>
+    triangle_intersections_batch(
+        const carray_t<double> &triangles,
+        const std::optional<size_t> max_intersections = std::nullopt,
+        size_t num_threads = 0) const;
     std::string to_string() const;
 };
 
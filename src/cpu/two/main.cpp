@@ -1,5 +1,6 @@
 #include "main.h"
 
+#include "batch.h"
 #include "boolean.h"
 #include "bvh.h"
 #include "io.h"
@@ -12,6 +13,7 @@ void add_2d_modules(py::module &m) {
     add_2d_bvh_modules(m);
     add_2d_boolean_modules(m);
     add_2d_io_modules(m);
+    add_2d_batch_modules(m);
 }
 
 }  // namespace trimesh
@@ -11,6 +11,10 @@
 #include <unordered_set>
 
 #include "../options.h"
+#include "../partition.h"
+#include "../pickle.h"
+#include "../predicates.h"
+#include "../weld.h"
 #include "boolean.h"
 #include "bvh.h"
 
@@ -379,37 +383,13 @@ std::vector<line_2d_t> triangle_2d_t::edges() const {
     return {{p1, p2}, {p2, p3}, {p3, p1}};
 }
 
-bool triangle_2d_t::is_clockwise() const {
-    return (p3 - p1).cross(p2 - p1) < 0.0;
-}
+bool triangle_2d_t::is_clockwise() const { return orient_2d(p1, p3, p2) < 0.0; }
 
 circle_2d_t triangle_2d_t::circumcircle() const { return {*this}; }
 
 bool triangle_2d_t::circumcircle_contains(const point_2d_t &p,
                                           double tolerance) const {
-    // Naive version.
-    // return circumcircle().contains_point(p, tolerance);
-
-    // Faster version.
-    double x0 = p1.x - p.x;
-    double y0 = p1.y - p.y;
-    double x1 = p2.x - p.x;
-    double y1 = p2.y - p.y;
-    double x2 = p3.x - p.x;
-    double y2 = p3.y - p.y;
-
-    double z0 = x0 * (p1.x + p.x) + y0 * (p1.y + p.y);
-    double z1 = x1 * (p2.x + p.x) + y1 * (p2.y + p.y);
-    double z2 = x2 * (p3.x + p.x) + y2 * (p3.y + p.y);
-
-    // Determinant of
-    // | x0 y0 z0 |
-    // | x1 y1 z1 |
-    // | x2 y2 z2 |
-    double det = x0 * (y1 * z2 - y2 * z1) - y0 * (x1 * z2 - x2 * z1) +
-                 z0 * (x1 * y2 - x2 * y1);
-
-    return det > -tolerance;
+    return in_circle(p1, p2, p3, p) > -tolerance;
 }
 
 bool triangle_2d_t::contains_point(const point_2d_t &p) const {
@@ -687,6 +667,8 @@ std::vector<line_2d_t> bounding_box_2d_t::edges() const {
 }
 
 bool bounding_box_2d_t::intersects_triangle(const triangle_2d_t &t) const {
+    // Handles the case where the triangle is entirely inside the box.
+    if (contains_point(t.p1)) return true;
     for (const auto &l : edges())
         if (l.intersects_triangle(t)) return true;
     return false;
@@ -864,7 +846,7 @@ point_2d_t polygon_2d_t::center() const {
 }
 
 bool is_ear(const bvh_2d_t &bvh, const std::vector<point_2d_t> &points, int vi,
-            int vj, int vk) {
+            int vj, int vk, std::vector<size_t> &intrs) {
     point_2d_t pi = points[vi], pj = points[vj], pk = points[vk];
 
     // Checks if the triangle is convex.
@@ -880,10 +862,11 @@ bool is_ear(const bvh_2d_t &bvh, const std::vector<point_2d_t> &points, int vi,
     // }
 
     // Faster version using BVH.
-    const auto &intrs =
-        bvh.triangle_intersections({pi, pj, pk}, /* max_intersections */ 4);
-    for (const auto &intr : intrs) {
-        auto l = intr.a;  // a, b, c are all the same for this BVH.
+    intrs.clear();
+    bvh.triangle_intersection_indices({pi, pj, pk}, intrs,
+                                      /* max_intersections */ 4);
+    for (const auto &l : intrs) {
+        // Face `l` is the single point `l` in this BVH.
         if (l == vi || l == vj || l == vk) continue;
         return false;
     }
@@ -912,6 +895,7 @@ trimesh_2d_t polygon_2d_t::get_trimesh(bool delaunay, bool is_convex) const {
         bvh_faces.push_back({i, i, i});
     }
     bvh_2d_t bvh{bvh_faces, vertices};
+    std::vector<size_t> intrs;
 
     // Runs ear clipping algorithm.
     while (indices.size() > 3) {
@@ -921,7 +905,7 @@ trimesh_2d_t polygon_2d_t::get_trimesh(bool delaunay, bool is_convex) const {
             size_t j = (i + 1) % n;
             size_t k = (i + 2) % n;
             size_t vi = indices[i], vj = indices[j], vk = indices[k];
-            if (is_convex || is_ear(bvh, points, vi, vj, vk)) {
+            if (is_convex || is_ear(bvh, points, vi, vj, vk, intrs)) {
                 faces.push_back({vi, vj, vk});
                 indices.erase(indices.begin() + j);
                 found = true;
@@ -1099,6 +1083,20 @@ trimesh_2d_t::trimesh_2d_t(const std::vector<point_2d_t> &vertices,
     if (validate) this->validate();
 }
 
+trimesh_2d_t::trimesh_2d_t(std::vector<point_2d_t> &&vertices,
+                           face_list_t &&faces, bool validate)
+    : _vertices(std::move(vertices)), _faces(std::move(faces)) {
+    if (validate) this->validate();
+}
+
+trimesh_2d_t trimesh_2d_t::from_arrays(const carray_t<double> &vertices,
+                                       const carray_t<int64_t> &faces,
+                                       bool validate) {
+    py::gil_scoped_release release;
+    return {points_from_array<point_2d_t, 2>(vertices, "vertices"),
+            indices_from_array<face_t, 3>(faces, "faces"), validate};
+}
+
 void trimesh_2d_t::validate() const {
     // Checks that there is at least one face.
     if (_faces.empty()) {
@@ -1179,23 +1177,18 @@ const std::vector<triangle_2d_t> trimesh_2d_t::get_triangles() const {
 const std::tuple<std::vector<point_2d_t>, face_set_t>
 trimesh_2d_t::merge_vertices(const std::vector<point_2d_t> &vertices,
                              const face_set_t &faces) {
-    std::vector<point_2d_t> new_vertices;
-    std::map<point_2d_t, size_t> vertex_map;
-    for (auto &v : vertices) {
-        if (vertex_map.find(v) == vertex_map.end()) {
-            vertex_map[v] = new_vertices.size();
-            new_vertices.push_back(v);
-        }
-    }
+    point_welder_t<point_2d_t, 2> welder;
+    std::vector<size_t> vertex_ids;
+    vertex_ids.reserve(vertices.size());
+    for (auto &v : vertices) vertex_ids.push_back(welder.add_point(v));
 
     face_set_t new_faces;
     for (auto &face : faces) {
         auto &[vi, vj, vk] = face;
-        new_faces.insert({vertex_map[vertices[vi]], vertex_map[vertices[vj]],
-                          vertex_map[vertices[vk]]});
+        new_faces.insert({vertex_ids[vi], vertex_ids[vj], vertex_ids[vk]});
     }
 
-    return {new_vertices, new_faces};
+    return {welder.points, new_faces};
 }
 
 const std::tuple<std::vector<point_2d_t>, face_set_t>
@@ -1296,8 +1289,9 @@ trimesh_2d_t::merge_triangles(const std::vector<point_2d_t> &init_vertices,
         while (!edge_queue.empty()) {
             auto edge = edge_queue.front();
             edge_queue.pop();
-            if (adj_map.find(edge) == adj_map.end()) continue;
-            const auto &adj_faces = adj_map[edge];
+            auto adj_it = adj_map.find(edge);
+            if (adj_it == adj_map.end() || adj_it->second.size() < 2) continue;
+            const auto &adj_faces = adj_it->second;
             auto f1 = get_face_id(adj_faces[0]), f2 = get_face_id(adj_faces[1]);
             if (f1 == f2) continue;
 
@@ -1452,6 +1446,7 @@ trimesh_2d_t::get_polygon(const face_set_t &component) const {
     // Builds a BVH for the faces.
     face_list_t faces(component.begin(), component.end());
     bvh_2d_t bvh(faces, _vertices);
+    std::vector<size_t> intrs;
 
     auto intersects_another_edge = [&](const edge_t &edge,
                                        const face_set_t &component) {
@@ -1459,9 +1454,10 @@ trimesh_2d_t::get_polygon(const face_set_t &component) const {
         // Using a BVH speeds this up to O(n log(n)).
         // for (const auto &face : component) {
         line_2d_t line{_vertices[edge.a], _vertices[edge.b]};
-        for (const auto &face :
-             bvh.line_intersections(line, /* max_intersections */ 3)) {
-            for (auto &other_edge : face.get_edges(false)) {
+        intrs.clear();
+        bvh.line_intersection_indices(line, intrs, /* max_intersections */ 3);
+        for (const auto &face_id : intrs) {
+            for (auto &other_edge : faces[face_id].get_edges(false)) {
                 if (edge.a == other_edge.a || edge.a == other_edge.b ||
                     edge.b == other_edge.a || edge.b == other_edge.b) {
                     continue;
@@ -1749,7 +1745,34 @@ trimesh_2d_t trimesh_2d_t::operator-(const trimesh_2d_t &other) const {
  * Additional constructors *
  * ----------------------- */
 
-trimesh_2d_t triangulate(const std::vector<point_2d_t> &points, bool shuffle) {
+// Returns the Morton (Z-order) code of each point within the bounding box,
+// using 32 bits per coordinate.
+std::vector<uint64_t> morton_codes(const std::vector<point_2d_t> &points,
+                                   const bounding_box_2d_t &bb) {
+    auto spread = [](uint64_t v) {
+        v = (v | (v << 16)) & 0x0000FFFF0000FFFFull;
+        v = (v | (v << 8)) & 0x00FF00FF00FF00FFull;
+        v = (v | (v << 4)) & 0x0F0F0F0F0F0F0F0Full;
+        v = (v | (v << 2)) & 0x3333333333333333ull;
+        v = (v | (v << 1)) & 0x5555555555555555ull;
+        return v;
+    };
+    auto quantize = [](double v, double min, double max) -> uint64_t {
+        if (max <= min) return 0;
+        return static_cast<uint64_t>((v - min) / (max - min) * 0xFFFFFFFFu);
+    };
+    std::vector<uint64_t> codes(points.size());
+    for (size_t i = 0; i < points.size(); i++) {
+        const auto &p = points[i];
+        codes[i] = spread(quantize(p.x, bb.min.x, bb.max.x)) |
+                   spread(quantize(p.y, bb.min.y, bb.max.y)) << 1;
+    }
+    return codes;
+}
+
+trimesh_2d_t triangulate(const std::vector<point_2d_t> &points, bool shuffle,
+                         bool brio, std::optional<unsigned int> seed,
+                         size_t num_threads) {
     // Reference: https://www.youtube.com/watch?v=1TUUevxkvp4
 
     if (points.size() < 3) {
@@ -1764,20 +1787,52 @@ trimesh_2d_t triangulate(const std::vector<point_2d_t> &points, bool shuffle) {
     point_2d_t p3 = {(bb.min.x + bb.max.x) / 2, bb.max.y + 10 * d};
     triangle_2d_t super_triangle{p1, p2, p3};
 
-    // Generates a random permutation of the point indices.
-    std::vector<size_t> indices(points.size());
-    std::iota(indices.begin(), indices.end(), 0);
-    if (shuffle) {
-        std::random_device rd;
-        std::mt19937 gen(rd());
-        std::shuffle(indices.begin(), indices.end(), gen);
+    // Triangulates blocks of the points in parallel. The points are welded
+    // first, so that the trees don't merge any of them.
+    if (get_num_threads(num_threads, points.size()) > 1) {
+        point_welder_t<point_2d_t, 2> welder;
+        for (const auto &p : points) welder.add_point(p);
+        const auto &unique = welder.points;
+        const auto simplices = triangulate_in_blocks<2>(
+            unique, num_threads,
+            [&]() { return delaunay_split_tree_2d_t{super_triangle, false}; },
+            [&](delaunay_split_tree_2d_t &tree, std::vector<size_t> &ids) {
+                std::vector<point_2d_t> batch;
+                batch.reserve(ids.size());
+                for (size_t i : ids) batch.push_back(unique[i]);
+                std::vector<size_t> sorted;
+                sorted.reserve(ids.size());
+                for (size_t j : insertion_order(morton_codes(batch, bb),
+                                                shuffle, brio, seed)) {
+                    tree.split_triangle(batch[j], tree.walk_to_leaf(batch[j]),
+                                        true);
+                    sorted.push_back(ids[j]);
+                }
+                ids.swap(sorted);
+            },
+            [](const delaunay_split_tree_2d_t &tree, auto &&fn) {
+                for (const auto i : tree.get_leaf_triangles()) fn(i);
+            },
+            [](const delaunay_split_tree_2d_t &tree, size_t i) {
+                const auto &face = tree.get_face(i);
+                return simplex_t<2>{face.a, face.b, face.c};
+            });
+        face_list_t faces;
+        faces.reserve(simplices.size());
+        for (const auto &s : simplices) faces.push_back({s[0], s[1], s[2]});
+        return {unique, faces, false};
     }
 
-    // Triangulation.
-    delaunay_split_tree_2d_t tree{super_triangle};
+    // Gets the order in which to insert the points.
+    const std::vector<size_t> indices =
+        insertion_order(morton_codes(points, bb), shuffle, brio, seed);
+
+    // Triangulation. Points are located by walking, so the split history
+    // doesn't need to be kept.
+    delaunay_split_tree_2d_t tree{super_triangle, false};
     for (size_t pi : indices) {
         const auto &p = points[pi];
-        const size_t i = tree.find_leaf_index(p);
+        const size_t i = tree.walk_to_leaf(p);
         tree.split_triangle(p, i, true);
     }
 
@@ -1815,6 +1870,40 @@ void add_2d_types_modules(py::module &m) {
     auto affine_2d = py::class_<affine_2d_t>(m, "Affine2D");
     auto trimesh_2d = py::class_<trimesh_2d_t>(m, "Trimesh2D");
 
+    // Defines pickling, so that these can be sent to other processes. The
+    // arrays in the pickled state of a mesh view its vertices and faces, so
+    // with protocol 5 they are sent as out-of-band buffers without copying.
+    point_2d.def(pickle_as_bytes<point_2d_t>());
+    line_2d.def(pickle_as_bytes<line_2d_t>());
+    triangle_2d.def(pickle_as_bytes<triangle_2d_t>());
+    circle_2d.def(pickle_as_bytes<circle_2d_t>());
+    bbox_2d.def(pickle_as_bytes<bounding_box_2d_t>());
+    affine_2d.def(pickle_as_bytes<affine_2d_t>());
+    polygon_2d.def(py::pickle(
+        [](py::object self) {
+            const auto &poly = self.cast<const polygon_2d_t &>();
+            return as_readonly_array<double, 2>(poly.points, self);
+        },
+        [](const py::array &state) {
+            return polygon_2d_t(points_from_array<point_2d_t, 2>(
+                state.cast<carray_t<double>>(), "points"));
+        }));
+    trimesh_2d.def(py::pickle(
+        [](py::object self) {
+            const auto &mesh = self.cast<const trimesh_2d_t &>();
+            return py::make_tuple(
+                as_readonly_array<double, 2>(mesh.vertices(), self),
+                as_readonly_array<int64_t, 3>(mesh.faces(), self));
+        },
+        [](const py::tuple &state) {
+            check_state_size(state, 2);
+            auto mesh = trimesh_2d_t::from_arrays(
+                state[0].cast<carray_t<double>>(),
+                state[1].cast<carray_t<int64_t>>(), false);
+            check_state_indices(mesh.faces(), mesh.vertices().size());
+            return mesh;
+        }));
+
     // Defines Point2D methods.
     point_2d
         .def(py::init<double, double>(), "A point in 2D space", "x"_a, "y"_a)
@@ -2190,9 +2279,27 @@ void add_2d_types_modules(py::module &m) {
         //               bool>(),
         //      "Creates a trimesh from vertices and faces", "vertices"_a,
         //      "faces"_a, "validate"_a = false)
+        .def_static("from_arrays", &trimesh_2d_t::from_arrays,
+                    "Creates a trimesh from (N, 2) vertex and (M, 3) face "
+                    "arrays",
+                    "vertices"_a, "faces"_a, "validate"_a = true)
         .def_property_readonly("vertices", &trimesh_2d_t::vertices,
                                "The mesh vertices")
         .def_property_readonly("faces", &trimesh_2d_t::faces, "The mesh faces")
+        .def_property_readonly(
+            "vertices_array",
+            [](py::object self) {
+                const auto &mesh = self.cast<const trimesh_2d_t &>();
+                return as_readonly_array<double, 2>(mesh.vertices(), self);
+            },
+            "Read-only (N, 2) array view of the mesh vertices")
+        .def_property_readonly(
+            "faces_array",
+            [](py::object self) {
+                const auto &mesh = self.cast<const trimesh_2d_t &>();
+                return as_readonly_array<int64_t, 3>(mesh.faces(), self);
+            },
+            "Read-only (M, 3) array view of the mesh faces")
         .def("get_triangle", &trimesh_2d_t::get_triangle,
              "Returns the triangle for a given face", "face"_a)
         .def("get_triangles", &trimesh_2d_t::get_triangles,
@@ -2204,12 +2311,15 @@ void add_2d_types_modules(py::module &m) {
              "at_edges"_a = true)
         .def("make_delaunay", &trimesh_2d_t::make_delaunay,
              "Creates a Delaunay triangulation of the mesh")
-        .def("union", &trimesh_2d_t::operator|,
-             "Computes the union of two 2D meshes", "other"_a)
-        .def("intersection", &trimesh_2d_t::operator&,
-             "Computes the intersection of two 2D meshes", "other"_a)
-        .def("difference", &trimesh_2d_t::operator-,
-             "Computes the difference of two 2D meshes", "other"_a)
+        .def("union", &mesh_union, "Computes the union of two 2D meshes",
+             "other"_a, "num_threads"_a = 1,
+             py::call_guard<py::gil_scoped_release>())
+        .def("intersection", &mesh_intersection,
+             "Computes the intersection of two 2D meshes", "other"_a,
+             "num_threads"_a = 1, py::call_guard<py::gil_scoped_release>())
+        .def("difference", &mesh_difference,
+             "Computes the difference of two 2D meshes", "other"_a,
+             "num_threads"_a = 1, py::call_guard<py::gil_scoped_release>())
         .def("__str__", &trimesh_2d_t::to_string, py::is_operator())
         .def("__repr__", &trimesh_2d_t::to_string, py::is_operator())
         .def("__or__", &trimesh_2d_t::operator|,
@@ -2227,7 +2337,9 @@ void add_2d_types_modules(py::module &m) {
 
     // Defines additional constructors.
     m.def("triangulate_2d", &triangulate, "Triangulates a set of points",
-          "polygon"_a, "shuffle"_a = true);
+          "polygon"_a, "shuffle"_a = true, "brio"_a = false,
+          "seed"_a = std::nullopt, "num_threads"_a = 1,
+          py::call_guard<py::gil_scoped_release>());
 }
 
 }  // namespace trimesh
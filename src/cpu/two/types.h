@@ -3,9 +3,11 @@
 #include <pybind11/pybind11.h>
 #include <pybind11/stl.h>
 
+#include <optional>
 #include <string>
 #include <unordered_set>
 
+#include "../arrays.h"
 #include "../types.h"
 
 namespace py = pybind11;
@@ -251,12 +253,17 @@ struct trimesh_2d_t {
                  const face_set_t &faces, bool validate = true);
     trimesh_2d_t(const std::vector<point_2d_t> &vertices,
                  const face_list_t &faces, bool validate = true);
+    trimesh_2d_t(std::vector<point_2d_t> &&vertices, face_list_t &&faces,
+                 bool validate = true);
 
     void validate() const;
     const std::vector<point_2d_t> &vertices() const;
     const face_list_t &faces() const;
     const triangle_2d_t get_triangle(const face_t &face) const;
     const std::vector<triangle_2d_t> get_triangles() const;
+    static trimesh_2d_t from_arrays(const carray_t<double> &vertices,
+                                    const carray_t<int64_t> &faces,
+                                    bool validate = true);
     static const std::tuple<std::vector<point_2d_t>, face_set_t> merge_vertices(
         const std::vector<point_2d_t> &vertices, const face_set_t &faces);
     static const std::tuple<std::vector<point_2d_t>, face_set_t>
@@ -277,8 +284,12 @@ struct trimesh_2d_t {
     trimesh_2d_t operator-(const trimesh_2d_t &other) const;
 };
 
+// Delaunay triangulation of a set of points. If `num_threads` isn't 1, the
+// points are split into blocks which are triangulated in parallel.
 trimesh_2d_t triangulate(const std::vector<point_2d_t> &points,
-                         bool shuffle = true);
+                         bool shuffle = true, bool brio = false,
+                         std::optional<unsigned int> seed = std::nullopt,
+                         size_t num_threads = 1);
 
 void add_2d_types_modules(py::module &m);
 
@@ -1,10 +1,13 @@
 #include "types.h"
 
+#include <algorithm>
 #include <iostream>
 #include <numeric>
+#include <random>
 #include <sstream>
 
 #include "options.h"
+#include "pickle.h"
 
 using namespace pybind11::literals;
 
@@ -52,11 +55,19 @@ std::string edge_t::to_string() const {
     return "Edge(" + std::to_string(b) + ", " + std::to_string(a) + ")";
 }
 
+// Combines vertex indices into a hash. Neighbouring elements have indices
+// which are close together (especially when points are inserted in
+// space-filling curve order), so XORing them would give lots of collisions.
+size_t hash_indices(std::initializer_list<size_t> indices) {
+    uint64_t h = 0;
+    for (size_t i : indices) h = mix_hash(h, i);
+    return h;
+}
+
 size_t __edge_hash_fn::operator()(const edge_t &e) const {
-    auto hf = std::hash<size_t>();
     auto [a, b, directed] = e;
     if (!directed && a > b) std::swap(a, b);
-    return hf(e.a) ^ hf(e.b);
+    return hash_indices({a, b});
 }
 
 /* ------ *
@@ -135,10 +146,7 @@ std::string face_t::to_string() const {
            std::to_string(c) + ")";
 }
 
-size_t face_hash_fn(const face_t &f) {
-    auto hf = std::hash<size_t>();
-    return hf(f.a) ^ hf(f.b) ^ hf(f.c);
-}
+size_t face_hash_fn(const face_t &f) { return hash_indices({f.a, f.b, f.c}); }
 
 size_t __face_hash_fn::operator()(const face_t &f) const {
     return face_hash_fn(f);
@@ -301,8 +309,7 @@ std::string volume_t::to_string() const {
 }
 
 size_t volume_hash_fn(const volume_t &v) {
-    auto hf = std::hash<size_t>();
-    return hf(v.a) ^ hf(v.b) ^ hf(v.c) ^ hf(v.d);
+    return hash_indices({v.a, v.b, v.c, v.d});
 }
 
 size_t __volume_hash_fn::operator()(const volume_t &v) const {
@@ -347,6 +354,47 @@ void check_file_ext(const std::string &filename, const std::string &ext) {
     }
 }
 
+// Smallest number of points in the first round of a biased randomized
+// insertion order; smaller inputs are just sorted along the curve.
+const size_t MIN_BRIO_ROUND_SIZE = 64;
+
+std::vector<size_t> insertion_order(const std::vector<uint64_t> &keys,
+                                    bool shuffle, bool brio,
+                                    std::optional<unsigned int> seed) {
+    std::vector<size_t> order(keys.size());
+    std::iota(order.begin(), order.end(), 0);
+    if (!shuffle && !brio) return order;
+
+    std::mt19937 gen(seed ? *seed : std::random_device{}());
+    std::shuffle(order.begin(), order.end(), gen);
+    if (!brio) return order;
+
+    // Biased randomized insertion order: the shuffled points are split into
+    // rounds, where each round has half of the points which are left, and
+    // the points in each round are sorted by their space-filling curve key.
+    // The sort direction alternates between rounds, so that the first point
+    // of each round is close to the last point of the previous one.
+    std::vector<size_t> ends;
+    for (size_t end = order.size(); end > 0;) {
+        ends.push_back(end);
+        end = end > 2 * MIN_BRIO_ROUND_SIZE ? end / 2 : 0;
+    }
+    size_t begin = 0;
+    for (size_t r = ends.size(); r-- > 0;) {
+        const auto first = order.begin() + begin,
+                   last = order.begin() + ends[r];
+        if (r % 2 == 0) {
+            std::sort(first, last,
+                      [&](size_t i, size_t j) { return keys[i] < keys[j]; });
+        } else {
+            std::sort(first, last,
+                      [&](size_t i, size_t j) { return keys[i] > keys[j]; });
+        }
+        begin = ends[r];
+    }
+    return order;
+}
+
 void add_types_modules(py::module &m) {
     // Defines the classes first, so that methods can resolve types
     // correctly.
@@ -356,6 +404,12 @@ void add_types_modules(py::module &m) {
     auto barycentric_coordinates =
         py::class_<barycentric_coordinates_t>(m, "BarycentricCoordinates");
 
+    // Defines pickling, so that these can be sent to other processes.
+    edge.def(pickle_as_bytes<edge_t>());
+    face.def(pickle_as_bytes<face_t>());
+    volume.def(pickle_as_bytes<volume_t>());
+    barycentric_coordinates.def(pickle_as_bytes<barycentric_coordinates_t>());
+
     // Defines Edge methods.
     edge.def(py::init<size_t, size_t, bool>(), "a"_a, "b"_a,
              "directed"_a = false, "Defines a directed triangle edge")
@@ -3,13 +3,24 @@
 #include <pybind11/pybind11.h>
 #include <pybind11/stl.h>
 
+#include <cstdint>
+#include <optional>
 #include <string>
 #include <unordered_set>
+#include <vector>
 
 namespace py = pybind11;
 
 namespace trimesh {
 
+// Mixes a value into a hash, using the splitmix64 finalizer.
+inline uint64_t mix_hash(uint64_t h, uint64_t v) {
+    h += v + 0x9E3779B97F4A7C15ull;
+    h = (h ^ (h >> 30)) * 0xBF58476D1CE4E5B9ull;
+    h = (h ^ (h >> 27)) * 0x94D049BB133111EBull;
+    return h ^ (h >> 31);
+}
+
 struct edge_t {
     size_t a, b;
     bool directed;
@@ -114,8 +125,24 @@ struct barycentric_coordinates_t {
     std::string to_string() const;
 };
 
+// Marks a missing neighbor in the flat adjacency arrays of the split trees.
+constexpr size_t NO_NEIGHBOR = SIZE_MAX;
+
+// Children of a node in a split tree. The simplices which replace a set of
+// simplices are always added in a single batch, so the children of each node
+// are a contiguous range of indices, and leaves have an empty range.
+struct child_range_t {
+    size_t begin = 0, end = 0;
+
+    bool empty() const { return begin == end; }
+};
+
 void check_file_ext(const std::string &filename, const std::string &ext);
 
+std::vector<size_t> insertion_order(const std::vector<uint64_t> &keys,
+                                    bool shuffle, bool brio,
+                                    std::optional<unsigned int> seed);
+
 void add_types_modules(py::module &m);
 
 }  // namespace trimesh
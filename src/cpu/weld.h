@@ -0,0 +1,281 @@
+#pragma once
+
+#include <array>
+#include <cmath>
+#include <cstdint>
+#include <cstring>
+#include <functional>
+#include <optional>
+#include <tuple>
+#include <utility>
+#include <vector>
+
+#include "options.h"
+#include "parallel.h"
+#include "types.h"
+
+namespace trimesh {
+
+// Integer coordinates of a cell in a uniform grid.
+template <size_t D>
+using grid_cell_t = std::array<int64_t, D>;
+
+// Returns the coordinates of a point which is laid out as D contiguous
+// doubles.
+template <size_t D, typename P>
+std::array<double, D> point_coordinates(const P &p) {
+    static_assert(sizeof(P) == D * sizeof(double),
+                  "Point must be D contiguous doubles");
+    std::array<double, D> coords;
+    std::memcpy(coords.data(), &p, sizeof(P));
+    return coords;
+}
+
+// Returns the grid cell containing a point. If the cell size isn't positive,
+// each distinct point gets its own cell.
+template <size_t D>
+grid_cell_t<D> get_grid_cell(const std::array<double, D> &coords,
+                             double cell_size) {
+    grid_cell_t<D> cell;
+    for (size_t d = 0; d < D; d++) {
+        if (cell_size > 0)
+            cell[d] = static_cast<int64_t>(std::floor(coords[d] / cell_size));
+        else
+            std::memcpy(&cell[d], &coords[d], sizeof(double));
+    }
+    return cell;
+}
+
+template <size_t D>
+uint64_t hash_grid_cell(const grid_cell_t<D> &cell) {
+    uint64_t h = 0;
+    for (const int64_t c : cell) h = mix_hash(h, static_cast<uint64_t>(c));
+    return h;
+}
+
+// Welds points which are within a tolerance of each other, so that each
+// cluster of nearby points gets a single index, which is the index of the
+// first point that was added to it. Points are bucketed into a grid with
+// cells four times the tolerance wide, so only the neighbouring cells on the
+// sides which a point is close to have to be searched. The cells are kept in
+// an open-addressing hash table with linear probing, and the points in each
+// cell are chained together in the order they were added.
+template <typename P, size_t D>
+struct point_welder_t {
+    std::vector<P> points;
+
+    explicit point_welder_t(double tolerance = get_tolerance())
+        : tolerance(tolerance), cell_size(4 * tolerance) {}
+
+    // Returns the index of the first point within the tolerance of `p`.
+    std::optional<size_t> find(const P &p) const {
+        if (this->slots.empty()) return std::nullopt;
+        const auto coords = point_coordinates<D>(p);
+        const auto home = get_grid_cell<D>(coords, this->cell_size);
+
+        // Gets the neighbouring cell on each axis which is within the
+        // tolerance of the point, if any.
+        std::array<int64_t, D> sides{};
+        for (size_t d = 0; d < D && this->cell_size > 0; d++) {
+            const double offset = coords[d] - home[d] * this->cell_size;
+            if (offset < this->tolerance)
+                sides[d] = -1;
+            else if (offset > this->cell_size - this->tolerance)
+                sides[d] = 1;
+        }
+
+        std::optional<size_t> found;
+        for (size_t mask = 0; mask < (size_t{1} << D); mask++) {
+            grid_cell_t<D> cell = home;
+            bool valid = true;
+            for (size_t d = 0; d < D && valid; d++) {
+                if (!(mask >> d & 1)) continue;
+                valid = sides[d] != 0;
+                cell[d] += sides[d];
+            }
+            if (!valid) continue;
+            const auto &slot = this->slots[this->find_slot(cell)];
+            for (size_t i = slot.head; i != EMPTY; i = this->next[i]) {
+                if (found && *found < i) break;
+                if (this->is_close(coords, this->points[i])) {
+                    found = i;
+                    break;
+                }
+            }
+        }
+        return found;
+    }
+
+    // Adds a point without checking for nearby points, returning its index.
+    size_t insert(const P &p) {
+        if (2 * (this->num_cells + 1) > this->slots.size()) this->grow();
+        const auto cell =
+            get_grid_cell<D>(point_coordinates<D>(p), this->cell_size);
+        auto &slot = this->slots[this->find_slot(cell)];
+        const size_t i = this->points.size();
+        if (slot.head == EMPTY) {
+            slot.cell = cell;
+            slot.head = i;
+            this->num_cells++;
+        } else {
+            this->next[slot.tail] = i;
+        }
+        slot.tail = i;
+        this->points.push_back(p);
+        this->next.push_back(EMPTY);
+        return i;
+    }
+
+    // Returns the index of the first point within the tolerance of `p`,
+    // adding `p` if there isn't one.
+    size_t add_point(const P &p) {
+        if (auto i = this->find(p); i) return *i;
+        return this->insert(p);
+    }
+
+    size_t size() const { return this->points.size(); }
+
+   private:
+    static constexpr size_t EMPTY = SIZE_MAX;
+
+    struct slot_t {
+        grid_cell_t<D> cell;
+        size_t head = EMPTY, tail = EMPTY;
+    };
+
+    double tolerance, cell_size;
+    std::vector<slot_t> slots;
+    std::vector<size_t> next;
+    size_t num_cells = 0;
+
+    bool is_close(const std::array<double, D> &coords, const P &q) const {
+        const auto other = point_coordinates<D>(q);
+        double dist = 0;
+        for (size_t d = 0; d < D; d++)
+            dist += (coords[d] - other[d]) * (coords[d] - other[d]);
+        return dist < this->tolerance * this->tolerance ||
+               (this->tolerance <= 0 && dist == 0);
+    }
+
+    // Returns the slot holding the cell, or the empty slot where it would
+    // go. The table is never more than half full, so this terminates.
+    size_t find_slot(const grid_cell_t<D> &cell) const {
+        const size_t mask = this->slots.size() - 1;
+        for (size_t s = hash_grid_cell<D>(cell) & mask;; s = (s + 1) & mask) {
+            const auto &slot = this->slots[s];
+            if (slot.head == EMPTY || slot.cell == cell) return s;
+        }
+    }
+
+    void grow() {
+        std::vector<slot_t> old(std::max<size_t>(16, 2 * this->slots.size()));
+        std::swap(old, this->slots);
+        for (const auto &slot : old)
+            if (slot.head != EMPTY)
+                this->slots[this->find_slot(slot.cell)] = slot;
+    }
+};
+
+// A slot of the hash tables used by `weld_points`, holding a grid cell and
+// the first point which falls in it.
+template <size_t D>
+struct weld_slot_t {
+    grid_cell_t<D> cell;
+    size_t first = SIZE_MAX;
+};
+
+// Welds a large batch of points at once, returning the unique points in the
+// order they first appear and the index of each input point among them.
+// Unlike `point_welder_t`, points are merged when they fall in the same cell
+// of a grid with the tolerance as its spacing. That always merges exact
+// duplicates, such as the shared corners of STL triangles, and only needs
+// one hash table lookup per point. The cells are split into shards by their
+// hash, and each shard has its own open-addressing table, filled on its own
+// thread by visiting its points in order.
+template <typename P, size_t D>
+std::tuple<std::vector<P>, std::vector<size_t>> weld_points(
+    const std::vector<P> &points, double tolerance = get_tolerance(),
+    size_t num_threads = 0) {
+    constexpr size_t EMPTY = SIZE_MAX;
+    const size_t n = points.size();
+    const size_t num_shards = get_num_threads(num_threads, n);
+    auto cell_of = [&](size_t i) {
+        return get_grid_cell<D>(point_coordinates<D>(points[i]), tolerance);
+    };
+
+    std::vector<uint64_t> hashes(n);
+    parallel_chunks(n, num_shards, [&](size_t chunk, size_t lo, size_t hi) {
+        for (size_t i = lo; i < hi; i++)
+            hashes[i] = hash_grid_cell<D>(cell_of(i));
+    });
+
+    // Groups the points by shard with a counting sort, so that each thread
+    // only visits its own points. The low bits of the hash pick the slot, so
+    // the high bits pick the shard. Each chunk writes its points after those
+    // of the earlier chunks, which keeps every shard in input order.
+    auto shard_of = [&](size_t i) { return (hashes[i] >> 32) % num_shards; };
+    std::vector<size_t> offsets(num_shards * num_shards + 1, 0);
+    parallel_chunks(n, num_shards, [&](size_t chunk, size_t lo, size_t hi) {
+        for (size_t i = lo; i < hi; i++)
+            offsets[shard_of(i) * num_shards + chunk + 1]++;
+    });
+    for (size_t k = 1; k < offsets.size(); k++) offsets[k] += offsets[k - 1];
+    std::vector<size_t> order(n);
+    parallel_chunks(n, num_shards, [&](size_t chunk, size_t lo, size_t hi) {
+        std::vector<size_t> next(num_shards);
+        for (size_t shard = 0; shard < num_shards; shard++)
+            next[shard] = offsets[shard * num_shards + chunk];
+        for (size_t i = lo; i < hi; i++) order[next[shard_of(i)]++] = i;
+    });
+
+    // Maps each point to the first point in its cell.
+    std::vector<size_t> ids(n);
+    parallel_chunks(
+        num_shards, num_shards, [&](size_t shard, size_t lo, size_t hi) {
+            std::vector<weld_slot_t<D>> slots(1024);
+            size_t num_cells = 0;
+            auto find_slot = [&](uint64_t hash, const grid_cell_t<D> &cell) {
+                const size_t mask = slots.size() - 1;
+                for (size_t s = hash & mask;; s = (s + 1) & mask)
+                    if (slots[s].first == EMPTY || slots[s].cell == cell)
+                        return s;
+            };
+            const size_t begin = offsets[shard * num_shards],
+                         end = offsets[(shard + 1) * num_shards];
+            for (size_t k = begin; k < end; k++) {
+                const size_t i = order[k];
+                const auto cell = cell_of(i);
+                size_t s = find_slot(hashes[i], cell);
+                if (slots[s].first == EMPTY) {
+                    // Keeps the table at most half full.
+                    if (2 * (num_cells + 1) > slots.size()) {
+                        std::vector<weld_slot_t<D>> old(2 * slots.size());
+                        std::swap(old, slots);
+                        for (const auto &slot : old)
+                            if (slot.first != EMPTY)
+                                slots[find_slot(hash_grid_cell<D>(slot.cell),
+                                                slot.cell)] = slot;
+                        s = find_slot(hashes[i], cell);
+                    }
+                    slots[s] = {cell, i};
+                    num_cells++;
+                }
+                ids[i] = slots[s].first;
+            }
+        });
+
+    // Numbers the unique points in order. Each point comes after the first
+    // point in its cell, which has already been given its final index.
+    std::vector<P> unique;
+    for (size_t i = 0; i < n; i++) {
+        if (ids[i] == i) {
+            ids[i] = unique.size();
+            unique.push_back(points[i]);
+        } else {
+            ids[i] = ids[ids[i]];
+        }
+    }
+    return {std::move(unique), std::move(ids)};
+}
+
+}  // namespace trimesh
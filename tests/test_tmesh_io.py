@@ -0,0 +1,191 @@
+"""Tests saving and loading meshes in the native .tmesh format."""
+
+import random
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing.shared_memory import SharedMemory
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+from tmesh import (
+    BVH3D,
+    Point3D,
+    Tetramesh3D,
+    Trimesh2D,
+    Trimesh3D,
+    icosphere,
+    linear_extrude,
+    load_tmesh,
+    load_tmesh_arrays,
+    load_tmesh_bvh,
+    regular_polygon_mesh,
+    save_tmesh,
+    share_tmesh,
+)
+
+
+def test_tmesh_round_trip(tmpdir: Path) -> None:
+    """Tests that each kind of mesh is loaded exactly as it was saved.
+
+    Args:
+        tmpdir: The temporary directory to use for testing.
+    """
+
+    meshes = [
+        regular_polygon_mesh(1.0, n=7),
+        icosphere(1.0, 2),
+        linear_extrude(regular_polygon_mesh(1.0, n=5), 1.0),
+    ]
+    for i, mesh in enumerate(meshes):
+        path = str(tmpdir / f"mesh_{i}.tmesh")
+        save_tmesh(path, mesh)
+        loaded = load_tmesh(path)
+        assert type(loaded) is type(mesh)
+        assert loaded.vertices == mesh.vertices
+        if isinstance(mesh, Tetramesh3D):
+            assert loaded.volumes == mesh.volumes
+        else:
+            assert loaded.faces == mesh.faces
+
+    assert isinstance(load_tmesh(str(tmpdir / "mesh_0.tmesh")), Trimesh2D)
+    assert isinstance(load_tmesh(str(tmpdir / "mesh_1.tmesh")), Trimesh3D)
+
+
+def test_tmesh_arrays(tmpdir: Path) -> None:
+    """Tests viewing the sections of a .tmesh file as arrays.
+
+    Args:
+        tmpdir: The temporary directory to use for testing.
+    """
+
+    mesh = icosphere(1.0, 0)
+    path = str(tmpdir / "sphere.tmesh")
+    save_tmesh(path, mesh, bvh=True, adjacency=True)
+    arrays = load_tmesh_arrays(path)
+    assert set(arrays) == {"vertices", "faces", "adjacency", "bvh_nodes", "bvh_indices"}
+    assert np.array_equal(arrays["vertices"], mesh.vertices_array)
+    assert np.array_equal(arrays["faces"], mesh.faces_array)
+    assert not arrays["vertices"].flags.writeable
+
+    # The root of the BVH holds every face.
+    nodes = arrays["bvh_nodes"]
+    assert nodes[0]["count"] + nodes[0]["offset"] <= len(mesh.faces)
+    assert np.allclose(nodes[0]["min"], mesh.vertices_array.min(axis=0))
+    assert np.allclose(nodes[0]["max"], mesh.vertices_array.max(axis=0))
+    assert sorted(arrays["bvh_indices"].tolist()) == list(range(len(mesh.faces)))
+
+    # The sphere is closed, so every edge has a neighbor, which has the same
+    # edge in the other direction.
+    faces, adjacency = arrays["faces"], arrays["adjacency"]
+    assert adjacency.shape == faces.shape
+    for i, (face, neighbors) in enumerate(zip(faces.tolist(), adjacency.tolist())):
+        for j, n in enumerate(neighbors):
+            a, b = face[j], face[(j + 1) % 3]
+            other = faces[n].tolist()
+            assert any(other[k] == b and other[(k + 1) % 3] == a for k in range(3))
+            assert i in adjacency[n]
+
+    # Boundary volumes of a tetrahedral mesh have missing neighbors.
+    tetramesh = linear_extrude(regular_polygon_mesh(1.0, n=5), 1.0)
+    path = str(tmpdir / "prism.tmesh")
+    save_tmesh(path, tetramesh, adjacency=True)
+    arrays = load_tmesh_arrays(path)
+    assert arrays["volumes"].shape == (len(tetramesh.volumes), 4)
+    assert (arrays["adjacency"] == -1).any()
+    assert (arrays["adjacency"] >= 0).any()
+
+
+def test_tmesh_bvh(tmpdir: Path) -> None:
+    """Tests that a saved BVH gives the same answers as a new one.
+
+    Args:
+        tmpdir: The temporary directory to use for testing.
+    """
+
+    mesh = icosphere(1.0, 3)
+    path = str(tmpdir / "sphere.tmesh")
+    save_tmesh(path, mesh, bvh=True)
+    loaded = load_tmesh(path)
+    bvh_a, bvh_b = BVH3D(mesh), load_tmesh_bvh(path, loaded)
+
+    rng = random.Random(0)
+    for _ in range(20):
+        p = Point3D(rng.uniform(-2, 2), rng.uniform(-2, 2), rng.uniform(-2, 2))
+        assert bvh_b.distance(p) == pytest.approx(bvh_a.distance(p))
+
+    save_tmesh(path, mesh)
+    with pytest.raises(RuntimeError, match="no BVH"):
+        load_tmesh_bvh(path, loaded)
+
+
+def _shared_distances(name: str, points: list[tuple[float, float, float]]) -> list[float]:
+    shm = SharedMemory(name=name)
+    try:
+        bvh = load_tmesh_bvh(shm.buf)
+        distances = [bvh.distance(Point3D(*p)) for p in points]
+        del bvh
+        return distances
+    finally:
+        shm.close()
+
+
+def test_share_tmesh() -> None:
+    """Tests attaching to a mesh and its BVH in shared memory."""
+
+    mesh = icosphere(1.0, 3)
+    shm = share_tmesh(mesh, bvh=True)
+    try:
+        arrays = load_tmesh_arrays(shm.buf)
+        assert np.array_equal(arrays["vertices"], mesh.vertices_array)
+        assert np.array_equal(arrays["faces"], mesh.faces_array)
+        del arrays
+
+        # The loaded mesh uses the shared memory in place, so the memory
+        # can't be released until the mesh is gone.
+        loaded = load_tmesh(shm.buf)
+        assert loaded.faces == mesh.faces
+        with pytest.raises(BufferError):
+            shm.close()
+        assert loaded.signed_volume() == pytest.approx(mesh.signed_volume())
+        del loaded
+
+        rng = random.Random(0)
+        points = [(rng.uniform(-2, 2), rng.uniform(-2, 2), rng.uniform(-2, 2)) for _ in range(20)]
+        with ProcessPoolExecutor(max_workers=2) as pool:
+            distances = pool.submit(_shared_distances, shm.name, points).result()
+        bvh = BVH3D(mesh)
+        assert distances == pytest.approx([bvh.distance(Point3D(*p)) for p in points])
+    finally:
+        shm.close()
+        shm.unlink()
+
+    with pytest.raises(TypeError):
+        load_tmesh(1)
+
+
+def test_invalid_tmesh(tmpdir: Path) -> None:
+    """Tests that truncated and unrelated files are rejected.
+
+    Args:
+        tmpdir: The temporary directory to use for testing.
+    """
+
+    path = tmpdir / "sphere.tmesh"
+    save_tmesh(str(path), icosphere(1.0, 1))
+    data = path.read_binary()
+
+    path.write_binary(data[:-8])
+    with pytest.raises(RuntimeError, match="out of bounds"):
+        load_tmesh(str(path))
+
+    path.write_binary(b"solid" + data[5:])
+    with pytest.raises(RuntimeError, match="magic"):
+        load_tmesh_arrays(str(path))
+
+    # Faces are used in place, but are still checked against the vertices.
+    faces = np.asarray(icosphere(1.0, 1).faces_array, dtype=np.int64).tobytes()
+    corrupt = np.int64(10**6).tobytes() + faces[8:]
+    path.write_binary(data.replace(faces, corrupt))
+    with pytest.raises(RuntimeError, match="Invalid vertex index"):
+        load_tmesh(str(path), validate=False)
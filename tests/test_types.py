@@ -1,9 +1,10 @@
 """Tests types which are shared between two and three dimensions."""
 
 import itertools
+import pickle
 import random
 
-from tmesh import Face, Point2D, Point3D, Tetrahedron3D, Triangle2D, Volume
+from tmesh import BarycentricCoordinates, Edge, Face, Point2D, Point3D, Tetrahedron3D, Triangle2D, Volume
 
 
 def test_face_hashing() -> None:
@@ -34,3 +35,8 @@ def test_volume_hashing() -> None:
                 assert v2 in volumes
             else:
                 assert v2 not in volumes
+
+
+def test_pickle_indices() -> None:
+    for value in (Edge(1, 2, directed=True), Face(3, 1, 2), Volume(4, 2, 3, 1), BarycentricCoordinates(0.2, 0.3, 0.5)):
+        assert pickle.loads(pickle.dumps(value)) == value
@@ -0,0 +1,58 @@
+"""Tests vectorized geometry predicates in three dimensions."""
+
+import numpy as np
+import pytest
+
+from tmesh import (
+    Point3D,
+    Tetrahedron3D,
+    Triangle3D,
+    batch_barycentric_coordinates_3d,
+    batch_distance_to_tetrahedron_3d,
+    batch_distance_to_triangle_3d,
+    batch_point_is_inside_3d,
+)
+
+
+def test_batch_triangle_predicates_3d() -> None:
+    """Checks the batched triangle predicates against their scalar counterparts."""
+
+    rng = np.random.default_rng(1337)
+    points = rng.uniform(-1.0, 2.0, size=(100, 3))
+    triangle = Triangle3D(Point3D(0, 0, 0), Point3D(1, 0, 0), Point3D(0, 1, 1))
+    scalar_points = [Point3D(*p) for p in points]
+
+    distances = batch_distance_to_triangle_3d(points, triangle)
+    assert distances.tolist() == pytest.approx([p.distance_to_triangle(triangle) for p in scalar_points])
+
+    bary = batch_barycentric_coordinates_3d(points, triangle)
+    assert bary.shape == (100, 3)
+    for row, p in zip(bary, scalar_points):
+        b = p.barycentric_coordinates(triangle)
+        assert row.tolist() == pytest.approx([b.u, b.v, b.w])
+
+    triangles = np.broadcast_to([[0, 0, 0], [1, 0, 0], [0, 1, 1]], (100, 3, 3))
+    assert batch_distance_to_triangle_3d(points, triangles).tolist() == pytest.approx(distances.tolist())
+
+
+def test_batch_tetrahedron_predicates_3d() -> None:
+    """Checks the batched tetrahedron predicates against their scalar counterparts."""
+
+    rng = np.random.default_rng(1337)
+    points = rng.uniform(-0.5, 1.0, size=(100, 3))
+    tetra = Tetrahedron3D(Point3D(0, 0, 0), Point3D(1, 0, 0), Point3D(0, 1, 0), Point3D(0, 0, 1))
+    scalar_points = [Point3D(*p) for p in points]
+
+    inside = batch_point_is_inside_3d(points, tetra)
+    assert inside.dtype == np.bool_
+    assert inside.tolist() == [tetra.point_is_inside(p) for p in scalar_points]
+    assert inside.any() and not inside.all()
+
+    distances = batch_distance_to_tetrahedron_3d(points, tetra)
+    assert distances.tolist() == pytest.approx([p.distance_to_tetrahedron(tetra) for p in scalar_points])
+
+    tetras = np.broadcast_to([[0, 0, 0], [1, 0, 0], [0, 1, 0], [0, 0, 1]], (100, 4, 3))
+    assert batch_point_is_inside_3d(points, tetras).tolist() == inside.tolist()
+
+    with pytest.raises(ValueError):
+        batch_point_is_inside_3d(points, tetras[:, :3])
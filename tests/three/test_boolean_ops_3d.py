@@ -1,11 +1,34 @@
 import math
+from collections import Counter
 
 import pytest
 
-from tmesh import Affine3D, tetrahedron
+from tmesh import (
+    Affine3D,
+    Tetramesh3D,
+    Trimesh3D,
+    cuboid,
+    icosphere,
+    linear_extrude,
+    regular_polygon_mesh,
+    tetrahedron,
+)
+
+
+def is_closed(mesh: Trimesh3D) -> bool:
+    """Checks that every edge of a mesh is shared by exactly two faces.
+
+    Args:
+        mesh: The mesh to check.
+
+    Returns:
+        Whether the mesh is closed.
+    """
+
+    edges = Counter(tuple(sorted(e)) for f in mesh.faces for e in ((f.a, f.b), (f.b, f.c), (f.c, f.a)))
+    return all(count == 2 for count in edges.values())
 
 
-@pytest.mark.skip("Not implemented yet")
 def test_union_3d() -> None:
     """Tests taking the union of two trimeshes."""
 
@@ -21,10 +44,120 @@ def test_union_3d() -> None:
     mesh_intersection = mesh_a & mesh_b
     mesh_difference = mesh_a - mesh_b
 
+    # The tips of the tetrahedra poke into each other, and their surfaces
+    # cross in a hexagon.
     assert len(mesh_union.vertices) == 12
-    assert len(mesh_intersection.vertices) == 4
-    assert len(mesh_difference.vertices) == 8
+    assert len(mesh_intersection.vertices) == 8
+    assert len(mesh_difference.vertices) == 10
+
+
+@pytest.mark.parametrize("num_threads", [1, 4])
+def test_trimesh_booleans_3d(num_threads: int) -> None:
+    """Tests boolean operations on closed triangle meshes.
+
+    Args:
+        num_threads: The number of threads to use for each operation.
+    """
+
+    mesh_a = cuboid(1.0, 1.0, 1.0)
+    mesh_b = mesh_a << Affine3D(trans=(0.5, 0.5, 0.5))
+
+    mesh_union = mesh_a.union(mesh_b, num_threads=num_threads)
+    mesh_intersection = mesh_a.intersection(mesh_b, num_threads=num_threads)
+    mesh_difference = mesh_a.difference(mesh_b, num_threads=num_threads)
+
+    assert mesh_union.signed_volume() == pytest.approx(1.875)
+    assert mesh_intersection.signed_volume() == pytest.approx(0.125)
+    assert mesh_difference.signed_volume() == pytest.approx(0.875)
+    for mesh in (mesh_union, mesh_intersection, mesh_difference):
+        assert is_closed(mesh)
+
+    # Shared faces, and one mesh inside the other.
+    mesh_c = mesh_a << Affine3D(trans=(0.5, 0.0, 0.0))
+    assert (mesh_a | mesh_c).signed_volume() == pytest.approx(1.5)
+    assert (mesh_a & mesh_c).signed_volume() == pytest.approx(0.5)
+    mesh_d = cuboid(0.5, 0.5, 0.5) << Affine3D(trans=(0.25, 0.25, 0.25))
+    assert (mesh_a | mesh_d).signed_volume() == pytest.approx(1.0)
+    assert (mesh_a - mesh_d).signed_volume() == pytest.approx(0.875)
+
+
+def test_curved_trimesh_booleans_3d() -> None:
+    """Tests that boolean operations on spheres agree with each other."""
+
+    mesh_a = icosphere(1.0, 3)
+    mesh_b = mesh_a << Affine3D(trans=(0.7, 0.3, 0.2))
+
+    mesh_union, mesh_intersection, mesh_difference = mesh_a | mesh_b, mesh_a & mesh_b, mesh_a - mesh_b
+
+    volume = mesh_a.signed_volume()
+    assert mesh_union.signed_volume() == pytest.approx(2 * volume - mesh_intersection.signed_volume())
+    assert mesh_difference.signed_volume() == pytest.approx(volume - mesh_intersection.signed_volume())
+    for mesh in (mesh_union, mesh_intersection, mesh_difference):
+        assert is_closed(mesh)
+
+
+@pytest.mark.parametrize("num_threads", [1, 4])
+def test_tetramesh_booleans_3d(num_threads: int) -> None:
+    """Tests boolean operations on overlapping tetrahedral meshes.
+
+    Args:
+        num_threads: The number of threads to use for each operation.
+    """
+
+    mesh_a = linear_extrude(regular_polygon_mesh(1.0, 4), 1.0)
+    mesh_b = mesh_a << Affine3D(trans=(0.5, 0.5, 0.5))
+
+    def volume(mesh: Tetramesh3D) -> float:
+        return sum(t.signed_volume() for t in mesh.get_tetrahedra())
+
+    mesh_union = mesh_a.union(mesh_b, num_threads=num_threads)
+    mesh_intersection = mesh_a.intersection(mesh_b, num_threads=num_threads)
+    mesh_difference = mesh_a.difference(mesh_b, num_threads=num_threads)
+
+    assert volume(mesh_union) == pytest.approx(3.5)
+    assert volume(mesh_intersection) == pytest.approx(0.5)
+    assert volume(mesh_difference) == pytest.approx(1.5)
+    assert volume(mesh_a | mesh_b) == pytest.approx(3.5)
+
+    # The tetrahedra on either side of each cut share their faces, so the
+    # boundaries of the results are closed.
+    for mesh in (mesh_union, mesh_intersection, mesh_difference):
+        assert is_closed(mesh.to_trimesh())
+
+    # Disjoint meshes.
+    mesh_c = mesh_a << Affine3D(trans=(5.0, 0.0, 0.0))
+    assert volume(mesh_a | mesh_c) == pytest.approx(4.0)
+    assert volume(mesh_a - mesh_c) == pytest.approx(2.0)
+
+
+@pytest.mark.parametrize("level", [2, 3])
+def test_curved_tetramesh_booleans_3d(level: int) -> None:
+    """Tests boolean operations on tetrahedral spheres, and the size of their outputs.
+
+    Args:
+        level: The subdivision level of the spheres.
+    """
+
+    mesh_a = icosphere(1.0, level).to_tetramesh()
+    mesh_b = mesh_a << Affine3D(trans=(0.7, 0.3, 0.2))
+    surface_a, surface_b = mesh_a.to_trimesh(), mesh_b.to_trimesh()
+
+    def volume(mesh: Tetramesh3D) -> float:
+        return sum(t.signed_volume() for t in mesh.get_tetrahedra())
+
+    mesh_union, mesh_intersection, mesh_difference = mesh_a | mesh_b, mesh_a & mesh_b, mesh_a - mesh_b
+
+    assert volume(mesh_union) == pytest.approx((surface_a | surface_b).signed_volume())
+    assert volume(mesh_intersection) == pytest.approx((surface_a & surface_b).signed_volume())
+    assert volume(mesh_difference) == pytest.approx((surface_a - surface_b).signed_volume())
+
+    # The outputs are tetrahedralized from their surfaces, so they are closed
+    # and stay within a small multiple of the inputs.
+    num_inputs = len(mesh_a.volumes) + len(mesh_b.volumes)
+    for mesh in (mesh_union, mesh_intersection, mesh_difference):
+        assert is_closed(mesh.to_trimesh())
+        assert len(mesh.volumes) < 5 * num_inputs
 
 
 if __name__ == "__main__":
-    test_union_3d()
+    test_trimesh_booleans_3d(1)
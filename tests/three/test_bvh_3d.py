@@ -1,8 +1,27 @@
 """Tests axis aligned bounding box data structure for CPU."""
 
+import pickle
+import random
+
+import numpy as np
 import pytest
 
-from tmesh import DelaunaySplitTree3D, Point3D, Tetrahedron3D
+from tmesh import (
+    BVH3D,
+    BoundingBox3D,
+    DelaunaySplitTree3D,
+    Face,
+    Line3D,
+    Point3D,
+    Tetrahedron3D,
+    Triangle3D,
+    Trimesh3D,
+    cuboid,
+    icosphere,
+)
+
+# The layout of a BVH3D node in its pickled state.
+NODE_DTYPE = np.dtype([("min", "<f8", 3), ("max", "<f8", 3), ("offset", "<u8"), ("count", "<u8")])
 
 
 @pytest.mark.parametrize(
@@ -68,3 +87,193 @@ def test_split_tree_multi_insert_3d(points: list[Point3D], make_delaunay: bool,
     volumes = [tree.get_tetrahedron(i).signed_volume() for i in tree.get_leaf_indices()]
     assert all(v > 0 for v in volumes)
     assert sum(volumes) == pytest.approx(tetra.signed_volume())
+
+
+def test_split_tree_walk_to_leaf_3d() -> None:
+    """Checks that walking to a leaf agrees with descending the history."""
+
+    tetra = Tetrahedron3D(
+        Point3D(-10, -10, -10),
+        Point3D(10, -10, -10),
+        Point3D(0, 10, -10),
+        Point3D(0, 0, 10),
+    )
+    tree = DelaunaySplitTree3D(tetra)
+
+    rng = random.Random(0)
+    for _ in range(200):
+        point = Point3D(rng.uniform(-1, 1), rng.uniform(-1, 1), rng.uniform(-1, 1))
+        i = tree.walk_to_leaf(point)
+        assert i == tree.find_leaf_index(point)
+        tree.split_tetrahedron(point, i)
+
+    for _ in range(100):
+        point = Point3D(rng.uniform(-1, 1), rng.uniform(-1, 1), rng.uniform(-1, 1))
+        assert tree.get_tetrahedron(tree.walk_to_leaf(point)).point_is_inside(point)
+
+
+@pytest.mark.parametrize("keep_history", [True, False])
+def test_split_tree_neighbors_3d(keep_history: bool) -> None:
+    """Checks the neighbors of the leaves, with and without the history.
+
+    Args:
+        keep_history: Whether the tree keeps the replaced tetrahedra.
+    """
+
+    tetra = Tetrahedron3D(
+        Point3D(-10, -10, -10),
+        Point3D(10, -10, -10),
+        Point3D(0, 10, -10),
+        Point3D(0, 0, 10),
+    )
+    tree = DelaunaySplitTree3D(tetra, keep_history=keep_history)
+
+    rng = random.Random(0)
+    for _ in range(200):
+        point = Point3D(rng.uniform(-1, 1), rng.uniform(-1, 1), rng.uniform(-1, 1))
+        tree.split_tetrahedron(point, tree.walk_to_leaf(point))
+
+    # Discarding the history keeps the same leaves, renumbered in order.
+    volumes = sorted(tree.get_volume(i) for i in tree.get_leaf_indices())
+    tree.discard_history()
+    assert tree.get_leaf_indices() == list(range(len(volumes)))
+    assert sorted(tree.get_volume(i) for i in tree.get_leaf_indices()) == volumes
+
+    for i in tree.get_leaf_indices():
+        faces = tree.get_volume(i).get_faces()
+        for face, j in zip(faces, tree.get_neighbors(i)):
+            if j is None:
+                continue
+            assert tree.is_leaf(j)
+            assert face.flip() in tree.get_volume(j).get_faces()
+            assert i in tree.get_neighbors(j)
+
+
+def test_bvh_queries_3d() -> None:
+    """Checks BVH queries against brute force over every face."""
+
+    mesh = icosphere(1.0, 2)
+    bvh = BVH3D(mesh, leaf_size=2)
+    assert len(bvh) > 1
+
+    def key(face: Face) -> tuple[int, int, int]:
+        return (face.a, face.b, face.c)
+
+    triangles = [(face, mesh.get_triangle(face)) for face in mesh.faces]
+    rng = random.Random(1337)
+    for _ in range(20):
+        p = Point3D(rng.uniform(-2, 2), rng.uniform(-2, 2), rng.uniform(-2, 2))
+        q = Point3D(rng.uniform(-2, 2), rng.uniform(-2, 2), rng.uniform(-2, 2))
+
+        # Closest point and signed distance.
+        expected = min(p.distance_to_point(t.closest_point(p)) for _, t in triangles)
+        assert bvh.distance(p) == pytest.approx(expected)
+        _, closest = bvh.closest_point(p)
+        assert p.distance_to_point(closest) == pytest.approx(expected)
+        inside = p.distance_to_point(Point3D(0, 0, 0)) < 1 - expected
+        assert bvh.signed_distance(p) == pytest.approx(-expected if inside else expected)
+
+        # Line segment intersections.
+        line = Line3D(p, q)
+        brute = {key(f) for f, t in triangles if line.intersects_triangle(t)}
+        assert {key(f) for f in bvh.line_intersections(line)} == brute
+        hit = bvh.raycast(line)
+        assert (hit is None) == (not brute)
+        if hit is not None:
+            assert key(hit[0]) in brute
+
+        # Bounding box and triangle intersections.
+        box = BoundingBox3D([p, q])
+        brute = {key(f) for f, t in triangles if t.intersects_bounding_box(box)}
+        assert {key(f) for f in bvh.bounding_box_intersections(box)} == brute
+        tri = Triangle3D(p, q, Point3D(0, 0, 0))
+        brute = {key(f) for f, t in triangles if tri.intersects_triangle(t)}
+        assert {key(f) for f in bvh.triangle_intersections(tri)} == brute
+        assert len(bvh.triangle_intersections(tri, max_intersections=1)) == min(len(brute), 1)
+
+
+def test_bvh_skewed_3d() -> None:
+    """Checks a BVH over faces which each double in size.
+
+    The surface area heuristic splits off one face at a time here, so this
+    checks that the depth of the tree is capped and that queries still work.
+    """
+
+    num_faces = 300
+    scales = 2.0 ** np.arange(num_faces)
+    corners = np.array([[1.0, 0.0, 0.0], [2.0, 0.0, 0.0], [1.0, 1.0, 0.0]])
+    vertices = (scales[:, None, None] * corners).reshape(-1, 3)
+    faces = np.arange(3 * num_faces).reshape(-1, 3)
+    bvh = BVH3D(Trimesh3D.from_arrays(vertices, faces, validate=False), leaf_size=1)
+
+    # Nodes are stored in depth-first order, with the right child at `offset`.
+    nodes = bvh.__getstate__()[2].view(NODE_DTYPE).ravel()
+    depths = np.zeros(len(nodes), dtype=np.int64)
+    for i, node in enumerate(nodes):
+        if node["count"] == 0:
+            depths[i + 1] = depths[node["offset"]] = depths[i] + 1
+    assert depths.max() <= 32 + np.log2(num_faces) + 1
+
+    for i in range(0, num_faces, 37):
+        p = Point3D(*(vertices[3 * i] + [0.0, 0.0, scales[i]]))
+        assert bvh.distance(p) == pytest.approx(scales[i])
+
+
+def test_bvh_raycast_3d() -> None:
+    """Casts a ray through a cuboid and checks the first hit."""
+
+    bvh = BVH3D(cuboid(2.0, 2.0, 2.0, center=True))
+    hit = bvh.raycast(Line3D(Point3D(-5, 0.1, 0.2), Point3D(5, 0.1, 0.2)))
+    assert hit is not None
+    _, point = hit
+    assert point.x == pytest.approx(-1.0)
+    assert bvh.raycast(Line3D(Point3D(-5, 3, 0), Point3D(5, 3, 0))) is None
+    assert bvh.signed_distance(Point3D(0, 0, 0)) == pytest.approx(-1.0)
+    assert bvh.signed_distance(Point3D(0, 0, 3)) == pytest.approx(2.0)
+
+
+def test_bvh_pickle_3d() -> None:
+    """Checks that an unpickled BVH gives the same answers as the original."""
+
+    bvh = BVH3D(icosphere(1.0, 2))
+    other = pickle.loads(pickle.dumps(bvh))
+    del bvh
+    bvh = BVH3D(icosphere(1.0, 2))
+    assert len(other) == len(bvh)
+    rng = random.Random(1337)
+    for _ in range(20):
+        p = Point3D(rng.uniform(-2, 2), rng.uniform(-2, 2), rng.uniform(-2, 2))
+        assert other.signed_distance(p) == bvh.signed_distance(p)
+
+    vertices, faces, nodes, indices = other.__getstate__()
+    faces = faces.copy()
+    faces[0, 0] = len(vertices)
+    with pytest.raises(RuntimeError):
+        BVH3D.__new__(BVH3D).__setstate__((vertices, faces, nodes, indices))
+
+    # A tree which is deeper than any built tree is rejected, since it would
+    # overflow the traversal stack. Each internal node has the next node as
+    # its left child and a leaf at the end as its right child.
+    vertices, faces, _, indices = other.__getstate__()
+    depth = 200
+    chain = np.zeros(2 * depth + 1, dtype=NODE_DTYPE)
+    chain["min"], chain["max"] = -2.0, 2.0
+    chain["offset"][:depth] = 2 * depth - np.arange(depth)
+    chain["count"][depth:] = 1
+    with pytest.raises(ValueError):
+        BVH3D.__new__(BVH3D).__setstate__((vertices, faces, chain.view(np.uint8).reshape(-1, 64), indices))
+
+    # A tree whose nodes are shared by a deep path and a shallow one is
+    # rejected, since the shallow path would hide the depth of the deep one.
+    # The deep path takes the left child of every fifth node, which leaves a
+    # leaf on the stack each time, and then the right child of the next node,
+    # which it shares with a node that has no parent.
+    units = 120
+    shared = np.zeros(5 * units + 1, dtype=NODE_DTYPE)
+    shared["min"], shared["max"] = -2.0, 2.0
+    shared["count"] = 1
+    for b in range(0, 5 * units, 5):
+        shared["count"][[b, b + 1, b + 3]] = 0
+        shared["offset"][[b, b + 1, b + 3]] = b + 2, b + 5, b + 5
+    with pytest.raises(ValueError):
+        BVH3D.__new__(BVH3D).__setstate__((vertices, faces, shared.view(np.uint8).reshape(-1, 64), indices))
@@ -2,14 +2,20 @@
 
 from pathlib import Path
 
+import numpy as np
 import pytest
 
 from tmesh import (
     Face,
+    Point3D,
+    Trimesh3D,
     cuboid,
+    icosphere,
     load_obj,
     load_ply,
+    load_ply_arrays,
     load_stl,
+    load_stl_arrays,
     load_stl_text,
     save_obj,
     save_ply,
@@ -85,6 +91,194 @@ def test_trimesh_io(tmpdir: Path) -> None:
     assert sorted(tr_g.faces) == sorted(tr_a.faces)
 
 
+def test_stl_welds_vertices(tmpdir: Path) -> None:
+    """Tests that loading an STL welds the corners shared between triangles.
+
+    Args:
+        tmpdir: The temporary directory to use for testing.
+    """
+
+    tr_a = icosphere(1.0, 3)
+    stl_path = str(tmpdir / "sphere.stl")
+    save_stl(stl_path, tr_a)
+    tr_b = load_stl(stl_path)
+
+    # Every vertex is shared by several faces, but is only loaded once.
+    assert len(tr_b.faces) == len(tr_a.faces)
+    assert len(tr_b.vertices) == len(tr_b.faces) // 2 + 2
+    used = {i for f in tr_b.faces for i in (f.a, f.b, f.c)}
+    assert used == set(range(len(tr_b.vertices)))
+
+
+def test_load_stl_arrays(tmpdir: Path) -> None:
+    """Tests loading an STL as vertex and face arrays, on several threads.
+
+    Args:
+        tmpdir: The temporary directory to use for testing.
+    """
+
+    tr_a = icosphere(1.0, 3)
+    stl_path = str(tmpdir / "sphere.stl")
+    save_stl(stl_path, tr_a)
+    tr_b = load_stl(stl_path)
+
+    arrays = load_stl_arrays(stl_path, num_threads=4)
+    vertices, faces = arrays["vertices"], arrays["faces"]
+    assert vertices.shape == (len(tr_b.vertices), 3)
+    assert faces.shape == (len(tr_b.faces), 3)
+    assert faces.dtype == np.int64
+    assert np.array_equal(vertices, tr_b.vertices_array)
+    assert np.array_equal(faces, tr_b.faces_array)
+
+    tr_c = Trimesh3D.from_arrays(vertices, faces)
+    assert tr_c.signed_volume() == pytest.approx(tr_b.signed_volume())
+    assert load_stl(stl_path, num_threads=4).faces == tr_b.faces
+
+
+def test_load_truncated_stl(tmpdir: Path) -> None:
+    """Tests that loading an STL checks the size of the file.
+
+    Args:
+        tmpdir: The temporary directory to use for testing.
+    """
+
+    stl_path = tmpdir / "cube.stl"
+    save_stl(str(stl_path), cuboid(1.0, 1.0, 1.0))
+    stl_path.write_binary(stl_path.read_binary()[:-1])
+    with pytest.raises(RuntimeError, match="too small"):
+        load_stl(str(stl_path))
+    with pytest.raises(RuntimeError, match="Could not open"):
+        load_stl_arrays(str(tmpdir / "missing.stl"))
+
+
+@pytest.mark.parametrize("binary", [False, True])
+def test_ply_arrays(tmpdir: Path, binary: bool) -> None:
+    """Tests saving and loading PLYs with per-vertex normals and colors.
+
+    Args:
+        tmpdir: The temporary directory to use for testing.
+        binary: Whether to save the PLY in binary.
+    """
+
+    tr_a = icosphere(1.0, 2)
+    vertices = tr_a.vertices_array
+    colors = np.arange(len(vertices) * 3).reshape(-1, 3).astype(np.uint8)
+    ply_path = str(tmpdir / "sphere.ply")
+    save_ply(ply_path, tr_a, binary=binary, normals=vertices, colors=colors)
+
+    # The header counts the faces, rather than the vertices.
+    with open(ply_path, "rb") as f:
+        header = f.read().split(b"end_header")[0].decode()
+    assert f"element face {len(tr_a.faces)}" in header
+    assert ("binary_little_endian" in header) == binary
+
+    # Doubles are written with enough digits to be read back exactly.
+    arrays = load_ply_arrays(ply_path)
+    assert np.array_equal(arrays["vertices"], vertices)
+    assert np.array_equal(arrays["normals"], vertices)
+    assert np.array_equal(arrays["colors"], colors)
+    assert sorted(arrays["faces"].tolist()) == sorted(tr_a.faces_array.tolist())
+
+    # Single precision vertices are rounded to floats.
+    save_ply(ply_path, tr_a, binary=binary, single_precision=True)
+    tr_b = load_ply(ply_path)
+    assert np.array_equal(tr_b.vertices_array, vertices.astype(np.float32))
+    assert "normals" not in load_ply_arrays(ply_path)
+
+    # Colors which aren't bytes are rejected, rather than truncated.
+    with pytest.raises(ValueError, match="uint8"):
+        save_ply(ply_path, tr_a, binary=binary, colors=np.full((len(vertices), 3), 0.5))
+
+
+def test_ply_polygons(tmpdir: Path) -> None:
+    """Tests that polygons in PLYs are split into triangles.
+
+    Args:
+        tmpdir: The temporary directory to use for testing.
+    """
+
+    ply_path = tmpdir / "square.ply"
+    ply_path.write_text(
+        "\n".join(
+            [
+                "ply",
+                "format ascii 1.0",
+                "comment A unit square",
+                "element vertex 4",
+                "property float x",
+                "property float y",
+                "property float z",
+                "element face 1",
+                "property list uchar int vertex_indices",
+                "end_header",
+                "0 0 0",
+                "1 0 0",
+                "1 1 0",
+                "0 1 0",
+                "4 0 1 2 3",
+            ]
+        ),
+        encoding="utf-8",
+    )
+    tr = load_ply(str(ply_path))
+    assert sorted(tr.faces) == [Face(0, 1, 2), Face(0, 2, 3)]
+
+    # A header which declares more elements than the file can hold is
+    # rejected before anything is allocated for them.
+    ply_path.write_text(ply_path.read_text(encoding="utf-8").replace("vertex 4", "vertex 99999999999"), encoding="utf-8")
+    with pytest.raises(RuntimeError, match="too small"):
+        load_ply(str(ply_path))
+
+
+def test_obj_face_syntax(tmpdir: Path) -> None:
+    """Tests loading OBJ faces with texture and normal indices, and signed numbers.
+
+    Args:
+        tmpdir: The temporary directory to use for testing.
+    """
+
+    obj_path = tmpdir / "square.obj"
+    obj_path.write_text(
+        "\n".join(
+            [
+                "# A unit square and a triangle",
+                "o square",
+                "v 0 0 0",
+                "v 1 0 0",
+                "v 1 1 0",
+                "v 0 1 0",
+                "vt 0 0",
+                "vn 0 0 1",
+                "f 1/1/1 2/1/1 3/1/1 4/1/1",
+                "v 0 0 1",
+                "v 1 0 1",
+                "v 1 +1 1",
+                "f -3//1 -2//1 +7//1",
+            ]
+        ),
+        encoding="utf-8",
+    )
+    tr = load_obj(str(obj_path))
+    assert len(tr.vertices) == 7
+    assert tr.vertices[6] == Point3D(1, 1, 1)
+    assert sorted(tr.faces) == [Face(0, 1, 2), Face(0, 2, 3), Face(4, 5, 6)]
+
+
+def test_obj_chunks(tmpdir: Path) -> None:
+    """Tests that parsing a large OBJ in chunks gives the same mesh.
+
+    Args:
+        tmpdir: The temporary directory to use for testing.
+    """
+
+    tr_a = icosphere(1.0, 6)
+    obj_path = str(tmpdir / "sphere.obj")
+    save_obj(obj_path, tr_a)
+    tr_b = load_obj(obj_path, num_threads=4)
+    assert np.array_equal(tr_b.vertices_array, tr_a.vertices_array)
+    assert sorted(tr_b.faces) == sorted(tr_a.faces)
+
+
 if __name__ == "__main__":
     outdir = Path("out")
     outdir.mkdir(exist_ok=True)
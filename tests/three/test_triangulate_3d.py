@@ -2,9 +2,10 @@
 
 import random
 
+import numpy as np
 import pytest
 
-from tmesh import Point3D, triangulate_3d
+from tmesh import Affine3D, Point3D, Tetramesh3D, Trimesh3D, cuboid, icosphere, triangulate_3d
 
 
 @pytest.mark.parametrize("seed", [1337, 1338, 1339, 1340, 1341])
@@ -46,6 +47,172 @@ def test_random_triangulation() -> None:
     assert all(v > 0 for v in volumes)
 
 
+def test_large_random_triangulation() -> None:
+    """Tests Delaunay triangulation of enough points to nearly fill their bounding box."""
+
+    random.seed(1337)
+    points = [Point3D(*(random.random() for _ in range(3))) for _ in range(1000)]
+
+    tetramesh = triangulate_3d(points, shuffle=False)
+
+    assert len(tetramesh.vertices) == 1000
+
+    volumes = [t.signed_volume() for t in tetramesh.get_tetrahedra()]
+    assert all(v > 0 for v in volumes)
+    assert sum(volumes) == pytest.approx(1.0, abs=0.1)
+
+
+def test_brio_triangulation() -> None:
+    """Tests Delaunay triangulation with a biased randomized insertion order."""
+
+    random.seed(1337)
+    points = [Point3D(*(random.random() for _ in range(3))) for _ in range(1000)]
+
+    tetramesh = triangulate_3d(points, brio=True, seed=0)
+
+    assert len(tetramesh.vertices) == 1000
+
+    volumes = [t.signed_volume() for t in tetramesh.get_tetrahedra()]
+    assert all(v > 0 for v in volumes)
+    assert sum(volumes) == pytest.approx(1.0, abs=0.1)
+
+    # The same seed should give the same triangulation.
+    other = triangulate_3d(points, brio=True, seed=0)
+    assert other.volumes == tetramesh.volumes
+
+
+def test_scaled_triangulation() -> None:
+    """Tests that the triangulation doesn't depend on the scale of the points."""
+
+    random.seed(1337)
+    points = [Point3D(*(random.random() for _ in range(3))) for _ in range(1000)]
+    tetramesh = triangulate_3d(points, brio=True, seed=0)
+
+    # Scaling by a power of two is exact, so the predicates give the same results.
+    for scale in (1024.0, 1 / 64):
+        scaled = triangulate_3d([p * scale for p in points], brio=True, seed=0)
+        assert scaled.volumes == tetramesh.volumes
+
+
+def test_degenerate_triangulation() -> None:
+    """Tests Delaunay triangulation of cospherical and cocircular points."""
+
+    points = [Point3D(x / 4, y / 4, z / 4) for x in range(5) for y in range(5) for z in range(5)]
+    tetramesh = triangulate_3d(points)
+    volumes = [t.signed_volume() for t in tetramesh.get_tetrahedra()]
+    assert all(v > 0 for v in volumes)
+    assert sum(volumes) == pytest.approx(1.0)
+
+    points = list(icosphere(1.0, 3).vertices)
+    tetramesh = triangulate_3d(points)
+    volumes = [t.signed_volume() for t in tetramesh.get_tetrahedra()]
+    assert all(v > 0 for v in volumes)
+
+
+def test_parallel_triangulation() -> None:
+    """Tests that triangulating blocks of points in parallel fills the same volume."""
+
+    random.seed(1337)
+    points = [Point3D(*(random.random() for _ in range(3))) for _ in range(5000)]
+    serial = triangulate_3d(points, brio=True, seed=0)
+    tetramesh = triangulate_3d(points, brio=True, seed=0, num_threads=4)
+    assert sorted(tetramesh.vertices) == sorted(points)
+    assert {i for t in tetramesh.volumes for i in (t.a, t.b, t.c, t.d)} == set(range(5000))
+
+    volumes = [t.signed_volume() for t in tetramesh.get_tetrahedra()]
+    assert all(v > 0 for v in volumes)
+    expected = sum(t.signed_volume() for t in serial.get_tetrahedra())
+    assert sum(volumes) == pytest.approx(expected)
+
+    # Cospherical points on the boundaries between blocks.
+    points = [Point3D(x / 12, y / 12, z / 12) for x in range(13) for y in range(13) for z in range(13)]
+    tetramesh = triangulate_3d(points, num_threads=4)
+    volumes = [t.signed_volume() for t in tetramesh.get_tetrahedra()]
+    assert all(v > 0 for v in volumes)
+    assert sum(volumes) == pytest.approx(1.0)
+
+    # Ties are broken the same way in every block, so the simplices match.
+    def simplices(tetramesh: Tetramesh3D) -> set[frozenset[tuple[float, float, float]]]:
+        vs = tetramesh.vertices
+        return {frozenset((vs[i].x, vs[i].y, vs[i].z) for i in (t.a, t.b, t.c, t.d)) for t in tetramesh.volumes}
+
+    assert simplices(tetramesh) == simplices(triangulate_3d(points))
+
+
+@pytest.mark.parametrize("shape", ["cuboid", "sphere", "hole", "union"])
+def test_to_tetramesh(shape: str) -> None:
+    """Tests converting closed surfaces to tetrahedral meshes.
+
+    Args:
+        shape: The name of the surface to convert.
+    """
+
+    if shape == "cuboid":
+        mesh = cuboid(1.0, 2.0, 3.0)
+    elif shape == "sphere":
+        mesh = icosphere(1.0, 3)
+    elif shape == "hole":
+        mesh = cuboid(2.0, 2.0, 2.0, center=True) - cuboid(1.0, 1.0, 3.0, center=True)
+    else:
+        mesh_a = icosphere(1.0, 2)
+        mesh_b = icosphere(0.8, 2) << Affine3D(trans=(0.7, 0.3, 0.1))
+        mesh = mesh_a | mesh_b
+
+    tetramesh = mesh.to_tetramesh()
+    volumes = [t.signed_volume() for t in tetramesh.get_tetrahedra()]
+    assert all(v > 0 for v in volumes)
+    assert sum(volumes) == pytest.approx(mesh.signed_volume())
+    assert tetramesh.to_trimesh().signed_volume() == pytest.approx(mesh.signed_volume())
+
+
+@pytest.mark.parametrize("level", [4, 5])
+def test_to_tetramesh_icosphere(level: int) -> None:
+    """Tests converting icospheres, whose vertices are nearly cospherical, to tetrahedral meshes.
+
+    Args:
+        level: The subdivision level of the icosphere.
+    """
+
+    mesh = icosphere(1.0, level)
+    tetramesh = mesh.to_tetramesh()
+    volumes = [t.signed_volume() for t in tetramesh.get_tetrahedra()]
+    assert min(volumes) > 0
+    assert sum(volumes) == pytest.approx(mesh.signed_volume())
+
+    # Flat slivers inside the sphere are split at a new vertex rather than
+    # dropped, so the boundary of the tetramesh is just the surface, without
+    # the new vertices.
+    surface = tetramesh.to_trimesh()
+    assert len(surface.faces) == len(mesh.faces)
+    assert len(surface.vertices) < len(tetramesh.vertices)
+
+    # Flat slivers would flip when the vertices are rounded after moving them.
+    moved = tetramesh << Affine3D(trans=(0.7, 0.3, 0.2))
+    assert min(t.signed_volume() for t in moved.get_tetrahedra()) > 0
+    assert moved.to_trimesh().signed_volume() == pytest.approx(mesh.signed_volume())
+
+
+def test_large_to_tetramesh() -> None:
+    """Tests converting a surface with tens of thousands of faces to a tetrahedral mesh."""
+
+    mesh = icosphere(1.0, 6)
+    tetramesh = mesh.to_tetramesh()
+    volumes = [t.signed_volume() for t in tetramesh.get_tetrahedra()]
+    assert min(volumes) > 0
+    assert sum(volumes) == pytest.approx(mesh.signed_volume())
+    assert tetramesh.to_trimesh().signed_volume() == pytest.approx(mesh.signed_volume())
+
+
+def test_to_tetramesh_open() -> None:
+    """Tests that converting an open surface raises an error."""
+
+    mesh = cuboid(1.0, 1.0, 1.0)
+    vertices = np.array([[p.x, p.y, p.z] for p in mesh.vertices])
+    faces = np.array([[f.a, f.b, f.c] for f in mesh.faces[:-1]])
+    with pytest.raises(ValueError):
+        Trimesh3D.from_arrays(vertices, faces).to_tetramesh()
+
+
 if __name__ == "__main__":
     # python -m tests.three.test_triangulate_3d
     # test_random_triangulation()
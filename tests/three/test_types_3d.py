@@ -1,11 +1,28 @@
 """Test 3D types."""
 
 import math
+import pickle
 import random
+from concurrent.futures import ProcessPoolExecutor
 
+import numpy as np
 import pytest
 
-from tmesh import Affine3D, BoundingBox3D, Line3D, Point3D, Sphere3D, Tetrahedron3D, Triangle3D
+from tmesh import (
+    Affine3D,
+    BoundingBox3D,
+    Line3D,
+    Point3D,
+    Polygon3D,
+    Sphere3D,
+    Tetrahedron3D,
+    Tetramesh3D,
+    Triangle3D,
+    Trimesh3D,
+    cuboid,
+    linear_extrude,
+    regular_polygon_mesh,
+)
 
 SQRT_2 = math.sqrt(2)
 SQRT_3 = math.sqrt(3)
@@ -341,3 +358,102 @@ def test_sphere_intersection(lhs: Sphere3D, rhs: Sphere3D, expected: Sphere3D |
     """
 
     assert lhs.intersection(rhs) == expected
+
+
+def test_mesh_array_views_3d() -> None:
+    """Tests the zero-copy NumPy views of 3D mesh vertices, faces and volumes."""
+
+    trimesh = cuboid(1.0, 2.0, 3.0)
+    vertices, faces = trimesh.vertices_array, trimesh.faces_array
+    assert vertices.shape == (len(trimesh.vertices), 3) and vertices.dtype == np.float64
+    assert faces.shape == (len(trimesh.faces), 3) and faces.dtype == np.int64
+    assert vertices.tolist() == [[v.x, v.y, v.z] for v in trimesh.vertices]
+    assert faces.tolist() == [[f.a, f.b, f.c] for f in trimesh.faces]
+
+    # The views should be read-only and should keep the mesh alive.
+    with pytest.raises(ValueError):
+        vertices[0, 0] = 1.0
+    expected_sum = sum(v.x + v.y + v.z for v in trimesh.vertices)
+    del trimesh
+    assert vertices.sum() == pytest.approx(expected_sum)
+
+    tetramesh = linear_extrude(regular_polygon_mesh(1.0, n=5), 1.0)
+    volumes = tetramesh.volumes_array
+    assert tetramesh.vertices_array.shape == (len(tetramesh.vertices), 3)
+    assert volumes.shape == (len(tetramesh.volumes), 4) and volumes.dtype == np.int64
+    assert volumes.tolist() == [[v.a, v.b, v.c, v.d] for v in tetramesh.volumes]
+
+
+def test_mesh_from_arrays_3d() -> None:
+    """Tests constructing 3D meshes directly from NumPy arrays."""
+
+    trimesh = cuboid(1.0, 2.0, 3.0)
+    other = Trimesh3D.from_arrays(trimesh.vertices_array, trimesh.faces_array.astype(np.int32))
+    assert other.vertices == trimesh.vertices
+    assert other.faces == trimesh.faces
+    assert other.signed_volume() == pytest.approx(trimesh.signed_volume())
+
+    tetramesh = linear_extrude(regular_polygon_mesh(1.0, n=5), 1.0)
+    other = Tetramesh3D.from_arrays(tetramesh.vertices_array, tetramesh.volumes_array)
+    assert other.vertices == tetramesh.vertices
+    assert other.volumes == tetramesh.volumes
+
+    # Checks that invalid arrays are rejected.
+    with pytest.raises(ValueError):
+        Trimesh3D.from_arrays(np.zeros((3, 2)), np.array([[0, 1, 2]]))
+    with pytest.raises(ValueError):
+        Trimesh3D.from_arrays(np.zeros((3, 3)), np.array([[0, 1, -1]]))
+    with pytest.raises(ValueError):
+        Tetramesh3D.from_arrays(np.zeros((4, 3)), np.array([[0, 1, 2, 4]]))
+
+
+def _signed_volume(mesh: Trimesh3D) -> float:
+    return mesh.signed_volume()
+
+
+def test_pickle_3d() -> None:
+    """Tests pickling 3D types, including across processes."""
+
+    p1, p2, p3, p4 = Point3D(0, 0, 0), Point3D(1, 0, 0), Point3D(0, 1, 0), Point3D(0, 0, 1)
+    values = [
+        p2,
+        Line3D(p1, p2),
+        Sphere3D(p2, 2.0),
+        Triangle3D(p1, p2, p3),
+        Tetrahedron3D(p1, p2, p3, p4),
+        BoundingBox3D(p1, p4),
+        Polygon3D([p1, p2, p3, p4]),
+    ]
+    for value in values:
+        assert pickle.loads(pickle.dumps(value)) == value
+    affine = Affine3D(rot=(0.1, 0.2, 0.3), trans=(1.0, 2.0, 3.0))
+    other = pickle.loads(pickle.dumps(affine))
+    assert other.rotation == affine.rotation and other.translation == affine.translation
+
+    # With protocol 5, the vertex and face arrays are sent out-of-band.
+    trimesh = cuboid(1.0, 2.0, 3.0)
+    buffers: list[pickle.PickleBuffer] = []
+    data = pickle.dumps(trimesh, protocol=5, buffer_callback=buffers.append)
+    assert len(buffers) == 2
+    other = pickle.loads(data, buffers=buffers)
+    assert other.vertices == trimesh.vertices
+    assert other.faces == trimesh.faces
+
+    tetramesh = linear_extrude(regular_polygon_mesh(1.0, n=5), 1.0)
+    other = pickle.loads(pickle.dumps(tetramesh))
+    assert other.vertices == tetramesh.vertices
+    assert other.volumes == tetramesh.volumes
+
+    with ProcessPoolExecutor(max_workers=1) as executor:
+        assert executor.submit(_signed_volume, trimesh).result() == pytest.approx(trimesh.signed_volume())
+
+
+def test_unpickle_invalid_mesh_3d() -> None:
+    """Checks that unpickling a mesh with out-of-range indices fails."""
+
+    trimesh = Trimesh3D.__new__(Trimesh3D)
+    with pytest.raises(RuntimeError):
+        trimesh.__setstate__((np.zeros((3, 3)), np.array([[0, 1, 3]])))
+    tetramesh = Tetramesh3D.__new__(Tetramesh3D)
+    with pytest.raises(RuntimeError):
+        tetramesh.__setstate__((np.zeros((4, 3)), np.array([[0, 1, 2, 4]])))
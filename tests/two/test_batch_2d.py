@@ -0,0 +1,56 @@
+"""Tests vectorized geometry predicates in two dimensions."""
+
+import numpy as np
+import pytest
+
+from tmesh import (
+    Point2D,
+    Triangle2D,
+    batch_barycentric_coordinates_2d,
+    batch_contains_point_2d,
+    batch_distance_to_triangle_2d,
+)
+
+
+def test_batch_triangle_predicates_2d() -> None:
+    """Checks the batched predicates against their scalar counterparts."""
+
+    rng = np.random.default_rng(1337)
+    points = rng.uniform(-1.0, 2.0, size=(100, 2))
+    triangle = Triangle2D(Point2D(0, 0), Point2D(1, 0), Point2D(0, 1))
+    scalar_points = [Point2D(*p) for p in points]
+
+    distances = batch_distance_to_triangle_2d(points, triangle)
+    assert distances.shape == (100,)
+    assert distances.tolist() == pytest.approx([p.distance_to_triangle(triangle) for p in scalar_points])
+
+    contains = batch_contains_point_2d(points, triangle)
+    assert contains.dtype == np.bool_
+    assert contains.tolist() == [triangle.contains_point(p) for p in scalar_points]
+
+    bary = batch_barycentric_coordinates_2d(points, triangle)
+    assert bary.shape == (100, 3)
+    for row, p in zip(bary, scalar_points):
+        b = p.barycentric_coordinates(triangle)
+        assert row.tolist() == pytest.approx([b.u, b.v, b.w])
+
+
+def test_batch_paired_triangles_2d() -> None:
+    """Checks the batched predicates with one triangle per point."""
+
+    rng = np.random.default_rng(1337)
+    points = rng.uniform(-1.0, 2.0, size=(50, 2))
+    triangles = rng.uniform(-1.0, 2.0, size=(50, 3, 2))
+    scalar_triangles = [Triangle2D(*(Point2D(*v) for v in t)) for t in triangles]
+
+    distances = batch_distance_to_triangle_2d(points, triangles)
+    expected = [Point2D(*p).distance_to_triangle(t) for p, t in zip(points, scalar_triangles)]
+    assert distances.tolist() == pytest.approx(expected)
+
+    contains = batch_contains_point_2d(points, triangles)
+    assert contains.tolist() == [t.contains_point(Point2D(*p)) for p, t in zip(points, scalar_triangles)]
+
+    with pytest.raises(ValueError):
+        batch_contains_point_2d(points, triangles[:10])
+    with pytest.raises(ValueError):
+        batch_contains_point_2d(np.zeros((50, 3)), triangles)
@@ -3,9 +3,12 @@
 The validity of the assert statements can be checked using the plotting script.
 """
 
+import functools
 import math
 
-from tmesh import Affine2D, regular_polygon_mesh
+import pytest
+
+from tmesh import Affine2D, Trimesh2D, regular_polygon_mesh
 
 
 def test_union_2d() -> None:
@@ -21,7 +24,7 @@ def test_union_2d() -> None:
 
     # Checks the union of the two meshes.
     mesh_union = mesh_a | mesh_b
-    assert len(mesh_union.faces) == 16
+    assert len(mesh_union.faces) == 15
     assert len(mesh_union.vertices) == 12
 
     # Checks the intersection of the two meshes.
@@ -33,3 +36,69 @@ def test_union_2d() -> None:
     mesh_difference = mesh_a - mesh_b
     assert len(mesh_difference.faces) == 6
     assert len(mesh_difference.vertices) == 7
+
+
+def test_boolean_areas_2d() -> None:
+    """Checks boolean areas for overlapping, touching and disjoint squares."""
+
+    def area(mesh: Trimesh2D) -> float:
+        return sum(abs(t.area()) for t in mesh.get_triangles())
+
+    mesh_a = regular_polygon_mesh(1.0, n=4)
+
+    # Overlapping squares.
+    mesh_b = regular_polygon_mesh(1.0, n=4) << Affine2D(trans=(0.5, 0.5))
+    assert area(mesh_a | mesh_b) == pytest.approx(3.0)
+    assert area(mesh_a & mesh_b) == pytest.approx(1.0)
+    assert area(mesh_a - mesh_b) == pytest.approx(1.0)
+
+    # Squares which share an edge, and squares which don't touch at all.
+    for trans in ((1.0, 1.0), (5.0, 0.0)):
+        mesh_b = regular_polygon_mesh(1.0, n=4) << Affine2D(trans=trans)
+        assert area(mesh_a | mesh_b) == pytest.approx(4.0)
+        assert area(mesh_a - mesh_b) == pytest.approx(2.0)
+
+
+def test_parallel_booleans_2d() -> None:
+    """Checks that multithreaded booleans match the single-threaded ones."""
+
+    mesh_a = regular_polygon_mesh(1.0, n=4).subdivide().subdivide()
+    mesh_b = regular_polygon_mesh(1.0, n=4).subdivide().subdivide() << Affine2D(trans=(0.5, 0.5))
+
+    for op in ("union", "intersection", "difference"):
+        expected = getattr(mesh_a, op)(mesh_b)
+        for num_threads in (2, 4, 0):
+            mesh = getattr(mesh_a, op)(mesh_b, num_threads=num_threads)
+            assert mesh.vertices == expected.vertices
+            assert mesh.faces == expected.faces
+
+
+@pytest.mark.parametrize(
+    "n_a,n_b,trans",
+    [(3, 3, (0.75, 0.5)), (8, 8, (0.7, 0.2)), (24, 24, (1.0, 0.25)), (40, 37, (0.7, 0.3))],
+)
+def test_boolean_classification_2d(n_a: int, n_b: int, trans: tuple[float, float]) -> None:
+    """Checks that split faces are classified consistently across operations.
+
+    Args:
+        n_a: Number of sides of the first polygon.
+        n_b: Number of sides of the second polygon.
+        trans: Translation of the second polygon.
+    """
+
+    def area(mesh: Trimesh2D) -> float:
+        return sum(abs(t.area()) for t in mesh.get_triangles())
+
+    mesh_a = regular_polygon_mesh(1.0, n=n_a)
+    mesh_b = regular_polygon_mesh(1.0, n=n_b) << Affine2D(trans=trans)
+
+    # No area is lost when splitting faces, even for slivers much smaller than
+    # the tolerance.
+    approx = functools.partial(pytest.approx, rel=1e-9)
+    intersection = area(mesh_a & mesh_b)
+    assert area(mesh_a - mesh_b) + intersection == approx(area(mesh_a))
+    assert area(mesh_b - mesh_a) + intersection == approx(area(mesh_b))
+    assert area(mesh_a | mesh_b) + intersection == approx(area(mesh_a) + area(mesh_b))
+
+    # The union of two overlapping convex polygons has a single boundary.
+    assert len((mesh_a | mesh_b).get_polygons()) == 1
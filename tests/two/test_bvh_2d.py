@@ -1,6 +1,12 @@
 """Tests axis aligned bounding box data structure for CPU."""
 
-from tmesh import BVH2D, Face, Point2D, Triangle2D, regular_polygon_mesh
+import pickle
+import random
+
+import numpy as np
+import pytest
+
+from tmesh import BVH2D, DelaunaySplitTree2D, Face, Line2D, Point2D, Triangle2D, regular_polygon_mesh
 
 
 def test_simple_bvh_tree_2d() -> None:
@@ -44,3 +50,165 @@ def test_simple_bvh_tree_2d() -> None:
     triangle = Triangle2D(Point2D(-1.0, 2.0), Point2D(1.0, 2.0), Point2D(0.0, 1.0))
     intrs = sorted(bvh.triangle_intersections(triangle))
     assert intrs == [Face(0, 1, 2), Face(0, 2, 3)]
+
+
+@pytest.mark.parametrize("leaf_size,use_sah", [(1, True), (4, True), (4, False)])
+def test_bvh_matches_brute_force_2d(leaf_size: int, use_sah: bool) -> None:
+    """Checks BVH queries against brute force for different build options.
+
+    Args:
+        leaf_size: Maximum number of faces in a leaf.
+        use_sah: Whether to build the tree using the surface area heuristic.
+    """
+
+    trimesh = regular_polygon_mesh(1.0, 64)
+    bvh = BVH2D(trimesh, leaf_size=leaf_size, use_sah=use_sah)
+    assert len(bvh) >= 2 * len(trimesh.faces) // leaf_size - 1
+
+    # Each face is in exactly one leaf, and each internal node has two children.
+    tree = bvh.tree
+    assert len(tree) == len(bvh)
+    leaf_faces = sorted(i for face_ids, _, _, _ in tree for i in face_ids)
+    assert leaf_faces == list(range(len(trimesh.faces)))
+    for face_ids, left, right, _ in tree:
+        assert (left == -1) == (right == -1) == bool(face_ids)
+    triangles = [(face, trimesh.get_triangle(face)) for face in trimesh.faces]
+
+    rng = random.Random(1337)
+    for _ in range(50):
+        a, b, c = (Point2D(rng.uniform(-1.2, 1.2), rng.uniform(-1.2, 1.2)) for _ in range(3))
+        triangle = Triangle2D(a, b, c)
+        expected = sorted(face for face, tri in triangles if triangle.intersects_triangle(tri))
+        assert sorted(bvh.triangle_intersections(triangle)) == expected
+        line = Line2D(a, b)
+        expected = sorted(face for face, tri in triangles if line.intersects_triangle(tri))
+        assert sorted(bvh.line_intersections(line)) == expected
+        assert len(bvh.line_intersections(line, max_intersections=2)) == min(len(expected), 2)
+
+
+def test_bvh_index_queries_2d() -> None:
+    """Checks that the index queries match the face queries."""
+
+    trimesh = regular_polygon_mesh(1.0, 32)
+    bvh = BVH2D(trimesh)
+    faces = trimesh.faces
+
+    triangle = Triangle2D(Point2D(-0.5, -0.5), Point2D(0.5, -0.5), Point2D(0.0, 0.9))
+    indices = bvh.triangle_intersection_indices(triangle)
+    assert [faces[i] for i in indices] == bvh.triangle_intersections(triangle)
+    assert len(bvh.triangle_intersection_indices(triangle, max_intersections=3)) == 3
+
+    line = Line2D(Point2D(-2.0, 0.1), Point2D(2.0, 0.2))
+    indices = bvh.line_intersection_indices(line)
+    assert [faces[i] for i in indices] == bvh.line_intersections(line)
+
+    small = Triangle2D(Point2D(0.5, 0.01), Point2D(0.51, 0.01), Point2D(0.5, 0.02))
+    face = bvh.get_containing_face(small)
+    assert face is not None
+    assert trimesh.get_triangle(face).contains_triangle(small)
+    assert bvh.get_containing_face(Triangle2D(Point2D(2, 2), Point2D(3, 2), Point2D(2, 3))) is None
+
+
+@pytest.mark.parametrize("num_threads", [1, 3, 0])
+def test_bvh_batch_queries_2d(num_threads: int) -> None:
+    """Checks that batched queries match the single queries.
+
+    Args:
+        num_threads: Number of threads to use, where 0 means all of them.
+    """
+
+    trimesh = regular_polygon_mesh(1.0, 32)
+    bvh = BVH2D(trimesh)
+    faces = trimesh.faces
+    rng = np.random.default_rng(1337)
+
+    lines = rng.uniform(-1.2, 1.2, size=(100, 2, 2))
+    offsets, indices = bvh.line_intersections_batch(lines, num_threads=num_threads)
+    assert offsets.shape == (101,)
+    assert offsets[-1] == len(indices)
+    for i, ((x1, y1), (x2, y2)) in enumerate(lines):
+        expected = bvh.line_intersections(Line2D(Point2D(x1, y1), Point2D(x2, y2)))
+        assert [faces[j] for j in indices[offsets[i] : offsets[i + 1]]] == expected
+
+    triangles = rng.uniform(-1.2, 1.2, size=(100, 3, 2))
+    offsets, indices = bvh.triangle_intersections_batch(triangles, max_intersections=2, num_threads=num_threads)
+    for i, ((x1, y1), (x2, y2), (x3, y3)) in enumerate(triangles):
+        triangle = Triangle2D(Point2D(x1, y1), Point2D(x2, y2), Point2D(x3, y3))
+        expected = bvh.triangle_intersections(triangle, max_intersections=2)
+        assert [faces[j] for j in indices[offsets[i] : offsets[i + 1]]] == expected
+
+    with pytest.raises(ValueError):
+        bvh.line_intersections_batch(np.zeros((3, 3, 2)))
+
+
+@pytest.mark.parametrize("keep_history", [True, False])
+def test_split_tree_neighbors_2d(keep_history: bool) -> None:
+    """Checks the neighbors of the leaves, with and without the history.
+
+    Args:
+        keep_history: Whether the tree keeps the replaced triangles.
+    """
+
+    root = Triangle2D(Point2D(-10, -10), Point2D(10, -10), Point2D(0, 10))
+    tree = DelaunaySplitTree2D(root, keep_history=keep_history)
+
+    rng = random.Random(0)
+    for _ in range(200):
+        point = Point2D(rng.uniform(-1, 1), rng.uniform(-1, 1))
+        tree.split_triangle(point, tree.walk_to_leaf(point), make_delaunay=True)
+
+    # Discarding the history keeps the same leaves, renumbered in order.
+    triangles = sorted(tree.get_triangle(i) for i in tree.get_leaf_triangles())
+    tree.discard_history()
+    assert tree.get_leaf_triangles() == list(range(len(triangles)))
+    assert sorted(tree.get_triangle(i) for i in tree.get_leaf_triangles()) == triangles
+
+    for i in tree.get_leaf_triangles():
+        triangle = tree.get_triangle(i)
+        points = [triangle.p1, triangle.p2, triangle.p3]
+        for k, j in enumerate(tree.get_neighbors(i)):
+            if j is None:
+                continue
+            assert tree.is_leaf(j)
+            other = tree.get_triangle(j).vertices()
+            assert points[k] in other and points[(k + 1) % 3] in other
+            assert i in tree.get_neighbors(j)
+
+
+def test_bvh_pickle_2d() -> None:
+    """Checks that an unpickled BVH gives the same answers as the original."""
+
+    bvh = BVH2D(regular_polygon_mesh(1.0, n=32), leaf_size=2)
+    other = pickle.loads(pickle.dumps(bvh))
+    assert len(other) == len(bvh)
+    rng = random.Random(1337)
+    for _ in range(20):
+        p = Point2D(rng.uniform(-2, 2), rng.uniform(-2, 2))
+        q = Point2D(rng.uniform(-2, 2), rng.uniform(-2, 2))
+        line = Line2D(p, q)
+        assert other.line_intersections(line) == bvh.line_intersections(line)
+
+    state = list(other.__getstate__())
+    state[1] = state[1].copy()
+    state[1][0, 0] = len(state[0])
+    with pytest.raises(RuntimeError):
+        BVH2D.__new__(BVH2D).__setstate__(tuple(state))
+
+    # A tree which is deeper than any built tree is rejected, since it would
+    # overflow the traversal stack. Each internal node has the next node as
+    # its left child and a leaf at the end as its right child.
+    vertices, faces, _, _, _, indices = other.__getstate__()
+    depth = 200
+    boxes = np.tile([-2.0, -2.0, 2.0, 2.0], (2 * depth + 1, 1))
+    offsets = np.zeros(2 * depth + 1, dtype=np.int64)
+    offsets[:depth] = 2 * depth - np.arange(depth)
+    counts = np.zeros(2 * depth + 1, dtype=np.int64)
+    counts[depth:] = 1
+    with pytest.raises(ValueError):
+        BVH2D.__new__(BVH2D).__setstate__((vertices, faces, boxes, offsets, counts, indices))
+
+    # A node with two parents is rejected, even in a shallow tree. Here the
+    # root and its left child share their right child.
+    offsets, counts = np.array([3, 3, 0, 0]), np.array([0, 0, 1, 1])
+    with pytest.raises(ValueError):
+        BVH2D.__new__(BVH2D).__setstate__((vertices, faces, boxes[:4], offsets, counts, indices))
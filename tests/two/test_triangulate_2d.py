@@ -2,10 +2,12 @@
 
 import math
 import random
+from fractions import Fraction
+from typing import Set, Tuple
 
 import pytest
 
-from tmesh import Point2D, Polygon2D, triangulate_2d
+from tmesh import Point2D, Polygon2D, Trimesh2D, triangulate_2d
 
 
 @pytest.mark.parametrize("make_delaunay", [True, False])
@@ -84,5 +86,64 @@ def test_large_triangulate_2d() -> None:
                 assert not triangle.contains_point(points[neighbor])
 
 
+def test_brio_triangulate_2d() -> None:
+    """Tests Delaunay triangulation with a biased randomized insertion order."""
+
+    random.seed(1337)
+    points = [Point2D(random.random(), random.random()) for _ in range(2000)]
+    trimesh = triangulate_2d(points, brio=True, seed=0)
+
+    assert len(trimesh.vertices) == 2000
+    assert sorted(trimesh.vertices) == sorted(points)
+    areas = [trimesh.get_triangle(face).area() for face in trimesh.faces]
+    assert all(a > 0 for a in areas)
+
+    # The same seed should give the same triangulation.
+    other = triangulate_2d(points, brio=True, seed=0)
+    assert other.vertices == trimesh.vertices
+    assert other.faces == trimesh.faces
+
+
+def test_parallel_triangulate_2d() -> None:
+    """Tests that triangulating blocks of points in parallel gives the same triangulation."""
+
+    random.seed(1337)
+    points = [Point2D(random.random() * 1000, random.random() * 1000) for _ in range(5000)]
+    serial = triangulate_2d(points, brio=True, seed=0)
+    parallel = triangulate_2d(points, brio=True, seed=0, num_threads=4)
+
+    def get_triangles(trimesh: Trimesh2D) -> Set[Tuple[Tuple[float, float], ...]]:
+        vertices = [(p.x, p.y) for p in trimesh.vertices]
+        return {tuple(sorted(vertices[i] for i in (f.a, f.b, f.c))) for f in trimesh.faces}
+
+    assert sorted(parallel.vertices) == sorted(points)
+    assert get_triangles(parallel) == get_triangles(serial)
+
+
+def test_exact_triangulate_2d() -> None:
+    """Tests Delaunay triangulation of cocircular and nearly collinear points."""
+
+    points = [Point2D(x / 7, y / 7) for x in range(20) for y in range(20)]
+    points += [Point2D(i / 3, 3 + (-1) ** i * 1e-13) for i in range(20)]
+    trimesh = triangulate_2d(points)
+    assert sorted(trimesh.vertices) == sorted(points)
+
+    def in_circle(a: Point2D, b: Point2D, c: Point2D, d: Point2D) -> Fraction:
+        rows = [(Fraction(p.x) - Fraction(d.x), Fraction(p.y) - Fraction(d.y)) for p in (a, b, c)]
+        (ax, ay), (bx, by), (cx, cy) = rows
+        al, bl, cl = (x * x + y * y for x, y in rows)
+        return al * (bx * cy - cx * by) + bl * (cx * ay - ax * cy) + cl * (ax * by - bx * ay)
+
+    # Checks exactly that no vertex across an edge is inside a triangle's circumcircle.
+    vertices = trimesh.vertices
+    opposite = {}
+    for face in trimesh.faces:
+        for a, b, c in ((face.a, face.b, face.c), (face.b, face.c, face.a), (face.c, face.a, face.b)):
+            opposite[(a, b)] = c
+    for (a, b), c in opposite.items():
+        if (b, a) in opposite:
+            assert in_circle(vertices[a], vertices[b], vertices[c], vertices[opposite[(b, a)]]) <= 0
+
+
 if __name__ == "__main__":
     test_triangulate_polygon(True)
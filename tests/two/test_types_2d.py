@@ -1,8 +1,20 @@
 import math
+import pickle
 
+import numpy as np
 import pytest
 
-from tmesh import BoundingBox2D, Circle2D, Line2D, Point2D, Polygon2D, Triangle2D
+from tmesh import (
+    Affine2D,
+    BoundingBox2D,
+    Circle2D,
+    Line2D,
+    Point2D,
+    Polygon2D,
+    Triangle2D,
+    Trimesh2D,
+    regular_polygon_mesh,
+)
 
 SQRT_2 = math.sqrt(2)
 SQRT_3 = math.sqrt(3)
@@ -357,3 +369,75 @@ def test_circle_intersection(lhs: Circle2D, rhs: Circle2D, expected: list[Point2
     """
 
     assert sorted(lhs.intersection(rhs)) == sorted(expected)
+
+
+def test_circumcircle_contains_exact() -> None:
+    """Tests that points within rounding error of a circumcircle are classified exactly."""
+
+    triangle = Triangle2D(Point2D(0, 0), Point2D(1, 0), Point2D(0, 1))
+    assert triangle.circumcircle_contains(Point2D(0.5, 0.5))
+    assert not triangle.circumcircle_contains(Point2D(1, 1))
+    assert triangle.circumcircle_contains(Point2D(1, 1 - 1e-15))
+    assert not triangle.circumcircle_contains(Point2D(1, 1 + 1e-15))
+
+
+def test_trimesh_array_views_2d() -> None:
+    """Tests the zero-copy NumPy views of 2D mesh vertices and faces."""
+
+    trimesh = regular_polygon_mesh(1.0, n=6)
+    vertices, faces = trimesh.vertices_array, trimesh.faces_array
+    assert vertices.shape == (7, 2) and vertices.dtype == np.float64
+    assert faces.shape == (6, 3) and faces.dtype == np.int64
+    assert vertices.tolist() == [[v.x, v.y] for v in trimesh.vertices]
+    assert faces.tolist() == [[f.a, f.b, f.c] for f in trimesh.faces]
+
+    with pytest.raises(ValueError):
+        faces[0, 0] = 1
+
+
+def test_trimesh_from_arrays_2d() -> None:
+    """Tests constructing a 2D mesh directly from NumPy arrays."""
+
+    vertices = np.array([[0.0, 0.0], [1.0, 0.0], [1.0, 1.0], [0.0, 1.0]])
+    faces = np.array([[0, 1, 2], [0, 2, 3]])
+    trimesh = Trimesh2D.from_arrays(vertices, faces)
+    assert trimesh.vertices == [Point2D(*v) for v in vertices]
+    assert sum(t.area() for t in trimesh.get_triangles()) == pytest.approx(1.0)
+    assert np.array_equal(trimesh.faces_array, faces)
+
+    with pytest.raises(ValueError):
+        Trimesh2D.from_arrays(vertices, faces[:, :2])
+    with pytest.raises(ValueError):
+        Trimesh2D.from_arrays(vertices, faces + 1)
+
+
+def test_pickle_2d() -> None:
+    """Tests pickling 2D types."""
+
+    p1, p2, p3 = Point2D(0, 0), Point2D(1, 0), Point2D(0, 1)
+    values = [
+        p2,
+        Line2D(p1, p2),
+        Triangle2D(p1, p2, p3),
+        Circle2D(p2, 2.0),
+        BoundingBox2D(p1, p2),
+        Polygon2D([p1, p2, p3]),
+    ]
+    for value in values:
+        assert pickle.loads(pickle.dumps(value)) == value
+    affine = Affine2D(rot=0.5, trans=(1.0, 2.0))
+    assert (pickle.loads(pickle.dumps(affine)) >> p2) == (affine >> p2)
+
+    mesh = regular_polygon_mesh(1.0, n=7)
+    other = pickle.loads(pickle.dumps(mesh, protocol=5))
+    assert isinstance(other, Trimesh2D)
+    assert other.vertices == mesh.vertices
+    assert other.faces == mesh.faces
+
+
+def test_unpickle_invalid_mesh_2d() -> None:
+    """Checks that unpickling a mesh with out-of-range indices fails."""
+
+    mesh = Trimesh2D.__new__(Trimesh2D)
+    with pytest.raises(RuntimeError):
+        mesh.__setstate__((np.zeros((3, 2)), np.array([[0, 1, 3]])))